@@ -79,3 +79,26 @@ bool edge2D(sampler2D tex, vec2 coord, vec4 val, vec4 tol, vec2 offsets) {
 
     return false;  
 }
+
+
+/*
+ * For edge map textures created by the EdgeMapTexture class. Each texel
+ * contains a set of bits, one for each voxel axis, which are set if the
+ * voxel lies on an edge along that axis. The axes vector contains 1 for
+ * each axis that is to be considered, and 0 otherwise.
+ */
+bool edgeMap3D(sampler3D tex, vec3 coord, vec3 axes) {
+
+    float bits = floor(texture3D(tex, coord).r * 255.0 + 0.5);
+
+    for (int i = 0; i < 3; i++) {
+
+        if (axes[i] > 0 && mod(bits, 2.0) >= 1.0) {
+            return true;
+        }
+
+        bits = floor(bits / 2.0);
+    }
+
+    return false;
+}
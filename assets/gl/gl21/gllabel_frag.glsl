@@ -6,6 +6,7 @@
  */
 #version 120
 #pragma include test_in_bounds.glsl
+#pragma include edge.glsl
 
 /*
  * Texture containing image data.
@@ -33,6 +34,27 @@ uniform vec3 imageShape;
  */
 uniform float numLabels;
 
+/*
+ * If true, the edgeTexture is used to determine whether
+ * or not each fragment lies on a region outline.
+ */
+uniform bool useEdgeMap;
+
+/*
+ * Texture containing the edge map - see the EdgeMapTexture class.
+ */
+uniform sampler3D edgeTexture;
+
+/*
+ * Voxel axes along which edges are to be drawn.
+ */
+uniform vec3 edgeAxes;
+
+/*
+ * If true (and useEdgeMap is true), only region outlines are drawn.
+ */
+uniform bool outline;
+
 /*
  * Voxel coordinates.
  */
@@ -52,6 +74,11 @@ void main(void) {
         discard;
     }
 
+    if (useEdgeMap && outline &&
+        !edgeMap3D(edgeTexture, fragTexCoord, edgeAxes)) {
+        discard;
+    }
+
     float voxValue = texture3D(imageTexture, fragTexCoord).r;
     float lutCoord = ((voxValXform * vec4(voxValue, 0, 0, 1)).x + 0.5) / numLabels;
 
@@ -8,6 +8,7 @@
 
 #pragma include spline_interp.glsl
 #pragma include test_in_bounds.glsl
+#pragma include edge.glsl
 
 /*
  * Texture containing image data.
@@ -45,6 +46,21 @@ uniform bool useSpline;
  */
 uniform vec4 colour;
 
+/*
+ * If true, only the mask outline is drawn, as defined by the edgeTexture.
+ */
+uniform bool useEdgeMap;
+
+/*
+ * Texture containing the edge map - see the EdgeMapTexture class.
+ */
+uniform sampler3D edgeTexture;
+
+/*
+ * Voxel axes along which edges are to be drawn.
+ */
+uniform vec3 edgeAxes;
+
 /*
  * Voxel coordinates.
  */
@@ -65,6 +81,10 @@ void main(void) {
         discard;
     }
 
+    if (useEdgeMap && !edgeMap3D(edgeTexture, fragTexCoord, edgeAxes)) {
+        discard;
+    }
+
     if (useSpline) voxValue = spline_interp(imageTexture,
                                             fragTexCoord,
                                             imageShape,
@@ -37,10 +37,17 @@ uniform sampler1D negColourTexture;
 uniform mat4 img2CmapXform;
 
 /*
- * Shape of the imageTexture/clipTexture.
+ * Shape of the image.
  */
 uniform vec3 imageShape;
 
+/*
+ * Shape of the imageTexture. This will differ from
+ * the image shape if the image is being resampled
+ * from the texture of another image.
+ */
+uniform vec3 texShape;
+
 /*
  * Shape of the clipping image.
  */
@@ -112,6 +119,32 @@ uniform vec4 clipPlanes[5];
  */
 uniform int clipMode;
 
+/*
+ * Texture containing a flag for each brick of the image,
+ * which is zero for bricks that do not contain any voxels
+ * which could contribute to the final colour (see the
+ * BrickTexture class).
+ */
+uniform sampler3D brickTexture;
+
+/*
+ * If true, the brickTexture is used to skip over empty
+ * bricks.
+ */
+uniform bool skipEmpty;
+
+/*
+ * Number of bricks along each dimension.
+ */
+uniform vec3 brickShape;
+
+/*
+ * Scaling factors which transform an image texture
+ * coordinate into a brick coordinate (i.e. the image
+ * shape divided by the brick size).
+ */
+uniform vec3 brickCoordScale;
+
 /*
  * A vector which defines how far to move in one iteration
  * of the ray-cast loop. This is added directly to the
@@ -208,6 +241,38 @@ void main(void) {
         break;
       }
 
+      /*
+       * If the current brick is empty, jump to the
+       * first sample in the next brick. We move
+       * along the ray by a whole number of steps,
+       * so that samples are taken at the same
+       * positions as they would be without skipping.
+       */
+      if (skipEmpty) {
+
+        vec3 brickCoord = texCoord * brickCoordScale;
+
+        if (texture3D(brickTexture, brickCoord / brickShape).r < 0.5) {
+
+          vec3  brickStep = rayStep * brickCoordScale;
+          vec3  boundary  = floor(brickCoord) + step(0.0, brickStep);
+          vec3  exitDist  = abs(boundary - brickCoord) /
+                            max(abs(brickStep), vec3(1e-6));
+          float nsteps    = ceil(min(exitDist.x,
+                                     min(exitDist.y, exitDist.z)));
+
+          /*
+           * The loop will shift the ray
+           * along by one more step.
+           */
+          if (nsteps > 1.0) {
+            texCoord     += rayStep * (nsteps - 1.0);
+            clipTexCoord += rayStep * (nsteps - 1.0);
+          }
+          continue;
+        }
+      }
+
       /*
        * Count the number of active clipping
        * planes (planes for which the current
@@ -24,7 +24,7 @@ bool sample_volume(vec3      texCoord,
    */
   if (useSpline) voxValue = spline_interp(imageTexture,
                                           texCoord,
-                                          imageShape,
+                                          texShape,
                                           0);
   else           voxValue = texture3D(    imageTexture, texCoord).r;
 
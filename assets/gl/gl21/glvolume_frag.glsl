@@ -36,10 +36,17 @@ uniform sampler1D negColourTexture;
 uniform mat4 img2CmapXform;
 
 /*
- * Shape of the imageTexture/clipTexture.
+ * Shape of the image.
  */
 uniform vec3 imageShape;
 
+/*
+ * Shape of the imageTexture. This will differ from
+ * the image shape if the image is being resampled
+ * from the texture of another image.
+ */
+uniform vec3 texShape;
+
 /*
  * Shape of the clipping image.
  */
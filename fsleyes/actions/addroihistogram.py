@@ -9,26 +9,41 @@ action used by the :class:`.HistogramPanel`.
 """
 
 
-import          wx
-import numpy as np
+import logging
+
+import wx
 
 import fsl.data.image                   as fslimage
+import fsl.utils.idle                   as idle
+import fsl.utils.cache                  as cache
 
 import fsleyes.strings                  as strings
 import fsleyes.plotting.dataseries      as dataseries
 import fsleyes.plotting.histogramseries as histogramseries
+import fsleyes.plotting.histogramengine as histogramengine
 
 from . import                         base
 from . import                         addmaskdataseries
 
 
+log = logging.getLogger(__name__)
+
+
 class AddROIHistogramAction(base.Action):
     """The ``AddROIHistogramAction`` class is used by the
     :class:`.HistogramPanel`.
 
     It performs a very similar task to the :class:`.AddMaskDataSeriesAction` -
-    the user selects a binary mask, the data within the base image is extracted
-    for that mask, and the histogram of that data is added to the plot.
+    the user selects a binary mask, the histogram of the data within the base
+    image is calculated for that mask, and added to the plot.
+
+    The histogram is calculated on a separate thread, via
+    :func:`.histogramengine.calcBaseHistogram`, which streams the image data
+    rather than extracting the masked data into memory. If the
+    :attr:`.ImageHistogramSeries.allVolumes` property is ``True`` for the base
+    image, the histogram is calculated across all volumes. Calculated
+    histograms are cached for each image, mask and volume, and are discarded
+    when the data of either image changes.
     """
 
 
@@ -47,6 +62,8 @@ class AddROIHistogramAction(base.Action):
         self.__plotPanel   = plotPanel
         self.__name        = '{}_{}'.format(type(self).__name__, id(self))
         self.__roiOptions  = []
+        self.__cache       = cache.Cache(maxsize=20)
+        self.__registered  = {}
 
         overlayList.addListener('overlays',
                                 self.__name,
@@ -64,6 +81,11 @@ class AddROIHistogramAction(base.Action):
         """
         self.__overlayList.removeListener('overlays',        self.__name)
         self.__displayCtx .removeListener('selectedOverlay', self.__name)
+
+        for img in list(self.__registered.values()):
+            self.__deregister(img)
+
+        self.__cache.clear()
         self.__overlayList = None
         self.__displayCtx  = None
         self.__plotPanel   = None
@@ -77,6 +99,13 @@ class AddROIHistogramAction(base.Action):
         valid mask images for the currently selected overlay.
         """
 
+        # Discard cached histograms for
+        # images which have been removed
+        for img in list(self.__registered.values()):
+            if img not in self.__overlayList:
+                self.__deregister(img)
+                self.__cache.clear()
+
         overlay = self.__displayCtx.getSelectedOverlay()
 
         if (len(self.__overlayList) == 0 or
@@ -117,21 +146,65 @@ class AddROIHistogramAction(base.Action):
         if dlg.ShowModal() != wx.ID_OK:
             return
 
-        maskimg = roiOptions[dlg.GetChoice()]
-        mask    = maskimg[:] > 0
+        maskimg    = roiOptions[dlg.GetChoice()]
+        hs         = self.__plotPanel.getDataSeries(overlay)
+        allVolumes = getattr(hs, 'allVolumes', False) and overlay.ndim > 3
+
+        if   allVolumes:        volkey = ('all',)
+        elif overlay.ndim > 3:  volkey = (opts.volumeDim, opts.volume)
+        else:                   volkey = None
+
+        key      = (id(overlay), id(maskimg), volkey)
+        index    = opts.index()
+        baseHist = self.__cache.get(key, None)
+        result   = []
+
+        # The histogram is calculated on
+        # the worker pool, from a 3D mask
+        # and the image data, streamed
+        # along the last axis (Z, or time)
+        def calc():
+            mask = maskimg[:] > 0
+
+            if allVolumes or overlay.ndim <= 3: data = overlay
+            else:                               data = overlay[index]
+
+            result.append(histogramengine.calcBaseHistogram(
+                data, mask=mask, pool=histogramengine.sharedPool()))
+
+        def finish():
+            if self.__plotPanel is None:
+                return
+            self.__register(overlay)
+            self.__register(maskimg)
+            self.__cache.put(key, result[0])
+            self.__addHistogram(overlay, maskimg, result[0])
+
+        if baseHist is not None:
+            self.__addHistogram(overlay, maskimg, baseHist)
+        else:
+            idle.run(calc, onFinish=finish)
+
+
+    def __addHistogram(self, overlay, maskimg, baseHist):
+        """Called by :meth:`__addROIHistogram`. Derives a histogram from the
+        given :class:`.BaseHistogram`, and adds it to the plot.
+        """
 
-        if overlay.ndim > 3: data = overlay[opts.index()][mask]
-        else:                data = overlay[mask]
+        if baseHist is None or baseHist.nfinite == 0:
+            log.debug('Mask {} does not contain any values from '
+                      '{}'.format(maskimg.name, overlay.name))
+            return
 
         count           = self.__plotPanel.histType == 'count'
-        drange          = (np.nanmin(data), np.nanmax(data))
-        nbins           = histogramseries.autoBin(data, drange)
-        xdata, ydata, _ = histogramseries.histogram(data,
-                                                    nbins,
-                                                    drange,
-                                                    drange,
-                                                    includeOutliers=False,
-                                                    count=count)
+        drange          = (baseHist.dmin, baseHist.dmax)
+        nbins           = histogramseries.autoBin(baseHist, drange)
+        xdata, ydata, _ = baseHist.histogram(nbins,
+                                             drange,
+                                             drange,
+                                             includeOutliers=False,
+                                             ignoreZeros=False,
+                                             count=count)
 
         ds           = dataseries.DataSeries(overlay,
                                              self.__overlayList,
@@ -150,3 +223,28 @@ class AddROIHistogramAction(base.Action):
         ds.setData(*self.__plotPanel.prepareDataSeries(ds))
 
         self.__plotPanel.dataSeries.append(ds)
+
+
+    def __register(self, img):
+        """Registers a listener on the data of the given image, so that
+        cached histograms are discarded when it changes.
+        """
+        if id(img) in self.__registered:
+            return
+        self.__registered[id(img)] = img
+        img.register(self.__name, self.__dataChanged, 'data')
+
+
+    def __deregister(self, img):
+        """De-registers the listener which was registered on the given image
+        by :meth:`__register`.
+        """
+        self.__registered.pop(id(img), None)
+        img.deregister(self.__name, 'data')
+
+
+    def __dataChanged(self, *a):
+        """Called when the data of an image for which a histogram has been
+        cached changes. Clears the cache.
+        """
+        self.__cache.clear()
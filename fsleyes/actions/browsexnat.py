@@ -105,7 +105,8 @@ class BrowseXNATAction(base.Action):
         loadoverlay.loadOverlays(paths,
                                  onLoad=onLoad,
                                  saveDir=False,
-                                 inmem=self.__displayCtx.loadInMemory)
+                                 inmem=self.__displayCtx.loadInMemory,
+                                 progressive=True)
 
 
 class XNATBrowser(wx.Dialog):
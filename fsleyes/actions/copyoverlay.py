@@ -9,14 +9,15 @@ which creates a copy of the currently selected overlay.
 """
 
 
-import numpy                  as np
+import numpy                    as np
 
-import fsl.data.image         as fslimage
-import fsl.utils.transform    as transform
-import fsl.utils.settings     as fslsettings
-import fsleyes_widgets.dialog as fsldlg
-import fsleyes.strings        as strings
-from . import                    base
+import fsl.data.image           as fslimage
+import fsl.utils.transform      as transform
+import fsl.utils.settings       as fslsettings
+import fsleyes_widgets.dialog   as fsldlg
+import fsleyes.strings          as strings
+import fsleyes.copyonwriteimage as copyonwriteimage
+from . import                      base
 
 
 class CopyOverlayAction(base.Action):
@@ -100,7 +101,8 @@ class CopyOverlayAction(base.Action):
             return
 
         # TODO support for other overlay types
-        if type(overlay) != fslimage.Image:
+        if type(overlay) not in (fslimage.Image,
+                                 copyonwriteimage.CopyOnWriteImage):
             raise RuntimeError('Currently, only {} instances can be '
                                'copied'.format(fslimage.Image.__name__))
 
@@ -175,7 +177,8 @@ def copyImage(overlayList,
               copyDisplay=True,
               name=None,
               roi=None,
-              data=None):
+              data=None,
+              dtype=None):
     """Creates a copy of the given :class:`.Image` overlay, and inserts it
     into the :class:`.OverlayList`.
 
@@ -186,7 +189,8 @@ def copyImage(overlayList,
     :arg overlay:     The :class:`.Image` to be copied.
 
     :arg createMask:  If ``True``, the copy will be an empty ``Image`` the
-                      same shape as the ``overlay``.
+                      same shape as the ``overlay``, with a data type of
+                      ``uint8`` (unless a ``dtype`` is specified).
 
     :arg copy4D:      If ``True``, and the ``overlay`` is 4D, the copy will
                       also be 4D. Otherwise, the current 3D voluem is copied.
@@ -209,7 +213,22 @@ def copyImage(overlayList,
                       (i.e. ``copy4D`` and ``roi``). If ``data`` is provided,
                       the ``createMask`` argument is ignored.
 
+    :arg dtype:       Data type of the copy. Defaults to the ``overlay`` data
+                      type. Ignored if ``data`` is provided.
+
     :returns:         The newly created :class:`.Image` object.
+
+    Unless ``data`` is provided, the copy is a
+    :class:`.CopyOnWriteImage`, which shares its data with the ``overlay``
+    until it is modified, so creating the copy is fast, and does not require
+    any memory to be allocated.
+
+    .. note:: Because the copy shares its data with the ``overlay``, any
+              code which subsequently modifies the ``overlay`` data must call
+              :func:`.copyonwriteimage.prepareWrite` beforehand (the
+              :class:`.Editor` does this). If it is not called, the copy may
+              receive the new values, after which it is detached from the
+              ``overlay`` - see the :mod:`.copyonwriteimage` module.
     """
 
     ovlIdx = overlayList.index(overlay)
@@ -235,12 +254,8 @@ def copyImage(overlayList,
     if is4D and not copy4D:
         roi = list(roi[:3]) + [(opts.volume, opts.volume + 1)]
 
-    shape = [hi - lo for lo, hi in roi]
-    slc   = tuple([slice(lo, hi) for lo, hi in roi])
-
-    if data is not None: pass
-    elif createMask:     data = np.zeros(shape)
-    else:                data = np.copy(overlay[slc])
+    if createMask and dtype is None:
+        dtype = np.uint8
 
     # If this is an ROI, we need to add
     # an offset to the image affine
@@ -254,8 +269,16 @@ def copyImage(overlayList,
         xform  = None
 
     # Create the copy, put it in the list
-    header = overlay.header.copy()
-    copy   = fslimage.Image(data, name=name, header=header, xform=xform)
+    if data is not None:
+        header = overlay.header.copy()
+        copy   = fslimage.Image(data, name=name, header=header, xform=xform)
+    else:
+        copy = copyonwriteimage.CopyOnWriteImage(overlay,
+                                                 roi=roi,
+                                                 dtype=dtype,
+                                                 empty=createMask,
+                                                 name=name,
+                                                 xform=xform)
 
     overlayList.insert(ovlIdx + 1, copy)
 
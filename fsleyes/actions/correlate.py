@@ -7,14 +7,19 @@
 """This module provides the :class:`.PearsonCorrelateAction` and
 :class:`PCACorrelateAction` classes, which are :class:`.Action`s that
 calculate seed-based correlation on 4D :class:`.Image` overlays.
+
+The :class:`NormalisedTimeSeries` class is used by the
+``PearsonCorrelateAction`` to store pre-processed time series data, so that
+the correlation for each new seed can be calculated quickly.
 """
 
 
+import os
 import threading
+import tempfile
 import logging
 
-import numpy                  as np
-import scipy.spatial.distance as spd
+import numpy as np
 
 import fsl.data.image               as fslimage
 import fsl.utils.idle               as idle
@@ -194,14 +199,13 @@ class CorrelateAction(base.Action):
         # add it to the overlay list after the
         # correlation values have been calculated.
 
-        opts = self.__displayCtx.getOpts(ovl)
-        xyz  = opts.getVoxel(vround=True)
+        opts  = self.__displayCtx.getOpts(ovl)
+        xyz   = opts.getVoxel(vround=True)
+        index = opts.index(atVolume=False)
 
         if xyz is None:
             return
 
-        data = ovl.nibImage.get_data()[opts.index(atVolume=False)]
-
         # The correlation calculation is performed
         # on a separate thread. This thread then
         # schedules a function on idle.idle to
@@ -209,7 +213,15 @@ class CorrelateAction(base.Action):
         # main thread.
         def calcCorr():
 
-            correlations = self.calculateCorrelation(xyz, data)
+            try:
+                correlations = self.calculateCorrelation(xyz, ovl, index)
+
+            except Exception as e:
+                log.warning('Correlation calculation failed: {}'.format(e),
+                            exc_info=True)
+                fslstatus.clearStatus()
+                self.__correlateFlag.clear()
+                return
 
             # The correlation overlay is updated/
             # created on the main thread.
@@ -243,16 +255,20 @@ class CorrelateAction(base.Action):
         idle.run(calcCorr)
 
 
-    def calculateCorrelation(self, seed, data):
+    def calculateCorrelation(self, seed, overlay, index):
         """Calculates correlation values between the given ``seed`` voxel (an
         ``(x, y, z)`` tuple) and all other voxels. This method must be
-        implemented by sub-classes.
+        implemented by sub-classes. It is called on a separate thread.
 
-        :arg seed: An ``(x, y, z)`` tuple specifying the seed voxel
+        :arg seed:    An ``(x, y, z)`` tuple specifying the seed voxel
 
-        :arg data: A 4D ``numpy`` array containing all of the data.
+        :arg overlay: The 4D :class:`.Image`.
 
-        :returns:  A 3D ``numpy`` array containing the correlation values.
+        :arg index:   A tuple which can be used to index ``overlay`` to
+                      retrieve the 4D data to be correlated (see
+                      :meth:`.NiftiOpts.index`).
+
+        :returns:     A 3D ``numpy`` array containing the correlation values.
         """
         raise NotImplementedError('calculateCorrelation must be '
                                   'implemented by sub-classes')
@@ -262,39 +278,239 @@ class PearsonCorrelateAction(CorrelateAction):
     """The ``PearsonCorrelateAction`` is a :class:`CorrelateAction` which
     calculates Pearson correlation coefficient values between the seed voxel
     and all other voxels.
+
+    The first time that a correlation is calculated on an image, a
+    :class:`NormalisedTimeSeries` is created for it. This is cached, so that
+    the correlation for subsequent seeds can be calculated quickly. The cache
+    is cleared when the image data changes, or when the image is removed from
+    the :class:`.OverlayList`.
     """
 
-    def calculateCorrelation(self, seed, data):
+    def __init__(self, overlayList, displayCtx, panel):
+        """Create a ``PearsonCorrelateAction``. See
+        :meth:`CorrelateAction.__init__`.
+        """
+
+        CorrelateAction.__init__(self, overlayList, displayCtx, panel)
+
+        self.__overlayList = overlayList
+        self.__name        = '{}_{}'.format(type(self).__name__, id(self))
+        self.__normData    = {}
+        self.__normLock    = threading.Lock()
+
+        overlayList.addListener('overlays',
+                                self.__name,
+                                self.__overlayListChanged)
+
+
+    def destroy(self):
+        """Clears the cache, and calls :meth:`CorrelateAction.destroy`. """
+
+        self.__overlayList.removeListener('overlays', self.__name)
+
+        for overlay in list(self.__normData.keys()):
+            self.__clearNormData(overlay)
+
+        self.__overlayList = None
+        CorrelateAction.destroy(self)
+
+
+    def calculateCorrelation(self, seed, overlay, index):
         """Calculates Pearson correlation between the data at the specified
         seed voxel, and all other voxels.
         """
 
-        x, y, z = seed
-        npoints = data.shape[3]
+        key = tuple(None if isinstance(i, slice) else i for i in index[3:])
 
-        # the scipy.spatial.distance.cdist
-        # function can be used to calculate
-        # one-to-many correlation values.
-        with np.errstate(invalid='ignore'):
-            correlations = 1 - spd.cdist(
-                data[x, y, z, :].reshape( 1, npoints),
-                data            .reshape(-1, npoints),
-                metric='correlation')
+        with self.__normLock:
 
-        # Set any nans to 0
-        correlations[np.isnan(correlations)] = 0
+            cached = self.__normData.get(overlay, None)
 
-        return correlations.reshape(data.shape[:3])
+            if cached is not None and cached[0] != key:
+                self.__clearNormData(overlay)
+                cached = None
+
+        # The normalised data is calculated
+        # outside of the lock, as it may take
+        # a while, and the lock is also used
+        # on the main thread.
+        if cached is not None:
+            normData = cached[1]
+
+        else:
+            normData = NormalisedTimeSeries(overlay, index)
+
+            with self.__normLock:
+                self.__clearNormData(overlay)
+                self.__normData[overlay] = (key, normData)
+                overlay.register(self.__name, self.__dataChanged, 'data')
+
+        return normData.correlate(seed)
+
+
+    def __clearNormData(self, overlay):
+        """Removes the cached :class:`NormalisedTimeSeries` for the given
+        overlay, if there is one.
+        """
+
+        cached = self.__normData.pop(overlay, None)
+
+        if cached is None:
+            return
+
+        overlay.deregister(self.__name, 'data')
+        cached[1].destroy()
+
+
+    def __dataChanged(self, overlay, *a):
+        """Called when the data of an image which has cached normalised data
+        changes. Clears the cache for the image.
+        """
+        with self.__normLock:
+            self.__clearNormData(overlay)
+
+
+    def __overlayListChanged(self, *a):
+        """Called when the :class:`.OverlayList` changes. Clears the cache for
+        any images which have been removed.
+        """
+        with self.__normLock:
+            for overlay in list(self.__normData.keys()):
+                if overlay not in self.__overlayList:
+                    self.__clearNormData(overlay)
+
+
+class NormalisedTimeSeries(object):
+    """The ``NormalisedTimeSeries`` class stores de-meaned, unit-norm
+    ``float32`` time series for every voxel in a 4D :class:`.Image`. The
+    Pearson correlation between a seed voxel and all other voxels is then
+    simply the dot product of the normalised seed time series with the
+    normalised time series of every voxel.
+
+    The normalised time series are calculated one slice at a time, directly
+    from the image (which may be memory-mapped, or compressed and on disk),
+    so the full data set is never loaded into memory. If the normalised data
+    is larger than :attr:`MEMORY_LIMIT` bytes, it is stored in a temporary
+    memory-mapped file. Correlations are calculated in chunks of
+    :attr:`CHUNK_SIZE` voxels, so that memory use remains bounded.
+    """
+
+
+    MEMORY_LIMIT = 512 * 1048576
+    """Normalised time series data larger than this many bytes is stored in a
+    temporary memory-mapped file, rather than in memory.
+    """
+
+
+    CHUNK_SIZE = 65536
+    """Number of voxels to process at a time in :meth:`correlate`. """
+
+
+    def __init__(self, overlay, index):
+        """Create a ``NormalisedTimeSeries``, and calculate the normalised
+        time series for every voxel.
+
+        :arg overlay: The 4D :class:`.Image`.
+        :arg index:   A tuple which can be used to index ``overlay`` to
+                      retrieve the 4D data (see :meth:`.NiftiOpts.index`).
+        """
+
+        shape   = overlay.shape[:3]
+        nvox    = int(np.prod(shape))
+        volidx  = tuple(index[3:])
+        fname   = None
+        data    = None
+
+        log.debug('Calculating normalised time series for {}'.format(
+            overlay.name))
+
+        for z in range(shape[2]):
+
+            # Voxels are stored in fortran
+            # order (x fastest), so that each
+            # slice is a contiguous block of
+            # rows - transpose the slice from
+            # (x, y, t) to (y, x, t).
+            slc   = (slice(None), slice(None), z) + volidx
+            slc   = np.asarray(overlay[slc], dtype=np.float32)
+            slc   = slc.transpose((1, 0, 2)).reshape(-1, slc.shape[-1])
+            slc   = slc - slc.mean(axis=1, keepdims=True)
+            norms = np.sqrt((slc ** 2).sum(axis=1, keepdims=True))
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                slc = np.where(norms > 0, slc / norms, 0)
+
+            if data is None:
+                npoints = slc.shape[1]
+                nbytes  = nvox * npoints * 4
+
+                if nbytes > self.MEMORY_LIMIT:
+                    hd, fname = tempfile.mkstemp(prefix='fsleyes_correlate_',
+                                                 suffix='.dat')
+                    os.close(hd)
+                    data = np.memmap(fname,
+                                     dtype=np.float32,
+                                     mode='w+',
+                                     shape=(nvox, npoints))
+                else:
+                    data = np.zeros((nvox, npoints), dtype=np.float32)
+
+            start = z * shape[0] * shape[1]
+            end   = start + shape[0] * shape[1]
+
+            data[start:end] = slc
+
+        self.__shape = shape
+        self.__data  = data
+        self.__fname = fname
+
+
+    def destroy(self):
+        """Must be called when this ``NormalisedTimeSeries`` is no longer
+        needed. Deletes the temporary file, if one was created.
+        """
+
+        self.__data = None
+
+        if self.__fname is not None:
+            try:
+                os.remove(self.__fname)
+            except OSError as e:
+                log.warning('Could not remove temporary file {}: '
+                            '{}'.format(self.__fname, e))
+            self.__fname = None
+
+
+    def correlate(self, seed):
+        """Calculates the Pearson correlation between the time series at the
+        given ``(x, y, z)`` seed voxel and all other voxels.
+
+        :returns: A 3D ``numpy`` array containing the correlation values.
+        """
+
+        shape    = self.__shape
+        data     = self.__data
+        nvox     = data.shape[0]
+        x, y, z  = seed
+        seedts   = np.array(data[x + y * shape[0] + z * shape[0] * shape[1]])
+        corrs    = np.zeros(nvox, dtype=np.float32)
+
+        for start in range(0, nvox, self.CHUNK_SIZE):
+            end              = min(start + self.CHUNK_SIZE, nvox)
+            corrs[start:end] = np.dot(data[start:end], seedts)
+
+        return corrs.reshape(shape, order='F')
 
 
 class PCACorrelateAction(CorrelateAction):
     """
     """
 
-    def calculateCorrelation(self, seed, data):
+    def calculateCorrelation(self, seed, overlay, index):
         """
         """
 
+        data    = overlay[index]
         x, y, z = seed
         nvox    = np.prod(data.shape[:3])
         npoints =         data.shape[ 3]
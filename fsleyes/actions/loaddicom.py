@@ -22,14 +22,15 @@ from   datetime import datetime
 
 import wx
 
-import fsleyes_widgets.widgetgrid     as wg
-import fsleyes_widgets.utils.status   as status
-import fsleyes_widgets.utils.progress as progress
-import fsl.utils.settings             as fslsettings
-import fsl.data.dicom                 as fsldcm
-import fsleyes.strings                as strings
-import fsleyes.autodisplay            as autodisplay
-from . import                            base
+import fsleyes_widgets.widgetgrid   as wg
+import fsleyes_widgets.utils.status as status
+import fsl.utils.settings           as fslsettings
+import fsl.utils.idle               as idle
+import fsl.data.dicom               as fsldcm
+import fsleyes.strings              as strings
+import fsleyes.autodisplay          as autodisplay
+import fsleyes.dicomloader          as dicomloader
+from . import                          base
 
 
 class LoadDicomAction(base.Action):
@@ -93,13 +94,21 @@ def loadDicom(dcmdir=None, parent=None, callback=None):
          ``dcmdir is not None``)
 
       2. Loads metadata about all of the data series in the
-         DICOM directory
+         DICOM directory, via the :func:`.dicomloader.scanDir`
+         function.
 
       3. Uses a :class:`.BrowseDicomDialog` to allow the user
-         to choose which data series they wish to load
+         to choose which data series they wish to load. The
+         dialog is shown while the directory is being scanned,
+         and series are added to it as they are found.
 
-      4. Loads the selected series, and passes them to the
-         ``callback`` function if it is provided.
+      4. Loads the selected series in parallel, via the
+         :func:`.dicomloader.loadSeries` function, and passes
+         them to the ``callback`` function if it is provided.
+
+    The scan is cancelled if the user closes the ``BrowseDicomDialog`` before
+    it has finished (or loads the series that have been found so far), and
+    loading may be cancelled via its progress dialog.
 
     :arg dcmdir:   Directory to load DICOMs from. If not provided, the user is
                    prompted to select a directory.
@@ -129,84 +138,105 @@ def loadDicom(dcmdir=None, parent=None, callback=None):
 
     # 2. load metadata about all data series in
     #    the DICOM directory. This is performed
-    #    on a separate thread via the
-    #    progress.runWithBounce function.
-    series = []
-    images = []
+    #    on a separate thread, while the browse
+    #    dialog is shown - series are passed to
+    #    the dialog (on the main thread) as they
+    #    are found. Setting state['cancelled']
+    #    causes the scan to be aborted.
+    dlg   = BrowseDicomDialog(parent, [])
+    state = {'cancelled' : False, 'error' : None}
+
+    def addSeries(series):
+        if not state['cancelled']:
+            for s in series:
+                dlg.AddSeries(s)
 
-    def scan():
-        try:
-            series.extend(fsldcm.scanDir(dcmdir))
-            if len(series) == 0:
-                raise Exception('Could not find any DICOM '
-                                'data series in {}'.format(dcmdir))
+    def progfunc(series):
+        if len(series) > 0:
+            idle.idle(addSeries, series)
+        return not state['cancelled']
 
-        except Exception as e:
-            series.append(e)
+    def scan():
+        series = dicomloader.scanDir(dcmdir, progfunc)
+        if len(series) == 0:
+            raise Exception('Could not find any DICOM '
+                            'data series in {}'.format(dcmdir))
 
-    # 3. ask user which data series
-    #    they want to load. This is called
-    #    after the scan function has
-    #    finished - see runWithBounce.
-    def postScan(completed):
+    def onScanFinish():
+        if not state['cancelled']:
+            dlg.ScanFinished()
 
-        # did the user cancel the progress dialog?
-        if not completed:
+    def onScanError(e):
+        if state['cancelled']:
             return
+        state['error'] = e
+        dlg.EndModal(wx.ID_CANCEL)
 
-        # did an error occur in the scan step above?
-        if isinstance(series[0], Exception):
-            errTitle = strings.titles[  'loadDicom.scanError']
-            errMsg   = strings.messages['loadDicom.scanError']
-            status.reportError(errTitle, errMsg, series[0])
-            return
+    idle.run(scan, onFinish=onScanFinish, onError=onScanError)
 
-        dlg = BrowseDicomDialog(parent, series)
-        dlg.CentreOnParent()
+    # 3. ask user which data series
+    #    they want to load.
+    dlg.CentreOnParent()
 
-        if dlg.ShowModal() != wx.ID_OK:
-            return
+    result = dlg.ShowModal()
+    series = [s for i, s in enumerate(dlg.GetSeries())
+              if dlg.IsSelected(i)]
 
-        # load the selected series - this is
-        # done asynchronously via another
-        # call to runWithBounce.
-        for i in reversed(list(range(len(series)))):
-            if not dlg.IsSelected(i):
-                series.pop(i)
+    # stop the scan if it is
+    # still running
+    state['cancelled'] = True
+    dlg.Destroy()
 
-        title = strings.titles[  'loadDicom.loading']
-        msg   = strings.messages['loadDicom.loading']
-        progress.runWithBounce(load, title, msg, callback=postLoad)
+    # did an error occur in the scan step above?
+    if state['error'] is not None:
+        errTitle = strings.titles[  'loadDicom.scanError']
+        errMsg   = strings.messages['loadDicom.scanError']
+        status.reportError(errTitle, errMsg, state['error'])
+        return
+
+    if result != wx.ID_OK or len(series) == 0:
+        return
 
     # 4. Load the selected series. This is run
-    #    on a separate thread via runWithBounce
-    def load():
-        try:
-            for s in series:
-                images.extend(fsldcm.loadSeries(s))
+    #    on a separate thread, with a progress
+    #    dialog which allows the user to cancel.
+    progdlg = wx.ProgressDialog(
+        strings.titles[  'loadDicom.loading'],
+        strings.messages['loadDicom.loading'],
+        maximum=100,
+        parent=parent,
+        style=(wx.PD_CAN_ABORT      |
+               wx.PD_ELAPSED_TIME   |
+               wx.PD_REMAINING_TIME |
+               wx.PD_AUTO_HIDE))
+
+    lstate = {'cancelled' : False, 'finished' : False}
+    images = []
 
-            if len(images) == 0:
-                raise Exception('No images could be loaded '
-                                'from {}'.format(dcmdir))
+    def updateDialog(done, total):
+        if lstate['cancelled'] or lstate['finished']:
+            return
+        cont, _ = progdlg.Update(int(99 * done / float(total)))
+        if not cont:
+            lstate['cancelled'] = True
 
-        except Exception as e:
-            images.insert(0, e)
+    def loadProgress(done, total):
+        idle.idle(updateDialog, done, total)
+        return not lstate['cancelled']
+
+    def load():
+        images.extend(dicomloader.loadSeries(series, progfunc=loadProgress))
+
+        if len(images) == 0:
+            raise Exception('No images could be loaded '
+                            'from {}'.format(dcmdir))
 
     # Pass the loaded images to the calback
     # function. This is called after the
     # load function has finished.
-    def postLoad(completed):
-
-        # Did the user cancel the progress dialog?
-        if not completed:
-            return
-
-        # Did an error occur in the load step above?
-        if isinstance(images[0], Exception):
-            errTitle = strings.titles[  'loadDicom.loadError']
-            errMsg   = strings.messages['loadDicom.loadError']
-            status.reportError(errTitle, errMsg, images[0])
-            return
+    def onLoadFinish():
+        lstate['finished'] = True
+        progdlg.Destroy()
 
         fslsettings.write('loadSaveOverlayDir',
                           op.dirname(dcmdir.rstrip(op.sep)))
@@ -214,16 +244,29 @@ def loadDicom(dcmdir=None, parent=None, callback=None):
         if callback is not None:
             callback(images)
 
-    # Kick off the process
-    title = strings.titles[  'loadDicom.scanning']
-    msg   = strings.messages['loadDicom.scanning']
-    progress.runWithBounce(scan, title, msg, callback=postScan)
+    def onLoadError(e):
+        lstate['finished'] = True
+        progdlg.Destroy()
+        if isinstance(e, dicomloader.DicomCancelled):
+            return
+        errTitle = strings.titles[  'loadDicom.loadError']
+        errMsg   = strings.messages['loadDicom.loadError']
+        status.reportError(errTitle, errMsg, e)
+
+    progdlg.Show()
+    idle.run(load, onFinish=onLoadFinish, onError=onLoadError)
 
 
 class BrowseDicomDialog(wx.Dialog):
     """The ``BrowseDicomDialog`` contains a ``BrowseDicomPanel``, and a
     couple of buttons, allowing the user to select which DICOM series
     they would like to load.
+
+    The dialog may be created before the DICOM directory has been fully
+    scanned - new series can be added via the :meth:`AddSeries` method, and
+    the :meth:`ScanFinished` method should be called when the scan has
+    finished. The *Load* button is disabled until at least one series has
+    been added.
     """
 
     def __init__(self, parent, dcmseries):
@@ -231,22 +274,30 @@ class BrowseDicomDialog(wx.Dialog):
 
         :arg parent:    ``wx`` parent object
         :arg dcmseries: List of DICOM data series, as returned by the
-                        :func:`fsl.data.dicom.scanDir` function.
+                        :func:`.dicomloader.scanDir` function. May be empty.
         """
 
-        wx.Dialog.__init__(self, parent, title=strings.titles[self])
+        wx.Dialog.__init__(self,
+                           parent,
+                           title=strings.titles[self],
+                           style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
 
         self.__browser = BrowseDicomPanel(self, dcmseries)
+        self.__status  = wx.StaticText(self)
         self.__load    = wx.Button(self, id=wx.ID_OK)
         self.__cancel  = wx.Button(self, id=wx.ID_CANCEL)
 
         self.__load  .SetDefault()
         self.__load  .SetLabel(strings.labels[self, 'load'])
         self.__cancel.SetLabel(strings.labels[self, 'cancel'])
+        self.__status.SetLabel(strings.labels[self, 'scanning'])
+        self.__load  .Enable(len(dcmseries) > 0)
 
         self.__sizer    = wx.BoxSizer(wx.VERTICAL)
         self.__btnSizer = wx.BoxSizer(wx.HORIZONTAL)
 
+        self.__btnSizer.Add((10, 1),       flag=wx.EXPAND)
+        self.__btnSizer.Add(self.__status, flag=wx.ALIGN_CENTRE_VERTICAL)
         self.__btnSizer.Add((10, 1),       flag=wx.EXPAND, proportion=1)
         self.__btnSizer.Add(self.__load,   flag=wx.EXPAND)
         self.__btnSizer.Add((10, 1),       flag=wx.EXPAND)
@@ -260,6 +311,7 @@ class BrowseDicomDialog(wx.Dialog):
         self.__sizer.Add((1, 10),         flag=wx.EXPAND)
 
         self.SetSizer(self.__sizer)
+        self.SetMinSize((500, 300))
         self.Layout()
         self.Fit()
 
@@ -277,6 +329,33 @@ class BrowseDicomDialog(wx.Dialog):
         self.EndModal(wx.ID_CANCEL)
 
 
+    def AddSeries(self, series):
+        """Add a new DICOM series to the dialog, and enable the *Load*
+        button.
+        """
+        self.__browser.AddSeries(series)
+        self.__load.Enable()
+        self.__status.SetLabel(strings.labels[self, 'scanning'])
+        self.Layout()
+
+
+    def ScanFinished(self):
+        """Must be called when the DICOM directory scan has finished. Updates
+        the status label.
+        """
+        nseries = len(self.__browser.GetSeries())
+        self.__status.SetLabel(
+            strings.labels[self, 'found'].format(nseries))
+        self.Layout()
+
+
+    def GetSeries(self):
+        """Returns a list containing all of the DICOM series that are
+        displayed in this dialog.
+        """
+        return self.__browser.GetSeries()
+
+
     def IsSelected(self, sidx):
         """Returns ``True`` if the DICOM series at the given index has
         been selected by the user, ``False`` otherwise.
@@ -288,7 +367,8 @@ class BrowseDicomDialog(wx.Dialog):
 class BrowseDicomPanel(wx.Panel):
     """The ``BrowseDicomPanel`` displayes information about a collection of
     DICOM data series, and allows the user to select which series they would
-    like to load.
+    like to load. Series may be added after creation via the
+    :meth:`AddSeries` method.
     """
 
 
@@ -297,23 +377,13 @@ class BrowseDicomPanel(wx.Panel):
 
         :arg parent:    ``wx`` parent object
         :arg dcmseries: List of DICOM data series, as returned by the
-                        :func:`fsl.data.dicom.scanDir` function.
+                        :func:`.dicomloader.scanDir` function. May be empty.
         """
 
         wx.Panel.__init__(self, parent)
 
-        # we assume that this metadata
-        # is the same across all series
-        date        = dcmseries[0].get('AcquisitionDateTime', '')
-        dcmdir      = dcmseries[0].get('DicomDir',            '')
-        patient     = dcmseries[0].get('PatientName',         '')
-        institution = dcmseries[0].get('InstitutionName',     '')
-
-        try:
-            date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%S.%f')
-            date = '{:4d}-{:2d}-{:2d}'.format(date.year, date.month, date.day)
-        except ValueError:
-            date = ''
+        self.__dcmseries      = []
+        self.__loadCheckboxes = []
 
         self.__dcmdirLabel      = wx.StaticText(self)
         self.__dateLabel        = wx.StaticText(self)
@@ -326,16 +396,10 @@ class BrowseDicomPanel(wx.Panel):
         self.__institution = wx.StaticText(self)
         self.__series      = wg.WidgetGrid(self, style=0)
 
-        self.__loadCheckboxes = [wx.CheckBox(self) for s in dcmseries]
-
         self.__dcmdirLabel     .SetLabel(strings.labels[self, 'dicomdir'])
         self.__dateLabel       .SetLabel(strings.labels[self, 'date'])
         self.__patientLabel    .SetLabel(strings.labels[self, 'patient'])
         self.__institutionLabel.SetLabel(strings.labels[self, 'institution'])
-        self.__dcmdir          .SetLabel(dcmdir)
-        self.__date            .SetLabel(date)
-        self.__patient         .SetLabel(patient)
-        self.__institution     .SetLabel(institution)
 
         self.__mainSizer   = wx.BoxSizer(wx.VERTICAL)
         self.__titleSizer  = wx.FlexGridSizer(2, 5, 5)
@@ -368,26 +432,75 @@ class BrowseDicomPanel(wx.Panel):
         # TODO For other useful information,
         #      you might need to look in the niftis
 
-        # set up the grid
-        self.__series.SetGridSize(len(dcmseries), 4, growCols=(0, 1))
+        # set up the grid - rows are
+        # added in the AddSeries method
+        self.__series.SetGridSize(0, 4, growCols=(0, 1))
         self.__series.ShowColLabels()
         self.__series.SetColLabel(0, strings.labels[self, 'SeriesNumber'])
         self.__series.SetColLabel(1, strings.labels[self, 'SeriesDescription'])
         self.__series.SetColLabel(2, strings.labels[self, 'Matrix'])
         self.__series.SetColLabel(3, strings.labels[self, 'Load'])
 
-        for i, s in enumerate(dcmseries):
+        for s in dcmseries:
+            self.AddSeries(s)
+
+        self.__series.Refresh()
+
+
+    def AddSeries(self, series):
+        """Adds a new DICOM data series to this ``BrowseDicomPanel``. """
 
-            num  = s['SeriesNumber']
-            desc = s['SeriesDescription']
-            size = s['ReconMatrixPE']
+        # we assume that this metadata is the
+        # same across all series, and take it
+        # from the first one that is added
+        if len(self.__dcmseries) == 0:
+            self.__setHeader(series)
 
-            self.__series.SetText(  i, 0, str(num))
-            self.__series.SetText(  i, 1, desc)
-            self.__series.SetText(  i, 2, '{}x{}'.format(size, size))
-            self.__series.SetWidget(i, 3, self.__loadCheckboxes[i])
+        i        = len(self.__dcmseries)
+        num      = series['SeriesNumber']
+        desc     = series['SeriesDescription']
+        size     = series['ReconMatrixPE']
+        checkbox = wx.CheckBox(self)
 
+        self.__dcmseries     .append(series)
+        self.__loadCheckboxes.append(checkbox)
+
+        self.__series.InsertRow(i)
+        self.__series.SetText(  i, 0, str(num))
+        self.__series.SetText(  i, 1, desc)
+        self.__series.SetText(  i, 2, '{}x{}'.format(size, size))
+        self.__series.SetWidget(i, 3, checkbox)
         self.__series.Refresh()
+        self.Layout()
+
+
+    def __setHeader(self, series):
+        """Called by :meth:`AddSeries` for the first series that is added.
+        Populates the directory, date, patient, and institution labels.
+        """
+
+        date        = series.get('AcquisitionDateTime', '')
+        dcmdir      = series.get('DicomDir',            '')
+        patient     = series.get('PatientName',         '')
+        institution = series.get('InstitutionName',     '')
+
+        try:
+            date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%S.%f')
+            date = '{:4d}-{:2d}-{:2d}'.format(date.year, date.month, date.day)
+        except ValueError:
+            date = ''
+
+        self.__dcmdir     .SetLabel(dcmdir)
+        self.__date       .SetLabel(date)
+        self.__patient    .SetLabel(patient)
+        self.__institution.SetLabel(institution)
+
+
+    def GetSeries(self):
+        """Returns a list containing all of the DICOM series that are
+        displayed in this ``BrowseDicomPanel``.
+        """
+        return list(self.__dcmseries)
 
 
     def IsSelected(self, sidx):
@@ -28,6 +28,7 @@ when new files have been loaded.
 
 import            logging
 import            os
+import            threading
 import os.path as op
 
 import numpy   as np
@@ -39,6 +40,7 @@ import fsl.data.utils               as dutils
 import fsleyes_widgets.utils.status as status
 import fsleyes.autodisplay          as autodisplay
 import fsleyes.strings              as strings
+import fsleyes.workerpool           as workerpool
 from . import                          base
 
 
@@ -91,7 +93,8 @@ class LoadOverlayAction(base.Action):
                                             self.__displayCtx)
 
         interactiveLoadOverlays(onLoad=onLoad,
-                                inmem=self.__displayCtx.loadInMemory)
+                                inmem=self.__displayCtx.loadInMemory,
+                                progressive=True)
 
 
 def makeWildcard(allowedExts=None, descs=None):
@@ -140,7 +143,9 @@ def loadOverlays(paths,
                  saveDir=True,
                  onLoad=None,
                  inmem=False,
-                 blocking=False):
+                 blocking=False,
+                 progressive=False,
+                 nworkers=None):
     """Loads all of the overlays specified in the sequence of files
     contained in ``paths``.
 
@@ -148,49 +153,63 @@ def loadOverlays(paths,
               Use the ``onLoad`` argument if you wish to be notified when
               the overlays have been loaded.
 
-    :arg loadFunc:  A function which is called just before each overlay
-                    is loaded, and is passed the overlay path. The default
-                    load function uses the :mod:`.status` module to display
-                    the name of the overlay currently being loaded. Pass in
-                    ``None`` to disable this default behaviour.
-
-    :arg errorFunc: A function which is called if an error occurs while
-                    loading an overlay, being passed the name of the
-                    overlay, and either the :class:`Exception` which
-                    occurred, or a string containing an error message.  The
-                    default function pops up a :class:`wx.MessageBox` with
-                    an error message. Pass in ``None`` to disable this
-                    default behaviour.
-
-    :arg saveDir:   If ``True`` (the default), the directory of the last
-                    overlay in the list of ``paths`` is saved, and used
-                    later on as the default load directory.
-
-    :arg onLoad:    Optional function to call when all overlays have been
-                    loaded. Must accept two parameters:
-                      - a list of indices, one for each overlay, into the
-                        ``paths`` parameter, indicating, for each overlay, the
-                        path from which it was loaded.
-                      - a list of the overlays that were loaded
-
-    :arg inmem:     If ``True``, all :class:`.Image` overlays are
-                    force-loaded into memory. Otherwise, large compressed
-                    files may be kept on disk. Defaults to ``False``.
-
-    :arg blocking:  Defaults to ``False``. If ``True``, overlays are loaded
-                    immediately (and the ``onLoad`` function is called
-                    directly. Otherwise, overlays and the ``onLoad`` are loaded
-                    loaded/called on the :func:`.idle.idle` loop.
-
-    :returns:       If ``blocking is False`` (the default), returns ``None``.
-                    Otherwise returns a list containing the loaded overlay
-                    objects.
-
+    When more than one path is given, the files are loaded concurrently, on
+    a :class:`.WorkerPool` (most of the work involved in loading an image -
+    file I/O and ``gzip`` decompression - releases the GIL). The number of
+    overlays which have been loaded, but not yet passed to ``onLoad``, is
+    limited, so that loading a large number of files does not result in all
+    of them being held in memory at once. Overlays are always passed to
+    ``onLoad`` in the order of the ``paths``, regardless of the order in
+    which they finish loading.
+
+    :arg loadFunc:    A function which is called just before each overlay
+                      is loaded, and is passed the overlay path. The default
+                      load function uses the :mod:`.status` module to display
+                      the name of the overlay currently being loaded. Pass in
+                      ``None`` to disable this default behaviour.
+
+    :arg errorFunc:   A function which is called if an error occurs while
+                      loading an overlay, being passed the name of the
+                      overlay, and either the :class:`Exception` which
+                      occurred, or a string containing an error message.  The
+                      default function pops up a :class:`wx.MessageBox` with
+                      an error message. Pass in ``None`` to disable this
+                      default behaviour.
+
+    :arg saveDir:     If ``True`` (the default), the directory of the last
+                      overlay in the list of ``paths`` is saved, and used
+                      later on as the default load directory.
+
+    :arg onLoad:      Optional function to call when all overlays have been
+                      loaded. Must accept two parameters:
+                        - a list of indices, one for each overlay, into the
+                          ``paths`` parameter, indicating, for each overlay,
+                          the path from which it was loaded.
+                        - a list of the overlays that were loaded
+
+    :arg inmem:       If ``True``, all :class:`.Image` overlays are
+                      force-loaded into memory. Otherwise, large compressed
+                      files may be kept on disk. Defaults to ``False``.
+
+    :arg blocking:    Defaults to ``False``. If ``True``, overlays are loaded
+                      immediately (and the ``onLoad`` function is called
+                      directly. Otherwise, overlays and the ``onLoad`` are
+                      loaded/called on the :func:`.idle.idle` loop.
+
+    :arg progressive: Defaults to ``False``. If ``True`` (and ``blocking`` is
+                      ``False``), ``onLoad`` may be called more than once -
+                      it is called with each run of overlays which have
+                      finished loading, in order, so that overlays can be
+                      displayed as soon as they are available.
+
+    :arg nworkers:    Maximum number of files to load concurrently. Defaults
+                      to :func:`.workerpool.defaultNumWorkers`.
+
+    :returns:         If ``blocking is False`` (the default), returns
+                      ``None``. Otherwise returns a list containing the loaded
+                      overlay objects.
     """
 
-    import fsl.data.image as fslimage
-    import fsl.data.mesh  as fslmesh
-
     # The default load function updates
     # the dialog window created above
     def defaultLoadFunc(s):
@@ -205,38 +224,24 @@ def loadOverlays(paths,
             strings.messages['loadOverlays.error'].format(s),
             e)
 
-    # A function which loads a single overlay
-    def loadPath(path, idx):
-
-        loadFunc(path)
-
-        dtype, path = dutils.guessType(path)
-
-        if dtype is None:
-            errorFunc(path, strings.messages['loadOverlays.unknownType'])
-            return
-
-        log.debug('Loading overlay {} (guessed data type: {})'.format(
-            path, dtype.__name__))
-
-        try:
-            if   issubclass(dtype, fslimage.Image):
-                loaded = loadImage(dtype, path, inmem=inmem)
-            elif issubclass(dtype, fslmesh.Mesh):
-                loaded = [dtype(path, fixWinding=True)]
-            else:
-                loaded = [dtype(path)]
+    # Called on the calling/main thread
+    # with the result of loading each path,
+    # in order. Returns the loaded overlays.
+    def finishPath(path, idx, loaded, error):
 
+        if error is not None:
+            errorFunc(path, error)
+        else:
             overlays.extend(loaded)
             pathIdxs.extend([idx] * len(loaded))
 
-        except Exception as e:
-            errorFunc(path, e)
-
         # Record the path in the
         # recent files list
         recentPathManager.recordPath(path)
 
+        if error is None: return loaded
+        else:             return []
+
     # This function gets called after
     # all overlays have been loaded
     def realOnLoad(*a):
@@ -245,7 +250,7 @@ def loadOverlays(paths,
             ovlDir = op.abspath(op.dirname(paths[-1]))
             fslsettings.write('loadSaveOverlayDir', ovlDir)
 
-        if onLoad is not None:
+        if onLoad is not None and not progressive:
             onLoad(pathIdxs, overlays)
 
     # If loadFunc or errorFunc are explicitly set to
@@ -258,23 +263,230 @@ def loadOverlays(paths,
     if loadFunc  == 'default': loadFunc  = defaultLoadFunc
     if errorFunc == 'default': errorFunc = defaultErrorFunc
 
-    pathIdxs = []
-    overlays = []
-    funcs    = []
+    # progressive is only
+    # used in async mode
+    progressive = progressive and (not blocking) and (onLoad is not None)
+    paths       = list(paths)
+    pathIdxs    = []
+    overlays    = []
+
+    # A single path is loaded on the
+    # calling thread, or on the idle loop
+    if len(paths) <= 1:
+
+        def loadSingle(path, idx):
+            loadFunc(path)
+            path, loaded, error = _loadPath(path, inmem)
+            loaded              = finishPath(path, idx, loaded, error)
 
-    # Load the images
-    for idx, path in enumerate(paths):
-        funcs.append(lambda p=path, i=idx: loadPath(p, i))
-    funcs.append(realOnLoad)
+            if progressive and len(loaded) > 0:
+                onLoad([idx] * len(loaded), loaded)
 
-    for func in funcs:
-        if blocking: func()
-        else:        idle.idle(func)
+        funcs = [lambda p=p, i=i: loadSingle(p, i)
+                 for i, p in enumerate(paths)]
+        funcs.append(realOnLoad)
+
+        for func in funcs:
+            if blocking: func()
+            else:        idle.idle(func)
+
+    elif blocking:
+        pool = workerpool.WorkerPool(nworkers, name='loadOverlays')
+        try:
+            jobs = [pool.submit(_loadPath, p, inmem) for p in paths]
+            for idx, (path, job) in enumerate(zip(paths, jobs)):
+                loadFunc(path)
+                job.wait()
+                path, loaded, error = job.result
+                finishPath(path, idx, loaded, error)
+        finally:
+            pool.stop()
+        realOnLoad()
+
+    else:
+        loader = _ParallelLoader(paths,
+                                 inmem,
+                                 nworkers,
+                                 loadFunc,
+                                 finishPath,
+                                 realOnLoad,
+                                 onLoad if progressive else None)
+        loader.start()
 
     if blocking: return overlays
     else:        return None
 
 
+def _loadPath(path, inmem):
+    """Used by :func:`loadOverlays`. Loads the overlay(s) at the given
+    ``path``. This function may be called on a separate thread.
+
+    :returns: A tuple containing:
+                - The path, as resolved by :func:`.guessType`
+                - A list of the loaded overlays, or ``None`` if an error
+                  occurred.
+                - ``None``, or the error (an ``Exception``, or a message)
+                  if an error occurred.
+    """
+
+    import fsl.data.image as fslimage
+    import fsl.data.mesh  as fslmesh
+
+    try:
+        dtype, path = dutils.guessType(path)
+
+        if dtype is None:
+            return path, None, strings.messages['loadOverlays.unknownType']
+
+        log.debug('Loading overlay {} (guessed data type: {})'.format(
+            path, dtype.__name__))
+
+        if   issubclass(dtype, fslimage.Image):
+            loaded = loadImage(dtype, path, inmem=inmem)
+        elif issubclass(dtype, fslmesh.Mesh):
+            loaded = [dtype(path, fixWinding=True)]
+        else:
+            loaded = [dtype(path)]
+
+        return path, list(loaded), None
+
+    except Exception as e:
+        log.debug('Error loading {}: {}'.format(path, e), exc_info=True)
+        return path, None, e
+
+
+class _ParallelLoader(object):
+    """Used by :func:`loadOverlays` to load multiple files concurrently,
+    without blocking the main thread.
+
+    Files are loaded on a :class:`.WorkerPool`. When each file has been
+    loaded, the results are passed back to the main thread via
+    :func:`.idle.idle`, where they are processed in order. At most
+    ``WINDOW_FACTOR * nworkers`` files are loaded ahead of the first file
+    which has not yet been processed.
+    """
+
+
+    WINDOW_FACTOR = 2
+    """Multiplied by the number of worker threads to determine the maximum
+    number of files which may be loaded, but not yet processed.
+    """
+
+
+    def __init__(self,
+                 paths,
+                 inmem,
+                 nworkers,
+                 loadFunc,
+                 finishFunc,
+                 doneFunc,
+                 progressFunc):
+        """Create a ``_ParallelLoader``.
+
+        :arg paths:        Paths to load.
+        :arg inmem:        Passed to :func:`_loadPath`.
+        :arg nworkers:     Number of worker threads.
+        :arg loadFunc:     Called on the main thread, and passed the path,
+                           just before each path is loaded.
+        :arg finishFunc:   Called on the main thread, in path order, with
+                           ``(path, idx, loaded, error)`` for each path, and
+                           returning the loaded overlays.
+        :arg doneFunc:     Called on the main thread when all paths have been
+                           processed.
+        :arg progressFunc: Called on the main thread with
+                           ``(pathIdxs, overlays)`` for each run of paths
+                           which have been processed. May be ``None``.
+        """
+
+        self.__paths        = paths
+        self.__inmem        = inmem
+        self.__loadFunc     = loadFunc
+        self.__finishFunc   = finishFunc
+        self.__doneFunc     = doneFunc
+        self.__progressFunc = progressFunc
+        self.__pool         = workerpool.WorkerPool(nworkers,
+                                                    name='loadOverlays')
+        self.__window       = self.WINDOW_FACTOR * self.__pool.nworkers
+        self.__lock         = threading.Lock()
+        self.__results      = {}
+        self.__submitted    = 0
+        self.__processed    = 0
+        self.__done         = False
+
+
+    def start(self):
+        """Starts loading files. """
+        self.__submit()
+
+
+    def __submit(self):
+        """Submits paths to the pool, until the window is full. """
+
+        while self.__submitted < len(self.__paths) and \
+              self.__submitted - self.__processed < self.__window:
+
+            idx  = self.__submitted
+            path = self.__paths[idx]
+
+            self.__loadFunc(path)
+            self.__pool.submit(self.__load, idx, path)
+            self.__submitted += 1
+
+
+    def __load(self, idx, path):
+        """Run on a worker thread. Loads the given path, and schedules
+        :meth:`__process` on the idle loop.
+        """
+
+        result = _loadPath(path, self.__inmem)
+
+        with self.__lock:
+            self.__results[idx] = result
+
+        idle.idle(self.__process)
+
+
+    def __process(self):
+        """Called on the idle loop whenever a path has been loaded.
+        Processes all loaded paths which are next in order, and submits
+        more paths to the pool.
+        """
+
+        if self.__done:
+            return
+
+        idxs     = []
+        overlays = []
+
+        while self.__processed < len(self.__paths):
+
+            idx = self.__processed
+
+            with self.__lock:
+                result = self.__results.pop(idx, None)
+
+            if result is None:
+                break
+
+            path, loaded, error = result
+            loaded              = self.__finishFunc(path, idx, loaded, error)
+
+            idxs    .extend([idx] * len(loaded))
+            overlays.extend(loaded)
+
+            self.__processed += 1
+
+        self.__submit()
+
+        if self.__progressFunc is not None and len(overlays) > 0:
+            self.__progressFunc(idxs, overlays)
+
+        if self.__processed == len(self.__paths):
+            self.__done = True
+            self.__pool.stop()
+            self.__doneFunc()
+
+
 def loadImage(dtype, path, inmem=False):
     """Called by the :func:`loadOverlays` function. Loads an overlay which
     is represented by an ``Image`` instance, or a sub-class of ``Image``.
@@ -12,14 +12,39 @@ which allows the user to resample an image to a different resolution.
 import          wx
 import numpy as np
 
-import fsleyes_widgets.floatspin as floatspin
-import fsl.data.image            as fslimage
-import fsleyes.strings           as strings
-import fsleyes.tooltips          as tooltips
-from . import                       base
+import fsleyes_widgets.floatspin    as floatspin
+import fsleyes_widgets.utils.status as status
+import fsl.data.image               as fslimage
+import fsl.utils.idle               as idle
+import fsleyes.strings              as strings
+import fsleyes.tooltips             as tooltips
+import fsleyes.resampling           as resampling
+import fsleyes.resampledimage       as resampledimage
+from . import                          base
+
+
+BACKGROUND_LIMIT = 2 ** 22
+"""Images which will contain more than this many voxels after resampling
+are resampled on a separate thread, with a progress dialog. Smaller images
+are resampled immediately.
+"""
 
 
 class ResampleAction(base.Action):
+    """The ``ResampleAction`` prompts the user for a new image shape via a
+    :class:`ResampleDialog`, and then creates a resampled copy of the
+    currently selected :class:`.Image`. Resampling is performed by the
+    :func:`.resampling.resample` function - large images are resampled in
+    the background, volume by volume (or slab by slab), with a progress
+    dialog which allows the user to cancel the resampling. The resampled
+    image is added to the :class:`.OverlayList` once it is complete.
+
+    Alternately, the user may choose to create a *virtual* resampled image -
+    a :class:`.ResampledImage`, which is resampled on the fly from the
+    source image, and which is added to the ``OverlayList`` immediately.
+    """
+
+
     def __init__(self, overlayList, displayCtx, frame):
         """Create a ``ResampleAction``.
 
@@ -87,26 +112,102 @@ class ResampleAction(base.Action):
         dtype     = dlg.GetDataType()
         smoothing = dlg.GetSmoothing()
         allvols   = dlg.GetAllVolumes()
+        virtual   = dlg.GetVirtual()
         interp    = {'nearest' : 0, 'linear' : 1, 'cubic' : 3}[interp]
         name      = '{}_resampled'.format(ovl.name)
 
+        # Virtual images keep the data type and
+        # all volumes of the source, and are not
+        # smoothed - the resampling happens on
+        # the GPU, and when the data is accessed.
+        if virtual:
+            self.__overlayList.append(resampledimage.ResampledImage(
+                ovl, newShape, order=interp, name=name))
+            return
+
         if allvols or ovl.ndim == 3: slc = None
         else:                        slc = opts.index()
 
         if allvols and ovl.ndim > 3:
             newShape = list(newShape) + list(ovl.shape[3:])
 
-        resampled, xform = ovl.resample(newShape,
-                                        sliceobj=slc,
-                                        dtype=dtype,
-                                        order=interp,
-                                        smooth=smoothing)
-        resampled        = fslimage.Image(resampled,
-                                          xform=xform,
-                                          header=ovl.header,
-                                          name=name)
+        def resample(progfunc=None):
+            return resampling.resample(ovl,
+                                       newShape,
+                                       sliceobj=slc,
+                                       dtype=dtype,
+                                       order=interp,
+                                       smooth=smoothing,
+                                       progfunc=progfunc)
+
+        def finish(data, xform):
+            resampled = fslimage.Image(data,
+                                       xform=xform,
+                                       header=ovl.header,
+                                       name=name)
+            self.__overlayList.append(resampled)
+
+        if np.prod(np.round(newShape)) <= BACKGROUND_LIMIT:
+            finish(*resample())
+        else:
+            self.__resampleInBackground(ovl, resample, finish)
+
+
+    def __resampleInBackground(self, ovl, resample, finish):
+        """Called by :meth:`__resample` for large images. Runs the given
+        ``resample`` function on a separate thread, while displaying a
+        progress dialog. When the resampling is complete, the result is
+        passed to the ``finish`` function.
+        """
 
-        self.__overlayList.append(resampled)
+        dlg = wx.ProgressDialog(
+            strings.titles[  self, 'resampling'],
+            strings.messages[self, 'resampling'].format(ovl.name),
+            maximum=100,
+            parent=self.__frame,
+            style=(wx.PD_CAN_ABORT      |
+                   wx.PD_ELAPSED_TIME   |
+                   wx.PD_REMAINING_TIME |
+                   wx.PD_AUTO_HIDE))
+
+        # The dialog is updated on the main thread,
+        # and the progress function (called on the
+        # resampling thread) returns False to
+        # cancel the resampling.
+        state  = {'cancelled' : False, 'finished' : False}
+        result = []
+
+        def updateDialog(done, total):
+            if state['cancelled'] or state['finished']:
+                return
+            cont, _ = dlg.Update(int(99 * done / float(total)))
+            if not cont:
+                state['cancelled'] = True
+
+        def progfunc(done, total):
+            idle.idle(updateDialog, done, total)
+            return not state['cancelled']
+
+        def task():
+            result.extend(resample(progfunc))
+
+        def onFinish():
+            state['finished'] = True
+            dlg.Destroy()
+            finish(*result)
+
+        def onError(e):
+            state['finished'] = True
+            dlg.Destroy()
+            if isinstance(e, resampling.ResampleCancelled):
+                return
+            status.reportError(
+                strings.titles[  self, 'error'],
+                strings.messages[self, 'error'].format(ovl.name),
+                e)
+
+        dlg.Show()
+        idle.run(task, onFinish=onFinish, onError=onError)
 
 
 class ResampleDialog(wx.Dialog):
@@ -193,10 +294,12 @@ class ResampleDialog(wx.Dialog):
         self.__dtypeLabel  = wx.StaticText(self)
         self.__smoothLabel = wx.StaticText(self)
         self.__allVolLabel = wx.StaticText(self)
+        self.__virtLabel   = wx.StaticText(self)
         self.__interp      = wx.Choice(self, choices=self.__interpLabels)
         self.__dtype       = wx.Choice(self, choices=self.__dtypeLabels)
         self.__smooth      = wx.CheckBox(self)
         self.__allVolumes  = wx.CheckBox(self)
+        self.__virtual     = wx.CheckBox(self)
 
         if len(shape) <= 3:
             self.__allVolumes .Disable()
@@ -206,11 +309,13 @@ class ResampleDialog(wx.Dialog):
         self.__dtype     .SetSelection(0)
         self.__smooth    .SetValue(True)
         self.__allVolumes.SetValue(True)
+        self.__virtual   .SetValue(False)
 
         self.__interpLabel.SetLabel(strings.labels[self, 'interpolation'])
         self.__dtypeLabel .SetLabel(strings.labels[self, 'dtype'])
         self.__smoothLabel.SetLabel(strings.labels[self, 'smoothing'])
         self.__allVolLabel.SetLabel(strings.labels[self, 'allVolumes'])
+        self.__virtLabel  .SetLabel(strings.labels[self, 'virtual'])
 
         self.__interp     .SetToolTip(
             wx.ToolTip(tooltips.misc[self, 'interpolation']))
@@ -228,6 +333,10 @@ class ResampleDialog(wx.Dialog):
             wx.ToolTip(tooltips.misc[self, 'allVolumes']))
         self.__allVolLabel.SetToolTip(
             wx.ToolTip(tooltips.misc[self, 'allVolumes']))
+        self.__virtual    .SetToolTip(
+            wx.ToolTip(tooltips.misc[self, 'virtual']))
+        self.__virtLabel  .SetToolTip(
+            wx.ToolTip(tooltips.misc[self, 'virtual']))
 
         self.__labelSizer  = wx.BoxSizer(wx.HORIZONTAL)
         self.__xrowSizer   = wx.BoxSizer(wx.HORIZONTAL)
@@ -237,6 +346,7 @@ class ResampleDialog(wx.Dialog):
         self.__dtypeSizer  = wx.BoxSizer(wx.HORIZONTAL)
         self.__smoothSizer = wx.BoxSizer(wx.HORIZONTAL)
         self.__allVolSizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.__virtSizer   = wx.BoxSizer(wx.HORIZONTAL)
         self.__btnSizer    = wx.BoxSizer(wx.HORIZONTAL)
         self.__mainSizer   = wx.BoxSizer(wx.VERTICAL)
 
@@ -312,6 +422,13 @@ class ResampleDialog(wx.Dialog):
         self.__allVolSizer.Add((10, 1),            flag=wx.EXPAND,
                                proportion=1)
 
+        self.__virtSizer.Add((50, 1),          flag=wx.EXPAND)
+        self.__virtSizer.Add(self.__virtLabel, flag=wx.EXPAND)
+        self.__virtSizer.Add((10, 1),          flag=wx.EXPAND)
+        self.__virtSizer.Add(self.__virtual,   flag=wx.EXPAND)
+        self.__virtSizer.Add((10, 1),          flag=wx.EXPAND,
+                             proportion=1)
+
         self.__btnSizer.Add((10, 1),       flag=wx.EXPAND, proportion=1)
         self.__btnSizer.Add(self.__ok,     flag=wx.EXPAND)
         self.__btnSizer.Add((10, 1),       flag=wx.EXPAND)
@@ -335,6 +452,8 @@ class ResampleDialog(wx.Dialog):
         self.__mainSizer.Add((10, 10),           flag=wx.EXPAND)
         self.__mainSizer.Add(self.__allVolSizer, flag=wx.EXPAND)
         self.__mainSizer.Add((10, 10),           flag=wx.EXPAND)
+        self.__mainSizer.Add(self.__virtSizer,   flag=wx.EXPAND)
+        self.__mainSizer.Add((10, 10),           flag=wx.EXPAND)
         self.__mainSizer.Add(self.__btnSizer,    flag=wx.EXPAND)
         self.__mainSizer.Add((10, 10),           flag=wx.EXPAND)
 
@@ -349,6 +468,7 @@ class ResampleDialog(wx.Dialog):
         self.__pixx  .Bind(floatspin.EVT_FLOATSPIN, self.__onPixdim)
         self.__pixy  .Bind(floatspin.EVT_FLOATSPIN, self.__onPixdim)
         self.__pixz  .Bind(floatspin.EVT_FLOATSPIN, self.__onPixdim)
+        self.__virtual.Bind(wx.EVT_CHECKBOX,        self.__onVirtual)
 
         self.__ok.SetDefault()
 
@@ -435,6 +555,12 @@ class ResampleDialog(wx.Dialog):
         return self.__allVolumes
 
 
+    @property
+    def virtualCtrl(self):
+        """Returns a reference to the virtual checkbox. """
+        return self.__virtual
+
+
     def __onVoxel(self, ev):
         """Called when the user changes a voxel value. Updates the pixdim
         values accordingly.
@@ -459,6 +585,24 @@ class ResampleDialog(wx.Dialog):
         self.__voxz.SetValue(newvox[2])
 
 
+    def __onVirtual(self, ev):
+        """Called when the virtual checkbox is toggled. Enables/disables the
+        data type, smoothing, and all volumes controls, which do not apply
+        to virtual images.
+        """
+
+        enable = not self.__virtual.GetValue()
+
+        self.__dtype      .Enable(enable)
+        self.__dtypeLabel .Enable(enable)
+        self.__smooth     .Enable(enable)
+        self.__smoothLabel.Enable(enable)
+
+        if len(self.__oldShape) > 3:
+            self.__allVolumes .Enable(enable)
+            self.__allVolLabel.Enable(enable)
+
+
     def __onOk(self, ev):
         """Called when the ok button is pushed. Closes the dialog. """
         self.EndModal(wx.ID_OK)
@@ -475,8 +619,10 @@ class ResampleDialog(wx.Dialog):
         self.__pixy.SetValue(self.__oldPixdim[1])
         self.__pixz.SetValue(self.__oldPixdim[2])
 
-        self.__interp.SetSelection(0)
-        self.__dtype .SetSelection(0)
+        self.__interp .SetSelection(0)
+        self.__dtype  .SetSelection(0)
+        self.__virtual.SetValue(False)
+        self.__onVirtual(None)
 
 
     def __onCancel(self, ev):
@@ -523,6 +669,13 @@ class ResampleDialog(wx.Dialog):
         return self.__allVolumes.GetValue()
 
 
+    def GetVirtual(self):
+        """Returns ``True`` if the user has chosen to create a virtual
+        :class:`.ResampledImage`, ``False`` otherwise.
+        """
+        return self.__virtual.GetValue()
+
+
     def GetPixdims(self):
         """Returns the current pixdim values. """
         return (self.__pixx.GetValue(),
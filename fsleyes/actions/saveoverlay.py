@@ -5,7 +5,7 @@
 # Author: Paul McCarthy <pauldmccarthy@gmail.com>
 #
 """This module provides the :class:`SaveOverlayAction`, which allows the user
-to save the currently selected overlay. A couple of standalone functions are
+to save the currently selected overlay. A few standalone functions are
 defined in this module, which do the real work:
 
 .. autosummary::
@@ -13,19 +13,30 @@ defined in this module, which do the real work:
 
    saveOverlay
    doSave
+   isSaving
    checkOverlaySaveState
+
+
+Where possible, images are saved in the background, via the
+:mod:`.imagewriter` module, with progress being reported in the status bar.
+The ``gzip`` compression level, and the number of threads used for
+compression, can be set via the ``fsleyes.saveoverlay.compressLevel`` and
+``fsleyes.saveoverlay.nworkers`` settings (see :mod:`fsl.utils.settings`).
 """
 
 
 import logging
+import weakref
 
 import                                 os
 import os.path                      as op
 
+import fsl.utils.idle               as idle
 import fsl.utils.settings           as fslsettings
 import fsl.data.image               as fslimage
 import fsleyes_widgets.utils.status as status
 import fsleyes.strings              as strings
+import fsleyes.imagewriter          as imagewriter
 from . import                          base
 
 
@@ -233,7 +244,7 @@ def saveOverlay(overlay, display=None):
     oldPath = overlay.dataSource
     saveDir = op.dirname(savePath)
 
-    if doSave(overlay, savePath):
+    def onFinish():
 
         # Cache the save directory for next time.
         fslsettings.write('loadSaveOverlayDir', saveDir)
@@ -249,21 +260,130 @@ def saveOverlay(overlay, display=None):
             if display is not None:
                 display.name = overlay.name
 
+    doSave(overlay, savePath, onFinish=onFinish)
+
+
+_saving = weakref.WeakKeyDictionary()
+"""Used by :func:`doSave` and :func:`isSaving` to keep track of images
+which are currently being saved in the background.
+"""
+
+
+def isSaving(overlay):
+    """Returns ``True`` if the given ``overlay`` is currently being saved in
+    the background, ``False`` otherwise.
+    """
+    return overlay in _saving
+
 
-def doSave(overlay, path=None):
+def doSave(overlay, path=None, onFinish=None, blocking=False):
     """Called by :func:`saveOverlay`.  Tries to save the given ``overlay`` to
     the given ``path``, and shows an error message if something goes wrong.
-    Returns ``True`` if the save was successful, ``False`` otherwise.
+
+    If possible (see :func:`.imagewriter.canWrite`), the image is saved on a
+    separate thread, and the :attr:`.Image.saveState` is only updated once
+    the file has been written. Otherwise the image is saved via
+    :meth:`.Image.save`.
+
+    :arg overlay:  The :class:`.Image` to save.
+
+    :arg path:     File to save to. Defaults to the image
+                   :attr:`.Image.dataSource`.
+
+    :arg onFinish: Function which is called (on the main thread, with no
+                   arguments) if, and when, the image has been successfully
+                   saved.
+
+    :arg blocking: If ``True``, the image is saved on the calling thread.
+
+    :returns:      ``True`` if the save was successful (or, for background
+                   saves, was started), ``False`` otherwise.
     """
 
+    if path is None:
+        path = overlay.dataSource
+
     emsg   = strings.messages['SaveOverlayAction.saveError'].format(path)
     etitle = strings.titles[  'SaveOverlayAction.saveError']
 
-    with status.reportIfError(msg=emsg, title=etitle, raiseError=False):
-        overlay.save(path)
+    if isSaving(overlay):
+        status.update(strings.messages['SaveOverlayAction.inProgress'].format(
+            overlay.name))
+        return False
+
+    if path is None or not imagewriter.canWrite(overlay, path):
+        with status.reportIfError(msg=emsg, title=etitle, raiseError=False):
+            overlay.save(path)
+            if onFinish is not None:
+                onFinish()
+            return True
+        return False
+
+    compressLevel = fslsettings.read('fsleyes.saveoverlay.compressLevel',
+                                     imagewriter.COMPRESS_LEVEL)
+    nworkers      = fslsettings.read('fsleyes.saveoverlay.nworkers', None)
+    data, header  = imagewriter.snapshot(overlay)
+    lName         = '{}_{}'.format(__name__, id(data))
+    state         = {'modified' : False}
+
+    # The image may be modified (e.g. by the
+    # Editor) while it is being saved - the
+    # snapshot is not affected, but the image
+    # must not be marked as saved.
+    def modified(*a):
+        state['modified'] = True
+
+    def showProgress(done, total):
+        if isSaving(overlay):
+            status.update(strings.messages['SaveOverlayAction.saving'].format(
+                path, int(100 * done / float(total))), timeout=None)
+
+    def progfunc(done, total):
+        idle.idle(showProgress, done, total)
+
+    def task():
+        imagewriter.writeImage(data,
+                               header,
+                               path,
+                               compresslevel=compressLevel,
+                               nworkers=nworkers,
+                               progfunc=progfunc)
+
+    def finish():
+        data.detach()
+        overlay.deregister(lName, topic='data')
+        overlay.deregister(lName, topic='transform')
+        _saving.pop(overlay, None)
+
+    def onSuccess():
+        finish()
+        imagewriter.markSaved(overlay, path, state['modified'])
+        status.update(strings.messages['SaveOverlayAction.saved'].format(
+            path))
+        if onFinish is not None:
+            onFinish()
+
+    def onError(e):
+        finish()
+        status.update('')
+        status.reportError(etitle, emsg, e)
+
+    overlay.register(lName, modified, topic='data')
+    overlay.register(lName, modified, topic='transform')
+    _saving[overlay] = True
+
+    if not blocking:
+        idle.run(task, onFinish=onSuccess, onError=onError)
         return True
 
-    return False
+    try:
+        task()
+    except Exception as e:
+        onError(e)
+        return False
+
+    onSuccess()
+    return True
 
 
 def checkOverlaySaveState(overlayList, displayCtx):
@@ -275,7 +395,10 @@ def checkOverlaySaveState(overlayList, displayCtx):
 
     for ovl in overlayList:
 
-        # Only Image overlays can be edited/saved
+        # Only Image overlays can be edited/saved.
+        # Images which are being saved in the
+        # background are considered unsaved,
+        # until the save is complete.
         if not isinstance(ovl, fslimage.Image): continue
         if ovl.saveState:                       continue
 
@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+#
+# atlasindex.py - Precomputed per-voxel lookup indices for probabilistic
+#                 atlases.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`AtlasIndex` class, and the
+:func:`loadIndex` function, which are used by the :class:`.AtlasInfoPanel`
+to look up the regions at a location in a :class:`.ProbabilisticAtlas`.
+
+
+Looking up region probabilities via :meth:`.ProbabilisticAtlas.proportions`
+involves reading a value from every volume of the 4D atlas image, and then
+sorting the regions by probability. An ``AtlasIndex`` instead contains, for
+every voxel, the ``k`` most probable regions (see :data:`TOP_K`), already
+sorted. Voxels which do not belong to any region are not stored - a 3D
+lookup array maps each voxel to a row in the index, so a location lookup is
+a single array read.
+
+
+An index is calculated once for each atlas image by the
+:func:`calcAtlasIndex` function, on a separate thread, and is then saved to
+the FSLeyes settings directory (see :mod:`fsl.utils.settings`), under
+``atlasindex/``. The next time the atlas is loaded, the index is memory-mapped
+from disk. Use the :func:`loadIndex` function to retrieve the index for an
+atlas.
+"""
+
+
+import os.path as op
+import            os
+import            shutil
+import            hashlib
+import            logging
+import            tempfile
+import            threading
+
+import numpy as np
+
+import fsl.utils.idle     as idle
+import fsl.utils.settings as fslsettings
+
+
+log = logging.getLogger(__name__)
+
+
+TOP_K = 8
+"""Maximum number of regions stored for each voxel in an
+:class:`AtlasIndex`.
+"""
+
+
+CACHE_DIR = 'atlasindex'
+"""Sub-directory of the FSLeyes settings directory in which atlas indices
+are saved.
+"""
+
+
+VERSION = 1
+"""Index file format version. Cached indices created with a different
+version are ignored.
+"""
+
+
+_indices = {}
+"""Dictionary of ``{key : AtlasIndex}`` mappings, containing all indices
+which have been loaded or calculated. Used by :func:`loadIndex`.
+"""
+
+
+_pending = {}
+"""Dictionary of ``{key : [(onLoad, onError)]}`` mappings, containing
+callbacks for indices which are currently being loaded or calculated. Used
+by :func:`loadIndex`.
+"""
+
+
+_lock = threading.Lock()
+"""Lock protecting access to the :data:`_indices` and :data:`_pending`
+dictionaries.
+"""
+
+
+def calcAtlasIndex(data, volumes=None, k=None):
+    """Calculates the ``k`` most probable regions for every voxel of a
+    probabilistic atlas. The atlas is processed one Z slice at a time, so
+    it does not need to be fully loaded into memory.
+
+    :arg data:    4D array-like (e.g. an :class:`.Image`) containing the
+                  probabilistic atlas, with one volume for each region.
+
+    :arg volumes: Sequence of volume indices to include in the index.
+                  Defaults to all volumes. Regions in the index are
+                  identified by their position in this sequence.
+
+    :arg k:       Maximum number of regions to store for each voxel.
+                  Defaults to :data:`TOP_K`.
+
+    :returns:     A tuple containing:
+
+                   - A 3D ``int32`` array which contains, for each voxel,
+                     the corresponding row in the ``regions`` and
+                     ``probs`` arrays, or ``-1`` for voxels which are
+                     not in any region.
+
+                   - A ``(N, k)`` ``int16`` array containing the region
+                     indices for each non-empty voxel, in descending order
+                     of probability. Unused entries contain ``-1``.
+
+                   - A ``(N, k)`` array, with the same data type as the
+                     atlas, containing the corresponding probabilities.
+    """
+
+    if k       is None: k       = TOP_K
+    if volumes is None: volumes = range(data.shape[3])
+
+    volumes = np.asarray(volumes, dtype=np.intp)
+    shape   = data.shape[:3]
+    k       = max(1, min(k, len(volumes)))
+    lut     = np.full(shape, -1, dtype=np.int32)
+    regions = []
+    probs   = []
+    nrows   = 0
+
+    for z in range(shape[2]):
+
+        slab = np.asarray(data[:, :, z, :])[..., volumes]
+        mask = (slab > 0).any(axis=-1)
+        rows = slab[mask]
+
+        if rows.shape[0] == 0:
+            continue
+
+        # Select the k largest probabilities
+        # for each voxel, then sort them in
+        # descending order (we don't negate,
+        # as the data may be unsigned)
+        nvols = rows.shape[1]
+        if k < nvols:
+            idxs = np.argpartition(rows, nvols - k, axis=1)[:, nvols - k:]
+        else:
+            idxs = np.tile(np.arange(nvols), (rows.shape[0], 1))
+
+        vals  = np.take_along_axis(rows, idxs, axis=1)
+        order = np.argsort(vals, axis=1, kind='stable')[:, ::-1]
+        idxs  = np.take_along_axis(idxs, order, axis=1)
+        vals  = np.take_along_axis(vals, order, axis=1)
+
+        idxs[vals <= 0] = -1
+
+        lut[:, :, z][mask] = np.arange(nrows, nrows + rows.shape[0])
+        nrows             += rows.shape[0]
+
+        regions.append(idxs.astype(np.int16))
+        probs  .append(vals)
+
+    if nrows == 0:
+        regions = np.zeros((0, k), dtype=np.int16)
+        probs   = np.zeros((0, k), dtype=data.dtype)
+    else:
+        regions = np.concatenate(regions)
+        probs   = np.concatenate(probs)
+
+    # Drop columns which are
+    # not used by any voxel
+    used    = (regions >= 0).any(axis=0)
+    ncols   = max(1, int(np.count_nonzero(used)))
+    regions = regions[:, :ncols]
+    probs   = probs[  :, :ncols]
+
+    return lut, regions, probs
+
+
+class AtlasIndex(object):
+    """An ``AtlasIndex`` contains the most probable regions for every voxel
+    of a probabilistic atlas. See the module documentation for details.
+    """
+
+
+    def __init__(self, lut, regions, probs, worldToVox):
+        """Create an ``AtlasIndex``.
+
+        :arg lut:        3D lookup array, as returned by
+                         :func:`calcAtlasIndex`.
+        :arg regions:    Region indices, as returned by
+                         :func:`calcAtlasIndex`.
+        :arg probs:      Region probabilities, as returned by
+                         :func:`calcAtlasIndex`.
+        :arg worldToVox: Affine transformation from world coordinates to
+                         atlas voxel coordinates.
+        """
+        self.__lut        = lut
+        self.__regions    = regions
+        self.__probs      = probs
+        self.__worldToVox = np.array(worldToVox, dtype=np.float64)
+
+
+    @property
+    def shape(self):
+        """Returns the shape of the atlas image. """
+        return self.__lut.shape
+
+
+    def lookup(self, loc, voxel=False):
+        """Returns the regions at the given location.
+
+        :arg loc:   Location in world coordinates.
+
+        :arg voxel: If ``True``, ``loc`` is interpreted as voxel coordinates.
+
+        :returns:   A list of ``(probability, region)`` tuples, in descending
+                    order of probability, where ``region`` is an index into
+                    the ``volumes`` that were passed to
+                    :func:`calcAtlasIndex` (e.g. an index into
+                    :attr:`.AtlasDescription.labels`). An empty list is
+                    returned if the location is out of bounds, or does not
+                    belong to any region.
+        """
+
+        loc = np.asarray(loc, dtype=np.float64)
+
+        if not voxel:
+            xform = self.__worldToVox
+            loc   = np.dot(xform[:3, :3], loc) + xform[:3, 3]
+            loc   = loc.round()
+
+        loc = tuple(int(v) for v in loc[:3])
+
+        if any(v < 0 or v >= s for v, s in zip(loc, self.shape)):
+            return []
+
+        row = self.__lut[loc]
+
+        if row < 0:
+            return []
+
+        regions = self.__regions[row]
+        probs   = self.__probs[  row]
+
+        return [(p, int(r)) for p, r in zip(probs, regions) if r >= 0]
+
+
+    def save(self, dirname):
+        """Saves this ``AtlasIndex`` to the given directory. The directory
+        is created if necessary.
+        """
+
+        if not op.exists(dirname):
+            os.makedirs(dirname)
+
+        np.save(op.join(dirname, 'lut.npy'),     self.__lut)
+        np.save(op.join(dirname, 'regions.npy'), self.__regions)
+        np.save(op.join(dirname, 'probs.npy'),   self.__probs)
+
+
+    @classmethod
+    def load(cls, dirname, worldToVox):
+        """Loads an ``AtlasIndex`` which was saved via :meth:`save`. The
+        index arrays are memory-mapped.
+        """
+        lut     = np.load(op.join(dirname, 'lut.npy'),     mmap_mode='r')
+        regions = np.load(op.join(dirname, 'regions.npy'), mmap_mode='r')
+        probs   = np.load(op.join(dirname, 'probs.npy'),   mmap_mode='r')
+        return cls(lut, regions, probs, worldToVox)
+
+
+def indexKey(atlas, k=None):
+    """Returns a key which uniquely identifies the index for the given
+    :class:`.ProbabilisticAtlas`. The key incorporates the atlas image file
+    path, size and modification time, so that cached indices are not used
+    if the atlas image changes.
+    """
+
+    if k is None:
+        k = TOP_K
+
+    source = op.abspath(atlas.dataSource)
+    stat   = os.stat(source)
+    labels = [l.index for l in atlas.desc.labels]
+    key    = [VERSION, source, stat.st_size, stat.st_mtime, k] + labels
+    key    = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    return '{}_{}'.format(atlas.desc.atlasID, key[:16])
+
+
+def getIndex(atlas):
+    """Returns the :class:`AtlasIndex` for the given atlas if it has already
+    been loaded via :func:`loadIndex`, ``None`` otherwise.
+    """
+    try:
+        with _lock:
+            return _indices.get(indexKey(atlas), None)
+    except Exception:
+        return None
+
+
+def loadIndex(atlas, onLoad=None, onError=None, cache=True):
+    """Loads or calculates the :class:`AtlasIndex` for the given
+    :class:`.ProbabilisticAtlas`. The index is loaded from the settings
+    directory if it has previously been saved, or calculated on a separate
+    thread otherwise (via :func:`.idle.run`).
+
+    :arg atlas:   The :class:`.ProbabilisticAtlas`.
+
+    :arg onLoad:  Function which is called, on the main thread, with the
+                  ``AtlasIndex`` when it has been loaded.
+
+    :arg onError: Function which is called, on the main thread, with the
+                  error if the index could not be loaded.
+
+    :arg cache:   If ``True`` (the default), newly calculated indices are
+                  saved to the settings directory.
+    """
+
+    try:
+        key = indexKey(atlas)
+    except Exception as e:
+        if onError is not None:
+            onError(e)
+        return
+
+    with _lock:
+
+        index = _indices.get(key, None)
+
+        if index is None:
+            callbacks = _pending.get(key, None)
+            start     = callbacks is None
+
+            if start:
+                callbacks     = []
+                _pending[key] = callbacks
+            callbacks.append((onLoad, onError))
+
+    if index is not None:
+        if onLoad is not None:
+            onLoad(index)
+        return
+
+    if not start:
+        return
+
+    worldToVox = atlas.worldToVoxMat
+    volumes    = [l.index for l in atlas.desc.labels]
+    dirname    = fslsettings.filePath(op.join(CACHE_DIR, key))
+    result     = []
+
+    def load():
+
+        if op.exists(dirname):
+            try:
+                result.append(AtlasIndex.load(dirname, worldToVox))
+                log.debug('Loaded index for atlas %s from %s',
+                          atlas.desc.atlasID, dirname)
+                return
+            except Exception as e:
+                log.warning('Could not load index for atlas %s from %s '
+                            '(%s) - re-calculating', atlas.desc.atlasID,
+                            dirname, e)
+
+        log.debug('Calculating index for atlas %s', atlas.desc.atlasID)
+
+        index = AtlasIndex(*calcAtlasIndex(atlas, volumes),
+                           worldToVox=worldToVox)
+        result.append(index)
+
+        if cache:
+            _saveIndex(index, dirname)
+
+    def finish():
+        with _lock:
+            _indices[key] = result[0]
+            callbacks     = _pending.pop(key)
+        for onLoad, _ in callbacks:
+            if onLoad is not None:
+                onLoad(result[0])
+
+    def error(e):
+        log.warning('Error calculating index for atlas %s: %s',
+                    atlas.desc.atlasID, e, exc_info=True)
+        with _lock:
+            callbacks = _pending.pop(key)
+        for _, onError in callbacks:
+            if onError is not None:
+                onError(e)
+
+    idle.run(load,
+             onFinish=finish,
+             onError=error,
+             name='AtlasIndex_{}'.format(key))
+
+
+def _saveIndex(index, dirname):
+    """Used by :func:`loadIndex`. Saves the given ``index`` to ``dirname``.
+    The index is written to a temporary directory which is then renamed,
+    so that a partially written index is never loaded. Errors are logged
+    and ignored.
+    """
+
+    parent = op.dirname(dirname)
+    tmpdir = None
+
+    try:
+        if not op.exists(parent):
+            os.makedirs(parent)
+
+        tmpdir = tempfile.mkdtemp(dir=parent)
+        index.save(tmpdir)
+        os.rename(tmpdir, dirname)
+        tmpdir = None
+
+        log.debug('Saved atlas index to %s', dirname)
+
+    except Exception as e:
+        log.warning('Could not save atlas index to %s: %s', dirname, e)
+
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
@@ -16,6 +16,7 @@ import wx.html                            as wxhtml
 import fsleyes_widgets.elistbox           as elistbox
 import fsleyes.panel                      as fslpanel
 import fsleyes.strings                    as strings
+import fsleyes.atlasindex                 as atlasindex
 import fsl.utils.idle                     as idle
 from   fsl.utils.platform import platform as fslplatform
 import fsl.data.atlases                   as atlases
@@ -36,6 +37,12 @@ class AtlasInfoPanel(fslpanel.FSLeyesPanel):
        :scale: 50%
        :align: center
 
+    Region information for probabilistic atlases is retrieved from a
+    pre-calculated :class:`.AtlasIndex` (see the :mod:`.atlasindex` module),
+    which is loaded or calculated in the background when an atlas is enabled.
+    Until the index is available, region information is retrieved directly
+    from the atlas.
+
     The ``AtlasInfoPanel`` contains two main sections:
 
       - A :class:`fsleyes_widgets.elistbox.EditableListBox` filled with
@@ -67,6 +74,7 @@ class AtlasInfoPanel(fslpanel.FSLeyesPanel):
             self, parent, overlayList, displayCtx, frame)
 
         self.__enabledAtlases = {}
+        self.__atlasIndices   = {}
         self.__atlasPanel     = atlasPanel
         self.__contentPanel   = wx.SplitterWindow(self,
                                                   style=wx.SP_LIVE_UPDATE)
@@ -173,6 +181,9 @@ class AtlasInfoPanel(fslpanel.FSLeyesPanel):
 
             listWidget.SetValue(True)
 
+            if isinstance(atlas, atlases.ProbabilisticAtlas):
+                self.__loadAtlasIndex(atlasID, atlas)
+
             if refresh:
                 self.__locationChanged()
 
@@ -210,11 +221,40 @@ class AtlasInfoPanel(fslpanel.FSLeyesPanel):
             self.__atlasList.IndexOf(atlasID))
 
         self.__enabledAtlases.pop(atlasID)
+        self.__atlasIndices  .pop(atlasID, None)
         self.__locationChanged()
 
         listWidget.SetValue(False)
 
 
+    def __loadAtlasIndex(self, atlasID, atlas):
+        """Called by :meth:`enableAtlasInfo` when a probabilistic atlas is
+        enabled. Loads (or calculates) the :class:`.AtlasIndex` for the atlas
+        in the background and, when it is available, refreshes the displayed
+        information.
+        """
+
+        def onLoad(index):
+
+            if not self or self.destroyed():
+                return
+
+            # The atlas may have been
+            # disabled in the meantime
+            if self.__enabledAtlases.get(atlasID, None) is not atlas:
+                return
+
+            self.__atlasIndices[atlasID] = index
+            self.__locationChanged()
+
+        def onError(e):
+            log.warning('Could not load index for atlas %s (%s) - region '
+                        'information will be read from the atlas image',
+                        atlasID, e)
+
+        atlasindex.loadIndex(atlas, onLoad=onLoad, onError=onError)
+
+
     def __fslDirChanged(self, *a):
         """Called when the :attr:`.Platform.fsldir` changes. Refreshes
         the atlas list.
@@ -276,6 +316,9 @@ class AtlasInfoPanel(fslpanel.FSLeyesPanel):
             if enabled:
                 self.__enabledAtlases[atlasID] = enabledAtlases[atlasID]
 
+        self.__atlasIndices = {a : i for a, i in self.__atlasIndices.items()
+                               if a in self.__enabledAtlases}
+
 
     def __locationChanged(self, *a):
         """Called when the :attr:`.DisplayContext.location` property changes.
@@ -337,6 +380,21 @@ class AtlasInfoPanel(fslpanel.FSLeyesPanel):
             lines.append(titleTemplate.format(atlas.desc.name, atlasID, None))
 
             if isinstance(atlas, atlases.ProbabilisticAtlas):
+
+                # Use the pre-calculated index
+                # if it is available - the
+                # regions are already sorted
+                index = self.__atlasIndices.get(atlasID, None)
+
+                if index is not None:
+                    for prop, labelIdx in index.lookup(loc):
+                        label = atlas.desc.labels[labelIdx]
+                        lines.append(probTemplate.format(prop,
+                                                         label.name,
+                                                         atlasID,
+                                                         label.index))
+                    continue
+
                 proportions = atlas.proportions(loc)
 
                 if len(proportions) == 0:
@@ -182,6 +182,15 @@ class CanvasSettingsPanel(ctrlpanel.SettingsPanel):
             ('showLegend', props.Widget('showLegend')),
             ('light',      props.Widget('light')),
             ('occlusion',  props.Widget('occlusion')),
+            ('progressive', props.Widget('progressive')),
+            ('progressiveDelay',
+             props.Widget('progressiveDelay',
+                          showLimits=False,
+                          enabledWhen=lambda o: o.progressive)),
+            ('frameBudget',
+             props.Widget('frameBudget',
+                          showLimits=False,
+                          enabledWhen=lambda o: o.progressive)),
         ))
 
         import fsleyes.views.orthopanel    as orthopanel
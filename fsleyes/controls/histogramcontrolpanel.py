@@ -81,6 +81,7 @@ class HistogramControlPanel(plotcontrolpanel.PlotControlPanel):
         """
 
         isimage    = isinstance(hs, hseries.ImageHistogramSeries)
+        is4d       = isimage and hs.overlay.ndim > 3
         widgetList = self.getWidgetList()
 
         autoBin    = props.Widget('autoBin')
@@ -102,6 +103,9 @@ class HistogramControlPanel(plotcontrolpanel.PlotControlPanel):
         if isimage:
             showOverlay = props.makeWidget(widgetList, hs, 'showOverlay')
 
+        if is4d:
+            allVolumes = props.makeWidget(widgetList, hs, 'allVolumes')
+
         widgetList.AddWidget(ignoreZeros,
                              groupName=groupName,
                              displayName=strings.properties[hs, 'ignoreZeros'],
@@ -114,6 +118,13 @@ class HistogramControlPanel(plotcontrolpanel.PlotControlPanel):
                 displayName=strings.properties[hs, 'showOverlay'],
                 tooltip=fsltooltips.properties[hs, 'showOverlay'])
 
+        if is4d:
+            widgetList.AddWidget(
+                allVolumes,
+                groupName=groupName,
+                displayName=strings.properties[hs, 'allVolumes'],
+                tooltip=fsltooltips.properties[hs, 'allVolumes'])
+
         widgetList.AddWidget(includeOutliers,
                              groupName=groupName,
                              displayName=strings.properties[hs,
@@ -134,12 +145,10 @@ class HistogramControlPanel(plotcontrolpanel.PlotControlPanel):
                              tooltip=fsltooltips.properties[hs, 'dataRange'])
 
         if isimage:
-            return [ignoreZeros,
-                    showOverlay,
-                    includeOutliers,
-                    autoBin,
-                    nbins,
-                    dataRange]
+            widgets = [ignoreZeros, showOverlay]
+            if is4d:
+                widgets.append(allVolumes)
+            return widgets + [includeOutliers, autoBin, nbins, dataRange]
         else:
             return [ignoreZeros,
                     includeOutliers,
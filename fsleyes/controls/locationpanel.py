@@ -9,6 +9,7 @@ panel which shows information about the current display location.
 """
 
 
+import time
 import logging
 import itertools as it
 
@@ -17,6 +18,7 @@ import wx.html as wxhtml
 
 import numpy as np
 
+import fsl.utils.idle                 as idle
 import fsl.utils.transform            as transform
 import fsl.utils.settings             as fslsettings
 import fsl.data.image                 as fslimage
@@ -38,6 +40,12 @@ import fsleyes.strings                as strings
 log = logging.getLogger(__name__)
 
 
+INFO_UPDATE_INTERVAL = 0.05
+"""Minimum time, in seconds, between updates of the overlay information
+shown by the :class:`LocationInfoPanel`.
+"""
+
+
 class LocationPanel(ctrlpanel.ControlPanel):
     """The ``LocationPanel`` is a panel which contains controls allowing the
     user to view and modify the :attr:`.DisplayContext.location` property.
@@ -218,6 +226,13 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         self.__registeredDisplay = None
         self.__registeredOpts    = None
 
+        # Updates to the HTML info panel
+        # are throttled - see the
+        # __updateLocationInfo method.
+        self.__infoPending    = False
+        self.__lastInfoUpdate = 0
+        self.__infoPage       = None
+
         self.__column1 = wx.Panel(self)
         self.__column2 = wx.Panel(self)
         self.__info    = wxhtml.HtmlWindow(self)
@@ -818,22 +833,51 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
 
     def __updateLocationInfo(self):
         """Called whenever the :attr:`.DisplayContext.location` changes.
-        Updates the HTML panel which displays information about all overlays
-        in the :class:`.OverlayList`.
+        Schedules a call to :meth:`__refreshLocationInfo`, such that the
+        HTML panel is updated at most once every
+        :data:`INFO_UPDATE_INTERVAL` seconds.
+        """
+
+        if self.__infoPending:
+            return
+
+        elapsed            = time.time() - self.__lastInfoUpdate
+        self.__infoPending = True
+
+        idle.idle(self.__refreshLocationInfo,
+                  after=max(0, INFO_UPDATE_INTERVAL - elapsed))
+
+
+    def __refreshLocationInfo(self):
+        """Called by :meth:`__updateLocationInfo`. Updates the HTML panel
+        which displays information about all overlays in the
+        :class:`.OverlayList`.
         """
 
+        self.__infoPending = False
+
+        if not self or self.destroyed():
+            return
+
+        self.__lastInfoUpdate = time.time()
+
         if len(self.overlayList) == 0 or self.__registeredOverlay is None:
-            self.__info.SetPage('')
+            self.__setInfoPage('')
             return
 
         # Reverse the overlay order so they
         # are ordered the same on the info
         # page as in the overlay list panel
         displayCtx = self.displayCtx
-        overlays   = reversed(displayCtx.getOrderedOverlays())
+        overlays   = list(reversed(displayCtx.getOrderedOverlays()))
         selOvl     = displayCtx.getSelectedOverlay()
         lines      = []
 
+        # Voxel coordinates and values for
+        # all images are retrieved at once
+        values = displayCtx.queryLocation(
+            [o for o in overlays if displayCtx.getDisplay(o).enabled])
+
         for overlay in overlays:
 
             display = displayCtx.getDisplay(overlay)
@@ -880,16 +924,14 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
 
             elif isinstance(overlay, fslimage.Image):
 
-                vloc = opts.getVoxel()
+                vloc, vval = values[overlay]
 
                 if vloc is not None:
-                    vloc = tuple(int(v) for v in vloc)
                     vloc = opts.index(vloc)
-                    vval = overlay[vloc]
                     vloc = ' '.join(map(str, vloc))
 
                     if not np.isscalar(vval):
-                        vval = np.asscalar(vval)
+                        vval = vval.item()
 
                     if opts.overlayType == 'label':
                         lbl = opts.lut.get(int(vval))
@@ -919,7 +961,19 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
             if info is not None:
                 lines.append(info)
 
-        self.__info.SetPage('<br>'.join(lines))
+        self.__setInfoPage('<br>'.join(lines))
+
+
+    def __setInfoPage(self, page):
+        """Called by :meth:`__refreshLocationInfo`. Sets the contents of the
+        HTML panel, if they have changed.
+        """
+
+        if page == self.__infoPage:
+            return
+
+        self.__infoPage = page
+        self.__info.SetPage(page)
         self.__info.Refresh()
 
 
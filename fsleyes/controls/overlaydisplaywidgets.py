@@ -183,7 +183,8 @@ def _initPropertyList_MaskOpts(threedee):
             'threshold',
             'interpolation',
             'outline',
-            'outlineWidth']
+            'outlineWidth',
+            'voxelOutline']
 
 
 def _initPropertyList_VectorOpts(threedee):
@@ -276,6 +277,7 @@ def _initPropertyList_LabelOpts(threedee):
     return ['lut',
             'outline',
             'outlineWidth',
+            'voxelOutline',
             'custom_volume']
 
 
@@ -450,6 +452,7 @@ def _initWidgetSpec_MaskOpts(threedee):
         'threshold'    : props.Widget('threshold', showLimits=False),
         'outline'      : props.Widget('outline'),
         'outlineWidth' : props.Widget('outlineWidth', showLimits=False),
+        'voxelOutline' : props.Widget('voxelOutline'),
     }
 
 
@@ -458,6 +461,7 @@ def _initWidgetSpec_LabelOpts(threedee):
         'lut'          : props.Widget('lut', labels=lambda l: l.name),
         'outline'      : props.Widget('outline'),
         'outlineWidth' : props.Widget('outlineWidth', showLimits=False),
+        'voxelOutline' : props.Widget('voxelOutline'),
         'custom_volume'  : _NiftiOpts_VolumeWidget,
         'volume'         : props.Widget(
             'volume',
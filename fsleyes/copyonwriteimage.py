@@ -0,0 +1,806 @@
+#!/usr/bin/env python
+#
+# copyonwriteimage.py - The CopyOnWriteImage class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`CopyOnWriteImage` class, an
+:class:`.Image` which shares its data with another image until it is
+modified.
+
+
+A ``CopyOnWriteImage`` is a copy of (a region of) a source ``Image``, or an
+empty image (e.g. a mask) which is initially filled with zeros. Creating a
+``CopyOnWriteImage`` is very fast, and does not require any memory to be
+allocated for the image data - its data is managed by a
+:class:`CopyOnWriteDataProxy` (the ``dataobj`` of the underlying ``nibabel``
+image), which divides the image into *chunks* along its last (non-trivial)
+axis, e.g. one chunk per volume of a 4D image, or per slab of slices of a 3D
+image (see :data:`CHUNK_SIZE`).
+
+
+Reads from a chunk which has not been modified are passed through to the
+source image. When a chunk is written to for the first time, the chunk is
+copied from the source image, and the write is applied to the copy. So
+memory is only allocated for those parts of the image which are edited.
+
+
+If the source image is modified, any copies of it must preserve their
+current values. Therefore, code which modifies the data of an ``Image`` must
+call the :func:`prepareWrite` function beforehand, which will cause all
+copies of the image to take a private copy of the chunks that are about to
+be changed. The :class:`.Editor` does this for all data changes that are
+made in FSLeyes.
+
+
+Copies also listen for changes to the source image data, so that writes
+which were not preceded by a call to :func:`prepareWrite` (e.g. ``img[...] =
+x`` from the FSLeyes shell, or from a plugin) can be detected. The modified
+region of the source has already been changed by the time that such a write
+is detected, so any copies which had not taken a private copy of that region
+will contain the new values. A warning is logged, and the copies take a
+private copy of all remaining source data, and are detached from the source,
+so that they are not affected by any further changes.
+
+
+If the entire image data is loaded into memory (e.g. via the
+:attr:`.Image.data` attribute), or the image is saved to file, the image is
+permanently detached from its source, and subsequently behaves like a
+normal ``Image``.
+"""
+
+
+import logging
+import threading
+import weakref
+
+import numpy             as np
+import nibabel           as nib
+import nibabel.fileslice as fileslice
+
+import fsl.data.image as fslimage
+
+
+log = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 4 * 1048576
+"""Approximate size, in bytes, of the chunks that the data of a
+:class:`CopyOnWriteImage` is divided into.
+"""
+
+
+_dependants = weakref.WeakKeyDictionary()
+"""Used by :func:`prepareWrite`. Contains a ``{source : WeakSet}`` mapping
+between source :class:`.Image` instances, and all of the
+:class:`CopyOnWriteDataProxy` instances which read from them.
+"""
+
+
+def prepareWrite(image, sliceobj=None):
+    """Must be called before the data of ``image`` is modified. Any
+    :class:`CopyOnWriteImage` instances which are sharing data with the
+    image take a private copy of the data which is about to be modified.
+
+    :arg image:    The :class:`.Image` that is about to be modified.
+
+    :arg sliceobj: Region of the image that is about to be modified. If not
+                   provided, it is assumed that the entire image is to be
+                   modified.
+
+    .. note:: Copies of an image which is modified without this function
+              being called beforehand may receive the new values - see the
+              module documentation.
+    """
+
+    proxies = _dependants.get(image, None)
+
+    if proxies is None:
+        return
+
+    for proxy in list(proxies):
+        proxy.preserve(sliceobj)
+
+
+class CopyOnWriteImage(fslimage.Image):
+    """A ``CopyOnWriteImage`` is an :class:`.Image` which shares its data
+    with a source ``Image`` until it is modified. See the module
+    documentation for details.
+    """
+
+
+    def __init__(self,
+                 source,
+                 roi=None,
+                 dtype=None,
+                 empty=False,
+                 name=None,
+                 header=None,
+                 xform=None,
+                 chunkSize=None):
+        """Create a ``CopyOnWriteImage``.
+
+        :arg source:    The source :class:`.Image`.
+
+        :arg roi:       Region of the source image to copy - a sequence of
+                        ``(low, high)`` voxel bounds, one for each dimension
+                        of the source image. Defaults to the entire image.
+
+        :arg dtype:     Data type of the copy. Defaults to the source data
+                        type.
+
+        :arg empty:     If ``True``, the copy is initially filled with zeros,
+                        instead of with the source image data.
+
+        :arg name:      Image name - defaults to ``<source>_copy``.
+
+        :arg header:    Header to use as a template. Defaults to the source
+                        image header.
+
+        :arg xform:     Voxel-to-world affine of the copy. Defaults to the
+                        affine stored in the ``header``.
+
+        :arg chunkSize: Approximate chunk size in bytes. Defaults to
+                        :data:`CHUNK_SIZE`.
+        """
+
+        if not isinstance(source, fslimage.Image):
+            raise ValueError('Source must be an Image instance')
+
+        if name   is None: name   = '{}_copy'.format(source.name)
+        if header is None: header = source.header
+        if roi    is None: roi    = []
+
+        # Any dimensions not included
+        # in the roi are copied in full
+        roi = list(roi) + [(0, s) for s in source.shape[len(roi):]]
+
+        offset = [lo      for lo, hi in roi]
+        shape  = [hi - lo for lo, hi in roi]
+
+        # The data type of the source image
+        # data may not be the same as the
+        # on-disk data type (e.g. if the
+        # image has scaling parameters)
+        if dtype is None:
+            dtype = np.asarray(source[tuple(offset)]).dtype
+
+        if empty: proxySource = None
+        else:     proxySource = source
+
+        proxy = CopyOnWriteDataProxy(proxySource,
+                                     shape,
+                                     dtype,
+                                     offset=offset,
+                                     chunkSize=chunkSize)
+
+        header = header.copy()
+        header.set_data_dtype(dtype)
+        header.set_data_shape(shape)
+
+        if xform is None:
+            xform = header.get_best_affine()
+
+        if isinstance(header, nib.nifti1.Nifti1Header):
+            header.set_sform(xform, code=int(header.get_sform(True)[1]))
+            header.set_qform(xform, code=int(header.get_qform(True)[1]))
+
+        nibImage = type(source.nibImage)(proxy, xform, header=header)
+
+        self.__source     = source
+        self.__proxy      = proxy
+        self.__modified   = False
+        self.__writeRange = None
+
+        # The data range is not calculated, as
+        # that would require all of the source
+        # data to be read. Instead we start
+        # with the source range (which, for
+        # a ROI, may be wider than the range
+        # of the copy), which is refined as
+        # more data is accessed.
+        if empty: dataRange = (0, 0)
+        else:     dataRange = source.dataRange
+
+        fslimage.Image.__init__(self,
+                                nibImage,
+                                name=name,
+                                loadData=False,
+                                calcRange=False)
+        self.getImageWrapper().reset(dataRange)
+
+
+    @property
+    def source(self):
+        """Returns the source :class:`.Image`, or ``None`` if this image has
+        been detached from its source.
+        """
+        if self.__isShared(): return self.__source
+        else:                 return None
+
+
+    @property
+    def saveState(self):
+        """Returns ``True`` if this image has been saved, and not since
+        modified, ``False`` otherwise.
+        """
+        return fslimage.Image.saveState.fget(self) and not self.__modified
+
+
+    @property
+    def dataRange(self):
+        """Returns the known data range of this image, expanded to include
+        any values that have been written to it.
+        """
+
+        lo, hi = fslimage.Image.dataRange.fget(self)
+
+        if self.__writeRange is not None:
+            wlo, whi = self.__writeRange
+            if lo is None or wlo < lo: lo = wlo
+            if hi is None or whi > hi: hi = whi
+
+        return lo, hi
+
+
+    def clearModified(self):
+        """Clears the modified state of this image. Called by
+        :func:`.imagewriter.markSaved` after the image data has been saved
+        without calling :meth:`save`.
+        """
+        self.__modified = False
+
+
+    def detach(self, path=None):
+        """Permanently detaches this image from its source.
+
+        :arg path: Path to a file which contains the current data of this
+                   image (e.g. as written by :func:`.imagewriter.writeImage`).
+                   If provided, any data which has not been modified is
+                   subsequently read from this file. Otherwise, all of the
+                   image data is loaded into memory.
+        """
+
+        if not self.__isShared():
+            return
+
+        if path is None:
+            self.loadData()
+            self.__isShared()
+            return
+
+        log.debug('%s: detaching from source, data source is now %s',
+                  self.name, path)
+
+        self.__proxy.rebase(nib.load(path).dataobj)
+        self.__source = None
+        self.__proxy  = None
+
+
+    def save(self, filename=None):
+        """Saves this image via :meth:`.Image.save`. After the image has been
+        saved, it is detached from its source image.
+        """
+
+        modified        = self.__modified
+        self.__modified = False
+
+        try:
+            fslimage.Image.save(self, filename)
+        except Exception:
+            self.__modified = modified
+            raise
+
+
+    def __isShared(self):
+        """Returns ``True`` if this image is still sharing data with its
+        source, ``False`` otherwise. If the image data has been loaded into
+        memory, or has been re-loaded from file, the image is detached from
+        its source.
+        """
+
+        nibImage = self.nibImage
+        shared   = (self.__proxy is not None       and
+                    nibImage     is not None       and
+                    nibImage.dataobj is self.__proxy and
+                    not nibImage.in_memory)
+
+        if not shared and self.__proxy is not None:
+            self.__proxy.detach()
+            self.__proxy = None
+
+        return shared
+
+
+    def __setitem__(self, sliceobj, values):
+        """Writes ``values`` to the image at ``sliceobj``. Only the chunks
+        which are written to are copied from the source image.
+
+        .. note:: If ``sliceobj`` is a boolean mask array, the entire image
+                  is loaded into memory, and detached from its source.
+        """
+
+        prepareWrite(self, sliceobj)
+
+        if self.__isShared() and isinstance(sliceobj, np.ndarray):
+            self.loadData()
+
+        if not self.__isShared():
+            fslimage.Image.__setitem__(self, sliceobj, values)
+            return
+
+        values = np.array(values)
+
+        log.debug('%s: __setitem__ [%s = %s]',
+                  self.name, sliceobj, values.shape)
+
+        if values.size == 0:
+            return
+
+        self.__proxy[sliceobj] = values
+
+        oldRange = self.dataRange
+        wlo      = float(values.min())
+        whi      = float(values.max())
+
+        if self.__writeRange is not None:
+            wlo = min(wlo, self.__writeRange[0])
+            whi = max(whi, self.__writeRange[1])
+
+        self.__writeRange = (wlo, whi)
+        newRange          = self.dataRange
+
+        self.notify(topic='data', value=sliceobj)
+
+        if not self.__modified:
+            self.__modified = True
+            self.notify(topic='saveState')
+
+        if not np.all(np.isclose(oldRange, newRange)):
+            self.notify(topic='dataRange')
+
+
+class CopyOnWriteDataProxy(object):
+    """The ``CopyOnWriteDataProxy`` is an array-like object which is used as
+    the ``dataobj`` of the ``nibabel`` image that underlies a
+    :class:`CopyOnWriteImage`. The data is divided into chunks along its last
+    non-trivial axis - chunks which have not been written to are read from
+    the source.
+    """
+
+
+    is_proxy = True
+    """Tells ``nibabel`` that the data is not in memory. """
+
+
+    def __init__(self, source, shape, dtype, offset=None, chunkSize=None):
+        """Create a ``CopyOnWriteDataProxy``.
+
+        :arg source:    The source :class:`.Image` (or any array-like), or
+                        ``None``, in which case the data is initially filled
+                        with zeros.
+        :arg shape:     Shape of the data.
+        :arg dtype:     Data type.
+        :arg offset:    Voxel offset of the data into the ``source``.
+        :arg chunkSize: Approximate chunk size in bytes. Defaults to
+                        :data:`CHUNK_SIZE`.
+        """
+
+        if chunkSize is None: chunkSize = CHUNK_SIZE
+        if offset    is None: offset    = [0] * len(shape)
+
+        shape = tuple(int(s) for s in shape)
+        dtype = np.dtype(dtype)
+
+        # Chunk along the last axis which
+        # has a length greater than 1
+        axis = len(shape) - 1
+        while axis > 0 and shape[axis] == 1:
+            axis -= 1
+
+        # The number of indices along
+        # the chunk axis in each chunk
+        stride = dtype.itemsize * int(np.prod(shape)) // max(shape[axis], 1)
+        length = int(max(1, chunkSize // max(stride, 1)))
+        length = min(length, max(shape[axis], 1))
+
+        self.__source = source
+        self.__shape  = shape
+        self.__dtype  = dtype
+        self.__offset = tuple(int(o) for o in offset)
+        self.__axis   = axis
+        self.__length = length
+        self.__chunks = {}
+        self.__lock   = threading.RLock()
+
+        if source is not None:
+            _dependants.setdefault(source, weakref.WeakSet()).add(self)
+
+        # Detect changes to the source which
+        # were not preceded by prepareWrite
+        self.__lName = '{}_{}'.format(type(self).__name__, id(self))
+        if isinstance(source, fslimage.Image):
+            source.register(self.__lName,
+                            self.__sourceDataChanged,
+                            topic='data')
+
+
+    @property
+    def shape(self):
+        """Returns the shape of the data. """
+        return self.__shape
+
+
+    @property
+    def ndim(self):
+        """Returns the number of dimensions of the data. """
+        return len(self.__shape)
+
+
+    @property
+    def dtype(self):
+        """Returns the data type. """
+        return self.__dtype
+
+
+    @property
+    def chunkAxis(self):
+        """Returns the axis along which the data is divided into chunks. """
+        return self.__axis
+
+
+    @property
+    def chunkLength(self):
+        """Returns the number of indices along the :meth:`chunkAxis`
+        contained in each chunk.
+        """
+        return self.__length
+
+
+    def nchunks(self):
+        """Returns the number of chunks which have been copied from the
+        source, and are stored in memory.
+        """
+        with self.__lock:
+            return len(self.__chunks)
+
+
+    def detach(self):
+        """Stops this ``CopyOnWriteDataProxy`` from tracking changes to its
+        source. Must be called if this proxy is no longer being used.
+        """
+        if self.__source is not None:
+            proxies = _dependants.get(self.__source, None)
+            if proxies is not None:
+                proxies.discard(self)
+        if isinstance(self.__source, fslimage.Image):
+            self.__source.deregister(self.__lName, topic='data')
+        self.__source = None
+
+
+    def rebase(self, data):
+        """Detaches this ``CopyOnWriteDataProxy`` from its source, and
+        discards all copied chunks. All data is subsequently read from
+        ``data``, which must be an array-like with the same shape as this
+        proxy, containing its current data (e.g. the ``dataobj`` of a file
+        that the data has been saved to).
+        """
+        with self.__lock:
+            self.detach()
+            self.__source = data
+            self.__offset = (0,) * len(self.__shape)
+            self.__chunks = {}
+
+
+    def preserve(self, sliceobj=None):
+        """Called by :func:`prepareWrite` when the source is about to be
+        modified. Copies all chunks which overlap with the source region
+        ``sliceobj`` from the source.
+        """
+
+        for chunk in self.__sourceChunks(sliceobj):
+            self.__getChunk(chunk, create=True)
+
+
+    def __sourceChunks(self, sliceobj):
+        """Returns the indices of all chunks which overlap with the region
+        ``sliceobj`` of the source.
+        """
+
+        source = self.__source
+
+        if source is None:
+            return []
+
+        # Region in source coordinates -
+        # for fancy indexing, we assume
+        # the entire image.
+        if sliceobj is None or isinstance(sliceobj, np.ndarray):
+            sliceobj = (slice(None),) * len(source.shape)
+
+        sliceobj = fileslice.canonical_slicers(sliceobj, source.shape)
+        bounds   = _sliceBounds(sliceobj, source.shape)
+
+        # Convert into our coordinates,
+        # and clip to our extent
+        lo = []
+        hi = []
+        for (slo, shi), off, n in zip(bounds, self.__offset, self.__shape):
+            lo.append(max(slo - off, 0))
+            hi.append(min(shi - off, n))
+
+        if any(h <= l for l, h in zip(lo, hi)):
+            return []
+
+        return self.__chunkRange(lo[self.__axis], hi[self.__axis])
+
+
+    def __sourceDataChanged(self, source, topic, sliceobj):
+        """Called when the data of the source :class:`.Image` changes. If any
+        chunks which overlap with the changed region have not been copied,
+        the change was not preceded by a call to :func:`prepareWrite`. In
+        this case, all remaining chunks are copied from the source, and this
+        proxy is detached from it.
+        """
+
+        with self.__lock:
+
+            if source is not self.__source:
+                return
+
+            chunks = self.__sourceChunks(sliceobj)
+
+            if all(c in self.__chunks for c in chunks):
+                return
+
+            log.warning('%s was modified without prepareWrite being called '
+                        '- a copy of it may contain the modified values, '
+                        'and is being detached from it.', source.name)
+
+            self.preserve()
+            self.detach()
+
+
+    def __chunkRange(self, lo, hi):
+        """Returns the indices of all chunks which overlap with the range
+        ``[lo, hi)`` along the chunk axis.
+        """
+        length = self.__length
+        return range(lo // length, (hi - 1) // length + 1)
+
+
+    def __chunkBounds(self, chunk):
+        """Returns the ``(low, high)`` bounds of the given chunk along the
+        chunk axis.
+        """
+        length = self.__length
+        lo     = chunk * length
+        hi     = min(lo + length, self.__shape[self.__axis])
+        return lo, hi
+
+
+    def __readSource(self, lo, hi):
+        """Reads the data within the given bounds from the source. """
+
+        shape = tuple(h - l for l, h in zip(lo, hi))
+
+        if self.__source is None:
+            return np.zeros(shape, dtype=self.__dtype)
+
+        slc  = tuple(slice(o + l, o + h)
+                     for o, l, h in zip(self.__offset, lo, hi))
+        data = np.asarray(self.__source[slc], dtype=self.__dtype)
+
+        return data.reshape(shape)
+
+
+    def __getChunk(self, chunk, create=False):
+        """Returns the data for the given chunk, or ``None`` if it has not
+        been copied from the source. If ``create is True``, the chunk is
+        copied from the source if necessary.
+        """
+
+        with self.__lock:
+
+            data = self.__chunks.get(chunk, None)
+
+            if data is not None or not create:
+                return data
+
+            clo, chi = self.__chunkBounds(chunk)
+            lo       = [0] * self.ndim
+            hi       = list(self.__shape)
+            lo[self.__axis]      = clo
+            hi[self.__axis]      = chi
+            data                 = np.array(self.__readSource(lo, hi))
+            self.__chunks[chunk] = data
+
+            return data
+
+
+    def __readBlock(self, lo, hi):
+        """Returns the data within the given bounds. Contiguous chunks which
+        have not been copied are read from the source in a single call.
+
+        The lock is held for the duration of the read, so that a chunk
+        cannot be copied (by :meth:`preserve`), and the source subsequently
+        modified, part way through a read from the source.
+        """
+
+        axis  = self.__axis
+        block = np.empty([h - l for l, h in zip(lo, hi)], dtype=self.__dtype)
+        run   = None
+
+        def readRun(start, end):
+            rlo, rhi      = list(lo), list(hi)
+            rlo[axis]     = start
+            rhi[axis]     = end
+            idx           = [slice(None)] * len(lo)
+            idx[axis]     = slice(start - lo[axis], end - lo[axis])
+            block[tuple(idx)] = self.__readSource(rlo, rhi)
+
+        with self.__lock:
+            for chunk in self.__chunkRange(lo[axis], hi[axis]):
+
+                clo, chi = self.__chunkBounds(chunk)
+                clo      = max(clo, lo[axis])
+                chi      = min(chi, hi[axis])
+                data     = self.__getChunk(chunk)
+
+                if data is None:
+                    if run is None: run = [clo, chi]
+                    else:           run[1] = chi
+                    continue
+
+                if run is not None:
+                    readRun(*run)
+                    run = None
+
+                cstart         = self.__chunkBounds(chunk)[0]
+                src            = [slice(l, h) for l, h in zip(lo, hi)]
+                dest           = [slice(None)] * len(lo)
+                src[ axis]     = slice(clo - cstart,   chi - cstart)
+                dest[axis]     = slice(clo - lo[axis], chi - lo[axis])
+                block[tuple(dest)] = data[tuple(src)]
+
+            if run is not None:
+                readRun(*run)
+
+        return block
+
+
+    def __array__(self, dtype=None):
+        """Returns all of the data. """
+        data = self[(slice(None),) * self.ndim]
+        if dtype is not None:
+            data = np.asarray(data, dtype=dtype)
+        return data
+
+
+    def __getitem__(self, sliceobj):
+        """Returns the data at ``sliceobj``, which may contain integers and
+        slices, or may be a boolean mask array.
+        """
+
+        if isinstance(sliceobj, np.ndarray):
+            return self.__array__()[sliceobj]
+
+        shape            = self.__shape
+        sliceobj         = _canonicalise(sliceobj, shape)
+        indices, squeeze = _sliceIndices(sliceobj, shape)
+        outShape         = [len(i) for i, s in zip(indices, squeeze)
+                            if not s]
+
+        if any(len(i) == 0 for i in indices):
+            return np.zeros(outShape, dtype=self.__dtype)
+
+        lo               = [int(i.min())     for i in indices]
+        hi               = [int(i.max()) + 1 for i in indices]
+        block            = self.__readBlock(lo, hi)
+
+        # Non-contiguous slices
+        if any(len(i) != h - l for i, l, h in zip(indices, lo, hi)) or \
+           any(len(i) > 1 and i[0] > i[-1] for i in indices):
+            block = block[np.ix_(*[i - l for i, l in zip(indices, lo)])]
+
+        return block.reshape(outShape)
+
+
+    def __setitem__(self, sliceobj, values):
+        """Writes ``values`` at ``sliceobj``, which may contain integers and
+        slices. All chunks which are written to are copied from the source
+        beforehand.
+        """
+
+        shape            = self.__shape
+        axis             = self.__axis
+        sliceobj         = _canonicalise(sliceobj, shape)
+        indices, squeeze = _sliceIndices(sliceobj, shape)
+        outShape         = [len(i) for i in indices]
+
+        if any(n == 0 for n in outShape):
+            return
+
+        # The values may have been given
+        # with or without any trailing
+        # dimensions of length 1
+        values = np.asarray(values)
+        if values.size == np.prod(outShape):
+            values = values.reshape(outShape)
+        else:
+            values = np.broadcast_to(
+                values, [n for n, s in zip(outShape, squeeze) if not s])
+            values = values.reshape(outShape)
+        chunkIdxs = indices[axis] // self.__length
+
+        with self.__lock:
+            for chunk in np.unique(chunkIdxs):
+
+                data    = self.__getChunk(int(chunk), create=True)
+                mask    = chunkIdxs == chunk
+                cstart  = self.__chunkBounds(int(chunk))[0]
+                dest    = list(indices)
+                src     = [slice(None)] * len(indices)
+                dest[axis] = indices[axis][mask] - cstart
+                src[ axis] = np.where(mask)[0]
+
+                data[np.ix_(*dest)] = values[tuple(src)]
+
+
+def _canonicalise(sliceobj, shape):
+    """Converts ``sliceobj`` into a tuple, containing one integer or
+    ``slice`` for each dimension in ``shape``.
+    """
+
+    sliceobj = fileslice.canonical_slicers(sliceobj, shape)
+
+    if len(sliceobj) != len(shape) or \
+       any(not isinstance(s, (slice, int, np.integer)) for s in sliceobj):
+        raise IndexError('Unsupported index: {}'.format(sliceobj))
+
+    return sliceobj
+
+
+def _sliceIndices(sliceobj, shape):
+    """Converts a canonical ``sliceobj`` into a list of index arrays, one for
+    each dimension. Also returns a list of booleans, ``True`` for each
+    dimension which was indexed with an integer.
+    """
+
+    indices = []
+    squeeze = []
+
+    for slc, n in zip(sliceobj, shape):
+        if isinstance(slc, slice):
+            indices.append(np.arange(*slc.indices(n)))
+            squeeze.append(False)
+        else:
+            slc = int(slc)
+            if slc < 0:
+                slc += n
+            if slc < 0 or slc >= n:
+                raise IndexError('Index {} out of range'.format(slc))
+            indices.append(np.array([slc]))
+            squeeze.append(True)
+
+    return indices, squeeze
+
+
+def _sliceBounds(sliceobj, shape):
+    """Returns a sequence of ``(low, high)`` bounds covering the region of
+    the canonical ``sliceobj``.
+    """
+
+    bounds = []
+    for slc, n in zip(sliceobj, shape):
+        if isinstance(slc, slice):
+            idxs = range(*slc.indices(n))
+            if len(idxs) == 0: bounds.append((0, 0))
+            else:              bounds.append((min(idxs[0], idxs[-1]),
+                                              max(idxs[0], idxs[-1]) + 1))
+        else:
+            slc = int(slc)
+            if slc < 0:
+                slc += n
+            bounds.append((slc, slc + 1))
+    return bounds
@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+#
+# dicomloader.py - Progressive, cancellable DICOM scanning and loading.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :func:`scanDir` and :func:`loadSeries` functions,
+which are used by the :class:`.LoadDicomAction` to identify and load the data
+series in a DICOM directory. They are alternatives to the equivalent
+functions in the :mod:`fsl.data.dicom` module, and also use ``dcm2niix`` to do
+all of the work, but:
+
+  - :func:`scanDir` reports data series as soon as ``dcm2niix`` has
+    identified them, rather than after the entire directory has been
+    scanned.
+
+  - Both functions accept a progress function which may be used to cancel the
+    scan/conversion - any ``dcm2niix`` processes which are running are
+    killed, and a :exc:`DicomCancelled` error is raised.
+
+  - Scan results are cached, both in memory and in the FSLeyes settings
+    directory (see :mod:`fsl.utils.settings`), under ``dicomscan/``. Cached
+    results are keyed by the DICOM directory path, and by the modification
+    times of the directory and all of its sub-directories, so a directory is
+    re-scanned if any files are added, removed, or renamed.
+
+  - :func:`loadSeries` converts several series at once, using a
+    :class:`.WorkerPool` - each series is converted by a separate ``dcm2niix``
+    process.
+"""
+
+
+import os.path    as op
+import               os
+import subprocess as sp
+import               json
+import               glob
+import               time
+import               shutil
+import               hashlib
+import               logging
+import               tempfile
+import               threading
+
+import numpy      as np
+import nibabel    as nib
+
+import fsl.data.dicom     as fsldcm
+import fsl.utils.settings as fslsettings
+import fsleyes.workerpool as workerpool
+
+
+log = logging.getLogger(__name__)
+
+
+POLL_INTERVAL = 0.25
+"""Interval, in seconds, at which running ``dcm2niix`` processes are polled
+for new output, and at which progress functions are called.
+"""
+
+
+CACHE_DIR = 'dicomscan'
+"""Sub-directory of the FSLeyes settings directory in which scan results are
+saved.
+"""
+
+
+VERSION = 1
+"""Scan cache file format version. Cached scan results created with a
+different version are ignored.
+"""
+
+
+_scans = {}
+"""Dictionary of ``{key : [series]}`` mappings, containing all scan results
+which have been loaded or generated. Used by :func:`scanDir`.
+"""
+
+
+_lock = threading.Lock()
+"""Lock protecting access to the :data:`_scans` dictionary. """
+
+
+class DicomCancelled(Exception):
+    """Raised by :func:`scanDir` and :func:`loadSeries` when they are
+    cancelled via their progress function.
+    """
+    pass
+
+
+def scanKey(dcmdir):
+    """Returns a key which identifies the current state of the given DICOM
+    directory. The key incorporates the directory path, and the modification
+    times of the directory and all of its sub-directories.
+    """
+
+    dcmdir = op.abspath(dcmdir)
+    mtimes = []
+
+    for dirpath, dirnames, _ in os.walk(dcmdir):
+        dirnames.sort()
+        mtimes.append((op.relpath(dirpath, dcmdir),
+                       os.stat(dirpath).st_mtime))
+
+    key = [VERSION, dcmdir] + mtimes
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+
+def scanDir(dcmdir, progfunc=None, cache=True):
+    """Uses ``dcm2niix`` to scan the given DICOM directory, and returns a
+    list of dictionaries, one for each data series that was identified. Each
+    dictionary contains some basic metadata about the series, as for
+    :func:`fsl.data.dicom.scanDir`.
+
+    :arg dcmdir:   Directory containing DICOM files.
+
+    :arg progfunc: Function which is called periodically while the directory
+                   is being scanned. It is passed a list containing any
+                   series which have been identified since the previous call
+                   (which may be empty). If it returns ``False``, the scan is
+                   cancelled, and a :exc:`DicomCancelled` error is raised.
+                   If the scan results were cached, it is called once, with
+                   all of the series.
+
+    :arg cache:    If ``True`` (the default), cached scan results are used if
+                   available, and new scan results are saved.
+
+    :returns:      A list of dictionaries, each containing metadata about one
+                   DICOM data series, sorted by series number.
+    """
+
+    dcmdir = op.abspath(dcmdir)
+    key    = scanKey(dcmdir)
+
+    if cache:
+        series = _loadScan(key)
+
+        if series is not None:
+            log.debug('Using cached scan results for %s', dcmdir)
+            if progfunc is not None and progfunc(list(series)) is False:
+                raise DicomCancelled()
+            return series
+
+    if not fsldcm.enabled():
+        raise RuntimeError('dcm2niix is not available or is too old')
+
+    outdir = tempfile.mkdtemp(prefix='fsleyes_dicom_')
+    cmd    = ['dcm2niix', '-b', 'o', '-ba', 'n', '-f', '%s',
+              '-o', outdir, dcmdir]
+    series = []
+    seen   = set()
+
+    try:
+        with open(os.devnull, 'wb') as devnull:
+            proc = sp.Popen(cmd, stdout=devnull, stderr=devnull)
+
+        try:
+            while True:
+
+                finished = proc.poll() is not None
+                new      = _readSeries(outdir, dcmdir, seen, finished)
+
+                series.extend(new)
+
+                if progfunc is not None and progfunc(new) is False:
+                    raise DicomCancelled()
+
+                if finished:
+                    break
+
+                time.sleep(POLL_INTERVAL)
+
+        finally:
+            _terminate(proc)
+
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+
+    series = sorted(series, key=_seriesSortKey)
+
+    log.debug('Found %i series in %s', len(series), dcmdir)
+
+    if cache:
+        _saveScan(key, series)
+
+    return series
+
+
+def loadSeries(series, nworkers=None, progfunc=None):
+    """Takes a list of DICOM series metadata dictionaries, as returned by
+    :func:`scanDir`, and loads the associated data as :class:`.DicomImage`
+    objects. Series are converted in parallel on a :class:`.WorkerPool`.
+
+    :arg series:   List of series metadata dictionaries.
+
+    :arg nworkers: Maximum number of series to convert concurrently. Defaults
+                   to :func:`.workerpool.defaultNumWorkers`.
+
+    :arg progfunc: Function which is called periodically with two arguments -
+                   the number of series that have been converted, and the
+                   total number of series. If it returns ``False``, the
+                   conversion is cancelled, and a :exc:`DicomCancelled`
+                   error is raised.
+
+    :returns:      A list containing the loaded images, in the same order as
+                   the input ``series``. A series may result in more than one
+                   image.
+    """
+
+    if not fsldcm.enabled():
+        raise RuntimeError('dcm2niix is not available or is too old')
+
+    total  = len(series)
+    cancel = threading.Event()
+    pool   = workerpool.WorkerPool(nworkers, name='loadDicomSeries')
+
+    try:
+        jobs = [pool.submit(_convertSeries, s, cancel) for s in series]
+
+        while True:
+
+            done = len([j for j in jobs if j.done()])
+
+            if progfunc is not None and progfunc(done, total) is False:
+                cancel.set()
+                pool.cancel()
+                raise DicomCancelled()
+
+            if done == total:
+                break
+
+            pending = [j for j in jobs if not j.done()]
+            pending[0].wait(POLL_INTERVAL)
+
+    finally:
+        pool.stop()
+
+    images = []
+
+    for job in jobs:
+        if job.error is not None:
+            raise job.error
+        images.extend(job.result)
+
+    return images
+
+
+def _convertSeries(series, cancel):
+    """Used by :func:`loadSeries`. Converts a single DICOM series to NIFTI
+    with ``dcm2niix``, and loads the result.
+
+    :arg series: Series metadata dictionary.
+    :arg cancel: ``threading.Event`` which, if set, causes the conversion to
+                 be cancelled.
+
+    :returns:    A list of :class:`.DicomImage` objects.
+    """
+
+    dcmdir = series['DicomDir']
+    snum   = series['SeriesNumber']
+    desc   = series['SeriesDescription']
+    outdir = tempfile.mkdtemp(prefix='fsleyes_dicom_')
+    cmd    = ['dcm2niix', '-b', 'n', '-f', '%s', '-z', 'n',
+              '-o', outdir, '-n', str(snum), dcmdir]
+
+    try:
+        with open(os.devnull, 'wb') as devnull:
+            proc = sp.Popen(cmd, stdout=devnull, stderr=devnull)
+
+        try:
+            while proc.poll() is None:
+                if cancel.is_set():
+                    raise DicomCancelled()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            _terminate(proc)
+
+        files  = sorted(glob.glob(op.join(outdir, '*.nii')))
+        images = [nib.load(f, mmap=False) for f in files]
+
+        # copy images so nibabel no longer
+        # refs to the files (as they will
+        # be deleted), and force-load the
+        # image data.
+        images = [nib.Nifti1Image(np.asanyarray(i.dataobj), None, i.header)
+                  for i in images]
+
+        return [fsldcm.DicomImage(i, series, dcmdir, name=desc)
+                for i in images]
+
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+
+
+def _readSeries(outdir, dcmdir, seen, final):
+    """Used by :func:`scanDir`. Reads any new series metadata files that have
+    been written to ``outdir`` by ``dcm2niix``.
+
+    :arg outdir: ``dcm2niix`` output directory.
+    :arg dcmdir: DICOM directory.
+    :arg seen:   Set containing the names of files that have already been
+                 read. Updated in place.
+    :arg final:  If ``False``, files which cannot be parsed are assumed to
+                 still be being written, and are skipped (and read on a
+                 subsequent call). If ``True``, they are ignored.
+
+    :returns:    A list of new series metadata dictionaries.
+    """
+
+    series = []
+
+    for fname in sorted(glob.glob(op.join(outdir, '*.json'))):
+
+        if fname in seen:
+            continue
+
+        try:
+            with open(fname, 'rt') as f:
+                meta = json.load(f)
+
+        except ValueError as e:
+            if final:
+                log.warning('Could not read DICOM series '
+                            'metadata from %s: %s', fname, e)
+                seen.add(fname)
+            continue
+
+        seen.add(fname)
+        meta['DicomDir'] = dcmdir
+        series.append(meta)
+
+    return series
+
+
+def _seriesSortKey(series):
+    """Used by :func:`scanDir`. Sort key for series metadata dictionaries -
+    series are sorted by series number where possible.
+    """
+    try:
+        return (0, int(series.get('SeriesNumber')))
+    except (TypeError, ValueError):
+        return (1, 0)
+
+
+def _terminate(proc):
+    """Kills the given ``subprocess.Popen`` process if it is still running.
+    """
+    if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+
+
+def _cacheFile(key):
+    """Returns the path to the file in which scan results for the given key
+    are cached.
+    """
+    return fslsettings.filePath(op.join(CACHE_DIR, '{}.json'.format(key)))
+
+
+def _loadScan(key):
+    """Used by :func:`scanDir`. Returns cached scan results for the given
+    key, or ``None`` if there are no cached results.
+    """
+
+    with _lock:
+        series = _scans.get(key, None)
+
+    if series is None:
+        fname = _cacheFile(key)
+
+        if not op.exists(fname):
+            return None
+
+        try:
+            with open(fname, 'rt') as f:
+                series = json.load(f)
+        except Exception as e:
+            log.warning('Could not load cached DICOM scan '
+                        'results from %s: %s', fname, e)
+            return None
+
+        with _lock:
+            _scans[key] = series
+
+    return [dict(s) for s in series]
+
+
+def _saveScan(key, series):
+    """Used by :func:`scanDir`. Caches the given scan results, in memory and
+    in the settings directory. The file is written to a temporary file which
+    is then renamed, so that a partially written file is never loaded. Errors
+    are logged and ignored.
+    """
+
+    with _lock:
+        _scans[key] = [dict(s) for s in series]
+
+    fname  = _cacheFile(key)
+    parent = op.dirname(fname)
+    tmp    = None
+
+    try:
+        if not op.exists(parent):
+            os.makedirs(parent)
+
+        hd, tmp = tempfile.mkstemp(dir=parent)
+        with os.fdopen(hd, 'wt') as f:
+            json.dump(series, f)
+
+        os.rename(tmp, fname)
+        tmp = None
+
+        log.debug('Saved DICOM scan results to %s', fname)
+
+    except Exception as e:
+        log.warning('Could not save DICOM scan results to %s: %s', fname, e)
+
+    finally:
+        if tmp is not None and op.exists(tmp):
+            os.remove(tmp)
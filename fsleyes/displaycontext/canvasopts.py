@@ -264,3 +264,27 @@ class Scene3DCanvasOpts(props.HasProperties):
     system (defined by the :class:`.DisplayContext.bounds`), and applied to
     the scene that is being displayed.
     """
+
+
+    progressive = props.Boolean(default=False)
+    """If ``True``, volumes are rendered at a reduced quality while the user
+    is interacting with the scene (i.e. changing the :attr:`rotation`,
+    :attr:`zoom`, or :attr:`offset`), and are re-rendered at full quality
+    once the interaction has stopped. See the :class:`.Scene3DCanvas` class.
+    """
+
+
+    progressiveDelay = props.Int(minval=0, maxval=5000, default=250,
+                                 clamped=True)
+    """Time, in milliseconds, to wait after the last interaction, before
+    re-rendering the scene at full quality. Only used when :attr:`progressive`
+    rendering is enabled.
+    """
+
+
+    frameBudget = props.Int(minval=10, maxval=1000, default=50, clamped=True)
+    """Target time, in milliseconds, in which to render a single frame
+    while the user is interacting with the scene. The quality of the
+    interactive rendering is adjusted automatically to stay within this
+    budget. Only used when :attr:`progressive` rendering is enabled.
+    """
@@ -13,6 +13,7 @@ general display settings for displaying the overlays in a
 import sys
 import logging
 import contextlib
+import collections
 
 import numpy        as np
 import numpy.linalg as npla
@@ -64,6 +65,7 @@ class DisplayContext(props.SyncableHasProperties):
         getSelectedOverlay
         getOverlayOrder
         getOrderedOverlays
+        queryLocation
         freeze
         freezeOverlay
         thawOverlay
@@ -334,6 +336,26 @@ class DisplayContext(props.SyncableHasProperties):
         # {Overlay : Display} mappings
         self.__displays = {}
 
+        # The contents of the overlay list, as
+        # of the last call to __overlayListChanged.
+        # This is used to identify overlays which
+        # have been added/removed, instead of
+        # OverlayList.getLastValue, because the
+        # latter only reflects the most recent
+        # change when several changes have been
+        # made in an OverlayList.batch block.
+        lastOverlays = overlayList.getLastValue('overlays')
+        if lastOverlays is None:
+            lastOverlays = []
+        self.__prevOverlays = list(lastOverlays)
+
+        # Voxel coordinates calculated by the
+        # queryLocation method are cached for
+        # the most recently queried location,
+        # as a tuple containing the location,
+        # and a {transform key : voxel} dict.
+        self.__voxelCache = (None, {})
+
         overlayList.addListener('overlays',
                                 self.__name,
                                 self.__overlayListChanged,
@@ -444,6 +466,14 @@ class DisplayContext(props.SyncableHasProperties):
         if self.destroyed():
             raise ValueError('DisplayContext has been destroyed')
 
+        # Fast path - a Display only exists
+        # for overlays which are in the list,
+        # so we can avoid the (linear time)
+        # list membership test below.
+        display = self.__displays.get(overlay, None)
+        if display is not None:
+            return display
+
         if overlay not in self.__overlayList:
             raise InvalidOverlayError('Overlay {} is not in '
                                       'list'.format(overlay.name))
@@ -451,6 +481,16 @@ class DisplayContext(props.SyncableHasProperties):
         if isinstance(overlay, int):
             overlay = self.__overlayList[overlay]
 
+        return self.__getOrCreateDisplay(overlay, overlayType)
+
+
+    def __getOrCreateDisplay(self, overlay, overlayType=None):
+        """Used by :meth:`getDisplay` and :meth:`__overlayListChanged`.
+        Returns the :class:`.Display` for the given overlay, creating it
+        if necessary. It is assumed that the overlay is in the
+        :class:`.OverlayList`.
+        """
+
         try:
             display = self.__displays[overlay]
 
@@ -459,7 +499,8 @@ class DisplayContext(props.SyncableHasProperties):
             if not self.__child:
                 dParent = None
             else:
-                dParent = self.getParent().getDisplay(overlay, overlayType)
+                dParent = self.getParent().__getOrCreateDisplay(overlay,
+                                                                overlayType)
                 if overlayType is None:
                     overlayType = dParent.overlayType
 
@@ -487,10 +528,6 @@ class DisplayContext(props.SyncableHasProperties):
         if self.destroyed():
             raise ValueError('DisplayContext has been destroyed')
 
-        if overlay not in self.__overlayList:
-            raise InvalidOverlayError('Overlay {} is not in '
-                                      'list'.format(overlay.name))
-
         return self.getDisplay(overlay, overlayType).opts
 
 
@@ -625,6 +662,102 @@ class DisplayContext(props.SyncableHasProperties):
         return [self.__overlayList[idx] for idx in self.overlayOrder]
 
 
+    def queryLocation(self, overlays=None, location=None):
+        """Returns the voxel coordinates corresponding to a display location,
+        and the values at those voxels, for several :class:`.Image` overlays
+        at once.
+
+        The location is transformed into the voxel coordinate system once for
+        each distinct display-to-voxel transformation, with all
+        transformations being applied in a single vectorised operation.
+        Voxel coordinates are cached for the most recently queried location,
+        so repeated queries from different users of this ``DisplayContext``
+        do not need to re-transform the location. Values are read via
+        ``Image.__getitem__``, so only the queried voxel is read for images
+        which have not been loaded into memory.
+
+        :arg overlays: Overlays to query. Defaults to all overlays, in the
+                       order returned by :meth:`getOrderedOverlays`.
+                       Overlays which are not :class:`.Image` instances are
+                       ignored.
+
+        :arg location: Display space location. Defaults to the current
+                       :attr:`location`.
+
+        :returns:      A dict of ``{overlay : (voxel, value)}`` mappings,
+                       where ``voxel`` is a tuple of integer voxel
+                       coordinates, and ``value`` is the value at that voxel
+                       in the current volume. Both are ``None`` if the
+                       location is outside of the image bounds.
+        """
+
+        if overlays is None: overlays = self.getOrderedOverlays()
+        if location is None: location = self.location.xyz
+
+        location = tuple(float(l) for l in location)
+
+        # Voxel rounding depends on the
+        # transform and the image shape,
+        # so we group images by both.
+        groups = collections.OrderedDict()
+
+        for overlay in overlays:
+
+            if not isinstance(overlay, fslimage.Image):
+                continue
+
+            opts  = self.getOpts(overlay)
+            xform = opts.getTransform('display', 'voxel')
+            key   = (xform.tobytes(), tuple(overlay.shape[:3]))
+
+            if key not in groups:
+                groups[key] = (opts, xform, [])
+            groups[key][2].append(overlay)
+
+        cacheLoc, cache = self.__voxelCache
+
+        if cacheLoc != location:
+            cache             = {}
+            self.__voxelCache = (location, cache)
+
+        todo = [key for key in groups if key not in cache]
+
+        if len(todo) > 0:
+            xforms = np.array([groups[key][1] for key in todo])
+            voxels = np.einsum('gij,j->gi', xforms, location + (1,))[:, :3]
+
+            for key, vox in zip(todo, voxels):
+
+                opts  = groups[key][0]
+                shape = key[1]
+                vox   = opts.roundVoxels(vox.reshape(1, 3))[0]
+                vox   = tuple(int(v) for v in vox)
+
+                if any(v < 0 or v >= s for v, s in zip(vox, shape)):
+                    vox = None
+
+                cache[key] = vox
+
+        results = {}
+
+        for key, (_, _, group) in groups.items():
+
+            vox = cache[key]
+
+            for overlay in group:
+
+                if vox is None:
+                    results[overlay] = (None, None)
+                    continue
+
+                slc   = self.getOpts(overlay).index(vox)
+                value = overlay[slc]
+
+                results[overlay] = (vox, value)
+
+        return results
+
+
     @contextlib.contextmanager
     def freeze(self, overlay):
         """This method can be used as a context manager to suppress
@@ -744,11 +877,22 @@ class DisplayContext(props.SyncableHasProperties):
         constraints on the :attr:`selectedOverlay` property.
         """
 
+        # Set-based membership tests are used
+        # throughout, as the overlay list may
+        # be very large, and may have been
+        # modified many times since we were
+        # last called (see OverlayList.batch).
+        oldList             = self.__prevOverlays
+        newList             = list(self.__overlayList)
+        oldSet              = set(oldList)
+        newSet              = set(newList)
+        self.__prevOverlays = newList
+
         # Discard all Display instances
         # which refer to overlays that
         # are no longer in the list
         for overlay in list(self.__displays.keys()):
-            if overlay not in self.__overlayList:
+            if overlay not in newSet:
 
                 display = self.__displays.pop(overlay)
                 opts    = display.opts
@@ -762,15 +906,19 @@ class DisplayContext(props.SyncableHasProperties):
 
         # Ensure that a Display object exists
         # for every overlay in the list
-        for overlay in self.__overlayList:
+        for overlay in newList:
 
             ovlType = self.__overlayList.initOverlayType(overlay)
 
-            # The getDisplay method
-            # will create a Display object
-            # if one does not already exist
-            new     = overlay not in self.__displays
-            display = self.getDisplay(overlay, ovlType)
+            # A Display object is created
+            # if one does not already
+            # exist. A Display may have
+            # already been created for a new
+            # overlay if it was accessed within
+            # an OverlayList.batch block.
+            new     = (overlay not in oldSet) or \
+                      (overlay not in self.__displays)
+            display = self.__getOrCreateDisplay(overlay, ovlType)
             opts    = display.opts
 
             # Register a listener on the overlay type,
@@ -836,7 +984,7 @@ class DisplayContext(props.SyncableHasProperties):
 
         # Ensure that the overlayOrder
         # property is valid
-        self.__syncOverlayOrder()
+        self.__syncOverlayOrder(oldList, newList)
 
         # If the overlay list was empty,
         # and is now non-empty, we need
@@ -867,10 +1015,9 @@ class DisplayContext(props.SyncableHasProperties):
         # Initialise the transform property
         # of any Image overlays which have
         # just been added to the list,
-        oldList = self.__overlayList.getLastValue('overlays')[:]
-        for overlay in self.__overlayList:
+        for overlay in newList:
             if isinstance(overlay, fslimage.Nifti) and \
-               (overlay not in oldList):
+               (overlay not in oldSet):
                 self.__setTransform(overlay)
 
         # Ensure that the bounds
@@ -967,12 +1114,15 @@ class DisplayContext(props.SyncableHasProperties):
         self.__propagateLocation('display')
 
 
-    def __syncOverlayOrder(self):
+    def __syncOverlayOrder(self, oldList, newList):
         """Ensures that the :attr:`overlayOrder` property is up to date
         with respect to the :class:`.OverlayList`.
+
+        :arg oldList: The previous contents of the overlay list
+        :arg newList: The current contents of the overlay list
         """
 
-        if len(self.overlayOrder) == len(self.__overlayList):
+        if len(self.overlayOrder) == len(newList):
             return
 
         #
@@ -986,18 +1136,18 @@ class DisplayContext(props.SyncableHasProperties):
         # More complex overlay list modifications
         # will cause this code to break.
 
-        oldList  = self.__overlayList.getLastValue('overlays')[:]
         oldOrder = self.overlayOrder[:]
+        oldIdxs  = {ovl : i for i, ovl in enumerate(oldList)}
 
         # If the overlay order was just the
         # list order, preserve that ordering
-        if self.overlayOrder[:] == list(range(len(oldList))):
-            self.overlayOrder[:] = list(range(len(self.__overlayList)))
+        if oldOrder == list(range(len(oldList))):
+            self.overlayOrder[:] = list(range(len(newList)))
 
         # If overlays have been added to
         # the overlay list, add indices
         # for them to the overlayOrder list
-        elif len(oldList) < len(self.__overlayList):
+        elif len(oldList) < len(newList):
 
             newOrder      = []
             newOverlayIdx = len(oldList)
@@ -1005,10 +1155,10 @@ class DisplayContext(props.SyncableHasProperties):
             # The order of existing overlays is preserved,
             # and all new overlays added to the end of the
             # overlay order.
-            for overlay in self.__overlayList:
+            for overlay in newList:
 
-                if overlay in oldList:
-                    newOrder.append(oldOrder[oldList.index(overlay)])
+                if overlay in oldIdxs:
+                    newOrder.append(oldOrder[oldIdxs[overlay]])
                 else:
                     newOrder.append(newOverlayIdx)
                     newOverlayIdx += 1
@@ -1017,18 +1167,20 @@ class DisplayContext(props.SyncableHasProperties):
 
         # Otherwise, if overlays have been
         # removed from the overlay list ...
-        elif len(oldList) > len(self.__overlayList):
+        elif len(oldList) > len(newList):
 
             # Remove the corresponding indices
             # from the overlayOrder list
-            for i, overlay in enumerate(oldList):
-                if overlay not in self.__overlayList:
-                    oldOrder.remove(i)
+            newSet   = set(newList)
+            removed  = set(i for i, ovl in enumerate(oldList)
+                           if ovl not in newSet)
+            oldOrder = [idx for idx in oldOrder if idx not in removed]
 
             # Re-generate new indices,
             # preserving the order of
             # the remaining overlays
-            newOrder = [sorted(oldOrder).index(idx) for idx in oldOrder]
+            ranks    = {idx : i for i, idx in enumerate(sorted(oldOrder))}
+            newOrder = [ranks[idx] for idx in oldOrder]
             self.overlayOrder[:] = newOrder
 
 
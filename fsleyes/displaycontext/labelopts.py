@@ -33,7 +33,18 @@ class LabelOpts(volumeopts.NiftiOpts):
 
     outlineWidth = props.Int(minval=0, maxval=10, default=1, clamped=True)
     """Width of labelled region outlines, if :attr:``outline` is ``True``.
-    This value is in terms of pixels.
+    This value is in terms of pixels, or voxels if :attr:`voxelOutline` is
+    ``True``.
+    """
+
+
+    voxelOutline = props.Boolean(default=False)
+    """If ``True``, region outlines are calculated in terms of voxels, once
+    for each image volume, instead of in terms of pixels, every time the
+    display is drawn. This can be much faster when many slices are being
+    drawn (e.g. in the lightbox view). When regions are filled, they are
+    drawn without the border which is otherwise shown. See the
+    :class:`.GLLabel` class.
     """
 
 
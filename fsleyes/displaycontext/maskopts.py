@@ -50,7 +50,15 @@ class MaskOpts(volumeopts.NiftiOpts):
 
     outlineWidth = props.Int(minval=0, maxval=10, default=1, clamped=True)
     """Width of mask outline, if :attr:``outline` is ``True``.  This value is
-    in terms of pixels.
+    in terms of pixels, or voxels if :attr:`voxelOutline` is ``True``.
+    """
+
+
+    voxelOutline = props.Boolean(default=False)
+    """If ``True``, the mask outline is calculated in terms of voxels, once
+    for each image volume, instead of in terms of pixels, every time the
+    display is drawn. This can be much faster when many slices are being
+    drawn (e.g. in the lightbox view). See the :class:`.GLMask` class.
     """
 
 
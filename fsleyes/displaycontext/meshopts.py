@@ -21,6 +21,7 @@ import fsleyes_props        as props
 import fsleyes.colourmaps   as colourmaps
 import fsleyes.overlay      as fsloverlay
 import fsleyes.colourmaps   as fslcmaps
+import fsleyes.meshindex    as meshindex
 from . import display       as fsldisplay
 from . import colourmapopts as cmapopts
 
@@ -448,31 +449,45 @@ class MeshOpts(cmapopts.ColourMapOpts, fsldisplay.DisplayOpts):
         return opts.getTransform(self.coordSpace, opts.transform)
 
 
-    def getVertex(self, xyz=None):
+    def getVertex(self, xyz=None, tolerance=None):
         """Returns an integer identifying the index of the mesh vertex that
-        coresponds to the given ``xyz`` location,
+        coresponds to the given ``xyz`` location, or ``None`` if there is no
+        vertex at that location.
 
-        :arg xyz: Location to convert to a vertex index. If not provided, the
-                  current :class:`.DisplayContext.location` is used.
-        """
+        Vertices are looked up via a :class:`.MeshIndex`, which is shared
+        between all users of the mesh (see the :mod:`.meshindex` module).
+
+        :arg xyz:       Location to convert to a vertex index. If not
+                        provided, the current :class:`.DisplayContext.location`
+                        is used.
 
-        # TODO return vertex closest to the point,
-        #      within some configurabe tolerance?
+        :arg tolerance: If provided, the index of the vertex nearest to
+                        ``xyz``, within this distance, is returned. Otherwise
+                        ``xyz`` must coincide with a vertex.
+        """
 
         if xyz is None:
             xyz = self.displayCtx.location.xyz
             xyz = self.transformCoords(xyz, 'display', 'mesh')
 
-        vert = None
+        xyz  = np.asarray(xyz, dtype=np.float64)
         vidx = self.displayCtx.vertexIndex
 
-        if vidx >= 0 and vidx <= self.overlay.nvertices:
-            vert = self.overlay.vertices[vidx, :]
-
-        if vert is not None and np.all(np.isclose(vert, xyz)):
+        # The location will usually correspond
+        # to the currently selected vertex
+        if vidx >= 0 and vidx < self.overlay.nvertices and \
+           np.all(np.isclose(self.overlay.vertices[vidx, :], xyz)):
             return vidx
-        else:
-            return None
+
+        if tolerance is None:
+            tolerance = 1e-5
+
+        vidx, _ = meshindex.getIndex(self.overlay).nearestVertex(
+            xyz, tolerance)
+
+        if vidx < 0: return None
+        else:        return int(vidx)
+
 
     def normaliseSpace(self, space):
         """Used by :meth:`transformCoords` and :meth:`getTransform` to
@@ -11,6 +11,8 @@ by :class:`.Scene3DPanel` instances for managing their display settings.
 
 import copy
 
+from fsl.utils.platform import platform as fslplatform
+
 from . import sceneopts
 from . import canvasopts
 
@@ -32,6 +34,11 @@ class Scene3DOpts(sceneopts.SceneOpts):
     offset     = copy.copy(canvasopts.Scene3DCanvasOpts.offset)
     rotation   = copy.copy(canvasopts.Scene3DCanvasOpts.rotation)
 
+    progressive      = copy.copy(canvasopts.Scene3DCanvasOpts.progressive)
+    progressiveDelay = copy.copy(
+        canvasopts.Scene3DCanvasOpts.progressiveDelay)
+    frameBudget      = copy.copy(canvasopts.Scene3DCanvasOpts.frameBudget)
+
 
     def __init__(self, *args, **kwargs):
         """Create a ``Scene3DCanvasOpts`` instance. All arguments are passed
@@ -47,6 +54,12 @@ class Scene3DOpts(sceneopts.SceneOpts):
         self.bgColour = (0.6, 0.6, 0.753)
         self.fgColour = (0,   1,   0)
 
+        # If we're in an X11/SSH session,
+        # enable progressive rendering so
+        # that interaction is responsive.
+        if fslplatform.inSSHSession:
+            self.progressive = True
+
         sceneopts.SceneOpts.__init__(self, *args, **kwargs)
 
 
@@ -16,6 +16,12 @@ import fsl.utils.deprecated               as deprecated
 import fsleyes_props                      as props
 
 
+MIN_STEPS = 10
+"""Minimum number of ray-casting steps which are executed when rendering at
+a reduced quality - see :meth:`Volume3DOpts.getNumSteps`.
+"""
+
+
 class Volume3DOpts(object):
     """The ``Volume3DOpts`` class is a mix-in for use with :class:`.DisplayOpts`
     classes. It defines display properties used for ray-cast based rendering
@@ -163,37 +169,66 @@ class Volume3DOpts(object):
         pass
 
 
-    def getNumSteps(self):
+    def getNumSteps(self, quality=1.0):
         """Return the value of the :attr:`numSteps` property, possibly
         adjusted according to the the :attr:`numInnerSteps` property. The
         result of this method should be used instead of the value of
         the :attr:`numSteps` property.
 
+        :arg quality: Rendering quality, between 0 and 1. The number of
+                      steps is scaled by this value, so that a lower quality
+                      (and faster) rendering can be performed while the user
+                      is interacting with the scene (see the
+                      :class:`.Scene3DCanvas` class). At least
+                      :data:`MIN_STEPS` steps are always executed.
+
         See the :class:`.GLVolume` class for more details.
         """
 
         if float(fslplatform.glVersion) >= 2.1:
-            return self.numSteps
+            steps = int(np.round(self.numSteps * quality))
+            return max(min(MIN_STEPS, self.numSteps), steps)
 
-        outer = self.getNumOuterSteps()
+        outer = self.getNumOuterSteps(quality)
 
         return int(outer * self.numInnerSteps)
 
 
-    def getNumOuterSteps(self):
+    def getNumOuterSteps(self, quality=1.0):
         """Returns the number of iterations for the outer ray-casting loop.
 
+        :arg quality: Rendering quality - see :meth:`getNumSteps`.
+
         See the :class:`.GLVolume` class for more details.
         """
 
-        total = self.numSteps
+        total = max(min(MIN_STEPS, self.numSteps), self.numSteps * quality)
         inner = self.numInnerSteps
         outer = np.ceil(total / float(inner))
 
         return int(outer)
 
 
-    def calculateRayCastSettings(self, view=None, proj=None):
+    def getBlendFactor(self, quality=1.0):
+        """Returns the exponent which is used by the ray-casting shader
+        programs to weight the opacity of each sample along a ray, derived
+        from the :attr:`blendFactor` property.
+
+        When rendering at a reduced quality, fewer samples are taken along
+        each ray, so the opacity of each sample is increased to compensate
+        - this keeps the overall appearance of the rendering roughly the
+        same as the full quality rendering.
+
+        :arg quality: Rendering quality - see :meth:`getNumSteps`.
+        """
+
+        blendFactor = (1 - self.blendFactor) ** 2
+        scale       = self.getNumSteps() / float(self.getNumSteps(quality))
+
+        return blendFactor * scale
+
+
+    def calculateRayCastSettings(self, view=None, proj=None, quality=1.0):
         """Calculates various parameters required for 3D ray-cast rendering
         (see the :class:`.GLVolume` class).
 
@@ -206,6 +241,8 @@ class Volume3DOpts(object):
                    to normalised device coordinates (i.e. the GL projection
                    matrix).
 
+        :arg quality: Rendering quality - see :meth:`getNumSteps`.
+
         Returns a tuple containing:
 
           - A vector defining the amount by which to move along a ray in a
@@ -251,7 +288,7 @@ class Volume3DOpts(object):
         # the maximum number of steps will
         # be reached across the longest axis
         # of the image texture cube.
-        rayStep = np.sqrt(3) * cdir / self.getNumSteps()
+        rayStep = np.sqrt(3) * cdir / self.getNumSteps(quality)
 
         # A transformation matrix which can
         # transform image texture coordinates
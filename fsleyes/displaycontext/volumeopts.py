@@ -118,7 +118,8 @@ import fsl.utils.transform                as transform
 from   fsl.utils.platform import platform as fslplatform
 import fsleyes_props                      as props
 
-import fsleyes.colourmaps   as fslcm
+import fsleyes.colourmaps     as fslcm
+import fsleyes.resampledimage as resampledimage
 from . import display       as fsldisplay
 from . import colourmapopts as cmapopts
 from . import volume3dopts  as vol3dopts
@@ -127,6 +128,18 @@ from . import volume3dopts  as vol3dopts
 log = logging.getLogger(__name__)
 
 
+XFORM_ALIASES = {
+    'voxel'   : 'id',
+    'world'   : 'affine',
+    'pixflip' : 'pixdim-flip',
+    'ref'     : 'reference',
+}
+"""Aliases for the coordinate system names accepted by the
+:meth:`NiftiOpts.getTransform` method. The ``display`` coordinate system
+is an alias for the current value of :attr:`NiftiOpts.transform`.
+"""
+
+
 class NiftiOpts(fsldisplay.DisplayOpts):
     """The ``NiftiOpts`` class describes how a :class:`.Nifti` overlay
     should be displayed.
@@ -264,6 +277,7 @@ class NiftiOpts(fsldisplay.DisplayOpts):
             # a listener with the current display space
             # (if it is an overlay)
             self.__xforms    = {}
+            self.__axisMap   = None
             self.__dsOverlay = None
             self.__setupTransforms()
             self.__transformChanged()
@@ -370,6 +384,8 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         :attr:`.DisplayOpts.bounds` property accordingly.
         """
 
+        self.__updateDisplayXforms()
+
         lo, hi = transform.axisBounds(
             self.overlay.shape[:3],
             self.getTransform('voxel', 'display'))
@@ -434,7 +450,6 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         """
 
         image = self.overlay
-        shape = np.array(image.shape[:3])
 
         voxToIdMat      = np.eye(4)
         voxToPixdimMat  = np.diag(list(image.pixdim[:3]) + [1.0])
@@ -458,8 +473,18 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         # we add 0.5 to centre the voxel (see
         # the note on coordinate systems at
         # the top of this file).
-        voxToTexMat        = transform.scaleOffsetXform(tuple(1.0 / shape),
-                                                        tuple(0.5 / shape))
+        #
+        # The texture may contain the data of a
+        # different image (see getTextureSource),
+        # in which case we go from our voxels
+        # to texture image voxels, and then to
+        # texture coordinates.
+        texImage, voxToTexVoxMat = self.getTextureSource()
+        texShape                 = np.array(texImage.shape[:3])
+        voxToTexMat              = transform.concat(
+            transform.scaleOffsetXform(tuple(1.0 / texShape),
+                                       tuple(0.5 / texShape)),
+            voxToTexVoxMat)
 
         idToVoxMat         = transform.invert(voxToIdMat)
         idToPixdimMat      = transform.concat(voxToPixdimMat,  idToVoxMat)
@@ -545,6 +570,40 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         self.__xforms['texture', 'affine']      = texToWorldMat
         self.__xforms['texture', 'reference']   = texToRefMat
 
+        # Add entries for every alias (e.g.
+        # 'voxel', 'world'), so getTransform
+        # does not need to resolve them
+        for (from_, to), xform in list(self.__xforms.items()):
+            froms = [from_] + [a for a, n in XFORM_ALIASES.items()
+                               if n == from_]
+            tos   = [to]    + [a for a, n in XFORM_ALIASES.items()
+                               if n == to]
+            for f in froms:
+                for t in tos:
+                    self.__xforms[f, t] = xform
+
+        self.__updateDisplayXforms()
+
+
+    def __updateDisplayXforms(self):
+        """Called by :meth:`__setupTransforms` and :meth:`__transformChanged`.
+        Updates the ``display`` entries in the transformation matrix table,
+        according to the current value of the :attr:`transform` property,
+        and clears the cached :meth:`getDisplayAxisMapping`.
+        """
+
+        xforms  = self.__xforms
+        display = self.transform
+        spaces  = set(f for f, _ in xforms.keys() if f != 'display')
+
+        xforms['display', 'display'] = np.eye(4)
+
+        for space in spaces:
+            xforms['display', space] = xforms[display, space]
+            xforms[space, 'display'] = xforms[space, display]
+
+        self.__axisMap = None
+
 
     @classmethod
     def getVolumeProps(cls):
@@ -591,7 +650,7 @@ class NiftiOpts(fsldisplay.DisplayOpts):
 
         ``texture``     Voxel coordinates scaled to lie between 0.0 and 1.0,
                         suitable for looking up voxel values when stored as
-                        an OpenGL texture.
+                        an OpenGL texture (see :meth:`getTextureSource`).
         =============== ======================================================
 
 
@@ -600,22 +659,43 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         value of :attr:`transform`.
         """
 
-        if xform is None:
-            xform = self.transform
+        # The transformation matrix table contains
+        # entries for all aliases, including the
+        # current display space. We only need to
+        # resolve 'display' if a different xform
+        # has been requested.
+        if xform is not None and xform != self.transform:
+            if from_ == 'display': from_ = xform
+            if to    == 'display': to    = xform
 
-        if   from_ == 'display': from_ = xform
-        elif from_ == 'world':   from_ = 'affine'
-        elif from_ == 'voxel':   from_ = 'id'
-        elif from_ == 'pixflip': from_ = 'pixdim-flip'
-        elif from_ == 'ref':     from_ = 'reference'
+        return self.__xforms[from_, to]
 
-        if   to    == 'display': to    = xform
-        elif to    == 'world':   to    = 'affine'
-        elif to    == 'voxel':   to    = 'id'
-        elif to    == 'pixflip': to    = 'pixdim-flip'
-        elif to    == 'ref':     to    = 'reference'
 
-        return self.__xforms[from_, to]
+    def getDisplayAxisMapping(self):
+        """Returns the mapping between the display coordinate system axes
+        and the voxel axes of the image (the result of passing the
+        ``voxel`` to ``display`` transformation to
+        :meth:`.Nifti.axisMapping`). The result is cached until the
+        transformation matrices change.
+        """
+        if self.__axisMap is None:
+            self.__axisMap = self.overlay.axisMapping(
+                self.getTransform('voxel', 'display'))
+        return self.__axisMap
+
+
+    def getTextureSource(self):
+        """Returns the :class:`.Image` whose data is stored in the texture
+        that is used to render the overlay, and an affine which transforms
+        overlay voxel coordinates into voxel coordinates of that image. The
+        ``texture`` coordinate system of the :meth:`getTransform` method is
+        defined in terms of this image.
+
+        The default implementation returns the overlay, and an identity
+        matrix. Sub-classes may override this method to render an overlay
+        from the data of a different image.
+        """
+        return self.overlay, np.eye(4)
 
 
     def roundVoxels(self, voxels, daxes=None, roundOther=False):
@@ -680,7 +760,7 @@ class NiftiOpts(fsldisplay.DisplayOpts):
             daxes = list(range(3))
 
         shape = self.overlay.shape[:3]
-        ornts = self.overlay.axisMapping(self.getTransform('voxel', 'display'))
+        ornts = self.getDisplayAxisMapping()
 
         # We start by truncating the precision
         # of the coordinates, so that values
@@ -748,9 +828,13 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         """Transforms the given coordinates from ``from_`` to ``to_``.
 
         The ``from_`` and ``to_`` parameters must be those accepted by the
-        :meth:`getTransform` method.
+        :meth:`getTransform` method. The transformation is applied to all
+        coordinates at once, so callers with many points should pass them
+        in a single ``(N, 3)`` array, rather than calling this method for
+        each point.
 
-        :arg coords: Coordinates to transform
+        :arg coords: Coordinates to transform - either a single ``(x, y, z)``
+                     point, or a ``(N, 3)`` array
         :arg from_:  Space to transform from
         :arg to_:    Space to transform to
         :arg vround: If ``True``, and ``to_ in ('voxel', 'id)``, the
@@ -769,14 +853,21 @@ class NiftiOpts(fsldisplay.DisplayOpts):
         if pre  is not None: xform = transform.concat(xform, pre)
         if post is not None: xform = transform.concat(post, xform)
 
-        coords = np.array(coords)
-        coords = transform.transform(coords, xform, vector=vector)
+        coords = np.array(coords, dtype=np.float64)
+        shape  = coords.shape
+        coords = coords.reshape((-1, 3))
+
+        # All of our transforms are affine, so we
+        # can skip the generic (and comparatively
+        # slow) transform.transform function
+        if vector: coords = np.dot(coords, xform[:3, :3].T)
+        else:      coords = np.dot(coords, xform[:3, :3].T) + xform[:3, 3]
 
         # Round to integer voxel coordinates?
         if to_ in ('voxel', 'id') and vround:
             coords = self.roundVoxels(coords)
 
-        return coords
+        return coords.reshape(shape)
 
 
     def getVoxel(self, xyz=None, clip=True, vround=True):
@@ -1114,6 +1205,18 @@ class VolumeOpts(cmapopts.ColourMapOpts, vol3dopts.Volume3DOpts, NiftiOpts):
             return self.clipImage.dataRange
 
 
+    def getTextureSource(self):
+        """Overrides :meth:`NiftiOpts.getTextureSource`. If the overlay is a
+        :class:`.ResampledImage`, returns its source image, and the
+        transformation from resampled voxels to source voxels, so that it
+        is rendered directly from the source image data.
+        """
+        overlay = self.overlay
+        if isinstance(overlay, resampledimage.ResampledImage):
+            return overlay.source, overlay.voxToSourceVoxMat
+        return NiftiOpts.getTextureSource(self)
+
+
     def __dataRangeChanged(self, *a):
         """Called when the :attr:`.Image.dataRange` property changes.
         Calls :meth:`.ColourMapOpts.updateDataRange`.
@@ -15,8 +15,9 @@ import collections
 
 import numpy as np
 
-import fsleyes.actions    as actions
-from . import                selection
+import fsleyes.actions          as actions
+import fsleyes.copyonwriteimage as copyonwriteimage
+from . import                      selection
 
 
 log = logging.getLogger(__name__)
@@ -393,6 +394,7 @@ class Editor(actions.ActionProvider):
         """
 
         data, selection = clipboard
+        copyonwriteimage.prepareWrite(self.__image, selection)
         self.__image[selection] = data[selection]
 
 
@@ -462,6 +464,7 @@ class Editor(actions.ActionProvider):
             sliceobj = self.__makeSlice(change.offset,
                                         change.newVals.shape,
                                         opts.index()[3:])
+            copyonwriteimage.prepareWrite(image, sliceobj)
             image[sliceobj] = change.newVals
 
         elif isinstance(change, SelectionChange):
@@ -492,6 +495,7 @@ class Editor(actions.ActionProvider):
             sliceobj = self.__makeSlice(change.offset,
                                         change.oldVals.shape,
                                         opts.index()[3:])
+            copyonwriteimage.prepareWrite(image, sliceobj)
             image[sliceobj] = change.oldVals
 
         elif isinstance(change, SelectionChange):
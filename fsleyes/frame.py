@@ -2055,8 +2055,9 @@ class OverlayDropTarget(wx.FileDropTarget):
         if filenames is not None:
             loadoverlay.loadOverlays(
                 filenames,
-                onLoad=self.onLoad,
-                inmem=self.__displayCtx.loadInMemory)
+                onLoad=self.__onLoad,
+                inmem=self.__displayCtx.loadInMemory,
+                progressive=True)
             return True
         else:
             return False
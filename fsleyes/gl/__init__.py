@@ -424,6 +424,12 @@ def bootstrap(glVersion=None):
         import fsleyes.displaycontext as dc
         dc.SceneOpts.performance.setAttribute(None, 'default', 1)
 
+        # Calculating outlines in the fragment
+        # shader is expensive on software
+        # renderers - precompute them instead.
+        dc.LabelOpts.voxelOutline.setAttribute(None, 'default', True)
+        dc.MaskOpts .voxelOutline.setAttribute(None, 'default', True)
+
 
 def getGLContext(**kwargs):
     """Create and return a GL context object for on- or off-screen OpenGL
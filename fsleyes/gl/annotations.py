@@ -33,6 +33,7 @@ import numpy       as np
 import OpenGL.GL   as gl
 
 import fsleyes.gl.globject  as globject
+import fsleyes.gl.glstate   as glstate
 import fsleyes.gl.routines  as glroutines
 import fsleyes.gl.resources as glresources
 import fsleyes.gl.textures  as textures
@@ -356,11 +357,11 @@ class AnnotationObject(globject.GLSimpleObject):
 
 
     def preDraw(self, *args, **kwargs):
-        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        glstate.enable(gl.GL_VERTEX_ARRAY)
 
 
     def postDraw(self, *args, **kwargs):
-        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        glstate.disable(gl.GL_VERTEX_ARRAY)
 
 
 class Line(AnnotationObject):
@@ -687,7 +688,6 @@ class VoxelSelection(AnnotationObject):
         shape        = self.__selection.getSelection().shape
         displayToVox = opts.getTransform('display', 'voxel')
         voxToDisplay = opts.getTransform('voxel',   'display')
-        voxToTex     = opts.getTransform('voxel',   'texture')
         verts, voxs  = glroutines.slice2D(shape,
                                           xax,
                                           yax,
@@ -695,9 +695,16 @@ class VoxelSelection(AnnotationObject):
                                           voxToDisplay,
                                           displayToVox)
 
-        texs  = transform.transform(voxs, voxToTex)
-        verts = np.array(verts, dtype=np.float32).ravel('C')
-        texs  = np.array(texs,  dtype=np.float32).ravel('C')
+        # The selection texture has the same shape as
+        # the selection, which is not necessarily the
+        # same as the overlay texture (see
+        # NiftiOpts.getTextureSource)
+        shape    = np.array(shape[:3], dtype=np.float64)
+        voxToTex = transform.scaleOffsetXform(tuple(1.0 / shape),
+                                              tuple(0.5 / shape))
+        texs     = transform.transform(voxs, voxToTex)
+        verts    = np.array(verts, dtype=np.float32).ravel('C')
+        texs     = np.array(texs,  dtype=np.float32).ravel('C')
 
         texture.bindTexture(gl.GL_TEXTURE0)
         gl.glClientActiveTexture(gl.GL_TEXTURE0)
@@ -23,6 +23,7 @@ import OpenGL.GL as gl
 import fsleyes_props                         as props
 import fsl.utils.idle                        as idle
 import fsleyes.controls.colourbar            as cbar
+import fsleyes.gl.glstate                    as glstate
 import fsleyes.gl.textures                   as textures
 
 
@@ -171,8 +172,8 @@ class ColourBarCanvas(props.HasProperties):
 
         gl.glClearColor(*self.__cbar.bgColour)
         gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
-        gl.glEnable(gl.GL_BLEND)
-        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        glstate.enable(gl.GL_BLEND)
+        glstate.blendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
         gl.glShadeModel(gl.GL_FLAT)
 
         xmin, xmax = 0, 1
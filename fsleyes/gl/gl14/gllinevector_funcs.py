@@ -30,6 +30,7 @@ import numpy                   as np
 import OpenGL.GL               as gl
 
 import fsl.utils.transform     as transform
+import fsleyes.gl.glstate      as glstate
 import fsleyes.gl.gllinevector as gllinevector
 import fsleyes.gl.resources    as glresources
 from . import                     glvector_funcs
@@ -147,7 +148,7 @@ def updateShaderState(self):
 def preDraw(self, xform=None, bbox=None):
     """Initialises the GL state ready for drawing the :class:`.GLLineVector`.
     """
-    gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+    glstate.enable(gl.GL_VERTEX_ARRAY)
     self.shader.load()
 
 
@@ -198,4 +199,4 @@ def drawAll(self, axes, zposes, xforms):
 def postDraw(self, xform=None, bbox=None):
     """Clears the GL state after drawing the :class:`.GLLineVector`. """
     self.shader.unload()
-    gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+    glstate.disable(gl.GL_VERTEX_ARRAY)
@@ -176,7 +176,7 @@ def draw2D(self, zpos, axes, xform=None, bbox=None):
         gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
 
 
-def draw3D(self, xform=None, bbox=None):
+def draw3D(self, xform=None, bbox=None, quality=1.0):
     """Draws the image in 3D on the canvas.
 
     :arg self:    The :class:`.GLVolume` object which is managing the image
@@ -186,6 +186,9 @@ def draw3D(self, xform=None, bbox=None):
                   data.
 
     :arg bbox:    An optional bounding box.
+
+    :arg quality: Rendering quality, between 0 and 1 - see
+                  :meth:`.Volume3DOpts.getNumSteps`.
     """
     opts    = self.opts
     canvas  = self.canvas
@@ -197,19 +200,20 @@ def draw3D(self, xform=None, bbox=None):
     w, h    = src.getSize()
 
     vertices, voxCoords, texCoords = self.generateVertices3D(bbox)
-    rayStep, texform               = opts.calculateRayCastSettings(xform, proj)
+    rayStep, texform               = opts.calculateRayCastSettings(
+        xform, proj, quality)
 
     if xform is not None:
         vertices = transform.transform(vertices, xform)
 
     vertices = np.array(vertices, dtype=np.float32).ravel('C')
 
-    outerLoop  = opts.getNumOuterSteps()
+    outerLoop  = opts.getNumOuterSteps(quality)
     screenSize = [1.0 / w, 1.0 / h, 0, 0]
     rayStep    = list(rayStep)   + [0]
     texform    = texform[2, :]
     settings   = [
-        (1 - opts.blendFactor) ** 2,
+        opts.getBlendFactor(quality),
         0,
         0,
         display.alpha / 100.0]
@@ -263,19 +267,10 @@ def drawAll(self, axes, zposes, xforms):
     applying the corresponding transformation to each of the slices.
     """
 
-    nslices   = len(zposes)
-    vertices  = np.zeros((nslices * 6, 3), dtype=np.float32)
-    texCoords = np.zeros((nslices * 6, 3), dtype=np.float32)
-    indices   = np.arange(nslices * 6,     dtype=np.uint32)
-
-    for i, (zpos, xform) in enumerate(zip(zposes, xforms)):
-
-        v, vc, tc = self.generateVertices2D(zpos, axes)
-
-        vertices[ i * 6: i * 6 + 6, :] = transform.transform(v, xform)
-        texCoords[i * 6: i * 6 + 6, :] = tc
-
-    vertices = vertices.ravel('C')
+    nslices                = len(zposes)
+    indices                = np.arange(nslices * 6, dtype=np.uint32)
+    vertices, _, texCoords = self.generateAllVertices2D(zposes, axes, xforms)
+    vertices               = vertices.ravel('C')
 
     self.shader.setAtt('texCoord', texCoords)
 
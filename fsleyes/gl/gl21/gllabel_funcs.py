@@ -11,6 +11,10 @@ Rendering of a ``GLLabel`` is very similar to that of a ``GLVolume``, with the
 exception that a different fragment shader (``gllabel``) is used. The
 ``preDraw``, ``draw``, ``drawAll`` and ``postDraw`` functions defined in the
 :mod:`.gl21.glvolume_funcs` are re-used by this module.
+
+If the :meth:`.GLLabel.useEdgeMap` method returns ``True``, the ``gllabel``
+fragment shader uses the :class:`.EdgeMapTexture` (bound to texture unit 3)
+to identify voxels which lie on region outlines.
 """
 
 
@@ -70,24 +74,41 @@ def updateShaderState(self):
     changed |= shader.set('voxValXform',  vvx)
     changed |= shader.set('imageTexture', 0)
     changed |= shader.set('lutTexture',   1)
+    changed |= shader.set('edgeTexture',  3)
 
     shader.unload()
 
     return changed
 
 
-def draw2D(self, *args, **kwargs):
+def setEdgeState(self, axes):
+    """Called by :func:`draw2D` and :func:`drawAll`. Configures the shader
+    program to use (or not use) the :class:`.EdgeMapTexture`.
+    """
+
+    useEdgeMap = self.useEdgeMap()
+
+    self.shader.set('useEdgeMap', useEdgeMap)
+
+    if useEdgeMap:
+        self.shader.set('outline',  self.opts.outline)
+        self.shader.set('edgeAxes', self.edgeAxes(axes))
+
+
+def draw2D(self, zpos, axes, *args, **kwargs):
     """Draws the label overlay in 2D. See :meth:`.GLObject.draw2D`."""
     self.shader.load()
-    glvolume_funcs.draw2D(self, *args, **kwargs)
+    setEdgeState(self, axes)
+    glvolume_funcs.draw2D(self, zpos, axes, *args, **kwargs)
     self.shader.unloadAtts()
     self.shader.unload()
 
 
-def drawAll(self, *args, **kwargs):
+def drawAll(self, axes, *args, **kwargs):
     """Draws the label overlay in 2D. See :meth:`.GLObject.draw2D`."""
     self.shader.load()
-    glvolume_funcs.drawAll(self, *args, **kwargs)
+    setEdgeState(self, axes)
+    glvolume_funcs.drawAll(self, axes, *args, **kwargs)
     self.shader.unloadAtts()
     self.shader.unload()
 
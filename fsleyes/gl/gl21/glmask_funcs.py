@@ -6,6 +6,10 @@
 #
 """This module provides functions which are used by the :class:`.GLMask`
 class to render :class:`.Image` overlays in an OpenGL 2.1 compatible manner.
+
+If the :meth:`.GLMask.useEdgeMap` method returns ``True``, the ``glmask``
+fragment shader uses the :class:`.EdgeMapTexture` (bound to texture unit 2)
+to draw the mask outline.
 """
 
 
@@ -65,17 +69,32 @@ def updateShaderState(self):
     changed |= shader.set('threshold',     self.getThreshold())
     changed |= shader.set('invert',        opts.invert)
     changed |= shader.set('colour',        self.getColour())
+    changed |= shader.set('edgeTexture',   2)
 
     shader.unload()
 
     return changed
 
 
+def setEdgeState(self, axes):
+    """Called by :func:`draw2D` and :func:`drawAll`. Configures the shader
+    program to use (or not use) the :class:`.EdgeMapTexture`.
+    """
+
+    useEdgeMap = self.useEdgeMap()
+
+    self.shader.set('useEdgeMap', useEdgeMap)
+
+    if useEdgeMap:
+        self.shader.set('edgeAxes', self.edgeAxes(axes))
+
+
 def draw2D(self, zpos, axes, xform=None, bbox=None):
     """Draws a 2D slice at the given ``zpos``. Uses the
     :func:`.glvolume_funcs.draw2D` function.
     """
     self.shader.load()
+    setEdgeState(self, axes)
     glvolume_funcs.draw2D(self, zpos, axes, xform, bbox)
     self.shader.unloadAtts()
     self.shader.unload()
@@ -86,6 +105,7 @@ def drawAll(self, axes, zposes, xforms):
     :func:`.glvolume_funcs.drawAll` function.
     """
     self.shader.load()
+    setEdgeState(self, axes)
     glvolume_funcs.drawAll(self, axes, zposes, xforms)
     self.shader.unloadAtts()
     self.shader.unload()
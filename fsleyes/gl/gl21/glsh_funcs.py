@@ -35,6 +35,7 @@ import OpenGL.GL                    as gl
 import OpenGL.GL.ARB.draw_instanced as arbdi
 
 import fsl.utils.transform          as transform
+import fsleyes.gl.glstate           as glstate
 import fsleyes.gl.shaders           as shaders
 
 
@@ -181,9 +182,9 @@ def preDraw(self, xform=None, bbox=None):
 
     shader.set('normalMatrix', normalMatrix)
 
-    gl.glEnable(gl.GL_CULL_FACE)
+    glstate.enable(gl.GL_CULL_FACE)
     gl.glClear(gl.GL_DEPTH_BUFFER_BIT)
-    gl.glEnable(gl.GL_DEPTH_TEST)
+    glstate.enable(gl.GL_DEPTH_TEST)
     gl.glCullFace(gl.GL_BACK)
 
 
@@ -228,5 +229,5 @@ def postDraw(self, xform=None, bbox=None):
 
     self.shader.unloadAtts()
     self.shader.unload()
-    gl.glDisable(gl.GL_CULL_FACE)
-    gl.glDisable(gl.GL_DEPTH_TEST)
+    glstate.disable(gl.GL_CULL_FACE)
+    glstate.disable(gl.GL_DEPTH_TEST)
@@ -33,6 +33,7 @@ import OpenGL.GL                    as gl
 import OpenGL.GL.ARB.draw_instanced as arbdi
 
 import fsl.utils.transform  as transform
+import fsleyes.gl.glstate   as glstate
 import fsleyes.gl.routines  as glroutines
 from . import                  glvector_funcs
 
@@ -163,8 +164,8 @@ def preDraw(self, xform=None, bbox=None):
 
     shader.set('normalMatrix', normalMatrix)
 
-    gl.glEnable(gl.GL_CULL_FACE)
-    gl.glEnable(gl.GL_DEPTH_TEST)
+    glstate.enable(gl.GL_CULL_FACE)
+    glstate.enable(gl.GL_DEPTH_TEST)
     gl.glClear(gl.GL_DEPTH_BUFFER_BIT)
     gl.glCullFace(gl.GL_BACK)
 
@@ -204,5 +205,5 @@ def postDraw(self, xform=None, bbox=None):
     self.shader.unloadAtts()
     self.shader.unload()
 
-    gl.glDisable(gl.GL_CULL_FACE)
-    gl.glDisable(gl.GL_DEPTH_TEST)
+    glstate.disable(gl.GL_CULL_FACE)
+    glstate.disable(gl.GL_DEPTH_TEST)
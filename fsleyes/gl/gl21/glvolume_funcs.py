@@ -85,9 +85,15 @@ def updateShaderState(self):
     clipHigh   = opts.clippingRange[1] * clipXform[0, 0] + clipXform[0, 3]
     texZero    = 0.0                   * imgXform[ 0, 0] + imgXform[ 0, 3]
     imageShape = self.image.shape[:3]
+    texShape   = opts.getTextureSource()[0].shape[:3]
 
-    if imageIsClip: clipImageShape = imageShape
-    else:           clipImageShape = opts.clipImage.shape[:3]
+    # The clip image shape is only used
+    # for spline interpolation, so it
+    # must be the clip texture shape
+    if imageIsClip:
+        clipImageShape = texShape
+    else:
+        clipImageShape = self.clipOpts.getTextureSource()[0].shape[:3]
 
     # Create a single transformation matrix
     # which transforms from image texture values
@@ -103,6 +109,7 @@ def updateShaderState(self):
 
     changed |= shader.set('useSpline',        opts.interpolation == 'spline')
     changed |= shader.set('imageShape',       imageShape)
+    changed |= shader.set('texShape',         texShape)
     changed |= shader.set('clipLow',          clipLow)
     changed |= shader.set('clipHigh',         clipHigh)
     changed |= shader.set('texZero',          texZero)
@@ -119,7 +126,7 @@ def updateShaderState(self):
 
     if self.threedee:
 
-        blendFactor = (1 - opts.blendFactor) ** 2
+        blendFactor = opts.getBlendFactor()
         clipPlanes  = np.zeros((opts.numClipPlanes, 4), dtype=np.float32)
         d2tmat      = opts.getTransform('display', 'texture')
 
@@ -134,6 +141,17 @@ def updateShaderState(self):
             normal           = transform.transformNormal(normal, d2tmat)
             clipPlanes[i, :] = glroutines.planeEquation2(origin, normal)
 
+        # Update the brick occupancy used for
+        # empty space skipping. The thresholds
+        # are in terms of the image data range.
+        self.brickTexture.setThresholds(opts.clippingRange[0],
+                                        opts.clippingRange[1],
+                                        opts.displayRange[0],
+                                        opts.invertClipping,
+                                        opts.useNegativeCmap,
+                                        imageIsClip)
+
+        changed |= shader.set('brickTexture',  6)
         changed |= shader.set('numClipPlanes', opts.numClipPlanes)
         changed |= shader.set('clipMode',      clipMode)
         changed |= shader.set('clipPlanes',    clipPlanes, opts.numClipPlanes)
@@ -188,7 +206,7 @@ def draw2D(self, zpos, axes, xform=None, bbox=None):
     gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
 
 
-def draw3D(self, xform=None, bbox=None):
+def draw3D(self, xform=None, bbox=None, quality=1.0):
     """Draws the image in 3D on the canvas.
 
     :arg self:    The :class:`.GLVolume` object which is managing the image
@@ -198,17 +216,43 @@ def draw3D(self, xform=None, bbox=None):
                   data.
 
     :arg bbox:    An optional bounding box.
+
+    :arg quality: Rendering quality, between 0 and 1 - see
+                  :meth:`.Volume3DOpts.getNumSteps`.
     """
 
     opts                           = self.opts
     tex                            = self.renderTexture1
     proj                           = self.canvas.projectionMatrix
     vertices, voxCoords, texCoords = self.generateVertices3D(bbox)
-    rayStep , texform              = opts.calculateRayCastSettings(xform, proj)
+    rayStep , texform              = opts.calculateRayCastSettings(
+        xform, proj, quality)
 
     if xform is not None:
         vertices = transform.transform(vertices, xform)
 
+    # Empty space skipping is disabled for spline
+    # interpolation (which may overshoot the brick
+    # data ranges), and for overridden data ranges
+    # (where the texture data may be clamped).
+    bricks    = self.brickTexture
+    texShape  = opts.getTextureSource()[0].shape[:3]
+    skipEmpty = (bricks.ready()                   and
+                 opts.interpolation != 'spline'   and
+                 not opts.enableOverrideDataRange and
+                 bricks.imageShape == texShape)
+
+    if skipEmpty:
+        brickShape = np.array(bricks.brickShape, dtype=np.float32)
+        brickScale = np.array(bricks.imageShape, dtype=np.float32)
+        brickScale = brickScale / bricks.brickSize
+        self.shader.set('brickShape',      brickShape)
+        self.shader.set('brickCoordScale', brickScale)
+        bricks.bindTexture(gl.GL_TEXTURE6)
+
+    self.shader.set(   'skipEmpty',       skipEmpty)
+    self.shader.set(   'blendFactor',     opts.getBlendFactor(quality))
+    self.shader.set(   'stepLength',      1.0 / opts.getNumSteps(quality))
     self.shader.set(   'tex2ScreenXform', texform)
     self.shader.set(   'rayStep',         rayStep)
     self.shader.setAtt('vertex',          vertices)
@@ -220,6 +264,9 @@ def draw3D(self, xform=None, bbox=None):
     gl.glDrawArrays(gl.GL_TRIANGLES, 0, 36)
     tex.unbindAsRenderTarget()
 
+    if skipEmpty:
+        bricks.unbindTexture()
+
     self.shader.unloadAtts()
     self.shader.unload()
 
@@ -227,17 +274,9 @@ def draw3D(self, xform=None, bbox=None):
 def drawAll(self, axes, zposes, xforms):
     """Draws all of the specified slices. """
 
-    nslices   = len(zposes)
-    vertices  = np.zeros((nslices * 6, 3), dtype=np.float32)
-    voxCoords = np.zeros((nslices * 6, 3), dtype=np.float32)
-    texCoords = np.zeros((nslices * 6, 3), dtype=np.float32)
-
-    for i, (zpos, xform) in enumerate(zip(zposes, xforms)):
-
-        v, vc, tc = self.generateVertices2D(zpos, axes)
-        vertices[ i * 6: i * 6 + 6, :] = transform.transform(v, xform)
-        voxCoords[i * 6: i * 6 + 6, :] = vc
-        texCoords[i * 6: i * 6 + 6, :] = tc
+    nslices                        = len(zposes)
+    vertices, voxCoords, texCoords = self.generateAllVertices2D(
+        zposes, axes, xforms)
 
     self.shader.setAtt('vertex',   vertices)
     self.shader.setAtt('voxCoord', voxCoords)
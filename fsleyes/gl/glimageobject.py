@@ -34,6 +34,7 @@ class GLImageObject(globject.GLObject):
 
          frontFace
          generateVertices2D
+         generateAllVertices2D
          generateVoxelCoordinates2D
 
     Some useful methods for 3D rendering::
@@ -262,6 +263,63 @@ class GLImageObject(globject.GLObject):
         return vertices, voxCoords, texCoords
 
 
+    def generateAllVertices2D(self, zposes, axes, xforms=None):
+        """Generates vertex coordinates for multiple 2D slices of the
+        :class:`.Image`, one through each of the given ``zposes``. This is
+        equivalent to calling :meth:`generateVertices2D` for each Z position,
+        but all slices are generated at once. It is used to draw all of the
+        slices of a :class:`.LightBoxCanvas` in a single draw call.
+
+        :arg zposes: Sequence of ``N`` Z positions.
+        :arg axes:   Display axis indices.
+        :arg xforms: Optional ``(N, 4, 4)`` array of transformations to
+                     apply to the vertices of each slice.
+
+        :returns:    A tuple containing ``(N*6, 3)`` ``numpy.float32`` arrays
+                     of vertex, voxel, and texture coordinates.
+        """
+
+        opts          = self.opts
+        v2dMat        = opts.getTransform('voxel',   'display')
+        d2vMat        = opts.getTransform('display', 'voxel')
+        v2tMat        = opts.getTransform('voxel',   'texture')
+        xax, yax, zax = axes
+        zposes        = np.asarray(zposes, dtype=np.float32)
+        nslices       = len(zposes)
+
+        # The x/y coordinates of a slice do not
+        # depend on its Z position, so we generate
+        # one slice, and replicate it along Z.
+        vertices, _ = glroutines.slice2D(
+            self.image.shape[:3],
+            xax,
+            yax,
+            0,
+            v2dMat,
+            d2vMat)
+
+        vertices = np.tile(vertices, (nslices, 1))
+        vertices[:, zax] = np.repeat(zposes, 6)
+
+        voxCoords = transform.transform(vertices, d2vMat)
+
+        # See generateVertices2D
+        if not hasattr(opts, 'interpolation') or opts.interpolation == 'none':
+            voxCoords = opts.roundVoxels(voxCoords, daxes=[zax])
+
+        texCoords = transform.transform(voxCoords, v2tMat)
+
+        if xforms is not None:
+            xforms   = np.asarray(xforms).reshape((-1, 4, 4))
+            vertices = glroutines.stackTransform(
+                vertices.reshape((nslices, 6, 3)), xforms)
+            vertices = vertices.reshape((-1, 3))
+
+        return (np.asarray(vertices,  dtype=np.float32),
+                np.asarray(voxCoords, dtype=np.float32),
+                np.asarray(texCoords, dtype=np.float32))
+
+
     @memoize.Instanceify(memoize.memoize)
     def generateVertices3D(self, bbox=None):
         """Generates vertex coordinates defining the 3D bounding box of the
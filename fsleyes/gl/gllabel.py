@@ -9,15 +9,19 @@ functionality to render an :class:`.Image` overlay as a label/atlas image.
 """
 
 
+import functools
+
 import OpenGL.GL                 as gl
 
 import fsleyes.gl                as fslgl
 import fsleyes.gl.routines       as glroutines
 import fsleyes.gl.shaders.filter as glfilter
 import fsl.utils.idle            as idle
+from   fsl.utils.platform    import platform as fslplatform
 from . import resources          as glresources
 from . import                       glimageobject
 from . import                       textures
+from .textures import               edgemaptexture
 
 
 class GLLabel(glimageobject.GLImageObject):
@@ -39,6 +43,14 @@ class GLLabel(glimageobject.GLImageObject):
     modules (:mod:`.gl14.gllabel_funcs` and :mod:`.gl21.gllabel_funcs`) are
     used to configure the vertex/fragment shader programs used for rendering.
 
+    By default, region outlines are drawn by rendering the label image to an
+    off-screen :class:`.RenderTexture`, and then running it through an edge
+    detection filter. If the :attr:`.LabelOpts.voxelOutline` property is
+    ``True``, an :class:`.EdgeMapTexture` is instead calculated whenever the
+    image data, lookup table, or outline width changes, and the fragment
+    shader uses it to identify voxels which lie on a region outline. This is
+    currently only performed by the :mod:`.gl21.gllabel_funcs` module.
+
     The ``GLLabel`` class is modelled upon the :class:`.GLVolume` class, and
     the version specific modules for the ``GLLabel`` class must provide the
     same set of functions that are required by the ``GLVolume`` class.
@@ -74,12 +86,19 @@ class GLLabel(glimageobject.GLImageObject):
         self.renderTexture = textures.RenderTexture(
             self.name, gl.GL_LINEAR, rttype='c')
 
+        # The edge texture is only populated
+        # when LabelOpts.voxelOutline is true
+        self.edgeTexture = textures.EdgeMapTexture(
+            '{}_edges'.format(self.name))
+        self.edgeTexture.register(self.name, self.__edgesChanged)
+
         self.__lut = self.opts.lut
 
         self.addListeners()
         self.registerLut()
         self.refreshLutTexture()
         self.refreshImageTexture()
+        self.refreshEdgeTexture()
 
         def init():
             fslgl.gllabel_funcs.init(self)
@@ -95,6 +114,8 @@ class GLLabel(glimageobject.GLImageObject):
 
         self.edgeFilter.destroy()
         self.renderTexture.destroy()
+        self.edgeTexture.deregister(self.name)
+        self.edgeTexture.destroy()
         self.imageTexture.deregister(self.name)
         glresources.delete(self.imageTexture.getTextureName())
         self.lutTexture.destroy()
@@ -118,6 +139,25 @@ class GLLabel(glimageobject.GLImageObject):
         return self.imageTexture is not None and self.imageTexture.ready()
 
 
+    def useEdgeMap(self):
+        """Returns ``True`` if the :class:`.EdgeMapTexture` should be used to
+        draw region outlines, ``False`` if the edge detection filter should
+        be used.
+        """
+        return (self.opts.voxelOutline                          and
+                self.edgeTexture.ready()                        and
+                self.edgeTexture.imageShape == self.image.shape[:3])
+
+
+    def edgeAxes(self, axes):
+        """Returns a sequence of three flags, identifying the voxel axes along
+        which outlines should be drawn for a 2D slice through the given
+        display ``axes``. See :func:`.edgemaptexture.calcEdgeAxes`.
+        """
+        xform = self.opts.getTransform('display', 'voxel')
+        return edgemaptexture.calcEdgeAxes(xform, axes[2])
+
+
     def updateShaderState(self, *args, **kwargs):
         """Calls :func:`.gl14.gllabel_funcs.updateShaderState` or
         :func:`.gl21.gllabel_funcs.updateShaderState`, and
@@ -150,7 +190,8 @@ class GLLabel(glimageobject.GLImageObject):
         display.addListener('brightness',   name, self.__colourPropChanged)
         display.addListener('contrast',     name, self.__colourPropChanged)
         opts   .addListener('outline',      name, self.notify)
-        opts   .addListener('outlineWidth', name, self.notify)
+        opts   .addListener('outlineWidth', name, self.__outlineChanged)
+        opts   .addListener('voxelOutline', name, self.__outlineChanged)
         opts   .addListener('lut',          name, self.__lutChanged)
         opts   .addListener('volume',       name, self.__imagePropChanged)
         opts   .addListener('transform',    name, self.notify)
@@ -177,6 +218,7 @@ class GLLabel(glimageobject.GLImageObject):
         display.removeListener('contrast',     name)
         opts   .removeListener('outline',      name)
         opts   .removeListener('outlineWidth', name)
+        opts   .removeListener('voxelOutline', name)
         opts   .removeListener('lut',          name)
         opts   .removeListener('volume',       name)
         opts   .removeListener('transform',    name)
@@ -218,6 +260,28 @@ class GLLabel(glimageobject.GLImageObject):
         self.imageTexture.register(self.name, self.__imageTextureChanged)
 
 
+    def refreshEdgeTexture(self):
+        """Re-calculates the :class:`.EdgeMapTexture` from the currently
+        displayed image volume, and the current :class:`.LookupTable`. Does
+        nothing if :attr:`.LabelOpts.voxelOutline` is ``False``, or if
+        OpenGL 2.1 is not available.
+        """
+
+        opts = self.opts
+
+        if not opts.voxelOutline or float(fslplatform.glVersion) < 2.1:
+            return
+
+        labels   = [lbl.value for lbl in opts.lut if lbl.enabled]
+        classify = functools.partial(edgemaptexture.labelClasses,
+                                     labels=labels)
+
+        self.edgeTexture.setImageData(self.image[opts.index()],
+                                      width=opts.outlineWidth,
+                                      classify=classify,
+                                      background=-1)
+
+
     def refreshLutTexture(self, *a):
         """Refreshes the :class:`.LookupTableTexture` which stores the
         :class:`.LookupTable` used to colour the overlay.
@@ -245,7 +309,7 @@ class GLLabel(glimageobject.GLImageObject):
 
         if self.__lut is not None:
             for topic in ['label', 'added', 'removed']:
-                self.__lut.register(self.name, self.__colourPropChanged, topic)
+                self.__lut.register(self.name, self.__lutLabelChanged, topic)
 
 
     def preDraw(self, xform=None, bbox=None):
@@ -264,6 +328,9 @@ class GLLabel(glimageobject.GLImageObject):
         self.imageTexture.bindTexture(gl.GL_TEXTURE0)
         self.lutTexture  .bindTexture(gl.GL_TEXTURE1)
 
+        if self.useEdgeMap():
+            self.edgeTexture.bindTexture(gl.GL_TEXTURE3)
+
 
     def draw2D(self, zpos, axes, xform=None, bbox=None):
         """Calls the version-dependent ``draw2D`` function. """
@@ -280,6 +347,12 @@ class GLLabel(glimageobject.GLImageObject):
         ymin, ymax = lo[yax], hi[yax]
         offsets    = [owidth / w, owidth / h]
 
+        # Outlines are identified by the shader
+        # program, so we can draw directly
+        if self.useEdgeMap():
+            fslgl.gllabel_funcs.draw2D(self, zpos, axes, xform, bbox)
+            return
+
         # draw the label to the offscreen texture
         with glroutines.disabled(gl.GL_BLEND), rtex.bound(xax, yax, lo, hi):
             fslgl.gllabel_funcs.draw2D(self, zpos, axes, xform, bbox)
@@ -312,6 +385,10 @@ class GLLabel(glimageobject.GLImageObject):
         ymin, ymax = lo[yax], hi[yax]
         offsets    = [owidth / w, owidth / h]
 
+        if self.useEdgeMap():
+            fslgl.gllabel_funcs.drawAll(self, axes, zposes, xforms)
+            return
+
         # draw all slices to the offscreen texture
         with glroutines.disabled(gl.GL_BLEND), rtex.bound(xax, yax, lo, hi):
             fslgl.gllabel_funcs.drawAll(self, axes, zposes, xforms)
@@ -331,17 +408,39 @@ class GLLabel(glimageobject.GLImageObject):
         self.imageTexture.unbindTexture()
         self.lutTexture  .unbindTexture()
 
+        if self.edgeTexture.isBound():
+            self.edgeTexture.unbindTexture()
+
 
     def __lutChanged(self, *a):
         """Called when the :attr:`.LabelOpts.lut` property changes. Re-creates
-        the :class:`.LookupTableTexture`.
+        the :class:`.LookupTableTexture`, and refreshes the edge map.
         """
 
         self.registerLut()
         self.refreshLutTexture()
+        self.refreshEdgeTexture()
+        self.updateShaderState(alwaysNotify=True)
+
+
+    def __lutLabelChanged(self, *a):
+        """Called when a label in the current :class:`.LookupTable` is added,
+        removed, or changed. Refreshes the LUT texture and the edge map.
+        """
+        self.refreshLutTexture()
+        self.refreshEdgeTexture()
         self.updateShaderState(alwaysNotify=True)
 
 
+    def __outlineChanged(self, *a):
+        """Called when the :attr:`.LabelOpts.outlineWidth` or
+        :attr:`.LabelOpts.voxelOutline` properties change. Refreshes the
+        edge map.
+        """
+        self.refreshEdgeTexture()
+        self.notify()
+
+
     def __colourPropChanged(self, *a):
         """Called when a :class:`.Display` property changes (e.g. ``alpha``).
         Refreshes the LUT texture.
@@ -363,7 +462,8 @@ class GLLabel(glimageobject.GLImageObject):
     def __imageSyncChanged(self, *a):
         """Called when the :attr:`.NiftiOpts.volume` property is synchronised
         or un-synchronised. Calls :meth:`refreshImageTexture` and
-        :meth:`updateShaderState`.
+        :meth:`updateShaderState`. The edge map is refreshed by
+        :meth:`__imageTextureChanged`, when the texture is updated.
         """
         self.refreshImageTexture()
         self.updateShaderState(alwaysNotify=True)
@@ -371,6 +471,15 @@ class GLLabel(glimageobject.GLImageObject):
 
     def __imageTextureChanged(self, *a):
         """Called when the :class:`.ImageTexture` containing the image data
-        changes. Calls :meth:`updateShaderState`.
+        changes. Calls :meth:`refreshEdgeTexture` and
+        :meth:`updateShaderState`.
         """
+        self.refreshEdgeTexture()
         self.updateShaderState(alwaysNotify=True)
+
+
+    def __edgesChanged(self, *a):
+        """Called when the ``edgeTexture`` has been refreshed. Triggers a
+        refresh of the scene.
+        """
+        self.notify()
@@ -9,10 +9,12 @@ functionality for rendering an :class:`.Image` overlay as a binary mask.
 """
 
 import logging
+import functools
 
 import OpenGL.GL                 as gl
 
 import fsl.utils.idle            as idle
+from   fsl.utils.platform    import platform as fslplatform
 import fsleyes.colourmaps        as colourmaps
 import fsleyes.gl                as fslgl
 import fsleyes.gl.textures       as textures
@@ -20,6 +22,7 @@ import fsleyes.gl.routines       as glroutines
 import fsleyes.gl.resources      as glresources
 import fsleyes.gl.shaders.filter as glfilter
 from . import                       glimageobject
+from .textures import               edgemaptexture
 
 
 log = logging.getLogger(__name__)
@@ -37,7 +40,7 @@ class GLMask(glimageobject.GLImageObject):
 
     **Textures**
 
-    A ``GLMask`` will use up to two textures:
+    A ``GLMask`` will use up to three textures:
 
       - An :class:`.ImageTexture` for storing the 3D image data. This texture
         is bound to texture unit 0.
@@ -45,6 +48,10 @@ class GLMask(glimageobject.GLImageObject):
       - A :class:`.RenderTexture`, used for edge filtering if necessary. This
         texture will be bound to texture unit 1.
 
+      - An :class:`.EdgeMapTexture`, used to draw the mask outline if the
+        :attr:`.MaskOpts.voxelOutline` property is ``True``. This texture
+        will be bound to texture unit 2.
+
 
     **2D rendering**
 
@@ -56,6 +63,13 @@ class GLMask(glimageobject.GLImageObject):
     the :mod:`.filters` module).
 
 
+    Alternatively, if the :attr:`.MaskOpts.voxelOutline` property is
+    ``True``, an :class:`.EdgeMapTexture` is calculated whenever the image
+    data, mask threshold, or outline width changes, and the mask outline is
+    drawn directly by the fragment shader. This is currently only performed
+    by the :mod:`.gl21.glmask_funcs` module.
+
+
     **Version dependent modules**
 
 
@@ -101,8 +115,15 @@ class GLMask(glimageobject.GLImageObject):
         self.renderTexture = textures.RenderTexture(
             self.name, gl.GL_LINEAR, rttype='c')
 
+        # The edge texture is only populated
+        # when MaskOpts.voxelOutline is true
+        self.edgeTexture = textures.EdgeMapTexture(
+            '{}_edges'.format(self.name))
+        self.edgeTexture.register(self.name, self.__edgesChanged)
+
         self.addDisplayListeners()
         self.refreshImageTexture()
+        self.refreshEdgeTexture()
 
         def init():
             fslgl.glmask_funcs.init(self)
@@ -117,6 +138,8 @@ class GLMask(glimageobject.GLImageObject):
         """
         self.edgeFilter.destroy()
         self.renderTexture.destroy()
+        self.edgeTexture.deregister(self.name)
+        self.edgeTexture.destroy()
         self.imageTexture.deregister(self.name)
         glresources.delete(self.imageTexture.getTextureName())
 
@@ -139,6 +162,26 @@ class GLMask(glimageobject.GLImageObject):
         return self.imageTexture is not None and self.imageTexture.ready()
 
 
+    def useEdgeMap(self):
+        """Returns ``True`` if the :class:`.EdgeMapTexture` should be used to
+        draw the mask outline, ``False`` otherwise.
+        """
+        opts = self.opts
+        return (opts.outline                                    and
+                opts.voxelOutline                               and
+                self.edgeTexture.ready()                        and
+                self.edgeTexture.imageShape == self.image.shape[:3])
+
+
+    def edgeAxes(self, axes):
+        """Returns a sequence of three flags, identifying the voxel axes along
+        which outlines should be drawn for a 2D slice through the given
+        display ``axes``. See :func:`.edgemaptexture.calcEdgeAxes`.
+        """
+        xform = self.opts.getTransform('display', 'voxel')
+        return edgemaptexture.calcEdgeAxes(xform, axes[2])
+
+
     def updateShaderState(self, *args, **kwargs):
         """Calls :func:`.gl14.gllabel_funcs.updateShaderState` or
         :func:`.gl21.gllabel_funcs.updateShaderState`, and
@@ -170,13 +213,18 @@ class GLMask(glimageobject.GLImageObject):
         def update(*a):
             self.updateShaderState(alwaysNotify=True)
 
-        display.addListener('alpha',         name, update, weak=False)
-        display.addListener('brightness',    name, update, weak=False)
-        display.addListener('contrast',      name, update, weak=False)
-        opts   .addListener('colour',        name, update, weak=False)
-        opts   .addListener('threshold',     name, update, weak=False)
-        opts   .addListener('invert',        name, update, weak=False)
-        opts   .addListener('outlineWidth',  name, update, weak=False)
+        def updateEdges(*a):
+            self.refreshEdgeTexture()
+            self.updateShaderState(alwaysNotify=True)
+
+        display.addListener('alpha',         name, update,      weak=False)
+        display.addListener('brightness',    name, update,      weak=False)
+        display.addListener('contrast',      name, update,      weak=False)
+        opts   .addListener('colour',        name, update,      weak=False)
+        opts   .addListener('threshold',     name, updateEdges, weak=False)
+        opts   .addListener('invert',        name, updateEdges, weak=False)
+        opts   .addListener('outlineWidth',  name, updateEdges, weak=False)
+        opts   .addListener('voxelOutline',  name, updateEdges, weak=False)
         opts   .addListener('outline',       name, self.notify)
         opts   .addListener('transform',     name, self.notify)
         opts   .addListener('volume',        name, self.__volumeChanged)
@@ -205,6 +253,7 @@ class GLMask(glimageobject.GLImageObject):
         opts   .removeListener('invert',        name)
         opts   .removeListener('outline',       name)
         opts   .removeListener('outlineWidth',  name)
+        opts   .removeListener('voxelOutline',  name)
         opts   .removeListener('transform',     name)
         opts   .removeListener('volume',        name)
         opts   .removeListener('interpolation', name)
@@ -248,6 +297,28 @@ class GLMask(glimageobject.GLImageObject):
         self.imageTexture.register(self.name, self.__imageTextureChanged)
 
 
+    def refreshEdgeTexture(self):
+        """Re-calculates the :class:`.EdgeMapTexture` from the currently
+        displayed image volume, and the current mask threshold. Does nothing
+        if :attr:`.MaskOpts.voxelOutline` is ``False``, or if OpenGL 2.1 is
+        not available.
+        """
+
+        opts = self.opts
+
+        if not opts.voxelOutline or float(fslplatform.glVersion) < 2.1:
+            return
+
+        classify = functools.partial(edgemaptexture.maskClasses,
+                                     threshold=tuple(opts.threshold),
+                                     invert=opts.invert)
+
+        self.edgeTexture.setImageData(self.image[opts.index()],
+                                      width=opts.outlineWidth,
+                                      classify=classify,
+                                      background=False)
+
+
     def getColour(self):
         """Prepares and returns the mask colour for use in the fragment shader.
         """
@@ -290,6 +361,9 @@ class GLMask(glimageobject.GLImageObject):
 
         self.imageTexture.bindTexture(gl.GL_TEXTURE0)
 
+        if self.useEdgeMap():
+            self.edgeTexture.bindTexture(gl.GL_TEXTURE2)
+
 
     def draw2D(self, zpos, axes, xform=None, bbox=None):
         """Calls the version-dependent ``draw2D`` function, then applies
@@ -298,7 +372,9 @@ class GLMask(glimageobject.GLImageObject):
 
         opts = self.opts
 
-        if not opts.outline:
+        # The outline, if enabled, may be
+        # drawn directly by the shader
+        if not opts.outline or self.useEdgeMap():
             fslgl.glmask_funcs.draw2D(self, zpos, axes, xform, bbox)
             return
 
@@ -333,6 +409,10 @@ class GLMask(glimageobject.GLImageObject):
         opts = self.opts
         rtex = self.renderTexture
 
+        if self.useEdgeMap():
+            fslgl.glmask_funcs.drawAll(self, axes, zposes, xforms)
+            return
+
         # Is taking max(z) hacky? It seems to work ok.
         zpos       = max(zposes)
         owidth     = opts.outlineWidth
@@ -373,6 +453,9 @@ class GLMask(glimageobject.GLImageObject):
         """Unbinds the ``ImageTexture``. """
         self.imageTexture.unbindTexture()
 
+        if self.edgeTexture.isBound():
+            self.edgeTexture.unbindTexture()
+
 
     def __volumeChanged(self, *a):
         """Called when the :attr:`.NiftiOpts.volume` changes. Updates the
@@ -391,11 +474,20 @@ class GLMask(glimageobject.GLImageObject):
 
 
     def __imageTextureChanged(self, *a):
-        """Called when the image texture data has changed. Triggers a refresh.
+        """Called when the image texture data has changed. Refreshes the edge
+        map, and triggers a refresh.
         """
+        self.refreshEdgeTexture()
         self.updateShaderState(alwaysNotify=True)
 
 
+    def __edgesChanged(self, *a):
+        """Called when the ``edgeTexture`` has been refreshed. Triggers a
+        refresh of the scene.
+        """
+        self.notify()
+
+
     def __imageSyncChanged(self, *a):
         """Called when the :attr:`.NiftiOpts.volume` property is synchronised
         or un-synchronised. Calls :meth:`refreshImageTexture` and
@@ -16,6 +16,7 @@ import OpenGL.GL    as gl
 from . import                 globject
 import fsl.utils.transform as transform
 import fsleyes.gl          as fslgl
+import fsleyes.gl.glstate  as glstate
 import fsleyes.gl.routines as glroutines
 import fsleyes.gl.textures as textures
 
@@ -522,7 +523,7 @@ class GLMesh(globject.GLObject):
         if is2D: enable = (gl.GL_DEPTH_TEST)
         else:    enable = (gl.GL_DEPTH_TEST, gl.GL_CULL_FACE)
 
-        gl.glDisable(gl.GL_CULL_FACE)
+        glstate.disable(gl.GL_CULL_FACE)
         with glroutines.enabled(enable):
             gl.glFrontFace(self.frontFace())
             if not is2D:
@@ -595,10 +596,10 @@ class GLMesh(globject.GLObject):
         if not useShader:
             vertices = vertices.ravel('C')
             gl.glColor(*opts.getConstantColour())
-            gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+            glstate.enable(gl.GL_VERTEX_ARRAY)
             gl.glVertexPointer(3, gl.GL_FLOAT, 0, vertices)
             gl.glDrawArrays(gl.GL_LINES, 0, nvertices)
-            gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+            glstate.disable(gl.GL_VERTEX_ARRAY)
 
         # Coloured from vertex data
         else:
@@ -633,7 +634,7 @@ class GLMesh(globject.GLObject):
         if not useShader:
 
             gl.glColor(*opts.getConstantColour())
-            gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+            glstate.enable(gl.GL_VERTEX_ARRAY)
 
             gl.glVertexPointer(3, gl.GL_FLOAT, 0, vertices.ravel('C'))
             gl.glDrawElements(gl.GL_TRIANGLES,
@@ -641,7 +642,7 @@ class GLMesh(globject.GLObject):
                               gl.GL_UNSIGNED_INT,
                               faces.ravel('C'))
 
-            gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+            glstate.disable(gl.GL_VERTEX_ARRAY)
 
         # Coloured from vertex data
         else:
@@ -703,10 +704,10 @@ class GLMesh(globject.GLObject):
                    gl.GL_DEPTH_BUFFER_BIT |
                    gl.GL_STENCIL_BUFFER_BIT)
 
-        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
-        gl.glEnable(gl.GL_CLIP_PLANE0)
-        gl.glEnable(gl.GL_CULL_FACE)
-        gl.glEnable(gl.GL_STENCIL_TEST)
+        glstate.enable(gl.GL_VERTEX_ARRAY)
+        glstate.enable(gl.GL_CLIP_PLANE0)
+        glstate.enable(gl.GL_CULL_FACE)
+        glstate.enable(gl.GL_STENCIL_TEST)
         gl.glFrontFace(gl.GL_CCW)
         gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
 
@@ -748,9 +749,9 @@ class GLMesh(globject.GLObject):
         # stencil buffer to the render texture.
         gl.glColorMask(gl.GL_TRUE, gl.GL_TRUE, gl.GL_TRUE, gl.GL_TRUE)
 
-        gl.glDisable(gl.GL_CLIP_PLANE0)
-        gl.glDisable(gl.GL_CULL_FACE)
-        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        glstate.disable(gl.GL_CLIP_PLANE0)
+        glstate.disable(gl.GL_CULL_FACE)
+        glstate.disable(gl.GL_VERTEX_ARRAY)
 
         gl.glStencilFunc(gl.GL_NOTEQUAL, 0, 255)
 
@@ -767,7 +768,7 @@ class GLMesh(globject.GLObject):
             gl.glVertex3f(*clipPlaneVerts[3, :])
             gl.glEnd()
 
-        gl.glDisable(gl.GL_STENCIL_TEST)
+        glstate.disable(gl.GL_STENCIL_TEST)
 
         dest.unbindAsRenderTarget()
         dest.restoreViewport()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+#
+# glstate.py - Tracking of OpenGL state, to avoid redundant GL calls.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides a thin layer over some OpenGL state-changing
+functions, which keeps track of the current GL state, and skips calls which
+would not change it. FSLeyes uses a single OpenGL context, so the state
+tracked by this module is shared by all canvases. The following state is
+tracked:
+
+  - Capabilities (see :func:`enable`, :func:`disable`, :func:`setEnabled`
+    and :func:`isEnabled`). Both server-side (``glEnable``/``glDisable``)
+    and client-side (``glEnableClientState``/``glDisableClientState``)
+    capabilities are supported.
+
+  - The blending function (see :func:`blendFunc`).
+
+  - The current GLSL program (see :func:`useProgram`).
+
+  - The active texture unit, and the texture bound to each target on each
+    unit (see :func:`activeTexture` and :func:`bindTexture`).
+
+  - Shader program variable values - the :func:`updateValue` function is
+    used by the :class:`.GLSLShader` and :class:`.ARBPShader` classes to
+    avoid uploading a value which is already stored in a (shared) program.
+
+
+In order for the tracked state to remain accurate, all changes to the above
+state must be made through this module. The tracked state is discarded at the
+start of every frame (see :func:`newFrame`), and whenever :func:`invalidate`
+is called, so any changes which are made by other means will only affect the
+frame in which they are made.
+
+
+This module also counts the number of GL calls which it has made, and the
+number of calls which it has skipped, for each frame. These counts can be
+retrieved via the :func:`stats` function, and are also logged at the end
+of each frame.
+"""
+
+
+import logging
+
+import numpy     as np
+import OpenGL.GL as gl
+
+
+log = logging.getLogger(__name__)
+
+
+_clientCapabilities = set([
+    gl.GL_VERTEX_ARRAY,
+    gl.GL_NORMAL_ARRAY,
+    gl.GL_COLOR_ARRAY,
+    gl.GL_SECONDARY_COLOR_ARRAY,
+    gl.GL_EDGE_FLAG_ARRAY,
+    gl.GL_INDEX_ARRAY,
+    gl.GL_FOG_COORD_ARRAY,
+    gl.GL_TEXTURE_COORD_ARRAY])
+"""Capabilities which are used via ``glEnableClientState`` and
+``glDisableClientState``, rather than ``glEnable`` and ``glDisable``.
+"""
+
+
+_unitCapabilities = set([
+    gl.GL_TEXTURE_1D,
+    gl.GL_TEXTURE_2D,
+    gl.GL_TEXTURE_3D,
+    gl.GL_TEXTURE_CUBE_MAP,
+    gl.GL_TEXTURE_GEN_S,
+    gl.GL_TEXTURE_GEN_T,
+    gl.GL_TEXTURE_GEN_R,
+    gl.GL_TEXTURE_GEN_Q])
+"""Capabilities which are set independently for each texture unit. """
+
+
+_untrackedCapabilities = set([gl.GL_TEXTURE_COORD_ARRAY])
+"""Capabilities which are set independently for each client texture unit
+(see ``glClientActiveTexture``). The state of these capabilities is not
+tracked.
+"""
+
+
+_state = {}
+"""Dictionary containing the current (known) GL state. Cleared by
+:func:`invalidate`. Contains the following items, any of which may be
+absent if the corresponding state is not known:
+
+================ =========================================================
+``'caps'``       Dictionary of ``{capability : bool}`` mappings.
+``'blend'``      ``(sfactor, dfactor)`` tuple.
+``'program'``    The current GLSL program.
+``'unit'``       The active texture unit.
+``'textures'``   Dictionary of ``{(unit, target) : texture}`` mappings.
+================ =========================================================
+"""
+
+
+_counts = {'calls' : 0, 'skipped' : 0, 'frames' : 0}
+"""Number of GL calls made and skipped in the current frame, and the number
+of frames which have been drawn. See :func:`count` and :func:`stats`.
+"""
+
+
+_lastFrame = {'calls' : 0, 'skipped' : 0}
+"""Number of GL calls made and skipped in the previous frame. """
+
+
+def count(ncalls=1):
+    """Increments the GL call counter for the current frame. This is called
+    by the functions in this module, but may also be called by any code which
+    makes GL calls that are to be reported by :func:`stats`.
+    """
+    _counts['calls'] += ncalls
+
+
+def _skip():
+    """Increments the skipped GL call counter for the current frame. """
+    _counts['skipped'] += 1
+
+
+def newFrame():
+    """Must be called at the start of each frame (e.g. by a canvas ``_draw``
+    method). Logs the GL call counts for the previous frame, resets the call
+    counters, and discards all tracked GL state.
+    """
+
+    if _counts['frames'] > 0:
+        log.debug('GL state calls for frame %i: %i (%i skipped)',
+                  _counts['frames'], _counts['calls'], _counts['skipped'])
+
+    _lastFrame['calls']   = _counts['calls']
+    _lastFrame['skipped'] = _counts['skipped']
+    _counts   ['calls']   = 0
+    _counts   ['skipped'] = 0
+    _counts   ['frames'] += 1
+
+    invalidate()
+
+
+def stats():
+    """Returns a dictionary containing the GL call counts:
+
+    ================ ========================================================
+    ``calls``        Number of GL calls made in the current frame.
+    ``skipped``      Number of redundant GL calls skipped in the current
+                     frame.
+    ``lastCalls``    Number of GL calls made in the previous frame.
+    ``lastSkipped``  Number of redundant GL calls skipped in the previous
+                     frame.
+    ``frames``       Number of frames started via :func:`newFrame`.
+    ================ ========================================================
+    """
+    return {'calls'       : _counts   ['calls'],
+            'skipped'     : _counts   ['skipped'],
+            'lastCalls'   : _lastFrame['calls'],
+            'lastSkipped' : _lastFrame['skipped'],
+            'frames'      : _counts   ['frames']}
+
+
+def invalidate():
+    """Discards all tracked GL state, so that subsequent calls are not
+    skipped until the state is known again. Must be called if the GL state is
+    changed by any means other than this module.
+    """
+    _state.clear()
+    _state['caps']     = {}
+    _state['textures'] = {}
+
+
+def _capabilityKey(cap):
+    """Returns a key under which the state of the given capability is
+    tracked, or ``None`` if the capability is set per texture unit, and the
+    active texture unit is not known, or the capability is not tracked.
+    """
+
+    if cap in _untrackedCapabilities:
+        return None
+
+    if cap not in _unitCapabilities:
+        return cap
+
+    unit = _state.get('unit', None)
+
+    if unit is None: return None
+    else:            return (cap, unit)
+
+
+def isEnabled(cap):
+    """Returns ``True`` if the given capability is enabled, ``False``
+    otherwise. ``glIsEnabled`` is only called if the state of the capability
+    is not known.
+    """
+
+    key  = _capabilityKey(cap)
+    caps = _state['caps']
+
+    if key in caps:
+        return caps[key]
+
+    count()
+    enabled = bool(gl.glIsEnabled(cap))
+
+    if key is not None:
+        caps[key] = enabled
+
+    return enabled
+
+
+def setEnabled(cap, enable):
+    """Enables or disables the given capability, unless it is already in the
+    requested state.
+    """
+
+    key    = _capabilityKey(cap)
+    caps   = _state['caps']
+    enable = bool(enable)
+
+    if key is not None and caps.get(key, None) is enable:
+        _skip()
+        return
+
+    if cap in _clientCapabilities:
+        if enable: gl.glEnableClientState( cap)
+        else:      gl.glDisableClientState(cap)
+    else:
+        if enable: gl.glEnable( cap)
+        else:      gl.glDisable(cap)
+
+    count()
+
+    if key is not None:
+        caps[key] = enable
+
+
+def enable(cap):
+    """Enables the given capability - see :func:`setEnabled`. """
+    setEnabled(cap, True)
+
+
+def disable(cap):
+    """Disables the given capability - see :func:`setEnabled`. """
+    setEnabled(cap, False)
+
+
+def blendFunc(sfactor, dfactor):
+    """Calls ``glBlendFunc``, unless the blending function is already set to
+    the given factors.
+    """
+
+    factors = (sfactor, dfactor)
+
+    if _state.get('blend', None) == factors:
+        _skip()
+        return
+
+    gl.glBlendFunc(sfactor, dfactor)
+    count()
+    _state['blend'] = factors
+
+
+def useProgram(program):
+    """Calls ``glUseProgram``, unless the given program is already in use. """
+
+    if 'program' in _state and _state['program'] == program:
+        _skip()
+        return
+
+    gl.glUseProgram(program)
+    count()
+    _state['program'] = program
+
+
+def activeTexture(unit):
+    """Calls ``glActiveTexture``, unless the given texture unit is already
+    active.
+    """
+
+    if _state.get('unit', None) == unit:
+        _skip()
+        return
+
+    gl.glActiveTexture(unit)
+    count()
+    _state['unit'] = unit
+
+
+def bindTexture(target, texture, unit=None):
+    """Calls ``glBindTexture``, unless the given texture is already bound to
+    the given target.
+
+    :arg target:  Texture target, e.g. ``GL_TEXTURE_2D``.
+    :arg texture: Texture handle, or ``0`` to unbind.
+    :arg unit:    Texture unit, e.g. ``GL_TEXTURE0``. If provided,
+                  :func:`activeTexture` is called first. Otherwise the
+                  texture is bound to the currently active unit.
+    """
+
+    if unit is not None:
+        activeTexture(unit)
+
+    unit     = _state.get('unit', None)
+    key      = (unit, target)
+    textures = _state['textures']
+
+    if unit is not None and key in textures and textures[key] == texture:
+        _skip()
+        return
+
+    gl.glBindTexture(target, texture)
+    count()
+
+    if unit is not None:
+        textures[key] = texture
+
+
+def forgetTexture(texture):
+    """Must be called when a texture is deleted. Discards any tracked
+    bindings for the texture.
+    """
+
+    textures = _state['textures']
+
+    for key, bound in list(textures.items()):
+        if bound == texture:
+            textures.pop(key)
+
+
+def updateValue(cache, name, value):
+    """Used by the shader program classes to avoid uploading redundant
+    variable values.
+
+    :arg cache: Dictionary containing the values which are currently stored
+                in a program.
+    :arg name:  Variable name.
+    :arg value: Variable value.
+
+    :returns:   ``True`` if the value is different from that stored in
+                ``cache`` (in which case the ``cache`` is updated, and the
+                caller must upload the value), ``False`` otherwise.
+    """
+
+    old = cache.get(name, None)
+
+    if old is not None and _equal(old, value):
+        _skip()
+        return False
+
+    cache[name] = _copy(value)
+    return True
+
+
+def _equal(a, b):
+    """Used by :func:`updateValue`. Returns ``True`` if the given values are
+    equal, ``False`` otherwise. Tuples are compared element-wise.
+    """
+
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return len(a) == len(b) and all(_equal(ai, bi)
+                                        for ai, bi in zip(a, b))
+
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a = np.asarray(a)
+        b = np.asarray(b)
+        return a.shape == b.shape and bool(np.all(a == b))
+
+    return a == b
+
+
+def _copy(value):
+    """Used by :func:`updateValue`. Returns a copy of the given value if it is
+    (or contains) a ``numpy`` array, in case the caller modifies it in place.
+    """
+    if   isinstance(value, tuple):      return tuple(_copy(v) for v in value)
+    elif isinstance(value, np.ndarray): return np.array(value)
+    else:                               return value
+
+
+invalidate()
@@ -413,6 +413,13 @@ class GLVectorBase(glimageobject.GLImageObject):
             norm           = None
 
         else:
+            # The texture coordinates used to sample
+            # the texture are calculated from the
+            # auxillary image texture transform, so
+            # the texture must contain the data of
+            # its texture source
+            if opts is not None:
+                image = opts.getTextureSource()[0]
             norm = image.dataRange
 
         texName = '{}_{}_{}_{}'.format(
@@ -99,6 +99,13 @@ class GLVolume(glimageobject.GLImageObject):
     image bounds.
 
 
+    If the :meth:`.NiftiOpts.getTextureSource` method returns a different
+    image (e.g. the source of a :class:`.ResampledImage`), the
+    ``ImageTexture`` contains the data of that image, and texture coordinates
+    are calculated through the ``texture`` transformation of the
+    :class:`.VolumeOpts`, so the image is resampled on the fly.
+
+
     Image voxels may be clipped according to the
     :attr:`.VolumeOpts.clippingRange` property. By default, the voxel value
     is compared against the clipping range, but the
@@ -122,6 +129,15 @@ class GLVolume(glimageobject.GLImageObject):
     ``renderTexture1``.
 
 
+    In order to reduce the number of samples taken along each ray, the image
+    is divided into a coarse grid of bricks, and a :class:`.BrickTexture` is
+    used to identify bricks which do not contain any voxels that could
+    contribute to the final rendering (e.g. background voxels, or voxels
+    outside of the clipping range). The ray-casting shader program jumps
+    over these bricks without sampling them. This is currently only
+    performed by the :mod:`.gl21.glvolume_funcs` module.
+
+
     **Textures**
 
 
@@ -149,6 +165,10 @@ class GLVolume(glimageobject.GLImageObject):
        is being drawn it is bound to texture units 4 (for RGBA) and 5 (for
        depth).
 
+     - A :class:`.BrickTexture`, a small 3D texture which is used to skip
+       over empty regions of the image in 3D rendering. This is bound to
+       texture unit 6.
+
 
     **Attributes**
 
@@ -169,9 +189,11 @@ class GLVolume(glimageobject.GLImageObject):
                          rendering.
     ``renderTexture2``   The first :class:`.RenderTexture` used for 3D
                          rendering.
-    ``texName``          A name used for the ``imageTexture``,
-                         ``colourTexture``, and ``negColourTexture`. The
-                         name for the latter is suffixed with ``'_neg'``.
+    ``brickTexture``     The :class:`.BrickTexture` used to skip over empty
+                         space in 3D rendering.
+    ``texName``          A name used for the ``colourTexture``, and
+                         ``negColourTexture`. The name for the latter is
+                         suffixed with ``'_neg'``.
     ==================== ==================================================
     """
 
@@ -207,8 +229,10 @@ class GLVolume(glimageobject.GLImageObject):
         # We use the gl.resources module to manage texture
         # creation, because ImageTexture instances can
         # potentially be shared between GLVolumes. So all
-        # GLVolumes use the same name, defined here, to
-        # refer to the ImageTexture for a given image.
+        # GLVolumes use the same name to refer to the
+        # ImageTexture for a given image (see
+        # refreshImageTexture). The name defined here
+        # is used for the colour map textures.
         self.texName  = '{}_{}'.format(type(self).__name__, id(self.image))
 
         # Ref to an OpenGL shader program -
@@ -239,6 +263,14 @@ class GLVolume(glimageobject.GLImageObject):
             self.renderTexture2 = textures.RenderTexture(
                 self.name, gl.GL_LINEAR, rttype='cd')
 
+            # The brick texture is used to skip
+            # over empty regions of the image
+            # when ray-casting. It is refreshed
+            # whenever the image texture changes.
+            self.brickTexture = textures.BrickTexture(
+                '{}_bricks'.format(self.name))
+            self.brickTexture.register(self.name, self.__bricksChanged)
+
         # This attribute is used by the
         # updateShaderState method to
         # make sure that the Notifier.notify()
@@ -255,6 +287,7 @@ class GLVolume(glimageobject.GLImageObject):
         self.refreshColourTextures()
         self.refreshImageTexture()
         self.refreshClipTexture()
+        self.refreshBrickTexture()
 
         # Call glvolume_funcs.init when the image
         # and clip textures are ready to be used.
@@ -291,11 +324,14 @@ class GLVolume(glimageobject.GLImageObject):
         self.negColourTexture = None
 
         if self.threedee:
+            self.brickTexture.deregister(self.name)
             self.renderTexture1.destroy()
             self.renderTexture2.destroy()
+            self.brickTexture  .destroy()
             self.smoothFilter  .destroy()
             self.renderTexture1 = None
             self.renderTexture2 = None
+            self.brickTexture   = None
             self.smoothFilter   = None
 
         fslgl.glvolume_funcs       .destroy(self)
@@ -537,7 +573,8 @@ class GLVolume(glimageobject.GLImageObject):
         """
 
         opts     = self.opts
-        texName  = self.texName
+        texImage = opts.getTextureSource()[0]
+        texName  = '{}_{}'.format(type(self).__name__, id(texImage))
         unsynced = self.testUnsynced()
 
         if unsynced:
@@ -561,7 +598,7 @@ class GLVolume(glimageobject.GLImageObject):
             texName,
             textures.ImageTexture,
             texName,
-            self.image,
+            texImage,
             interp=interp,
             volume=opts.index()[3:],
             normaliseRange=normRange,
@@ -570,6 +607,20 @@ class GLVolume(glimageobject.GLImageObject):
         self.imageTexture.register(self.name, self.__texturesChanged)
 
 
+    def refreshBrickTexture(self):
+        """Refreshes the :class:`.BrickTexture` which is used to skip over
+        empty space in 3D rendering, from the currently displayed image
+        volume. Does nothing if this ``GLVolume`` is not being used for 3D
+        rendering.
+        """
+
+        if not self.threedee:
+            return
+
+        texImage = self.opts.getTextureSource()[0]
+        self.brickTexture.setImageData(texImage[self.opts.index()])
+
+
     def registerClipImage(self):
         """Called whenever the :attr:`.VolumeOpts.clipImage` property changes.
         Adds property listeners to the :class:`.NiftiOpts` instance
@@ -618,8 +669,6 @@ class GLVolume(glimageobject.GLImageObject):
         opts      = self.opts
         clipOpts  = self.clipOpts
 
-        texName   = '{}_clip_{}'.format(type(self).__name__, id(clipImage))
-
         if self.clipTexture is not None:
             self.clipTexture.deregister(self.name)
             glresources.delete(self.clipTexture.getTextureName())
@@ -628,6 +677,9 @@ class GLVolume(glimageobject.GLImageObject):
         if clipImage is None:
             return None
 
+        clipImage = clipOpts.getTextureSource()[0]
+        texName   = '{}_clip_{}'.format(type(self).__name__, id(clipImage))
+
         if opts.interpolation == 'none': interp = gl.GL_NEAREST
         else:                            interp = gl.GL_LINEAR
 
@@ -708,13 +760,20 @@ class GLVolume(glimageobject.GLImageObject):
 
 
     def draw3D(self, *args, **kwargs):
-        """Calls the version dependent ``draw3D`` function. """
+        """Calls the version dependent ``draw3D`` function.
 
-        opts = self.opts
-        w, h = self.canvas.GetScaledSize()
-        res  = self.opts.resolution / 100.0
-        sw   = int(np.ceil(w * res))
-        sh   = int(np.ceil(h * res))
+        If the :attr:`.Scene3DCanvas.renderQuality` is less than 1 (e.g.
+        while the user is rotating the scene), the volume is rendered
+        with fewer ray-casting steps, into smaller off-screen textures.
+        """
+
+        opts    = self.opts
+        quality = self.canvas.renderQuality
+        w, h    = self.canvas.GetScaledSize()
+        res     = quality * self.opts.resolution / 100.0
+        sw      = max(1, int(np.ceil(w * res)))
+        sh      = max(1, int(np.ceil(h * res)))
+        resize  = (sw, sh) != (w, h)
 
         # Initialise and resize
         # the offscreen textures
@@ -726,7 +785,7 @@ class GLVolume(glimageobject.GLImageObject):
                 gl.glClearColor(0, 0, 0, 0)
                 gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
 
-        if opts.resolution != 100:
+        if resize:
             gl.glViewport(0, 0, sw, sh)
 
         # Do the render. Even though we're
@@ -742,7 +801,7 @@ class GLVolume(glimageobject.GLImageObject):
             gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
             gl.glFrontFace(gl.GL_CCW)
             gl.glCullFace(gl.GL_BACK)
-            fslgl.glvolume_funcs.draw3D(self, *args, **kwargs)
+            fslgl.glvolume_funcs.draw3D(self, *args, quality=quality, **kwargs)
 
         # Apply smoothing if needed. If smoothing
         # is enabled, the final final render will
@@ -764,7 +823,7 @@ class GLVolume(glimageobject.GLImageObject):
         invproj = transform.invert(self.canvas.projectionMatrix)
         verts   = transform.transform(verts, invproj)
 
-        if opts.resolution != 100:
+        if resize:
             gl.glViewport(0, 0, w, h)
 
         with glroutines.enabled(gl.GL_DEPTH_TEST):
@@ -1042,6 +1101,15 @@ class GLVolume(glimageobject.GLImageObject):
 
     def __texturesChanged(self, *a):
         """Called when either the ``imageTexture`` or the ``clipTexture``
-        changes. Calls :meth:`updateShaderState`.
+        changes. Calls :meth:`refreshBrickTexture` and
+        :meth:`updateShaderState`.
         """
+        self.refreshBrickTexture()
         self.updateShaderState(alwaysNotify=True)
+
+
+    def __bricksChanged(self, *a):
+        """Called when the ``brickTexture`` has been refreshed. Triggers a
+        refresh of the scene.
+        """
+        self.notify()
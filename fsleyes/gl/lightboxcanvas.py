@@ -16,11 +16,11 @@ import numpy     as np
 import OpenGL.GL as gl
 
 import fsl.data.image                    as fslimage
-import fsl.utils.transform               as transform
 
 import fsleyes.displaycontext.canvasopts as canvasopts
 import fsleyes.gl.slicecanvas            as slicecanvas
 import fsleyes.gl.resources              as glresources
+import fsleyes.gl.glstate                as glstate
 import fsleyes.gl.routines               as glroutines
 import fsleyes.gl.textures               as textures
 
@@ -60,7 +60,12 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
     ``offscreen`` render mode differently to the ``SliceCanvas. Where the
     ``SliceCanvas`` uses a separate :class:`.RenderTexture` for every overlay
     in the :class:`.OverlayList`, the ``LightBoxCanvas`` uses a single
-    ``RenderTexture`` to render all overlays off-screen.
+    ``RenderTexture`` to render all overlays off-screen. And in ``prerender``
+    mode, the ``LightBoxCanvas`` uses a :class:`.LightBoxTextureStack` for
+    each overlay, instead of a :class:`.RenderTextureStack`. Slices are
+    rendered at the size of one lightbox cell, visible slices (and those
+    which are about to be scrolled into view) are rendered first, and the
+    amount of GPU memory that is used is limited.
 
 
     The ``LightBoxCanvas`` class defines the following convenience methods (in
@@ -110,6 +115,11 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
         # the offscreen render mode is enabled
         self._offscreenRenderTexture = None
 
+        # Slice transformations, with the invertX/
+        # invertY settings applied, are cached here
+        # - see __prepareSliceTransforms.
+        self.__preparedXforms = {}
+
         opts = canvasopts.LightBoxCanvasOpts()
 
         slicecanvas.SliceCanvas.__init__(self,
@@ -379,8 +389,9 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
             self._offscreenRenderTexture.setSize(768, 768)
 
         # The LightBoxCanvas handles pre-render mode
-        # the same way as the SliceCanvas - a separate
-        # RenderTextureStack for eacn globject
+        # in a similar way to the SliceCanvas - a
+        # separate texture stack for each globject
+        # (see _getPreRenderTexture).
         elif renderMode == 'prerender':
 
             # Delete any RenderTextureStack instances for
@@ -407,6 +418,37 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
         self.Refresh()
 
 
+    def _getPreRenderTexture(self, globj, overlay):
+        """Overrides :meth:`.SliceCanvas._getPreRenderTexture`. Creates/
+        retrieves a :class:`.LightBoxTextureStack` for the given
+        :class:`.GLObject`. A tuple containing the ``LightBoxTextureStack``,
+        and its name, as passed to the :mod:`.resources` module, is returned.
+
+        The textures in a ``LightBoxTextureStack`` depend on the layout of
+        this ``LightBoxCanvas``, so they are never shared with other canvases.
+
+        :arg globj:   The :class:`.GLObject` instance.
+        :arg overlay: The overlay object.
+        """
+
+        copts = self.opts
+        name  = '{}_{}_{}_zax{}'.format(
+            id(self),
+            id(overlay),
+            textures.LightBoxTextureStack.__name__,
+            copts.zax)
+
+        if glresources.exists(name):
+            rt = glresources.get(name)
+
+        else:
+            rt = textures.LightBoxTextureStack(globj)
+            rt.setAxes(copts.xax, copts.yax)
+            glresources.set(name, rt)
+
+        return rt, name
+
+
     def _calcNumSlices(self, *a):
         """Calculates the total number of slices to be displayed and
         the total number of rows.
@@ -586,11 +628,11 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
     def _genSliceLocations(self):
         """Called when any of the slice display properties change.
 
-        For every overlay in the overlay list, generates a list of
-        transformation matrices, and a list of slice indices. The latter
-        specifies the slice indices from the overlay to be displayed, and the
-        former specifies the transformation matrix to be used to position the
-        slice on the canvas.
+        For every overlay in the overlay list, generates an array of
+        transformation matrices, and an array of slice locations. The latter
+        specifies the Z positions of the slices to be displayed, and the
+        former (a ``(N, 4, 4)`` array) specifies the transformation matrix
+        to be used to position each slice on the canvas.
         """
 
         # calculate the locations, in display coordinates,
@@ -601,103 +643,104 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
             opts.zrange.xhi,
             opts.sliceSpacing)
 
-        self._sliceLocs  = {}
-        self._transforms = {}
-
-        # calculate the transformation for each
-        # slice in each overlay, and the index of
-        # each slice to be displayed
-        for i, overlay in enumerate(self.overlayList):
-
-            iSliceLocs  = []
-            iTransforms = []
+        # The slice locations and transformations
+        # are the same for every overlay, so they
+        # are calculated once, and shared
+        xforms = self._calculateSliceTransforms(np.arange(len(sliceLocs)))
 
-            for zi, zpos in enumerate(sliceLocs):
+        self._sliceLocs       = {}
+        self._transforms      = {}
+        self.__preparedXforms = {}
 
-                xform = self._calculateSliceTransform(overlay, zi)
-
-                iTransforms.append(xform)
-                iSliceLocs .append(zpos)
-
-            self._transforms[overlay] = iTransforms
-            self._sliceLocs[ overlay] = iSliceLocs
+        for overlay in self.overlayList:
+            self._transforms[overlay] = xforms
+            self._sliceLocs[ overlay] = sliceLocs
 
 
     def _calculateSliceTransform(self, overlay, sliceno):
         """Calculates a transformation matrix for the given slice number in
-        the given overlay.
+        the given overlay. See :meth:`_calculateSliceTransforms`.
+        """
+        return self._calculateSliceTransforms([sliceno])[0]
+
+
+    def _calculateSliceTransforms(self, slicenos):
+        """Calculates transformation matrices for the given slice numbers.
 
         Each slice is displayed on the same canvas, but is translated to a
         specific row/column.  So translation matrix is created, to position
         the slice in the correct location on the canvas.
+
+        :returns: A ``(N, 4, 4)`` array containing a transformation matrix
+                  for each slice.
         """
 
-        opts  = self.opts
-        nrows = self._totalRows
-        ncols = opts.ncols
+        opts     = self.opts
+        nrows    = self._totalRows
+        ncols    = opts.ncols
+        slicenos = np.asarray(slicenos, dtype=np.intp)
 
-        row = int(np.floor(sliceno / ncols))
-        col = int(np.floor(sliceno % ncols))
+        rows = slicenos // ncols
+        cols = slicenos %  ncols
 
         xlen = self.displayCtx.bounds.getLen(opts.xax)
         ylen = self.displayCtx.bounds.getLen(opts.yax)
 
-        translate              = np.identity(4, dtype=np.float32)
-        translate[opts.xax, 3] = xlen * col
-        translate[opts.yax, 3] = ylen * (nrows - row - 1)
-        translate[opts.zax, 3] = 0
+        xforms    = np.zeros((len(slicenos), 4, 4), dtype=np.float32)
+        xforms[:] = np.identity(4, dtype=np.float32)
+
+        xforms[:, opts.xax, 3] = xlen * cols
+        xforms[:, opts.yax, 3] = ylen * (nrows - rows - 1)
 
-        return translate
+        return xforms
 
 
-    def __prepareSliceTransforms(self, globj, xforms):
-        """Applies the :attr:`.SliceCanvas.invertX` and
-        :attr:`.SliceCanvas.invertY` properties to the given transformation
-        matrices, if necessary. Returns the transformations.
+    def __prepareSliceTransforms(self, overlay, globj, start, end):
+        """Returns the transformation matrices for slices ``start`` to
+        ``end`` of the given overlay, with the :attr:`.SliceCanvas.invertX`
+        and :attr:`.SliceCanvas.invertY` properties applied, if necessary.
+        The result is cached until the slice properties, the overlay display
+        bounds, or the invert settings change.
         """
 
-        opts = self.opts
+        opts   = self.opts
+        xforms = self._transforms[overlay][start:end]
 
-        if not opts.invertX or opts.invertY:
+        if not (opts.invertX or opts.invertY):
             return xforms
 
-        invXforms = []
-        lo, hi    = globj.getDisplayBounds()
-        xmin      = lo[opts.xax]
-        xmax      = hi[opts.xax]
-        ymin      = lo[opts.yax]
-        ymax      = hi[opts.yax]
-        xlen      = xmax - xmin
-        ylen      = ymax - ymin
-
-        # We have to translate each slice transformation
-        # to the origin, perform the flip there, then
-        # transform it back to its original location.
-        for xform in xforms:
-
-            invert     = np.eye(4)
-            toOrigin   = np.eye(4)
-            fromOrigin = np.eye(4)
-
-            xoff = xlen / 2.0 + xform[opts.xax, 3] + xmin
-            yoff = ylen / 2.0 + xform[opts.yax, 3] + ymin
-
-            if opts.invertX:
-                invert[    opts.xax, opts.xax] = -1
-                toOrigin[  opts.xax, 3]        = -xoff
-                fromOrigin[opts.xax, 3]        =  xoff
-            if opts.invertY:
-                invert[    opts.yax, opts.yax] = -1
-                toOrigin[  opts.yax, 3]        = -yoff
-                fromOrigin[opts.yax, 3]        =  yoff
-
-            xform = transform.concat(fromOrigin,
-                                     invert,
-                                     toOrigin,
-                                     xform)
-            invXforms.append(xform)
-
-        return invXforms
+        lo, hi = globj.getDisplayBounds()
+        key    = (start, end, opts.invertX, opts.invertY, tuple(lo), tuple(hi))
+        cached = self.__preparedXforms.get(overlay, None)
+
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        xmin = lo[opts.xax]
+        xmax = hi[opts.xax]
+        ymin = lo[opts.yax]
+        ymax = hi[opts.yax]
+        xlen = xmax - xmin
+        ylen = ymax - ymin
+
+        # Each slice is flipped about its own
+        # centre, which is equivalent to
+        # translating it to the origin, flipping
+        # it, and translating it back.
+        inverted = np.array(xforms)
+        flips    = []
+
+        if opts.invertX: flips.append((opts.xax, xlen / 2.0 + xmin))
+        if opts.invertY: flips.append((opts.yax, ylen / 2.0 + ymin))
+
+        for ax, centre in flips:
+            offsets             = centre + xforms[:, ax, 3]
+            inverted[:, ax, :]  = -xforms[:, ax, :]
+            inverted[:, ax, 3] += 2 * offsets
+
+        self.__preparedXforms[overlay] = (key, inverted)
+
+        return inverted
 
 
     def _drawGridLines(self):
@@ -840,6 +883,8 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
         if not self._setGLContext():
             return
 
+        glstate.newFrame()
+
         opts = self.opts
         axes = (opts.xax, opts.yax, opts.zax)
 
@@ -895,8 +940,8 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
                           overlay))
 
             zposes = self._sliceLocs[ overlay][startSlice:endSlice]
-            xforms = self._transforms[overlay][startSlice:endSlice]
-            xforms = self.__prepareSliceTransforms(globj, xforms)
+            xforms = self.__prepareSliceTransforms(
+                overlay, globj, startSlice, endSlice)
 
             if opts.renderMode == 'prerender':
                 rt, name = self._prerenderTextures.get(overlay, (None, None))
@@ -911,6 +956,17 @@ class LightBoxCanvas(slicecanvas.SliceCanvas):
                               endSlice,
                               overlay))
 
+                # Tell the texture stack how big
+                # each slice is on screen, and which
+                # slices are currently visible, so
+                # it can decide which slices to
+                # pre-render and which to evict.
+                cellw, cellh = self.GetScaledSize()
+                rt.setCellSize(cellw / float(opts.ncols),
+                               cellh / float(opts.nrows))
+                rt.setVisibleSlices(
+                    self._sliceLocs[overlay], startSlice, endSlice)
+
                 for zpos, xform in zip(zposes, xforms):
                     rt.draw(zpos, xform)
             else:
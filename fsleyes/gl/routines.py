@@ -21,6 +21,7 @@ import OpenGL.GLUT as glut
 import numpy       as np
 
 import fsl.utils.transform as transform
+import fsleyes.gl.glstate  as glstate
 
 
 log = logging.getLogger(__name__)
@@ -38,8 +39,8 @@ def clear(bgColour):
     gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
 
     # enable transparency
-    gl.glEnable(gl.GL_BLEND)
-    gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+    glstate.enable(gl.GL_BLEND)
+    glstate.blendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
 
 
 @contextlib.contextmanager
@@ -58,63 +59,17 @@ def enabled(capabilities, enable=True):
                        default) or disabled.
     """
 
-    # Capabilities which are used via
-    # glEnableClientState/glDisableClientState,
-    # rather than glEnable/glDisable
-    clientCapabilities = [
-        gl.GL_VERTEX_ARRAY,
-        gl.GL_NORMAL_ARRAY,
-        gl.GL_COLOR_ARRAY,
-        gl.GL_SECONDARY_COLOR_ARRAY,
-        gl.GL_EDGE_FLAG_ARRAY,
-        gl.GL_INDEX_ARRAY,
-        gl.GL_FOG_COORD_ARRAY,
-        gl.GL_TEXTURE_COORD_ARRAY]
-
     if not isinstance(capabilities, collections.Sequence):
         capabilities = [capabilities]
 
-    # Build lists of pre/post-yield
-    # functions, one pre and post
-    # for each capability, being
-    # one of:
-    #
-    #   - glEnable
-    #   - glDisable
-    #   - glEnableClientState
-    #   - glDisableClientState
-    #   - noop (if the capability's
-    #     current state is already
-    #     in the requested state)
-
-    def noop(*a):
-        pass
-
-    pres  = []
-    posts = []
-
-    for c in capabilities:
-
-        if bool(gl.glIsEnabled(c)) == enable:
-            pre  = noop
-            post = noop
-        else:
-            if c in clientCapabilities:
-                pre  = gl.glEnableClientState
-                post = gl.glDisableClientState
-            else:
-                pre  = gl.glEnable
-                post = gl.glDisable
-
-        if not enable:
-            pre, post = post, pre
+    # The glstate module skips calls
+    # for capabilities which are
+    # already in the requested state
+    previous = [glstate.isEnabled(c) for c in capabilities]
 
-        pres .append(pre)
-        posts.append(post)
-
-    [p(c) for p, c in zip(pres,  capabilities)]
+    [glstate.setEnabled(c, enable) for c in capabilities]
     yield
-    [p(c) for p, c in zip(posts, capabilities)]
+    [glstate.setEnabled(c, p) for c, p in zip(capabilities, previous)]
 
 
 @contextlib.contextmanager
@@ -408,7 +363,7 @@ def text2D(text,
     gl.glPushMatrix()
     gl.glLoadIdentity()
 
-    gl.glEnable(gl.GL_LINE_SMOOTH)
+    glstate.enable(gl.GL_LINE_SMOOTH)
 
     # Draw each line one at a time
     width  = 0
@@ -1278,8 +1233,8 @@ def broadcast(vertices, indices, zposes, xforms, zax):
     :arg zposes:   Positions along the depth axis at which the vertices
                    are to be replicated.
 
-    :arg xforms:   Sequence of transformation matrices, one for each
-                   Z position.
+    :arg xforms:   Sequence of transformation matrices, or a ``(M, 4, 4)``
+                   array, one for each Z position.
 
     :arg zax:      Index of the 'depth' axis
 
@@ -1293,31 +1248,47 @@ def broadcast(vertices, indices, zposes, xforms, zax):
       - A new numpy array containing all of the generated indices.
     """
 
-    vertices = np.array(vertices)
-    indices  = np.array(indices)
+    vertices = np.array(vertices, dtype=np.float32)
+    indices  = np.array(indices,  dtype=np.uint32)
+    zposes   = np.asarray(zposes, dtype=np.float32)
+    xforms   = np.asarray(xforms, dtype=np.float64).reshape((-1, 4, 4))
 
     nverts   = vertices.shape[0]
-    nidxs    = indices.shape[ 0]
+    nslices  = len(zposes)
 
-    allTexCoords  = np.zeros((nverts * len(zposes), 3), dtype=np.float32)
-    allVertCoords = np.zeros((nverts * len(zposes), 3), dtype=np.float32)
-    allIndices    = np.zeros( nidxs  * len(zposes),     dtype=np.uint32)
+    allTexCoords = np.tile(vertices, (nslices, 1, 1))
+    allTexCoords[:, :, zax] = zposes[:, np.newaxis]
 
-    for i, (zpos, xform) in enumerate(zip(zposes, xforms)):
+    allVertCoords = stackTransform(allTexCoords, xforms)
+    allIndices    = np.arange(nslices, dtype=np.uint32) * nverts
+    allIndices    = indices[np.newaxis, :] + allIndices[:, np.newaxis]
 
-        vertices[:, zax] = zpos
+    allTexCoords  = allTexCoords .reshape((-1, 3))
+    allVertCoords = allVertCoords.reshape((-1, 3)).astype(np.float32)
+    allIndices    = allIndices   .ravel()
 
-        vStart = i * nverts
-        vEnd   = vStart + nverts
+    return allVertCoords, allTexCoords, allIndices
 
-        iStart = i * nidxs
-        iEnd   = iStart + nidxs
 
-        allIndices[   iStart:iEnd]    = indices + i * nverts
-        allTexCoords[ vStart:vEnd, :] = vertices
-        allVertCoords[vStart:vEnd, :] = transform.transform(vertices, xform)
+def stackTransform(coords, xforms):
+    """Applies a stack of affine transformations to a stack of coordinate
+    sets, in one go.
 
-    return allVertCoords, allTexCoords, allIndices
+    :arg coords: A ``(N, M, 3)`` array containing ``N`` sets of ``M``
+                 coordinates.
+
+    :arg xforms: A ``(N, 4, 4)`` array containing one affine transformation
+                 for each coordinate set.
+
+    :returns:    A ``(N, M, 3)`` array containing the transformed
+                 coordinates.
+    """
+
+    coords = np.asarray(coords)
+    xforms = np.asarray(xforms)
+    rots   = np.transpose(xforms[:, :3, :3], (0, 2, 1))
+
+    return np.matmul(coords, rots) + xforms[:, np.newaxis, :3, 3]
 
 
 def planeEquation(xyz1, xyz2, xyz3):
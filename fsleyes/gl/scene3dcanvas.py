@@ -10,6 +10,7 @@ FSLeyes for its 3D view.
 
 
 import logging
+import time
 
 import numpy     as np
 import OpenGL.GL as gl
@@ -19,6 +20,7 @@ import fsl.data.image      as fslimage
 import fsl.utils.idle      as idle
 import fsl.utils.transform as transform
 
+import fsleyes.gl.glstate                as glstate
 import fsleyes.gl.routines               as glroutines
 import fsleyes.gl.globject               as globject
 import fsleyes.displaycontext            as fsldisplay
@@ -28,7 +30,35 @@ import fsleyes.displaycontext.canvasopts as canvasopts
 log = logging.getLogger(__name__)
 
 
+MIN_QUALITY = 0.1
+"""Lowest rendering quality that will be used while the user is interacting
+with a :class:`Scene3DCanvas` - see :attr:`Scene3DCanvas.renderQuality`.
+"""
+
+
+QUALITY_STEP = 0.05
+"""The interactive rendering quality is rounded to a multiple of this value,
+so that off-screen render textures are not resized on every frame.
+"""
+
+
 class Scene3DCanvas(object):
+    """The ``Scene3DCanvas`` is used to draw overlays in 3D.
+
+    If the :attr:`.Scene3DCanvasOpts.progressive` property is ``True``, the
+    ``Scene3DCanvas`` will render volumes at a reduced quality while the user
+    is interacting with the scene (i.e. changing the rotation, zoom or
+    offset). The reduced quality is made available through the
+    :attr:`renderQuality` property, and is used by :class:`.GLVolume`
+    instances to reduce the number of ray-casting steps, and the size of
+    their off-screen render textures. Once no interaction has occurred for
+    :attr:`.Scene3DCanvasOpts.progressiveDelay` milliseconds, the scene is
+    re-rendered at full quality.
+
+    The interactive quality is adjusted automatically, by timing each frame
+    which is rendered during an interaction, and comparing it against the
+    :attr:`.Scene3DCanvasOpts.frameBudget`.
+    """
 
 
     def __init__(self, overlayList, displayCtx):
@@ -44,6 +74,13 @@ class Scene3DCanvas(object):
         self.__resetLightPos  = True
         self.__glObjects      = {}
 
+        # Progressive rendering state - see
+        # the __viewChanged method, and the
+        # renderQuality property.
+        self.__interacting        = False
+        self.__lastInteraction    = 0
+        self.__interactiveQuality = 0.5
+
         overlayList.addListener('overlays',
                                 self.__name,
                                 self.__overlayListChanged)
@@ -58,10 +95,13 @@ class Scene3DCanvas(object):
         opts.addListener('bgColour',     self.__name, self.Refresh)
         opts.addListener('showLegend',   self.__name, self.Refresh)
         opts.addListener('occlusion',    self.__name, self.Refresh)
-        opts.addListener('zoom',         self.__name, self.Refresh)
-        opts.addListener('offset',       self.__name, self.Refresh)
-        opts.addListener('rotation',     self.__name, self.Refresh)
+        opts.addListener('zoom',         self.__name, self.__viewChanged)
+        opts.addListener('offset',       self.__name, self.__viewChanged)
+        opts.addListener('rotation',     self.__name, self.__viewChanged)
         opts.addListener('highDpi',      self.__name, self.__highDpiChanged)
+        opts.addListener('progressive',
+                         self.__name,
+                         self.__progressiveChanged)
 
 
     def destroy(self):
@@ -91,6 +131,17 @@ class Scene3DCanvas(object):
         """
         return self.__opts
 
+    @property
+    def renderQuality(self):
+        """Returns the quality, between :data:`MIN_QUALITY` and 1, at which
+        the scene should currently be rendered. This will be less than 1
+        while the user is interacting with the scene, and
+        :attr:`.Scene3DCanvasOpts.progressive` rendering is enabled.
+        """
+        if self.__interacting: return self.__interactiveQuality
+        else:                  return 1.0
+
+
     @property
     def resetLightPos(self):
         """By default, the :attr:`lightPos` is updated whenever the
@@ -334,6 +385,92 @@ class Scene3DCanvas(object):
                 self.__registerOverlay(ovl)
 
 
+    def __viewChanged(self, *a):
+        """Called when the :attr:`.Scene3DCanvasOpts.rotation`,
+        :attr:`.Scene3DCanvasOpts.zoom`, or :attr:`.Scene3DCanvasOpts.offset`
+        properties change. If :attr:`.Scene3DCanvasOpts.progressive`
+        rendering is enabled, switches to interactive rendering quality,
+        and schedules a full quality re-render via
+        :meth:`__checkInteraction`. Refreshes the canvas.
+        """
+
+        if self.opts.progressive:
+
+            self.__lastInteraction = time.time()
+
+            if not self.__interacting:
+                self.__interacting = True
+                idle.idle(self.__checkInteraction,
+                          after=self.opts.progressiveDelay / 1000.0)
+
+        self.Refresh()
+
+
+    def __checkInteraction(self):
+        """Called on the idle loop, after an interaction with the scene. If
+        no further interaction has occurred within the
+        :attr:`.Scene3DCanvasOpts.progressiveDelay`, the scene is re-rendered
+        at full quality. Otherwise another check is scheduled.
+        """
+
+        if self.destroyed() or not self.__interacting:
+            return
+
+        delay     = self.opts.progressiveDelay / 1000.0
+        remaining = self.__lastInteraction + delay - time.time()
+
+        if remaining > 0:
+            idle.idle(self.__checkInteraction, after=remaining)
+            return
+
+        log.debug('Interaction finished - rendering at full quality')
+
+        self.__interacting = False
+        self.Refresh()
+
+
+    def __progressiveChanged(self, *a):
+        """Called when the :attr:`.Scene3DCanvasOpts.progressive` property
+        changes. Makes sure that the scene is rendered at full quality if
+        progressive rendering is disabled.
+        """
+        if not self.opts.progressive and self.__interacting:
+            self.__interacting = False
+            self.Refresh()
+
+
+    def __adjustQuality(self, frameTime):
+        """Called by :meth:`_draw` after a frame has been rendered while the
+        user is interacting with the scene. Adjusts the interactive
+        rendering quality, so that subsequent frames will be rendered within
+        the :attr:`.Scene3DCanvasOpts.frameBudget`.
+
+        :arg frameTime: Time, in seconds, taken to render the last frame.
+        """
+
+        budget  = self.opts.frameBudget / 1000.0
+        quality = self.__interactiveQuality
+
+        # The cost of rendering a volume is
+        # roughly proportional to the number
+        # of ray-casting steps, multiplied by
+        # the number of pixels, so scales with
+        # the cube of the quality. We move
+        # half-way towards the target quality
+        # to avoid oscillation.
+        target  = quality * (budget / max(frameTime, 1e-6)) ** (1 / 3.0)
+        quality = 0.5 * (quality + target)
+        quality = QUALITY_STEP * np.round(quality / QUALITY_STEP)
+        quality = float(np.clip(quality, MIN_QUALITY, 1.0))
+
+        if quality != self.__interactiveQuality:
+            log.debug('Frame time {:0.3f}s (budget: {:0.3f}s) - adjusting '
+                      'interactive quality to {:0.2f}'.format(
+                          frameTime, budget, quality))
+
+        self.__interactiveQuality = quality
+
+
     def __highDpiChanged(self, *a):
         """Called when the :attr:`.Scene3DCanvasOpts.highDpi` property
         changes. Calls the :meth:`.GLCanvasTarget.EnableHighDPI` method.
@@ -562,6 +699,8 @@ class Scene3DCanvas(object):
         if not self._setGLContext():
             return
 
+        glstate.newFrame()
+
         opts = self.opts
         glroutines.clear(opts.bgColour)
 
@@ -579,6 +718,8 @@ class Scene3DCanvas(object):
         # which are higher in the list will get
         # drawn above (closer to the screen)
         # than lower ones.
+        interacting = self.__interacting
+        startTime   = time.time()
         depthOffset = transform.scaleOffsetXform(1, [0, 0, 0.1])
         depthOffset = np.array(depthOffset,    dtype=np.float32, copy=False)
         xform       = np.array(self.__viewMat, dtype=np.float32, copy=False)
@@ -603,6 +744,14 @@ class Scene3DCanvas(object):
             globj.draw3D(  xform=xform)
             globj.postDraw(xform=xform)
 
+        # Time the frame, so we can adjust the
+        # interactive quality. We need to wait
+        # for the GL pipeline to finish for the
+        # timing to mean anything.
+        if interacting:
+            gl.glFinish()
+            self.__adjustQuality(time.time() - startTime)
+
         if opts.showCursor:
             with glroutines.enabled((gl.GL_DEPTH_TEST)):
                 self.__drawCursor()
@@ -690,7 +839,7 @@ class Scene3DCanvas(object):
         vertices   = transform.transform(vertices,       xform)
 
         # Draw the legend lines
-        gl.glDisable(gl.GL_DEPTH_TEST)
+        glstate.disable(gl.GL_DEPTH_TEST)
         gl.glColor3f(*copts.cursorColour[:3])
         gl.glLineWidth(2)
         gl.glBegin(gl.GL_LINES)
@@ -19,8 +19,12 @@ The :mod:`.glsl` and :mod:`.arbp` packages respectively define the
 used to manage shader programs of the corresponding type.
 
 
+Compiled programs are shared between all shader objects which use the same
+source code - this is managed by the :mod:`.programcache` module.
+
+
 Some package-level functions are defined here, for finding and loading
-shader source code:
+shader source code, and for compiling commonly used programs in advance:
 
 
   .. autosummary::
@@ -30,6 +34,7 @@ shader source code:
      getShaderSuffix
      getVertexShader
      getFragmentShader
+     warmUp
 """
 
 
@@ -40,13 +45,27 @@ shader source code:
 # characters).
 from io import                 open
 import os.path              as op
+import                         logging
 
+import fsl.utils.memoize    as memoize
 import                         fsleyes
 import fsleyes.gl           as fslgl
 from   .glsl import program as glslprogram
 from   .arbp import program as arbpprogram
 
 
+log = logging.getLogger(__name__)
+
+
+WARM_UP_PROGRAMS = [('glvolume',      'glvolume'),
+                    ('glvolume',      'gllabel'),
+                    ('glvolume',      'glmask'),
+                    ('rendertexture', 'rendertexture')]
+"""GLSL programs which are compiled by the :func:`warmUp` function. Each
+entry is a tuple containing the vertex and fragment shader prefixes.
+"""
+
+
 GLSLShader = glslprogram.GLSLShader
 ARBPShader = arbpprogram.ARBPShader
 
@@ -88,7 +107,14 @@ def _getShader(prefix, shaderType):
     """Returns the shader source for the given GL type and the given
     shader type ('vert' or 'frag').
     """
-    fname = _getFileName(prefix, shaderType)
+    return _loadShader(_getFileName(prefix, shaderType))
+
+
+@memoize.memoize
+def _loadShader(fname):
+    """Loads and preprocesses the given shader source file. Shader files do
+    not change while FSLeyes is running, so this function is memoized.
+    """
     with open(fname, 'rt', encoding='utf-8') as f:
         src = f.read()
 
@@ -140,3 +166,25 @@ def preprocess(src):
             lines[linei] = f.read()
 
     return '\n'.join(lines)
+
+
+def warmUp():
+    """Compiles the programs listed in :data:`WARM_UP_PROGRAMS`, so that they
+    are present in the :mod:`.programcache` when they are first needed. This
+    function may be called after :func:`.fsleyes.gl.bootstrap` (e.g. while
+    the splash screen is being shown). It does nothing if OpenGL 2.1 is not
+    in use, as ``ARB`` programs are generated from templates, and are
+    instead compiled when first needed.
+    """
+
+    if fslgl.GL_VERSION != '2.1':
+        return
+
+    for vert, frag in WARM_UP_PROGRAMS:
+        try:
+            shader = GLSLShader(getVertexShader(vert), getFragmentShader(frag))
+            shader.destroy()
+
+        except Exception as e:
+            log.warning('Could not compile shader program '
+                        '({}, {}): {}'.format(vert, frag, e), exc_info=True)
@@ -566,6 +566,8 @@ import                six
 import jinja2      as j2
 import jinja2.meta as j2meta
 
+import fsl.utils.memoize as memoize
+
 
 
 TEMPLATE_BUILTIN_CONSTANTS = ['range', 'arb_call', 'arb_include']
@@ -579,9 +581,13 @@ to do so.
 """
 
 
+@memoize.memoizeMD5
 def parseARBP(vertSrc, fragSrc):
     """Parses the given ``ARB_vertex_program`` and ``ARB_fragment_program``
     code, and returns information about all declared variables.
+
+    .. note:: This function is memoized, so the returned dictionary must
+              not be modified.
     """
 
     vvars = _findDeclaredVariables(vertSrc)
@@ -602,6 +608,7 @@ def parseARBP(vertSrc, fragSrc):
             'constant'  : constants}
 
 
+@memoize.memoizeMD5
 def fillARBP(vertSrc,
              fragSrc,
              vertParams,
@@ -649,6 +656,11 @@ def fillARBP(vertSrc,
 
     :arg includePath:   Path to a directory which contains any additional
                         files that may be included in the given source files.
+
+    .. note:: This function is memoized, as template expansion is relatively
+              expensive, and the same programs are generated for many
+              :class:`.ARBPShader` instances. All arguments must therefore
+              be passed positionally.
     """
 
     vertParams    = dict(vertParams)
@@ -23,7 +23,9 @@ import OpenGL.GL.ARB.fragment_program as arbfp
 import OpenGL.GL.ARB.vertex_program   as arbvp
 
 import fsl.utils.memoize              as memoize
+import fsleyes.gl.glstate             as glstate
 from . import                            parse
+from .. import                           programcache
 
 
 log = logging.getLogger(__name__)
@@ -108,6 +110,14 @@ class ARBPShader(object):
                  an ``ARBPShader`` you cannot directly use texture coordinates.
 
 
+    Compiled programs are shared between all ``ARBPShader`` instances which
+    generate the same program source code (i.e. the same source, texture
+    units, and constant values) - see the :mod:`.programcache` module. Each
+    ``ARBPShader`` keeps a copy of the values of all of its vertex and
+    fragment program parameters, which are uploaded to the programs in
+    :meth:`load`, if the programs were last used by another ``ARBPShader``.
+
+
     See also the :class:`.GLSLShader`, which provides similar functionality for
     GLSL shader programs.
     """
@@ -179,6 +189,15 @@ class ARBPShader(object):
         # information about this dict
         self.__attCache = {}
 
+        # Compiled programs are managed by the
+        # programcache module. Parameter values
+        # are stored so they can be uploaded
+        # if another ARBPShader has used the
+        # same programs (see load).
+        self.__program    = None
+        self.__vertValues = {}
+        self.__fragValues = {}
+
         poses = self.__generatePositions(textureMap)
         vpPoses, fpPoses, texPoses, attrPoses = poses
 
@@ -199,13 +218,15 @@ class ARBPShader(object):
 
 
     def destroy(self):
-        """Deletes all GL resources managed by this ``ARBPShader``. """
+        """Releases the vertex and fragment programs used by this
+        ``ARBPShader``. They are deleted if they are not being used by any
+        other ``ARBPShader``.
+        """
 
-        if self.vertexProgram is not None:
-            arbvp.glDeleteProgramsARB(1, gltypes.GLuint(self.vertexProgram))
-        if self.fragmentProgram is not None:
-            arbfp.glDeleteProgramsARB(1, gltypes.GLuint(self.fragmentProgram))
+        if self.__program is not None:
+            programcache.release(self.__program, self)
 
+        self.__program       = None
         self.vertexProgram   = None
         self.fragmentProgram = None
 
@@ -234,26 +255,38 @@ class ARBPShader(object):
                                           self.attrPositions,
                                           self.includePath)
 
-        # Compile the new version, but
-        # only discard the old version
-        # if compilation succeeds
-        vp, fp = self.__compile(vertSrc, fragSrc)
+        # Compile (or retrieve from the cache)
+        # the new version, but only discard the
+        # old version if compilation succeeds
+        key  = programcache.programKey('arbp', vertSrc, fragSrc)
+        prog = programcache.acquire(
+            key,
+            lambda : self.__compile(vertSrc, fragSrc),
+            _deletePrograms)
 
         self.destroy()
-        self.vertexProgram   = vp
-        self.fragmentProgram = fp
+        self.__program       = prog
+        self.vertexProgram   = prog.program[0]
+        self.fragmentProgram = prog.program[1]
 
 
     def load(self):
         """Loads the shader program. """
-        gl.glEnable(arbvp.GL_VERTEX_PROGRAM_ARB)
-        gl.glEnable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
+        glstate.enable(arbvp.GL_VERTEX_PROGRAM_ARB)
+        glstate.enable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
 
         arbvp.glBindProgramARB(arbvp.GL_VERTEX_PROGRAM_ARB,
                                self.vertexProgram)
         arbfp.glBindProgramARB(arbfp.GL_FRAGMENT_PROGRAM_ARB,
                                self.fragmentProgram)
 
+        if programcache.bind(self.__program, self):
+            for name, value in self.__vertValues.items():
+                self.__setParam(arbvp, self.vertParamPositions, name, value)
+            for name, value in self.__fragValues.items():
+                self.__setParam(arbfp, self.fragParamPositions, name, value)
+
+
     def loadAtts(self):
         """Enables texture coordinates for all shader program attributes. """
         for attr in self.attrs:
@@ -265,8 +298,9 @@ class ARBPShader(object):
 
     def unload(self):
         """Unloads the shader program. """
-        gl.glDisable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
-        gl.glDisable(arbvp.GL_VERTEX_PROGRAM_ARB)
+        glstate.disable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
+        glstate.disable(arbvp.GL_VERTEX_PROGRAM_ARB)
+        programcache.unbind(self)
 
 
     def unloadAtts(self):
@@ -293,17 +327,16 @@ class ARBPShader(object):
                   ``True`` if the value was changed, and ``False`` otherwise.
         """
 
-        pos   = self.vertParamPositions[name]
         value = self.__normaliseParam(value)
-        nrows = len(value) // 4
 
         log.debug('Setting vertex parameter {} = {}'.format(name, value))
 
-        for i in range(nrows):
-            row = value[i * 4: i * 4 + 4]
-            arbvp.glProgramLocalParameter4fARB(
-                arbvp.GL_VERTEX_PROGRAM_ARB, pos + i,
-                row[0], row[1], row[2], row[3])
+        self.__vertValues[name] = value
+
+        if programcache.isBound(self):
+            self.__setParam(arbvp, self.vertParamPositions, name, value)
+        else:
+            programcache.invalidate(self.__program, self)
 
 
     @memoize.Instanceify(memoize.skipUnchanged)
@@ -315,17 +348,16 @@ class ARBPShader(object):
                   :func:`.memoize.skipUnchanged` decorator, which returns
                   ``True`` if the value was changed, and ``False`` otherwise.
         """
-        pos   = self.fragParamPositions[name]
         value = self.__normaliseParam(value)
-        nrows = len(value) // 4
 
         log.debug('Setting fragment parameter {} = {}'.format(name, value))
 
-        for i in range(nrows):
-            row = value[i * 4: i * 4 + 4]
-            arbfp.glProgramLocalParameter4fARB(
-                arbfp.GL_FRAGMENT_PROGRAM_ARB, pos + i,
-                row[0], row[1], row[2], row[3])
+        self.__fragValues[name] = value
+
+        if programcache.isBound(self):
+            self.__setParam(arbfp, self.fragParamPositions, name, value)
+        else:
+            programcache.invalidate(self.__program, self)
 
 
     @memoize.Instanceify(memoize.skipUnchanged)
@@ -370,6 +402,39 @@ class ARBPShader(object):
         gl.glTexCoordPointer(size, gl.GL_FLOAT, 0, value)
 
 
+    def __setParam(self, mod, positions, name, value):
+        """Used by :meth:`setVertParam`, :meth:`setFragParam`, and
+        :meth:`load`. Uploads the value of a vertex or fragment program
+        parameter to the currently loaded program, unless it is already
+        stored in the program.
+
+        :arg mod:       Either the ``OpenGL.GL.ARB.vertex_program`` or
+                        ``OpenGL.GL.ARB.fragment_program`` module.
+        :arg positions: Dictionary containing parameter positions.
+        :arg name:      Parameter name.
+        :arg value:     Parameter value, as returned by
+                        :meth:`__normaliseParam`.
+        """
+
+        if mod is arbvp: target = arbvp.GL_VERTEX_PROGRAM_ARB
+        else:            target = arbfp.GL_FRAGMENT_PROGRAM_ARB
+
+        if not glstate.updateValue(self.__program.values,
+                                   (target, name),
+                                   value):
+            return
+
+        pos   = positions[name]
+        nrows = len(value) // 4
+
+        for i in range(nrows):
+            row = value[i * 4: i * 4 + 4]
+            mod.glProgramLocalParameter4fARB(
+                target, pos + i, row[0], row[1], row[2], row[3])
+
+        glstate.count(nrows)
+
+
     def __normaliseParam(self, value):
         """Used by :meth:`setVertParam` and :meth:`setFragParam`. Ensures that
         all vertex/fragment program parameters are vectors of length 4, or
@@ -488,8 +553,8 @@ class ARBPShader(object):
 
         """
 
-        gl.glEnable(arbvp.GL_VERTEX_PROGRAM_ARB)
-        gl.glEnable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
+        glstate.enable(arbvp.GL_VERTEX_PROGRAM_ARB)
+        glstate.enable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
 
         # Clear out unnecessary stuff from
         # the source, and make sure it is
@@ -536,7 +601,16 @@ class ARBPShader(object):
             raise RuntimeError('Error compiling fragment program ({}): '
                                '{}\n{}'.format(position, message, fragSrc))
 
-        gl.glDisable(arbvp.GL_VERTEX_PROGRAM_ARB)
-        gl.glDisable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
+        glstate.disable(arbvp.GL_VERTEX_PROGRAM_ARB)
+        glstate.disable(arbfp.GL_FRAGMENT_PROGRAM_ARB)
 
         return vertProg, fragProg
+
+
+def _deletePrograms(programs):
+    """Used by :meth:`ARBPShader.recompile`. Deletes the given
+    ``(vertexProgram, fragmentProgram)`` pair.
+    """
+    vertProg, fragProg = programs
+    arbvp.glDeleteProgramsARB(1, gltypes.GLuint(vertProg))
+    arbfp.glDeleteProgramsARB(1, gltypes.GLuint(fragProg))
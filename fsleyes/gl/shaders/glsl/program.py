@@ -17,7 +17,9 @@ import OpenGL.raw.GL._types           as gltypes
 import OpenGL.GL.ARB.instanced_arrays as arbia
 
 import fsl.utils.memoize as memoize
+import fsleyes.gl.glstate as glstate
 from . import               parse
+from .. import              programcache
 
 
 log = logging.getLogger(__name__)
@@ -94,6 +96,13 @@ class GLSLShader(object):
         # Delete the program when
         # we no longer need it
         program.destroy()
+
+
+    Compiled programs are shared between all ``GLSLShader`` instances which
+    are created with the same source code - see the :mod:`.programcache`
+    module. Each ``GLSLShader`` keeps a copy of the values of all of its
+    uniform variables, which are uploaded to the program in :meth:`load`,
+    if the program was last used by another ``GLSLShader``.
     """
 
 
@@ -111,7 +120,14 @@ class GLSLShader(object):
                       via the :meth:`setIndices` method.
         """
 
-        self.program     = self.__compile(vertSrc, fragSrc)
+        key = programcache.programKey('glsl', vertSrc, fragSrc)
+
+        self.__program  = programcache.acquire(
+            key,
+            lambda : self.__compile(vertSrc, fragSrc),
+            gl.glDeleteProgram)
+        self.__uniforms = {}
+        self.program    = self.__program.program
 
         vertDecs         = parse.parseGLSL(vertSrc)
         fragDecs         = parse.parseGLSL(fragSrc)
@@ -174,9 +190,14 @@ class GLSLShader(object):
 
 
     def load(self):
-        """Loads this ``GLSLShader`` into the GL state.
+        """Loads this ``GLSLShader`` into the GL state. If the program was
+        last used by another ``GLSLShader``, all uniform values are uploaded.
         """
-        gl.glUseProgram(self.program)
+        glstate.useProgram(self.program)
+
+        if programcache.bind(self.__program, self):
+            for name, (value, size) in self.__uniforms.items():
+                self.__setUniform(name, value, size)
 
 
     def loadAtts(self):
@@ -228,16 +249,29 @@ class GLSLShader(object):
 
     def unload(self):
         """Unloads the GL shader program. """
-        gl.glUseProgram(0)
+        glstate.useProgram(0)
+        programcache.unbind(self)
 
 
     def destroy(self):
-        """Deletes all GL resources managed by this ``GLSLShader``. """
-        gl.glDeleteProgram(self.program)
+        """Deletes all GL resources managed by this ``GLSLShader``. The
+        compiled program is released, and is deleted if it is not being used
+        by any other ``GLSLShader``.
+        """
+
+        if self.__program is not None:
+            programcache.release(self.__program, self)
 
         for buf in self.buffers.values():
             gl.glDeleteBuffers(1, gltypes.GLuint(buf))
-        self.program = None
+
+        if self.indexBuffer is not None:
+            gl.glDeleteBuffers(1, gltypes.GLuint(self.indexBuffer))
+
+        self.buffers     = {}
+        self.indexBuffer = None
+        self.program     = None
+        self.__program   = None
 
 
     @memoize.Instanceify(memoize.skipUnchanged)
@@ -245,7 +279,8 @@ class GLSLShader(object):
         """Sets the value for the specified GLSL ``uniform`` variable.
 
         The ``GLSLShader`` keeps a copy of the value of every uniform, to
-        avoid unnecessary GL calls.
+        avoid unnecessary GL calls. If the program is not currently loaded,
+        the value is uploaded the next time that :meth:`load` is called.
 
 
         .. note:: This method is decorated by the
@@ -253,28 +288,47 @@ class GLSLShader(object):
                   ``True`` if the value was changed, ``False`` otherwise.
         """
 
-        vPos  = self.positions[name]
-        vType = self.types[    name]
-        vSize = self.sizes[    name]
+        vType = self.types[name]
+        vSize = self.sizes[name]
 
         if size is None:
             size = 1
 
-        setfunc = getattr(self, '_uniform_{}'.format(vType), None)
-
         if size > vSize:
             raise RuntimeError('Specified size ({}) is greater than '
                                'uniform size {} ({})'.format(
                                    size, name, vSize))
 
-        if setfunc is None:
+        if getattr(self, '_uniform_{}'.format(vType), None) is None:
             raise RuntimeError('Unsupported shader program '
                                'type: {}'.format(vType))
 
+        self.__uniforms[name] = (value, size)
+
+        if programcache.isBound(self):
+            self.__setUniform(name, value, size)
+        else:
+            programcache.invalidate(self.__program, self)
+
+
+    def __setUniform(self, name, value, size):
+        """Used by :meth:`set` and :meth:`load`. Uploads the value of the
+        specified uniform to the program, which must be loaded. The value is
+        not uploaded if it is already stored in the program.
+        """
+
+        if not glstate.updateValue(self.__program.values, name, (value, size)):
+            return
+
+        vPos    = self.positions[name]
+        vType   = self.types[    name]
+        setfunc = getattr(self, '_uniform_{}'.format(vType))
+
         log.debug('Setting shader variable: {}({})[{}] = {}'.format(
             vType, size, name, value))
 
         setfunc(vPos, value, size)
+        glstate.count()
 
 
     def setAtt(self, name, value, divisor=None):
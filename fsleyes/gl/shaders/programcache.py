@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#
+# programcache.py - Process-wide cache of compiled shader programs.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides a process-wide cache of compiled shader programs,
+which is used by the :class:`.GLSLShader` and :class:`.ARBPShader` classes.
+FSLeyes uses a single OpenGL context, which is shared by all canvases, so a
+compiled program can be used by any number of ``GLObject`` instances, in any
+number of views. Many ``GLObject`` instances use exactly the same programs
+(e.g. every :class:`.GLVolume` in a 2D view), so rather than compiling a
+separate copy for each of them, a single copy is compiled, and shared.
+
+
+Programs are identified by a key, created with the :func:`programKey`
+function from the final (preprocessed) program source code. A program is
+created via the :func:`acquire` function, and must be released via the
+:func:`release` function when it is no longer needed. A program which is no
+longer in use is not deleted immediately - up to :data:`MAX_UNUSED` unused
+programs are kept, so that a program can be re-used if it is needed again
+(e.g. when a display setting is changed back and forth).
+
+
+Shader program variable (uniform/parameter) values are stored in the program
+object, and so are also shared. Each shader object therefore keeps its own
+copy of all of its variable values, and the :func:`bind` function is used to
+determine when these values need to be uploaded to the program - this is only
+necessary when a program is loaded by a different shader object from the one
+which last loaded it. Even then, only those values which differ from the
+values currently stored in the program are uploaded.
+"""
+
+
+import logging
+import hashlib
+import collections
+
+
+log = logging.getLogger(__name__)
+
+
+MAX_UNUSED = 32
+"""Maximum number of programs which are not in use, but which are kept in
+the cache in case they are needed again. When this limit is exceeded, the
+least recently used programs are deleted.
+"""
+
+
+class CachedProgram(object):
+    """A ``CachedProgram`` encapsulates a compiled shader program, which is
+    managed by this module. ``CachedProgram`` objects are created by the
+    :func:`acquire` function. A ``CachedProgram`` has the following
+    attributes:
+
+    ============ ============================================================
+    ``key``      The program key.
+    ``program``  A reference to the compiled program, as returned by the
+                 ``compile`` function passed to :func:`acquire`.
+    ``refcount`` The number of shader objects which are using the program.
+    ``owner``    The shader object which most recently uploaded its variable
+                 values to the program.
+    ``values``   Dictionary containing the variable values which are
+                 currently stored in the program - see
+                 :func:`.glstate.updateValue`.
+    ============ ============================================================
+    """
+
+
+    def __init__(self, key, program, destroy):
+        """Create a ``CachedProgram``. See :func:`acquire`. """
+        self.key         = key
+        self.program     = program
+        self.refcount    = 0
+        self.owner       = None
+        self.values      = {}
+        self.__destroy   = destroy
+
+
+    def destroy(self):
+        """Deletes the compiled program. """
+        log.debug('Deleting shader program {}'.format(self.key))
+        self.__destroy(self.program)
+        self.program = None
+
+
+_programs = {}
+"""Dictionary of ``{key : CachedProgram}`` mappings, containing all programs
+which are in the cache, whether they are in use or not.
+"""
+
+
+_unused = collections.OrderedDict()
+"""Dictionary of ``{key : CachedProgram}`` mappings, containing all programs
+which are not in use, in the order that they were released.
+"""
+
+
+_current = [None]
+"""Stores a reference to the shader object which has most recently loaded
+its program - see :func:`bind`.
+"""
+
+
+_stats = {'hits' : 0, 'misses' : 0}
+"""Counts the number of times that :func:`acquire` has found, or has not
+found, an existing program in the cache. See :func:`stats`.
+"""
+
+
+def programKey(kind, *sources):
+    """Generates a key which identifies a shader program.
+
+    :arg kind:    Program type, e.g. ``'glsl'`` or ``'arbp'``.
+    :arg sources: Program source code (e.g. vertex and fragment program
+                  source), after all preprocessing/template expansion.
+    """
+
+    hashobj = hashlib.sha1()
+    hashobj.update(kind.encode('utf-8'))
+
+    for src in sources:
+        hashobj.update(b'\0')
+        hashobj.update(src.encode('utf-8'))
+
+    return '{}_{}'.format(kind, hashobj.hexdigest())
+
+
+def acquire(key, compile, destroy):
+    """Returns a :class:`CachedProgram` for the given key, compiling it if
+    necessary. The :func:`release` function must be called when the program
+    is no longer needed.
+
+    :arg key:     Program key, as returned by :func:`programKey`.
+    :arg compile: Function which compiles and returns the program. Only
+                  called if the program is not in the cache.
+    :arg destroy: Function which is passed the compiled program, and which
+                  deletes it.
+    """
+
+    prog = _programs.get(key, None)
+
+    if prog is None:
+        log.debug('Compiling shader program {}'.format(key))
+        _stats['misses'] += 1
+        prog           = CachedProgram(key, compile(), destroy)
+        _programs[key] = prog
+
+    else:
+        _stats['hits'] += 1
+        _unused.pop(key, None)
+
+    prog.refcount += 1
+
+    return prog
+
+
+def release(prog, owner=None):
+    """Releases a program which was obtained via :func:`acquire`. If the
+    program is no longer in use, it is moved into the unused program pool.
+
+    :arg prog:  The :class:`CachedProgram`.
+    :arg owner: The shader object which is releasing the program.
+    """
+
+    if owner is not None:
+        unbind(owner)
+        if prog.owner is owner:
+            prog.owner = None
+
+    prog.refcount -= 1
+
+    if prog.refcount > 0:
+        return
+
+    prog.owner        = None
+    _unused[prog.key] = prog
+
+    while len(_unused) > MAX_UNUSED:
+        key, old = _unused.popitem(last=False)
+        _programs.pop(key)
+        old.destroy()
+
+
+def bind(prog, owner):
+    """Must be called when a shader object loads its program.
+
+    :arg prog:  The :class:`CachedProgram`.
+    :arg owner: The shader object which is loading the program.
+    :returns:   ``True`` if the program variable values are currently set
+                to those of another shader object, and so ``owner`` needs
+                to upload its variable values to the program, ``False``
+                otherwise.
+    """
+
+    _current[0] = owner
+    stale       = prog.owner is not owner
+    prog.owner  = owner
+    return stale
+
+
+def unbind(owner):
+    """Must be called when a shader object unloads its program. """
+    if _current[0] is owner:
+        _current[0] = None
+
+
+def isBound(owner):
+    """Returns ``True`` if the program of the given shader object is currently
+    loaded, ``False`` otherwise. Variable values may only be uploaded to a
+    program while it is loaded.
+    """
+    return _current[0] is owner
+
+
+def invalidate(prog, owner):
+    """Must be called when a shader object changes the value of a variable
+    while its program is not loaded. Ensures that the shader object will
+    upload all of its variable values the next time it loads the program.
+    """
+    if prog.owner is owner:
+        prog.owner = None
+
+
+def clear():
+    """Deletes all programs which are not currently in use. """
+    while len(_unused) > 0:
+        key, prog = _unused.popitem(last=False)
+        _programs.pop(key)
+        prog.destroy()
+
+
+def stats():
+    """Returns a dictionary containing some information about the cache:
+
+    =========== ============================================================
+    ``hits``    Number of times that a requested program was already in the
+                cache.
+    ``misses``  Number of times that a requested program had to be compiled.
+    ``total``   Number of programs currently in the cache.
+    ``unused``  Number of programs currently in the cache which are not in
+                use.
+    =========== ============================================================
+    """
+    return {'hits'   : _stats['hits'],
+            'misses' : _stats['misses'],
+            'total'  : len(_programs),
+            'unused' : len(_unused)}
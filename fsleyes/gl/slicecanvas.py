@@ -22,6 +22,7 @@ import fsleyes_props                      as props
 
 import fsleyes.strings                    as strings
 import fsleyes.displaycontext.canvasopts  as canvasopts
+import fsleyes.gl.glstate                 as glstate
 import fsleyes.gl.routines                as glroutines
 import fsleyes.gl.resources               as glresources
 import fsleyes.gl.globject                as globject
@@ -1330,7 +1331,7 @@ class SliceCanvas(object):
                 # Figure out the voxel coord axes
                 # that (approximately) correspond
                 # with the display x/y axes.
-                axes = ovl.axisMapping(dopts.getTransform('voxel', 'display'))
+                axes = dopts.getDisplayAxisMapping()
                 axes = np.abs(axes) - 1
                 xax  = axes[copts.xax]
                 yax  = axes[copts.yax]
@@ -1425,6 +1426,8 @@ class SliceCanvas(object):
         if not self._setGLContext():
             return
 
+        glstate.newFrame()
+
         overlays, globjs = self._getGLObjects()
 
         copts = self.opts
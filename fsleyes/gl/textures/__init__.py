@@ -16,13 +16,16 @@ textures for various purposes.
 
 # All *Texture classes are made available at the
 # textures package level due to these imports
-from .texture            import Texture
-from .texture            import Texture2D
-from .texture3d          import Texture3D
-from .imagetexture       import ImageTexture
-from .colourmaptexture   import ColourMapTexture
-from .lookuptabletexture import LookupTableTexture
-from .selectiontexture   import SelectionTexture
-from .rendertexture      import RenderTexture
-from .rendertexture      import GLObjectRenderTexture
-from .rendertexturestack import RenderTextureStack
+from .texture              import Texture
+from .texture              import Texture2D
+from .texture3d            import Texture3D
+from .imagetexture         import ImageTexture
+from .bricktexture         import BrickTexture
+from .edgemaptexture       import EdgeMapTexture
+from .colourmaptexture     import ColourMapTexture
+from .lookuptabletexture   import LookupTableTexture
+from .selectiontexture     import SelectionTexture
+from .rendertexture        import RenderTexture
+from .rendertexture        import GLObjectRenderTexture
+from .rendertexturestack   import RenderTextureStack
+from .lightboxtexturestack import LightBoxTextureStack
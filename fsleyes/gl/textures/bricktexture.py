@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+#
+# bricktexture.py - The BrickTexture class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`BrickTexture` class, a :class:`.Texture3D`
+which is used by the :class:`.GLVolume` class to skip over empty space when
+rendering a 3D :class:`.Image` via ray-casting.
+
+
+The image is divided into a coarse grid of *bricks* (e.g. 8x8x8 voxels). The
+minimum and maximum voxel value within each brick is calculated by the
+:func:`calcBrickRanges` function, whenever the image data changes. Then,
+whenever the display or clipping settings change, the
+:func:`calcBrickOccupancy` function is used to identify the bricks which
+contain at least one voxel that could contribute to the rendering. The result
+is stored in a small 3D texture, which the ray-casting shader program uses to
+jump over bricks which cannot contribute.
+"""
+
+
+import logging
+
+import numpy     as np
+import OpenGL.GL as gl
+
+import fsl.utils.idle                     as idle
+from   fsl.utils.platform import platform as fslplatform
+
+from . import texture3d
+
+
+log = logging.getLogger(__name__)
+
+
+BRICK_SIZE = 8
+"""Default brick width, in voxels, along each dimension. """
+
+
+def calcBrickRanges(data, brickSize=BRICK_SIZE, overlap=1):
+    """Calculates the minimum and maximum value within each brick of the
+    given 3D ``data``. ``nan`` values are ignored.
+
+    :arg data:      3D ``numpy`` array
+    :arg brickSize: Brick width, in voxels.
+    :arg overlap:   Number of voxels by which each brick is extended, on
+                    each side, to account for interpolation across brick
+                    boundaries.
+
+    :returns:       A tuple containing ``(mins, maxs)`` arrays, each with
+                    shape ``ceil(data.shape / brickSize)``. Bricks which only
+                    contain ``nan`` values will contain ``nan``.
+    """
+
+    mins = np.asarray(data)
+    maxs = mins
+
+    for axis in range(3):
+        mins = _reduceAxis(mins, axis, brickSize, overlap, np.fmin)
+        maxs = _reduceAxis(maxs, axis, brickSize, overlap, np.fmax)
+
+    return mins, maxs
+
+
+def _reduceAxis(data, axis, brickSize, overlap, ufunc):
+    """Used by :func:`calcBrickRanges`. Reduces the given ``data`` into bricks
+    along the given ``axis``, using the given ``ufunc``.
+    """
+
+    nvox    = data.shape[axis]
+    nbricks = int(np.ceil(nvox / float(brickSize)))
+    reduced = []
+
+    for b in range(nbricks):
+        lo        = max(0,    b      * brickSize - overlap)
+        hi        = min(nvox, (b + 1) * brickSize + overlap)
+        slc       = [slice(None)] * data.ndim
+        slc[axis] = slice(lo, hi)
+
+        reduced.append(ufunc.reduce(data[tuple(slc)], axis=axis))
+
+    return np.stack(reduced, axis=axis)
+
+
+def calcBrickOccupancy(mins,
+                       maxs,
+                       clipLow,
+                       clipHigh,
+                       displayLow,
+                       invertClip=False,
+                       useNegCmap=False,
+                       imageIsClip=True):
+    """Identifies the bricks which contain at least one voxel that could
+    contribute to a 3D rendering. All thresholds are specified in terms of
+    the image data range. The logic in this function must match that in the
+    ``glvolume_common.glsl`` and ``glvolume_3d_frag.glsl`` shader programs.
+
+    :arg mins:        Per-brick minimum values, as returned by
+                      :func:`calcBrickRanges`.
+
+    :arg maxs:        Per-brick maximum values, as returned by
+                      :func:`calcBrickRanges`.
+
+    :arg clipLow:     Voxels with a value less than or equal to this are
+                      clipped.
+
+    :arg clipHigh:    Voxels with a value greater than or equal to this are
+                      clipped.
+
+    :arg displayLow:  Voxels with a value less than or equal to this are
+                      fully transparent.
+
+    :arg invertClip:  If ``True``, the clipping range is inverted.
+
+    :arg useNegCmap:  If ``True``, voxels with a value less than or equal to
+                      zero are inverted before being clipped and coloured.
+
+    :arg imageIsClip: If ``False``, clipping is performed with respect to a
+                      different image, so only the display range is used to
+                      identify empty bricks.
+
+    :returns:         A boolean array, ``True`` for bricks which may
+                      contribute to the rendering, ``False`` for bricks which
+                      can be skipped.
+    """
+
+    def visible(lo, hi):
+        vis = hi > displayLow
+        if imageIsClip:
+            if invertClip: vis &= (lo < clipLow) | (hi > clipHigh)
+            else:          vis &= (hi > clipLow) & (lo < clipHigh)
+        return vis
+
+    mins  = np.asarray(mins, dtype=np.float64)
+    maxs  = np.asarray(maxs, dtype=np.float64)
+    valid = ~(np.isnan(mins) | np.isnan(maxs))
+
+    with np.errstate(invalid='ignore'):
+
+        if not useNegCmap:
+            occupied = visible(mins, maxs)
+
+        # When the negative colour map is in
+        # use, values <= 0 are inverted. So we
+        # test the positive and (inverted)
+        # negative parts of each brick separately.
+        else:
+            pos      = (maxs >  0) & visible(np.maximum( mins, 0),  maxs)
+            neg      = (mins <= 0) & visible(np.maximum(-maxs, 0), -mins)
+            occupied = pos | neg
+
+    return valid & occupied
+
+
+class BrickTexture(texture3d.Texture3D):
+    """The ``BrickTexture`` is a :class:`.Texture3D` which contains, for each
+    brick of an image, a flag indicating whether or not the brick contains
+    voxels that could contribute to a 3D rendering. See the module
+    documentation for details.
+
+    Use the :meth:`setImageData` method to set the image data, and the
+    :meth:`setThresholds` method to set the display and clipping settings.
+    The per-brick minimum/maximum values are calculated on a separate thread
+    (unless the ``threaded`` parameter to :meth:`__init__` is ``False``).
+    The ``BrickTexture`` is not ready to be used until both of these methods
+    have been called, and the occupancy texture has been generated - use the
+    :meth:`ready` method to test this.
+    """
+
+
+    def __init__(self, name, brickSize=None, overlap=1, threaded=None):
+        """Create a ``BrickTexture``.
+
+        :arg name:      A unique name for the texture.
+        :arg brickSize: Brick width, in voxels. Defaults to
+                        :data:`BRICK_SIZE`.
+        :arg overlap:   Passed to :func:`calcBrickRanges`.
+        :arg threaded:  If ``True``, the brick minimum/maximum values, and
+                        the texture data, are calculated on a separate
+                        thread.  Defaults to
+                        :attr:`.fsl.utils.platform.Platform.haveGui`.
+        """
+
+        if brickSize is None: brickSize = BRICK_SIZE
+        if threaded  is None: threaded  = fslplatform.haveGui
+
+        self.__brickSize  = brickSize
+        self.__overlap    = overlap
+        self.__imageShape = None
+        self.__ranges     = None
+        self.__thresholds = None
+        self.__occupancy  = None
+        self.__destroyed  = False
+
+        if threaded:
+            self.__taskThread = idle.TaskThread()
+            self.__taskName   = '{}_{}_ranges'.format(type(self).__name__,
+                                                      id(self))
+            self.__taskThread.daemon = True
+            self.__taskThread.start()
+        else:
+            self.__taskThread = None
+            self.__taskName   = None
+
+        texture3d.Texture3D.__init__(self,
+                                     name,
+                                     threaded=threaded,
+                                     interp=gl.GL_NEAREST)
+
+
+    def destroy(self):
+        """Must be called when this ``BrickTexture`` is no longer needed. """
+
+        texture3d.Texture3D.destroy(self)
+
+        if self.__taskThread is not None:
+            self.__taskThread.stop()
+
+        self.__destroyed  = True
+        self.__ranges     = None
+        self.__occupancy  = None
+        self.__taskThread = None
+
+
+    def ready(self):
+        """Returns ``True`` if the occupancy texture has been generated for
+        the most recent image data and thresholds, ``False`` otherwise.
+        """
+        return (self.__occupancy is not None and
+                self.__ranges    is not None and
+                texture3d.Texture3D.ready(self))
+
+
+    @property
+    def brickSize(self):
+        """Returns the brick width, in voxels. """
+        return self.__brickSize
+
+
+    @property
+    def brickShape(self):
+        """Returns the shape of the brick grid, or ``None`` if the image data
+        has not yet been set.
+        """
+        if self.__ranges is None:
+            return None
+        return self.__ranges[0].shape
+
+
+    @property
+    def imageShape(self):
+        """Returns the shape of the image data, or ``None`` if it has not
+        yet been set.
+        """
+        return self.__imageShape
+
+
+    def setImageData(self, data):
+        """Set the 3D image data. The brick minimum/maximum values are
+        (re-)calculated, and the occupancy texture refreshed.
+        """
+
+        brickSize = self.__brickSize
+        overlap   = self.__overlap
+        result    = []
+
+        def calcRanges():
+
+            # A newer request has already
+            # been queued - don't bother
+            if self.__taskThread is not None and \
+               self.__taskThread.isQueued(self.__taskName):
+                raise idle.TaskThreadVeto()
+
+            result.append(calcBrickRanges(data, brickSize, overlap))
+
+        def rangesReady():
+
+            if self.__destroyed:
+                return
+
+            log.debug('{}: brick ranges calculated (image shape: {}, '
+                      'brick shape: {})'.format(type(self).__name__,
+                                                data.shape,
+                                                result[0][0].shape))
+
+            self.__imageShape = data.shape[:3]
+            self.__ranges     = result[0]
+            self.__refreshOccupancy()
+
+        # Invalidate the current occupancy
+        # until the new ranges are ready
+        self.__occupancy = None
+
+        if self.__taskThread is not None:
+            self.__taskThread.enqueue(calcRanges,
+                                      taskName=self.__taskName,
+                                      onFinish=rangesReady)
+        else:
+            calcRanges()
+            rangesReady()
+
+
+    def setThresholds(self,
+                      clipLow,
+                      clipHigh,
+                      displayLow,
+                      invertClip=False,
+                      useNegCmap=False,
+                      imageIsClip=True):
+        """Set the display and clipping settings, which are used to identify
+        empty bricks. All arguments are passed through to the
+        :func:`calcBrickOccupancy` function.
+        """
+
+        thresholds = (clipLow,
+                      clipHigh,
+                      displayLow,
+                      invertClip,
+                      useNegCmap,
+                      imageIsClip)
+
+        if thresholds == self.__thresholds:
+            return
+
+        self.__thresholds = thresholds
+        self.__refreshOccupancy()
+
+
+    def __refreshOccupancy(self):
+        """Called by :meth:`setImageData` and :meth:`setThresholds`.
+        Re-calculates the brick occupancy, and refreshes the texture data.
+        """
+
+        if self.__ranges is None or self.__thresholds is None:
+            return
+
+        mins, maxs = self.__ranges
+        occupancy  = calcBrickOccupancy(mins, maxs, *self.__thresholds)
+
+        # Don't refresh the texture
+        # if nothing has changed
+        if self.__occupancy is not None and \
+           np.array_equal(occupancy, self.__occupancy):
+            return
+
+        log.debug('{}: {} / {} bricks occupied'.format(
+            type(self).__name__, occupancy.sum(), occupancy.size))
+
+        self.__occupancy = occupancy
+        self.set(data=np.asarray(occupancy * 255, dtype=np.uint8))
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+#
+# edgemaptexture.py - The EdgeMapTexture class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`EdgeMapTexture` class, a
+:class:`.Texture3D` which is used by the :class:`.GLLabel` and
+:class:`.GLMask` classes to draw region outlines without having to run an
+edge detection filter every time the scene is drawn.
+
+
+The voxels of an image are first assigned to *classes* - for a label image
+(see :func:`labelClasses`), voxels are classified by their label value, with
+all voxels that are not drawn (e.g. with a value not in the
+:class:`.LookupTable`) assigned to a single background class. For a mask
+image (see :func:`maskClasses`), voxels are either inside or outside of the
+mask threshold range.
+
+
+The :func:`calcEdgeMap` function then compares every voxel with its
+neighbours along each voxel axis, and sets a bit for each axis along which
+the voxel lies on a boundary between two classes. The result is stored in a
+``uint8`` 3D texture, which the shader programs can sample to determine
+whether or not a fragment lies on an outline. Edges are identified separately
+for each axis so that, in 2D views, only boundaries which lie within the
+plane being displayed are drawn - the :func:`calcEdgeAxes` function can be
+used to identify the voxel axes which lie within the display plane.
+"""
+
+
+import logging
+
+import numpy     as np
+import OpenGL.GL as gl
+
+import fsl.utils.idle                     as idle
+from   fsl.utils.platform import platform as fslplatform
+
+from . import texture3d
+
+
+log = logging.getLogger(__name__)
+
+
+def labelClasses(data, labels):
+    """Classifies the voxels of a label image for edge detection. Voxel
+    values are rounded to the nearest integer, as is done by the
+    ``gllabel`` fragment shader.
+
+    :arg data:   3D ``numpy`` array containing the label image data.
+    :arg labels: Sequence of label values which are drawn (i.e. present in
+                 the :class:`.LookupTable`, and enabled).
+
+    :returns:    An ``int32`` array, containing the label value for voxels
+                 which are drawn, and ``-1`` for all other voxels.
+    """
+
+    data   = np.asarray(data)
+    labels = np.asarray(labels, dtype=np.int64)
+    labels = labels[labels >= 0]
+
+    if len(labels) == 0:
+        return np.full(data.shape, -1, dtype=np.int32)
+
+    drawn         = np.zeros(labels.max() + 1, dtype=np.bool_)
+    drawn[labels] = True
+
+    with np.errstate(invalid='ignore'):
+        values  = np.round(data)
+        inrange = (values >= 0) & (values < len(drawn))
+
+    values = np.where(inrange, values, 0).astype(np.int32)
+
+    return np.where(inrange & drawn[values], values, -1).astype(np.int32)
+
+
+def maskClasses(data, threshold, invert=False):
+    """Classifies the voxels of a mask image for edge detection. The logic
+    in this function must match that in the ``glmask`` fragment shader.
+
+    :arg data:      3D ``numpy`` array containing the mask image data.
+    :arg threshold: Tuple containing the ``(low, high)`` mask thresholds.
+    :arg invert:    If ``True``, the threshold range is inverted.
+
+    :returns:       A boolean array, ``True`` for voxels which are shown,
+                    ``False`` otherwise.
+    """
+
+    data   = np.asarray(data)
+    lo, hi = threshold
+
+    with np.errstate(invalid='ignore'):
+        if invert: return ~((data >= lo) & (data <= hi))
+        else:      return   (data >  lo) & (data <  hi)
+
+
+def calcEdgeMap(data, width=1, background=None):
+    """Identifies the voxels in ``data`` which lie on the boundary between two
+    classes.
+
+    :arg data:       3D ``numpy`` array, e.g. as returned by
+                     :func:`labelClasses` or :func:`maskClasses`.
+
+    :arg width:      Outline width, in voxels. A voxel is considered to be
+                     on an edge along an axis if any voxel within this
+                     distance along that axis has a different value.
+
+    :arg background: Value of voxels which lie outside of the image. If
+                     provided, voxels within ``width`` voxels of the image
+                     boundary, and with a different value, are considered
+                     to be on an edge.
+
+    :returns:        A ``uint8`` array of the same shape as ``data``. Bit
+                     ``i`` (i.e. ``1 << i``) of each value is set if the
+                     corresponding voxel lies on an edge along axis ``i``.
+    """
+
+    data = np.asarray(data)
+
+    if data.ndim < 3:
+        data = data.reshape(data.shape + (1,) * (3 - data.ndim))
+
+    edges = np.zeros(data.shape, dtype=np.uint8)
+
+    for axis in range(3):
+
+        bit = np.uint8(1 << axis)
+        n   = data.shape[axis]
+
+        for off in range(1, min(width, n - 1) + 1):
+            lo   = _axisSlice(axis, 0,   n - off)
+            hi   = _axisSlice(axis, off, n)
+            diff = data[lo] != data[hi]
+
+            _setBit(edges[lo], diff, bit)
+            _setBit(edges[hi], diff, bit)
+
+        if background is None or width <= 0:
+            continue
+
+        nb = min(width, n)
+        for slc in (_axisSlice(axis, 0, nb), _axisSlice(axis, n - nb, n)):
+            _setBit(edges[slc], data[slc] != background, bit)
+
+    return edges
+
+
+def calcEdgeAxes(displayToVoxMat, zax):
+    """Identifies the voxel axes along which edges should be drawn, when
+    displaying a 2D slice which is perpendicular to the display axis ``zax``.
+
+    :arg displayToVoxMat: Affine transformation from the display coordinate
+                          system to the image voxel coordinate system.
+    :arg zax:             Display coordinate system axis which is
+                          perpendicular to the displayed slice.
+
+    :returns:             A ``float32`` array containing three flags, ``1``
+                          for the voxel axes which lie within the displayed
+                          plane, and ``0`` for the voxel axis which is most
+                          closely aligned with the depth axis.
+    """
+
+    depth = np.abs(np.asarray(displayToVoxMat)[:3, zax])
+    axes  = np.ones(3, dtype=np.float32)
+
+    axes[np.argmax(depth)] = 0
+    return axes
+
+
+def _axisSlice(axis, start, stop):
+    """Used by :func:`calcEdgeMap`. Creates a slice object which selects
+    ``start:stop`` along ``axis``.
+    """
+    slc       = [slice(None)] * 3
+    slc[axis] = slice(start, stop)
+    return tuple(slc)
+
+
+def _setBit(edges, mask, bit):
+    """Used by :func:`calcEdgeMap`. Sets ``bit`` in all elements of ``edges``
+    for which ``mask`` is ``True``. The ``edges`` array is modified in place.
+    """
+    np.bitwise_or(edges, bit, out=edges, where=mask)
+
+
+class EdgeMapTexture(texture3d.Texture3D):
+    """The ``EdgeMapTexture`` is a :class:`.Texture3D` which contains, for
+    each voxel of an image, a set of flags indicating whether or not the voxel
+    lies on an edge along each voxel axis. See the module documentation for
+    details.
+
+    Use the :meth:`setImageData` method to set the image data. The edge map
+    is calculated on a separate thread (unless the ``threaded`` parameter to
+    :meth:`__init__` is ``False``). The ``EdgeMapTexture`` is not ready to
+    be used until the edge map has been calculated for the most recent
+    image data - use the :meth:`ready` method to test this.
+
+    Values stored in the texture are in the range ``[0, 7]``, so are read by
+    shader programs as ``value / 255``.
+    """
+
+
+    def __init__(self, name, threaded=None):
+        """Create an ``EdgeMapTexture``.
+
+        :arg name:     A unique name for the texture.
+        :arg threaded: If ``True``, the edge map, and the texture data, are
+                       calculated on a separate thread. Defaults to
+                       :attr:`.fsl.utils.platform.Platform.haveGui`.
+        """
+
+        if threaded is None:
+            threaded = fslplatform.haveGui
+
+        self.__imageShape = None
+        self.__width      = None
+        self.__valid      = False
+        self.__destroyed  = False
+
+        if threaded:
+            self.__taskThread = idle.TaskThread()
+            self.__taskName   = '{}_{}_edges'.format(type(self).__name__,
+                                                     id(self))
+            self.__taskThread.daemon = True
+            self.__taskThread.start()
+        else:
+            self.__taskThread = None
+            self.__taskName   = None
+
+        texture3d.Texture3D.__init__(self,
+                                     name,
+                                     threaded=threaded,
+                                     interp=gl.GL_NEAREST)
+
+
+    def destroy(self):
+        """Must be called when this ``EdgeMapTexture`` is no longer needed.
+        """
+
+        texture3d.Texture3D.destroy(self)
+
+        if self.__taskThread is not None:
+            self.__taskThread.stop()
+
+        self.__destroyed  = True
+        self.__valid      = False
+        self.__taskThread = None
+
+
+    def ready(self):
+        """Returns ``True`` if the edge map has been calculated for the most
+        recent image data, ``False`` otherwise.
+        """
+        return self.__valid and texture3d.Texture3D.ready(self)
+
+
+    @property
+    def imageShape(self):
+        """Returns the shape of the image data, or ``None`` if it has not
+        yet been set.
+        """
+        return self.__imageShape
+
+
+    @property
+    def width(self):
+        """Returns the outline width, in voxels, that was used to calculate
+        the current edge map.
+        """
+        return self.__width
+
+
+    def setImageData(self, data, width=1, classify=None, background=None):
+        """Set the 3D image data. The edge map is (re-)calculated, and the
+        texture refreshed.
+
+        :arg data:       3D ``numpy`` array containing the image data.
+
+        :arg width:      Outline width, in voxels - passed to
+                         :func:`calcEdgeMap`.
+
+        :arg classify:   Function which is passed the image data, and which
+                         returns an array of voxel classes (e.g.
+                         :func:`labelClasses` or :func:`maskClasses`).
+                         Called on the texture thread.
+
+        :arg background: Class of voxels which lie outside of the image -
+                         passed to :func:`calcEdgeMap`.
+        """
+
+        result = []
+
+        def calcEdges():
+
+            # A newer request has already
+            # been queued - don't bother
+            if self.__taskThread is not None and \
+               self.__taskThread.isQueued(self.__taskName):
+                raise idle.TaskThreadVeto()
+
+            if classify is None: classes = data
+            else:                classes = classify(data)
+
+            result.append(calcEdgeMap(classes, width, background))
+
+        def edgesReady():
+
+            if self.__destroyed:
+                return
+
+            log.debug('{}: edge map calculated (image shape: {}, '
+                      'width: {})'.format(type(self).__name__,
+                                          data.shape,
+                                          width))
+
+            self.__imageShape = data.shape[:3]
+            self.__width      = width
+            self.__valid      = True
+            self.set(data=result[0])
+
+        # Invalidate the current edge
+        # map until the new one is ready
+        self.__valid = False
+
+        if self.__taskThread is not None:
+            self.__taskThread.enqueue(calcEdges,
+                                      taskName=self.__taskName,
+                                      onFinish=edgesReady)
+        else:
+            calcEdges()
+            edgesReady()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python
+#
+# lightboxtexturestack.py - The LightBoxTextureStack class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`LightBoxTextureStack` class, which is
+used by the :class:`.LightBoxCanvas` in ``prerender`` mode to cache rendered
+slices of a :class:`.GLObject`.
+
+
+The :class:`.RenderTextureStack` used by the :class:`.SliceCanvas` creates a
+fixed number of textures, sized according to the resolution of the
+``GLObject``, and refreshes all of them whenever anything changes. This does
+not work well for a lightbox, which may display hundreds of slices at once,
+each of which may only occupy a small region of the screen. The
+``LightBoxTextureStack`` instead:
+
+  - Sizes each texture according to the size of one lightbox cell on the
+    screen (see :meth:`LightBoxTextureStack.setCellSize`).
+
+  - Only renders slices which are visible, or which are likely to become
+    visible soon - slices which are beyond the visible range in the current
+    scroll direction are pre-rendered before slices which are in the other
+    direction (see :func:`prioritiseSlices`).
+
+  - Limits the total amount of GPU memory used by its textures (see
+    :data:`MEMORY_BUDGET`). When the budget is exhausted, the least recently
+    used textures are re-used for new slices.
+"""
+
+
+from __future__ import division
+
+import logging
+import collections
+
+import numpy     as np
+import OpenGL.GL as gl
+
+import fsleyes.gl.routines as glroutines
+import fsl.utils.idle      as idle
+from . import                 rendertexture
+
+
+log = logging.getLogger(__name__)
+
+
+MEMORY_BUDGET = 128 * 1024 * 1024
+"""Default maximum number of bytes which may be used by the textures of a
+single :class:`LightBoxTextureStack`.
+"""
+
+
+MAX_TEXTURE_SIZE = 1024
+"""Maximum width/height of a single slice texture. """
+
+
+def prioritiseSlices(nslices, start, end, direction, capacity):
+    """Determines the order in which the slices of a lightbox should be
+    rendered.
+
+    :arg nslices:   Total number of slices.
+
+    :arg start:     Index of the first visible slice.
+
+    :arg end:       Index of the last visible slice, plus one.
+
+    :arg direction: Scroll direction - ``1`` if the lightbox was last
+                    scrolled towards higher slices, ``-1`` otherwise.
+
+    :arg capacity:  Maximum number of slices to return.
+
+    :returns:       A list of slice indices, ordered by priority. Visible
+                    slices are first, followed by slices ahead of the visible
+                    range in the scroll direction, interleaved with slices
+                    behind the visible range (two ahead for every one behind).
+    """
+
+    start  = max(0, min(start, nslices))
+    end    = max(start, min(end, nslices))
+    order  = list(range(start, end))
+    after  = list(range(end, nslices))
+    before = list(range(start - 1, -1, -1))
+
+    if direction >= 0: ahead, behind = after,  before
+    else:              ahead, behind = before, after
+
+    ai = 0
+    bi = 0
+
+    while len(order) < capacity and (ai < len(ahead) or bi < len(behind)):
+
+        for i in range(2):
+            if ai < len(ahead):
+                order.append(ahead[ai])
+                ai += 1
+
+        if bi < len(behind):
+            order.append(behind[bi])
+            bi += 1
+
+    return order[:max(0, capacity)]
+
+
+class LightBoxTextureStack(object):
+    """The ``LightBoxTextureStack`` manages a cache of :class:`.RenderTexture`
+    instances, each of which contains one slice of a :class:`.GLObject`, as
+    displayed in a :class:`.LightBoxCanvas`. See the module documentation for
+    details.
+
+    The ``LightBoxTextureStack`` has the same interface as the
+    :class:`.RenderTextureStack`, with the addition of the
+    :meth:`setCellSize` and :meth:`setVisibleSlices` methods, which must be
+    called by the ``LightBoxCanvas`` before it draws the visible slices.
+
+    .. note:: As with the ``RenderTextureStack``, the
+              :meth:`onGLObjectUpdate` method must be called whenever the
+              ``GLObject`` changes.
+    """
+
+
+    def __init__(self, globj, budget=None):
+        """Create a ``LightBoxTextureStack``.
+
+        :arg globj:  The :class:`.GLObject` instance.
+
+        :arg budget: Maximum number of bytes of texture memory to use.
+                     Defaults to :data:`MEMORY_BUDGET`.
+        """
+
+        if budget is None:
+            budget = MEMORY_BUDGET
+
+        self.name = '{}_{}_{}'.format(
+            type(self).__name__,
+            type(globj).__name__, id(self))
+
+        self.__globj     = globj
+        self.__budget    = budget
+        self.__xax       = 0
+        self.__yax       = 1
+        self.__zax       = 2
+        self.__width     = 256
+        self.__height    = 256
+
+        # Slice locations and visible
+        # range, as passed to
+        # setVisibleSlices
+        self.__zposes    = np.zeros(0)
+        self.__start     = 0
+        self.__end       = 0
+        self.__direction = 1
+
+        # Textures are stored in LRU order, as
+        # { zpos : RenderTexture }, with the least
+        # recently used texture first. Textures
+        # which need to be re-drawn are stored
+        # in the dirty set.
+        self.__textures  = collections.OrderedDict()
+        self.__dirty     = set()
+
+        # Pre-render queue, and the set
+        # of slices which are in it
+        self.__queue     = []
+        self.__wanted    = set()
+
+        log.debug('{}.init ({})'.format(type(self).__name__, id(self)))
+
+
+    def __del__(self):
+        """Prints a log message."""
+        if log:
+            log.debug('{}.del ({})'.format(type(self).__name__, id(self)))
+
+
+    def destroy(self):
+        """Must be called when this ``LightBoxTextureStack`` is no longer
+        needed. Destroys all :class:`.RenderTexture` instances.
+        """
+        self.__destroyTextures()
+        self.__queue  = []
+        self.__wanted = set()
+
+
+    def getGLObject(self):
+        """Returns the :class:`.GLObject` associated with this
+        ``LightBoxTextureStack``.
+        """
+        return self.__globj
+
+
+    @property
+    def capacity(self):
+        """Returns the maximum number of textures that can be stored within
+        the memory budget, at the current texture size.
+        """
+        nbytes = self.__width * self.__height * 4
+        return max(1, int(self.__budget // nbytes))
+
+
+    def setAxes(self, xax, yax):
+        """This method must be called when the display orientation of the
+        :class:`.GLObject` changes. Destroys all :class:`.RenderTexture`
+        instances.
+        """
+
+        self.__xax = xax
+        self.__yax = yax
+        self.__zax = 3 - xax - yax
+
+        self.__destroyTextures()
+        self.onGLObjectUpdate()
+
+
+    def setCellSize(self, width, height):
+        """Sets the size, in pixels, of one lightbox cell on the screen.
+        Slices are rendered to textures of this size (limited to
+        :data:`MAX_TEXTURE_SIZE`). If the size changes, all textures are
+        marked as dirty.
+        """
+
+        width  = int(max(1, min(np.ceil(width),  MAX_TEXTURE_SIZE)))
+        height = int(max(1, min(np.ceil(height), MAX_TEXTURE_SIZE)))
+
+        if (width, height) == (self.__width, self.__height):
+            return
+
+        log.debug('Lightbox cell size changed: {} x {}'.format(width, height))
+
+        self.__width  = width
+        self.__height = height
+
+        # Fewer textures may fit into
+        # the budget at the new size
+        while len(self.__textures) > self.capacity:
+            self.__evict()[1].destroy()
+
+        self.__refreshAllTextures()
+
+
+    def setVisibleSlices(self, zposes, start, end):
+        """Tells this ``LightBoxTextureStack`` which slices are displayed
+        by the lightbox, and which of them are currently visible. The
+        pre-render queue is re-generated if anything has changed.
+
+        :arg zposes: Z locations of all slices in the lightbox.
+        :arg start:  Index of the first visible slice.
+        :arg end:    Index of the last visible slice, plus one.
+        """
+
+        zposes  = np.asarray(zposes)
+        changed = (len(zposes) != len(self.__zposes) or
+                   not np.all(zposes == self.__zposes))
+
+        if not changed and (start, end) == (self.__start, self.__end):
+            return
+
+        if not changed:
+            if   start > self.__start: self.__direction =  1
+            elif start < self.__start: self.__direction = -1
+
+        self.__zposes = np.array(zposes)
+        self.__start  = start
+        self.__end    = end
+
+        self.__updateQueue()
+
+
+    def draw(self, zpos, xform=None):
+        """Draws the slice at the specified Z position, rendering it first
+        if it has not been rendered, or is out of date.
+
+        :arg zpos:  Position of slice to render.
+
+        :arg xform: Transformation matrix to apply to rendered slice vertices.
+        """
+
+        if not self.__globj.ready():
+            return
+
+        key     = self.__key(zpos)
+        texture = self.__textures.get(key, None)
+
+        if texture is None or key in self.__dirty:
+            texture = self.__refreshTexture(zpos)
+
+        # Mark as most recently used
+        else:
+            self.__textures[key] = self.__textures.pop(key)
+
+        lo, hi = self.__globj.getDisplayBounds()
+        xax    = self.__xax
+        yax    = self.__yax
+
+        texture.drawOnBounds(
+            zpos, lo[xax], hi[xax], lo[yax], hi[yax], xax, yax, xform)
+
+
+    def onGLObjectUpdate(self):
+        """Must be called called when the :class:`.GLObject` display is
+        updated. Marks all textures as dirty.
+        """
+        self.__refreshAllTextures()
+
+
+    def __key(self, zpos):
+        """Returns a key which is used to store the texture for the slice at
+        the given Z location.
+        """
+        return round(float(zpos), 5)
+
+
+    def __destroyTextures(self):
+        """Destroys all :class:`.RenderTexture` instances. This is performed
+        asynchronously, via the ``idle.idle`` function.
+        """
+
+        texes           = list(self.__textures.values())
+        self.__textures = collections.OrderedDict()
+        self.__dirty    = set()
+
+        for tex in texes:
+            idle.idle(tex.destroy)
+
+
+    def __refreshAllTextures(self):
+        """Marks all textures as dirty, and re-generates the pre-render
+        queue.
+        """
+        self.__dirty = set(self.__textures.keys())
+        self.__updateQueue()
+
+
+    def __updateQueue(self):
+        """Re-generates the pre-render queue, via :func:`prioritiseSlices`,
+        and schedules :meth:`__textureUpdateLoop` on :func:`.idle.idle`.
+        """
+
+        zposes = self.__zposes
+        order  = prioritiseSlices(len(zposes),
+                                  self.__start,
+                                  self.__end,
+                                  self.__direction,
+                                  self.capacity)
+
+        self.__queue  = [zposes[i] for i in order]
+        self.__wanted = set(self.__key(z) for z in self.__queue)
+
+        if len(self.__queue) > 0:
+            idle.idle(self.__textureUpdateLoop,
+                      name=self.name,
+                      skipIfQueued=True)
+
+
+    def __textureUpdateLoop(self):
+        """Called via :func:`.idle.idle`. Renders the next slice in the
+        pre-render queue, if it has not already been rendered, and then
+        re-schedules itself if there are more slices in the queue.
+        """
+
+        while len(self.__queue) > 0:
+
+            zpos = self.__queue.pop(0)
+            key  = self.__key(zpos)
+
+            if key in self.__textures and key not in self.__dirty:
+                continue
+
+            if self.__globj.ready():
+                self.__refreshTexture(zpos)
+            break
+
+        if len(self.__queue) > 0:
+            idle.idle(self.__textureUpdateLoop,
+                      name=self.name,
+                      skipIfQueued=True)
+
+
+    def __evict(self):
+        """Removes and returns a ``(key, RenderTexture)`` pair from the
+        cache. The least recently used texture which is not in the
+        pre-render queue is chosen or, if all textures are in the queue, the
+        least recently used texture.
+        """
+
+        evict = None
+        for key in self.__textures.keys():
+            if key not in self.__wanted:
+                evict = key
+                break
+
+        if evict is None:
+            evict = next(iter(self.__textures.keys()))
+
+        self.__dirty.discard(evict)
+
+        return evict, self.__textures.pop(evict)
+
+
+    def __getTexture(self, key):
+        """Returns a :class:`.RenderTexture` to be used for the slice with
+        the given key. An existing texture is returned if there is one,
+        otherwise a new one is created or, if the memory budget has been
+        reached, an evicted one is re-used.
+        """
+
+        tex = self.__textures.pop(key, None)
+
+        if tex is None:
+            if len(self.__textures) >= self.capacity:
+                evicted, tex = self.__evict()
+                log.debug('Re-using texture for slice {} '
+                          '(evicted {})'.format(key, evicted))
+            else:
+                tex = rendertexture.RenderTexture(
+                    '{}_{}'.format(self.name, key), rttype='c')
+
+        self.__textures[key] = tex
+
+        return tex
+
+
+    def __refreshTexture(self, zpos):
+        """Renders the slice at the given Z location to a texture, and
+        returns the texture.
+        """
+
+        globj  = self.__globj
+        key    = self.__key(zpos)
+        tex    = self.__getTexture(key)
+        xax    = self.__xax
+        yax    = self.__yax
+        axes   = (self.__xax, self.__yax, self.__zax)
+        width  = self.__width
+        height = self.__height
+        lo, hi = globj.getDisplayBounds()
+
+        log.debug('Refreshing lightbox texture for slice (zpos {}, '
+                  'zax {}): {} x {}'.format(zpos, self.__zax, width, height))
+
+        if tex.getSize() != (width, height):
+            tex.setSize(width, height)
+
+        oldSize    = gl.glGetIntegerv(gl.GL_VIEWPORT)
+        oldProjMat = gl.glGetFloatv(  gl.GL_PROJECTION_MATRIX)
+        oldMVMat   = gl.glGetFloatv(  gl.GL_MODELVIEW_MATRIX)
+
+        tex.bindAsRenderTarget()
+        glroutines.show2D(xax, yax, width, height, lo, hi)
+        glroutines.clear((0, 0, 0, 0))
+
+        with glroutines.disabled(gl.GL_BLEND):
+            globj.preDraw()
+            globj.draw2D(zpos, axes)
+            globj.postDraw()
+
+        tex.unbindAsRenderTarget()
+
+        gl.glViewport(*oldSize)
+        gl.glMatrixMode(gl.GL_PROJECTION)
+        gl.glLoadMatrixf(oldProjMat)
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        gl.glLoadMatrixf(oldMVMat)
+
+        self.__dirty.discard(key)
+
+        return tex
@@ -16,6 +16,7 @@ import numpy     as np
 import OpenGL.GL as gl
 
 import fsl.utils.transform as transform
+import fsleyes.gl.glstate  as glstate
 import fsleyes.gl.routines as glroutines
 
 
@@ -129,6 +130,7 @@ class Texture(object):
                                                        self.__name,
                                                        self.__texture))
 
+        glstate.forgetTexture(self.__texture)
         gl.glDeleteTextures(self.__texture)
         self.__texture = None
 
@@ -162,10 +164,7 @@ class Texture(object):
                           ``GL_TEXTURE0``.
         """
 
-        if textureUnit is not None:
-            gl.glActiveTexture(textureUnit)
-
-        gl.glBindTexture(self.__ttype, self.__texture)
+        glstate.bindTexture(self.__ttype, self.__texture, textureUnit)
 
         self.__bound       = True
         self.__textureUnit = textureUnit
@@ -174,10 +173,7 @@ class Texture(object):
     def unbindTexture(self):
         """Unbinds this texture. """
 
-        if self.__textureUnit is not None:
-            gl.glActiveTexture(self.__textureUnit)
-
-        gl.glBindTexture(self.__ttype, 0)
+        glstate.bindTexture(self.__ttype, 0, self.__textureUnit)
 
         self.__bound       = False
         self.__textureUnit = None
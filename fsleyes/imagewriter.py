@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+#
+# imagewriter.py - Chunked, parallel and atomic saving of images.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides functions for saving an :class:`.Image` to a NIFTI
+file without blocking the GUI, and without taking a full copy of the image
+data:
+
+.. autosummary::
+   :nosignatures:
+
+   canWrite
+   snapshot
+   writeImage
+   markSaved
+
+
+The image data is saved in three steps:
+
+ 1. A *snapshot* of the image data is taken via the :func:`snapshot`
+    function (on the main thread). The snapshot is a
+    :class:`.CopyOnWriteDataProxy`, so no data is copied - the data of a
+    chunk is only copied if the image is modified (e.g. by the
+    :class:`.Editor`) before that chunk has been saved.
+
+ 2. The snapshot is written to file by the :func:`writeImage` function,
+    which may be called on a separate thread. The data is written in blocks
+    (volume by volume, or slab by slab), to a temporary file in the same
+    directory as the destination file, which is then renamed to the
+    destination file, so the destination is never partially written. Blocks
+    of ``.nii.gz`` files are compressed in parallel on a
+    :class:`.WorkerPool` - each block is compressed independently, and the
+    compressed blocks are concatenated into a single ``gzip`` stream, in the
+    same way as by ``pigz``. A progress function may be used to monitor
+    progress and to cancel the save.
+
+ 3. Once the file has been written, :func:`markSaved` is called (on the main
+    thread) to update the image :attr:`.Image.dataSource` and
+    :attr:`.Image.saveState`.
+"""
+
+
+import io
+import os
+import stat
+import struct
+import logging
+import tempfile
+import zlib
+
+import os.path as op
+
+import numpy   as np
+import nibabel as nib
+
+import fsl.data.image           as fslimage
+import fsleyes.workerpool       as workerpool
+import fsleyes.copyonwriteimage as copyonwriteimage
+
+
+log = logging.getLogger(__name__)
+
+
+BLOCK_SIZE = 8 * 1048576
+"""Approximate size, in bytes, of the blocks that image data is written and
+compressed in.
+"""
+
+
+COMPRESS_LEVEL = 1
+"""Default ``gzip`` compression level used by :func:`writeImage` - this is
+the same as that used by ``nibabel``.
+"""
+
+
+class WriteCancelled(Exception):
+    """Raised by :func:`writeImage` when the save is cancelled via the
+    progress function.
+    """
+    pass
+
+
+def canWrite(image, path):
+    """Returns ``True`` if the given ``image`` can be saved to ``path`` via
+    :func:`writeImage`, ``False`` otherwise. Only NIFTI images which are to
+    be saved to a single ``.nii`` or ``.nii.gz`` file are supported - other
+    images must be saved via :meth:`.Image.save`.
+    """
+
+    if not _canSetSaveState(image):
+        return False
+
+    return isinstance(image.header, nib.nifti1.Nifti1Header) and \
+        fslimage.getExt(path) in ('.nii', '.nii.gz')
+
+
+def snapshot(image):
+    """Takes a snapshot of the data of the given ``image``. Must be called
+    on the main thread. Returns a ``(data, header)`` tuple which can be
+    passed to :func:`writeImage`. The snapshot data is not affected by
+    subsequent changes to the image data, as long as those changes are
+    made via the :class:`.Editor` (see :func:`.copyonwriteimage.prepareWrite`).
+
+    The ``data`` is a :class:`.CopyOnWriteDataProxy` - its ``detach`` method
+    should be called when it is no longer needed.
+    """
+
+    shape  = image.shape
+    offset = [0] * len(shape)
+    dtype  = np.asarray(image[tuple(offset)]).dtype
+    data   = copyonwriteimage.CopyOnWriteDataProxy(image, shape, dtype)
+
+    return data, image.header.copy()
+
+
+def writeImage(data,
+               header,
+               path,
+               compresslevel=None,
+               nworkers=None,
+               progfunc=None,
+               blockSize=None):
+    """Writes the given image ``data`` and ``header`` to a NIFTI file. May
+    be called on a separate thread.
+
+    :arg data:          Array-like containing the image data, e.g. as
+                        returned by :func:`snapshot`.
+
+    :arg header:        NIFTI header to save. A copy is taken and updated
+                        with the shape and data type of the ``data``.
+
+    :arg path:          Destination file - must end in ``.nii`` or
+                        ``.nii.gz``.
+
+    :arg compresslevel: ``gzip`` compression level (``0`` to ``9``).
+                        Defaults to :data:`COMPRESS_LEVEL`.
+
+    :arg nworkers:      Number of threads to use for compression. If ``1``,
+                        compression is performed on the calling thread.
+                        Defaults to :func:`.workerpool.defaultNumWorkers`.
+
+    :arg progfunc:      Function which is called, on the calling thread,
+                        after each block has been written, and which is
+                        passed the number of written blocks, and the total
+                        number of blocks. If it returns ``False``, the save
+                        is cancelled, and a :exc:`WriteCancelled` error is
+                        raised.
+
+    :arg blockSize:     Defaults to :data:`BLOCK_SIZE`.
+
+    The destination file is only created/overwritten once all of the data
+    has been successfully written.
+    """
+
+    if compresslevel is None: compresslevel = COMPRESS_LEVEL
+    if nworkers      is None: nworkers      = workerpool.defaultNumWorkers()
+    if blockSize     is None: blockSize     = BLOCK_SIZE
+
+    path    = op.abspath(path)
+    gzipped = fslimage.getExt(path) == '.nii.gz'
+    header  = _prepareHeader(header, data.shape, data.dtype)
+    dtype   = header.get_data_dtype()
+    blocks  = _blocks(data.shape, dtype.itemsize, blockSize)
+    tmphd, tmpfile = tempfile.mkstemp(prefix='.{}.'.format(op.basename(path)),
+                                      dir=op.dirname(path))
+
+    log.debug('Writing %s (%u blocks, gzip: %s, %u workers)',
+              path, len(blocks), gzipped, nworkers)
+
+    def pieces():
+        yield _headerBytes(header)
+        for block in blocks:
+            yield np.asarray(data[block], dtype=dtype).tobytes(order='F')
+
+    def progress(i):
+        if i > 0 and progfunc is not None and \
+           progfunc(i, len(blocks)) is False:
+            raise WriteCancelled()
+
+    try:
+        with os.fdopen(tmphd, 'wb') as f:
+
+            if not gzipped:
+                for i, piece in enumerate(pieces()):
+                    f.write(piece)
+                    progress(i)
+
+            elif nworkers <= 1:
+                _writeGzip(f, pieces(), compresslevel, progress)
+            else:
+                _writeParallelGzip(f,
+                                   pieces(),
+                                   len(blocks) + 1,
+                                   compresslevel,
+                                   nworkers,
+                                   progress)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        _setMode(tmpfile, path)
+        _replace(tmpfile, path)
+
+    except Exception:
+        if op.exists(tmpfile):
+            os.remove(tmpfile)
+        raise
+
+    return path
+
+
+def markSaved(image, path, modified=False):
+    """Must be called on the main thread, after the data of ``image`` has
+    been saved to ``path`` via :func:`writeImage`. Sets the
+    :attr:`.Image.dataSource` of the image to ``path``, and, unless
+    ``modified`` is ``True`` (meaning that the image has been modified since
+    its :func:`snapshot` was taken), marks the image as saved. A saved
+    :class:`.CopyOnWriteImage` is detached from its source (see
+    :meth:`.CopyOnWriteImage.detach`).
+    """
+
+    path = op.abspath(path)
+
+    # A copy which has been saved no longer
+    # needs its source - it reads any data
+    # that has not been modified from the
+    # saved file. If the image has been
+    # modified since the snapshot, the file
+    # does not contain its current data, so
+    # it must remain attached.
+    if isinstance(image, copyonwriteimage.CopyOnWriteImage) and \
+       not modified:
+        image.detach(path)
+        image.clearModified()
+
+    _setSaveState(image, path, not modified)
+
+
+_SAVE_STATE_ATTRIBUTES = ('_Image__dataSource', '_Image__saveState')
+"""Private :class:`.Image` attributes which are updated by
+:func:`_setSaveState`.
+"""
+
+
+def _canSetSaveState(image):
+    """Used by :func:`canWrite`. Returns ``True`` if :func:`_setSaveState`
+    is able to update the save state of the given image, ``False`` (and logs
+    a warning) otherwise.
+    """
+
+    missing = [a for a in _SAVE_STATE_ATTRIBUTES if not hasattr(image, a)]
+
+    if len(missing) > 0:
+        log.warning('Unable to update save state of %s (missing %s) - '
+                    'background saving is disabled', image.name, missing)
+        return False
+
+    return True
+
+
+def _setSaveState(image, path, saved):
+    """Used by :func:`markSaved`. Sets the :attr:`.Image.dataSource` of
+    ``image`` to ``path`` and, if ``saved`` is ``True``, marks the image as
+    saved.
+
+    The :class:`.Image` class does not provide any way to update its save
+    state, other than via :meth:`.Image.save`, so this function (and
+    :func:`_canSetSaveState`) is the only place where its private attributes
+    are accessed.
+    """
+
+    dsattr, ssattr = _SAVE_STATE_ATTRIBUTES
+
+    setattr(image, dsattr, path)
+
+    if saved:
+        setattr(image, ssattr, True)
+        image.notify(topic='saveState')
+
+
+def _prepareHeader(header, shape, dtype):
+    """Used by :func:`writeImage`. Returns a copy of the given NIFTI
+    ``header``, updated for a single-file image with the given shape and
+    data type.
+    """
+
+    header = header.copy()
+
+    header.set_data_shape(shape)
+    header.set_data_dtype(dtype)
+    header.set_slope_inter(1, 0)
+
+    if isinstance(header, nib.nifti2.Nifti2Header): header['magic'] = b'n+2'
+    else:                                            header['magic'] = b'n+1'
+
+    offset = header.single_vox_offset + header.extensions.get_sizeondisk()
+    header.set_data_offset(offset)
+
+    return header
+
+
+def _headerBytes(header):
+    """Used by :func:`writeImage`. Returns the given NIFTI ``header``,
+    including any extensions, as a sequence of bytes, padded to the data
+    offset.
+    """
+
+    buf = io.BytesIO()
+    header.write_to(buf)
+    hdr = buf.getvalue()
+    pad = header.get_data_offset() - len(hdr)
+
+    return hdr + b'\0' * pad
+
+
+def _blocks(shape, itemsize, blockSize):
+    """Used by :func:`writeImage`. Splits an image with the given shape into
+    blocks along its last (non-trivial) axis, and returns a list of slice
+    objects, one for each block. The data for each block, stored in
+    column-major order, forms a contiguous part of the full image data.
+    """
+
+    axis = len(shape) - 1
+    while axis > 0 and shape[axis] == 1:
+        axis -= 1
+
+    stride = itemsize * int(np.prod(shape[:axis]))
+    length = int(max(1, blockSize // max(stride, 1)))
+    blocks = []
+
+    for start in range(0, shape[axis], length):
+        block       = [slice(None)] * len(shape)
+        block[axis] = slice(start, min(start + length, shape[axis]))
+        blocks.append(tuple(block))
+
+    return blocks
+
+
+def _gzipHeader():
+    """Returns a minimal ``gzip`` member header. """
+    # magic, deflate, no flags, no mtime,
+    # no extra flags, unknown OS
+    return b'\x1f\x8b\x08\x00' + struct.pack('<I', 0) + b'\x00\xff'
+
+
+def _gzipTrailer(crc, size):
+    """Returns a ``gzip`` member trailer containing the given CRC32 and
+    uncompressed size.
+    """
+    return struct.pack('<II', crc & 0xffffffff, size & 0xffffffff)
+
+
+def _writeGzip(f, pieces, compresslevel, progress):
+    """Used by :func:`writeImage`. Compresses the data in ``pieces`` on the
+    calling thread, writing it as a single ``gzip`` stream to ``f``.
+    """
+
+    comp = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc  = 0
+    size = 0
+
+    f.write(_gzipHeader())
+
+    for i, piece in enumerate(pieces):
+        crc   = zlib.crc32(piece, crc)
+        size += len(piece)
+        f.write(comp.compress(piece))
+        progress(i)
+
+    f.write(comp.flush())
+    f.write(_gzipTrailer(crc, size))
+
+
+def _compress(piece, compresslevel, last):
+    """Used by :func:`_writeParallelGzip`. Compresses ``piece`` into a raw
+    ``deflate`` stream which, unless ``last is True``, is ended with a full
+    flush, so that it can be concatenated with the stream for the next piece.
+    """
+    comp = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = comp.compress(piece)
+    if last: data += comp.flush(zlib.Z_FINISH)
+    else:    data += comp.flush(zlib.Z_FULL_FLUSH)
+    return data
+
+
+def _writeParallelGzip(f, pieces, npieces, compresslevel, nworkers, progress):
+    """Used by :func:`writeImage`. Compresses the data in ``pieces`` on a
+    :class:`.WorkerPool`, writing it as a single ``gzip`` stream to ``f``.
+    The number of pieces which are in memory at any one time is limited to
+    twice the number of workers.
+    """
+
+    pool    = workerpool.WorkerPool(nworkers, name='imagewriter')
+    window  = 2 * nworkers
+    pending = []
+    crc     = 0
+    size    = 0
+
+    def finishOne(i):
+        job = pending.pop(0)
+        job.wait()
+        if job.error is not None:
+            raise job.error
+        f.write(job.result)
+        progress(i)
+
+    try:
+        f.write(_gzipHeader())
+
+        written = 0
+        for i, piece in enumerate(pieces):
+
+            crc   = zlib.crc32(piece, crc)
+            size += len(piece)
+            job   = pool.submit(_compress,
+                                piece,
+                                compresslevel,
+                                i == npieces - 1)
+            pending.append(job)
+
+            if len(pending) >= window:
+                finishOne(written)
+                written += 1
+
+        while len(pending) > 0:
+            finishOne(written)
+            written += 1
+
+        f.write(_gzipTrailer(crc, size))
+
+    finally:
+        pool.stop()
+
+
+def _setMode(tmpfile, path):
+    """Used by :func:`writeImage`. Gives the temporary file the permissions
+    of the destination file, if it exists, or the default permissions
+    otherwise (temporary files are only readable by their owner).
+    """
+
+    if op.exists(path):
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode  = 0o666 & ~umask
+
+    os.chmod(tmpfile, mode)
+
+
+def _replace(src, dest):
+    """Used by :func:`writeImage`. Atomically renames ``src`` to ``dest``,
+    replacing ``dest`` if it exists.
+    """
+
+    # os.replace is not available in python 2,
+    # but os.rename is atomic on POSIX systems.
+    replace = getattr(os, 'replace', None)
+
+    if replace is not None:
+        replace(src, dest)
+    else:
+        if os.name == 'nt' and op.exists(dest):
+            os.remove(dest)
+        os.rename(src, dest)
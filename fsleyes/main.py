@@ -184,7 +184,8 @@ class FSLeyesApp(wx.App):
         loadoverlay.loadOverlays(
             filenames,
             onLoad=onLoad,
-            inmem=self.__displayCtx.loadInMemory)
+            inmem=self.__displayCtx.loadInMemory,
+            progressive=True)
 
 
 def main(args=None):
@@ -519,6 +520,13 @@ def initialise(splash, namespace, callback):
     # when the GL context is ready to be used.
     def realCallback():
         fslgl.bootstrap(namespace.glversion)
+
+        # Compile commonly used shader
+        # programs while the splash
+        # screen is being shown
+        import fsleyes.gl.shaders as shaders
+        shaders.warmUp()
+
         callback()
 
     try:
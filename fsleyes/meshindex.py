@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+#
+# meshindex.py - Spatial acceleration structures for picking on meshes.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`MeshIndex` class, and the
+:func:`getIndex` function, which are used to accelerate vertex and triangle
+picking on :class:`.Mesh` overlays.
+
+
+A ``MeshIndex`` contains two structures:
+
+  - A KD-tree over the mesh vertices (a ``scipy.spatial.cKDTree``), used to
+    find the vertex nearest to a point.
+
+  - A bounding volume hierarchy (BVH) over the mesh triangles, used to
+    calculate ray-mesh intersections. The triangles are sorted along a
+    Z-order (Morton) curve, and grouped into leaves of :data:`LEAF_SIZE`
+    triangles. The tree is built bottom-up by merging the bounding boxes of
+    adjacent nodes, and is traversed one level at a time, testing all
+    candidate nodes at each level at once.
+
+
+Both structures are built the first time they are needed. A single
+``MeshIndex`` is shared between all users of a :class:`.Mesh` and its
+current vertex set - use the :func:`getIndex` function to retrieve it,
+rather than creating a ``MeshIndex`` directly.
+"""
+
+
+import logging
+import threading
+import weakref
+
+import numpy         as np
+import scipy.spatial as spatial
+
+
+log = logging.getLogger(__name__)
+
+
+LEAF_SIZE = 32
+"""Number of triangles in each leaf node of the BVH. """
+
+
+_indices = weakref.WeakKeyDictionary()
+"""Dictionary of ``{mesh : (key, MeshIndex)}`` mappings, used by
+:func:`getIndex`.
+"""
+
+
+_indicesLock = threading.Lock()
+"""Lock protecting access to the :data:`_indices` dictionary. """
+
+
+def getIndex(mesh):
+    """Returns a :class:`MeshIndex` for the current vertex set of the given
+    :class:`.Mesh`, creating it if necessary. The index is re-created if the
+    mesh vertices have changed since it was created.
+    """
+
+    vertices = mesh.vertices
+    key      = (id(vertices), vertices.shape, id(mesh.indices))
+
+    with _indicesLock:
+
+        entry = _indices.get(mesh, None)
+
+        if entry is None or entry[0] != key:
+            entry         = (key, MeshIndex(vertices, mesh.indices))
+            _indices[mesh] = entry
+
+        return entry[1]
+
+
+def mortonCodes(points, bits=10):
+    """Calculates a Z-order (Morton) code for each of the given points.
+
+    :arg points: ``(N, 3)`` array of points
+    :arg bits:   Number of bits used to quantise each axis.
+    :returns:    ``(N,)`` ``uint64`` array of Morton codes.
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    lo     = points.min(axis=0)
+    extent = points.max(axis=0) - lo
+    extent[extent == 0] = 1
+
+    scale  = (2 ** bits) - 1
+    quant  = ((points - lo) / extent * scale).astype(np.uint64)
+    codes  = np.zeros(len(points), dtype=np.uint64)
+
+    for bit in range(bits):
+        for axis in range(3):
+            b      = (quant[:, axis] >> np.uint64(bit)) & np.uint64(1)
+            codes |= b << np.uint64(3 * bit + axis)
+
+    return codes
+
+
+def rayBoxIntersection(origin, direction, mins, maxs):
+    """Tests whether a ray intersects a set of axis-aligned bounding boxes.
+
+    :arg origin:    Ray origin
+    :arg direction: Ray direction
+    :arg mins:      ``(N, 3)`` array of box minimum corners
+    :arg maxs:      ``(N, 3)`` array of box maximum corners
+    :returns:       ``(N,)`` boolean array, ``True`` for boxes which are
+                    intersected by the ray.
+    """
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        invdir = 1.0 / direction
+        t1     = (mins - origin) * invdir
+        t2     = (maxs - origin) * invdir
+
+        # fmin/fmax ignore the nans that are
+        # produced when the ray is parallel
+        # to, and lies on, a box face
+        tnear = np.fmin(t1, t2).max(axis=1)
+        tfar  = np.fmax(t1, t2).min(axis=1)
+
+    return (tnear <= tfar) & (tfar >= 0)
+
+
+def rayTriangleIntersection(origin, direction, triangles, eps=1e-9):
+    """Calculates the intersection between a ray and a set of triangles,
+    using the Moller-Trumbore algorithm.
+
+    :arg origin:    Ray origin
+    :arg direction: Ray direction
+    :arg triangles: ``(N, 3, 3)`` array of triangle vertices
+    :returns:       ``(N,)`` array containing the distance along the ray (in
+                    units of ``direction``) to each triangle, or ``inf`` for
+                    triangles which are not intersected.
+    """
+
+    v0 = triangles[:, 0, :]
+    e1 = triangles[:, 1, :] - v0
+    e2 = triangles[:, 2, :] - v0
+
+    p   = np.cross(direction, e2)
+    det = np.einsum('ij,ij->i', e1, p)
+    ok  = np.abs(det) > eps
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        invdet = 1.0 / det
+        s      = origin - v0
+        u      = np.einsum('ij,ij->i', s, p) * invdet
+        q      = np.cross(s, e1)
+        v      = np.dot(q, direction) * invdet
+        t      = np.einsum('ij,ij->i', e2, q) * invdet
+
+    ok &= (u >= -eps) & (v >= -eps) & (u + v <= 1 + eps) & (t >= 0)
+
+    return np.where(ok, t, np.inf)
+
+
+class MeshIndex(object):
+    """The ``MeshIndex`` provides accelerated nearest-vertex and ray
+    intersection queries for a triangle mesh. See the module documentation
+    for details.
+    """
+
+
+    def __init__(self, vertices, indices, leafSize=None):
+        """Create a ``MeshIndex``. You should use the :func:`getIndex`
+        function instead of creating a ``MeshIndex`` directly.
+
+        :arg vertices: ``(N, 3)`` array of mesh vertices.
+        :arg indices:  ``(M, 3)`` array of mesh triangles.
+        :arg leafSize: Number of triangles in each BVH leaf. Defaults to
+                       :data:`LEAF_SIZE`.
+        """
+
+        if leafSize is None:
+            leafSize = LEAF_SIZE
+
+        self.__vertices = np.asarray(vertices, dtype=np.float64)
+        self.__indices  = np.asarray(indices)
+        self.__leafSize = leafSize
+        self.__lock     = threading.Lock()
+        self.__kdtree   = None
+        self.__bvh      = None
+
+
+    @property
+    def kdtree(self):
+        """Returns a ``scipy.spatial.cKDTree`` over the mesh vertices,
+        building it if necessary.
+        """
+        with self.__lock:
+            if self.__kdtree is None:
+                log.debug('Building vertex KD-tree (%u vertices)',
+                          len(self.__vertices))
+                self.__kdtree = spatial.cKDTree(self.__vertices)
+            return self.__kdtree
+
+
+    @property
+    def bvh(self):
+        """Returns the triangle BVH, building it if necessary. The BVH is
+        a tuple containing:
+
+          - A ``(M,)`` array containing the triangle indices, in the order
+            that they are stored in the BVH leaves.
+
+          - A list of ``(mins, maxs)`` tuples, one for each level of the
+            tree, from the root to the leaves, containing the bounding box
+            of every node in the level. The children of node ``i`` are nodes
+            ``2i`` and ``2i + 1`` (if present) in the next level.
+        """
+        with self.__lock:
+            if self.__bvh is None:
+                self.__bvh = self.__buildBVH()
+            return self.__bvh
+
+
+    def __buildBVH(self):
+        """Builds the triangle BVH - see the :meth:`bvh` property. """
+
+        verts    = self.__vertices
+        leafSize = self.__leafSize
+        tris     = verts[self.__indices]
+        ntris    = len(tris)
+
+        log.debug('Building triangle BVH (%u triangles)', ntris)
+
+        order  = np.argsort(mortonCodes(tris.mean(axis=1)), kind='stable')
+        tris   = tris[order]
+        starts = np.arange(0, ntris, leafSize)
+        mins   = np.minimum.reduceat(tris.min(axis=1), starts, axis=0)
+        maxs   = np.maximum.reduceat(tris.max(axis=1), starts, axis=0)
+        levels = [(mins, maxs)]
+
+        while len(mins) > 1:
+
+            # Pad odd-sized levels by duplicating the
+            # last node, so it becomes its own sibling
+            if len(mins) % 2:
+                mins = np.concatenate((mins, mins[-1:]))
+                maxs = np.concatenate((maxs, maxs[-1:]))
+
+            mins = np.minimum(mins[0::2], mins[1::2])
+            maxs = np.maximum(maxs[0::2], maxs[1::2])
+            levels.insert(0, (mins, maxs))
+
+        return order, levels
+
+
+    def nearestVertex(self, points, tolerance=None):
+        """Identifies the nearest vertex to each of the given points.
+
+        :arg points:    A ``(N, 3)`` array of points, or a single point.
+
+        :arg tolerance: Maximum distance between a point and its nearest
+                        vertex. Points which are further than this from
+                        every vertex are given an index of ``-1``.
+
+        :returns:       A tuple containing:
+
+                         - A ``(N,)`` array containing the index of the
+                           nearest vertex to each point.
+
+                         - A ``(N,)`` array containing the distance from each
+                           point to its nearest vertex (``inf`` for points
+                           which are not within the ``tolerance``).
+
+                        If a single point is given, a single index and
+                        distance are returned.
+        """
+
+        points = np.asarray(points, dtype=np.float64)
+        single = points.ndim == 1
+        points = points.reshape((-1, 3))
+
+        # cKDTree.query excludes points which
+        # are exactly at distance_upper_bound
+        if tolerance is None: tolerance = np.inf
+        else:                 tolerance = tolerance + 1e-9
+
+        dists, idxs = self.kdtree.query(points, distance_upper_bound=tolerance)
+        idxs        = np.asarray(idxs, dtype=np.int64)
+
+        idxs[~np.isfinite(dists)] = -1
+
+        if single: return idxs[0], dists[0]
+        else:      return idxs,    dists
+
+
+    def rayIntersection(self, origin, direction):
+        """Calculates the nearest intersection between the mesh and the ray
+        defined by ``origin`` and ``direction``.
+
+        :returns: A tuple containing the intersection point, and the index
+                  of the intersected triangle, or ``(None, None)`` if the
+                  ray does not intersect the mesh.
+        """
+
+        origin    = np.asarray(origin,    dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+
+        if len(self.__indices) == 0:
+            return None, None
+
+        order, levels = self.bvh
+        leafSize      = self.__leafSize
+        nodes         = np.zeros(1, dtype=np.int64)
+
+        # Descend the tree one level at a
+        # time, keeping the nodes which are
+        # intersected by the ray
+        for i, (mins, maxs) in enumerate(levels):
+
+            if i > 0:
+                nodes = np.concatenate((2 * nodes, 2 * nodes + 1))
+                nodes = nodes[nodes < len(mins)]
+
+            hits  = rayBoxIntersection(origin,
+                                       direction,
+                                       mins[nodes],
+                                       maxs[nodes])
+            nodes = nodes[hits]
+
+            if len(nodes) == 0:
+                return None, None
+
+        # Test every triangle
+        # in the intersected leaves
+        tris = (nodes[:, None] * leafSize + np.arange(leafSize)).ravel()
+        tris = order[tris[tris < len(order)]]
+        dist = rayTriangleIntersection(
+            origin, direction, self.__vertices[self.__indices[tris]])
+        near = np.argmin(dist)
+
+        if not np.isfinite(dist[near]):
+            return None, None
+
+        return origin + dist[near] * direction, int(tris[near])
@@ -58,6 +58,8 @@ Currently (``fsleyes`` version |version|) the only overlay types in existence
    ~fsl.data.vtk.VTKMesh
    ~fsl.data.gifti.GiftiMesh
    ~fsl.data.freesurfer.FreesurferMesh
+   ~fsleyes.resampledimage.ResampledImage
+   ~fsleyes.copyonwriteimage.CopyOnWriteImage
 
 
 This module also provides a few convenience classes and functions:
@@ -74,6 +76,7 @@ This module also provides a few convenience classes and functions:
 import os.path as op
 import            logging
 import            weakref
+import            contextlib
 
 import fsl.utils.deprecated as deprecated
 import fsl.data.utils       as dutils
@@ -101,6 +104,14 @@ class OverlayList(props.HasProperties):
 
     The :meth:`getData` and :meth:`setData` methods allow arbitrary bits
     of data associated with an overlay to be stored and retrieved.
+
+    The :meth:`batch` method can be used to make several changes to the
+    ``OverlayList``, with listeners only being notified once, after all of
+    the changes have been made::
+
+        with overlayList.batch():
+            for overlay in overlays:
+                overlayList.append(overlay)
     """
 
 
@@ -186,6 +197,36 @@ class OverlayList(props.HasProperties):
             self.__overlayData[overlay] = {key : value}
 
 
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager which may be used to make multiple changes to the
+        ``OverlayList``. Listeners registered on the :attr:`overlays` property
+        are not notified of each individual change - they are notified once,
+        when the outermost ``batch`` block exits, if the list has changed.
+
+        Calls to ``batch`` may be nested. Note that, within a ``batch``
+        block, listeners (e.g. :class:`.DisplayContext` instances) will
+        not have been told about any overlays which have been added.
+        """
+
+        old = list(self.overlays)
+
+        try:
+            with props.suppress(self, 'overlays'):
+                yield
+
+        # Listeners are notified even if an
+        # error occurred, so they do not get
+        # out of sync with the list. The
+        # notification has no effect if we
+        # are within another batch block.
+        finally:
+            new = list(self.overlays)
+            if len(old) != len(new) or \
+               any(o is not n for o, n in zip(old, new)):
+                self.propNotify('overlays')
+
+
     def find(self, name):
         """Returns the first overlay with the given ``name`` or ``dataSource``,
         or ``None`` if there is no overlay with said ``name``/``dataSource``.
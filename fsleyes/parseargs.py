@@ -518,6 +518,7 @@ OPTIONS = td.TypeDict({
                         'threshold',
                         'outline',
                         'outlineWidth',
+                        'voxelOutline',
                         'interpolation'],
     'VectorOpts'     : ['xColour',
                         'yColour',
@@ -570,7 +571,8 @@ OPTIONS = td.TypeDict({
                         'tensorScale'],
     'LabelOpts'      : ['lut',
                         'outline',
-                        'outlineWidth'],
+                        'outlineWidth',
+                        'voxelOutline'],
     'SHOpts'         : ['orientFlip',
                         'shResolution',
                         'shOrder',
@@ -817,6 +819,7 @@ ARGUMENTS = td.TypeDict({
     'MaskOpts.threshold'     : ('t',  'threshold',     True),
     'MaskOpts.outline'       : ('o',  'outline',       False),
     'MaskOpts.outlineWidth'  : ('w',  'outlineWidth',  True),
+    'MaskOpts.voxelOutline'  : ('vo', 'voxelOutline',  False),
     'MaskOpts.interpolation' : ('in', 'interpolation', True),
 
     'VectorOpts.xColour'         : ('xc', 'xColour',       True),
@@ -861,6 +864,7 @@ ARGUMENTS = td.TypeDict({
     'LabelOpts.lut'          : ('l',  'lut',          True),
     'LabelOpts.outline'      : ('o',  'outline',      False),
     'LabelOpts.outlineWidth' : ('w',  'outlineWidth', True),
+    'LabelOpts.voxelOutline' : ('vo', 'voxelOutline', False),
 
     'SHOpts.shResolution'    : ('sr', 'shResolution',    True),
     'SHOpts.shOrder'         : ('so', 'shOrder',         True),
@@ -1065,6 +1069,8 @@ HELP = td.TypeDict({
     'MaskOpts.threshold'     : 'Threshold',
     'MaskOpts.outline'       : 'Show mask outline',
     'MaskOpts.outlineWidth'  : 'Mask outline width (1-10, default: 2)',
+    'MaskOpts.voxelOutline'  : 'Calculate the mask outline in terms of '
+                               'voxels',
     'MaskOpts.interpolation' : 'Interpolation',
 
     'VectorOpts.xColour'         : 'X colour (0-1)',
@@ -1134,6 +1140,7 @@ HELP = td.TypeDict({
     'LabelOpts.outline'      : 'Show label outlines',
     'LabelOpts.outlineWidth' : 'Label outline width (proportion of '
                                'one voxel; 0-1, default: 0.25)',
+    'LabelOpts.voxelOutline' : 'Calculate label outlines in terms of voxels',
 
     'SHOpts.shResolution'    : 'FOD resolution/quality '
                                '(3-10, default: 5)',
@@ -0,0 +1,472 @@
+#!/usr/bin/env python
+#
+# histogramengine.py - Calculate histograms from fine-grained base histograms.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :func:`calcBaseHistogram` function, and the
+:class:`BaseHistogram` class, which are used by the :class:`.HistogramSeries`
+class to calculate histograms.
+
+
+Rather than storing a copy of the data and re-calculating a histogram from
+scratch whenever the histogram settings (e.g. number of bins, or data range)
+change, a single high-resolution *base* histogram of the data is calculated
+once, via :func:`calcBaseHistogram`. The :class:`BaseHistogram` records the
+minimum/maximum of the finite data, the number of zeros, and the counts for
+the non-zero finite data. Histograms with any number of bins, over any
+sub-range of the data, can then be derived from the base histogram via
+:meth:`BaseHistogram.histogram`, without having to re-scan the data.
+
+
+For integer data with a range smaller than :data:`BASE_BINS`, the base
+histogram contains the count of every individual value, so derived
+histograms are exact. For other data, the base histogram contains
+:data:`BASE_BINS` equally sized bins, and counts are linearly interpolated
+within each base bin when deriving histograms.
+
+
+Base histograms are calculated by streaming reduction - the data is read in
+pieces (e.g. one volume at a time from a memory-mapped 4D :class:`.Image`),
+optionally restricted to a mask, a partial histogram is calculated for each
+piece, and the partial histograms are merged. Pieces may be processed in
+parallel by a :class:`.WorkerPool` (see :func:`sharedPool`). This means that,
+for example, a histogram of every volume in a long 4D acquisition can be
+calculated without loading the full image into memory.
+"""
+
+
+import logging
+import threading
+
+import numpy as np
+
+import fsleyes.workerpool as workerpool
+
+
+log = logging.getLogger(__name__)
+
+
+BASE_BINS = 65536
+"""Number of bins used in a base histogram calculated by
+:func:`calcBaseHistogram`.
+"""
+
+
+CHUNK_SIZE = 2 ** 22
+"""Approximate number of values to process at once when calculating a
+base histogram.
+"""
+
+
+_pool = None
+"""A :class:`.WorkerPool` which is shared by all callers of
+:func:`sharedPool`.
+"""
+
+
+_poolLock = threading.Lock()
+"""Lock protecting creation of the :data:`_pool`. """
+
+
+def sharedPool():
+    """Returns a :class:`.WorkerPool` which can be passed to
+    :func:`calcBaseHistogram`. The pool is created on the first call, and
+    shared thereafter.
+    """
+
+    global _pool
+
+    with _poolLock:
+        if _pool is None:
+            _pool = workerpool.WorkerPool(name='histogramengine')
+        return _pool
+
+
+def calcBaseHistogram(data, nbins=None, chunkSize=None, mask=None, pool=None):
+    """Calculates a :class:`BaseHistogram` for the given ``data``.
+
+    The data is split along its last axis into pieces of (approximately)
+    ``chunkSize`` values, and each piece is read and processed separately, so
+    a copy of the full data is never made - the ``data`` can be any object
+    with ``shape`` and ``dtype`` attributes which supports slicing, such as an
+    :class:`.Image`, in which case the data can be streamed from disk (e.g.
+    volume by volume for a 4D image). A histogram is calculated for each
+    piece, and the partial histograms are then merged.
+
+    Pieces are processed in two passes - the first pass calculates the data
+    range, and the second calculates the histogram. Integer data with a
+    dtype of 16 bits or less is processed in a single pass.
+
+    :arg data:      Data to calculate a histogram for.
+    :arg nbins:     Number of bins to use. Defaults to :data:`BASE_BINS`.
+    :arg chunkSize: Number of values to process at a time. Defaults to
+                    :data:`CHUNK_SIZE`.
+    :arg mask:      Boolean mask - if provided, only values within the mask
+                    are included in the histogram. Must have the same shape
+                    as the leading dimensions of the ``data`` (e.g. a 3D mask
+                    can be used for a 4D image).
+    :arg pool:      :class:`.WorkerPool` used to process pieces in parallel
+                    (e.g. the pool returned by :func:`sharedPool`). If not
+                    provided, pieces are processed sequentially on the
+                    calling thread.
+    """
+
+    if nbins is None:
+        nbins = BASE_BINS
+
+    if not hasattr(data, 'shape'):
+        data = np.asanyarray(data)
+
+    shape = tuple(data.shape)
+    dtype = np.dtype(data.dtype)
+    isInt = issubclass(dtype.type, (np.integer, np.bool_))
+
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != shape[:mask.ndim]:
+            raise ValueError('Mask shape {} does not match data shape '
+                             '{}'.format(mask.shape, shape))
+
+    pieces = [(data, slc, mask) for slc in _pieces(shape, chunkSize)]
+
+    if isInt and dtype.itemsize <= 2:
+        return _calcSmallIntHistogram(pieces, dtype, pool)
+
+    # First pass - find the finite
+    # data range, and count zeros
+    ranges = [r for r in _map(pool, _calcRange, pieces, isInt)
+              if r is not None]
+
+    # No finite values
+    if len(ranges) == 0:
+        return BaseHistogram(dtype, 0, 0, 0, 0, np.zeros(0), np.zeros(0))
+
+    dmin    = min(r[0] for r in ranges)
+    dmax    = max(r[1] for r in ranges)
+    nfinite = sum(r[2] for r in ranges)
+    nzeros  = sum(r[3] for r in ranges)
+
+    if isInt:
+        dmin = int(dmin)
+        dmax = int(dmax)
+    else:
+        dmin = float(dmin)
+        dmax = float(dmax)
+
+    # Integer data, or constant data - we can
+    # store a count for every individual value
+    exact = (dmin == dmax) or (isInt and (dmax - dmin) < nbins)
+
+    if exact: nbins = int(dmax - dmin) + 1
+
+    # Second pass - calculate the histogram of
+    # all non-zero finite values, and merge
+    # the partial histograms
+    counts = np.zeros(nbins, dtype=np.int64)
+    for c in _map(pool, _calcCounts, pieces, isInt, dmin, dmax, nbins, exact):
+        counts += c
+
+    if exact: points = np.arange(nbins, dtype=np.float64) + dmin
+    else:     points = np.linspace(dmin, dmax, nbins + 1)
+
+    log.debug('Calculated base histogram (range: [{}, {}], {} finite '
+              'values, {} zeros, exact: {})'.format(
+                  dmin, dmax, nfinite, nzeros, exact))
+
+    return BaseHistogram(dtype, dmin, dmax, nfinite, nzeros, points, counts,
+                         exact)
+
+
+def _map(pool, func, pieces, *args):
+    """Used by :func:`calcBaseHistogram`. Calls ``func(*piece, *args)`` for
+    each of the given ``pieces``, either sequentially, or via the given
+    :class:`.WorkerPool`. Returns a list containing the results.
+    """
+
+    if pool is None:
+        return [func(*(piece + args)) for piece in pieces]
+
+    jobs = [pool.submit(func, *(piece + args)) for piece in pieces]
+
+    for job in jobs:
+        job.wait()
+
+    for job in jobs:
+        if job.error is not None:
+            raise job.error
+        if job.cancelled():
+            raise RuntimeError('Histogram calculation was cancelled')
+
+    return [job.result for job in jobs]
+
+
+def _pieces(shape, chunkSize=None):
+    """Used by :func:`calcBaseHistogram`. Returns a list of slice tuples
+    which split data of the given ``shape`` along its last axis into pieces
+    which contain approximately ``chunkSize`` values (defaults to
+    :data:`CHUNK_SIZE`).
+    """
+
+    if chunkSize is None:
+        chunkSize = CHUNK_SIZE
+
+    if len(shape) == 0:
+        return [()]
+
+    rowSize = max(1, int(np.prod(shape[:-1])))
+    step    = max(1, chunkSize // rowSize)
+    lead    = (slice(None),) * (len(shape) - 1)
+
+    return [lead + (slice(i, i + step),) for i in range(0, shape[-1], step)]
+
+
+def _readPiece(data, slc, mask):
+    """Used by :func:`calcBaseHistogram`. Reads the piece of ``data``
+    specified by ``slc``, applies the ``mask`` if provided, and returns the
+    result as a 1D array.
+    """
+
+    piece = np.asarray(data[slc])
+
+    if mask is not None:
+        if mask.ndim == piece.ndim: piece = piece[mask[slc]]
+        else:                       piece = piece[mask]
+
+    return piece.reshape(-1)
+
+
+def _calcRange(data, slc, mask, isInt):
+    """Used by :func:`calcBaseHistogram`. Returns a tuple containing the
+    minimum and maximum finite values, the number of finite values, and the
+    number of zeros in a piece of the data, or ``None`` if the piece does
+    not contain any finite values.
+    """
+
+    piece = _readPiece(data, slc, mask)
+
+    if not isInt:
+        piece = piece[np.isfinite(piece)]
+
+    if piece.size == 0:
+        return None
+
+    return (piece.min(),
+            piece.max(),
+            piece.size,
+            piece.size - np.count_nonzero(piece))
+
+
+def _calcCounts(data, slc, mask, isInt, dmin, dmax, nbins, exact):
+    """Used by :func:`calcBaseHistogram`. Calculates a histogram of the
+    non-zero finite values in a piece of the data.
+    """
+
+    piece = _readPiece(data, slc, mask)
+
+    if isInt: piece = piece[piece != 0]
+    else:     piece = piece[np.isfinite(piece) & (piece != 0)]
+
+    if piece.size == 0:
+        return np.zeros(nbins, dtype=np.int64)
+
+    # Constant non-integer data
+    # falls into a single bin
+    if exact:
+        if isInt: piece = np.asarray(piece, dtype=np.int64) - dmin
+        else:     piece = np.zeros(piece.size, dtype=np.int64)
+        return np.bincount(piece, minlength=nbins)
+
+    return np.histogram(piece, bins=nbins, range=(dmin, dmax))[0]
+
+
+def _calcSmallIntHistogram(pieces, dtype, pool):
+    """Used by :func:`calcBaseHistogram`. Calculates an exact
+    :class:`BaseHistogram` for integer data with a dtype of 16 bits or less,
+    by counting every possible value in a single pass over the data.
+    """
+
+    if dtype.type == np.bool_: offset = 0
+    else:                      offset = int(np.iinfo(dtype).min)
+
+    nvalues = 2 ** (8 * dtype.itemsize)
+    counts  = np.zeros(nvalues, dtype=np.int64)
+
+    for c in _map(pool, _calcValueCounts, pieces, offset, nvalues):
+        counts += c
+
+    present = np.nonzero(counts)[0]
+
+    if len(present) == 0:
+        return BaseHistogram(dtype, 0, 0, 0, 0, np.zeros(0), np.zeros(0))
+
+    first   = present[ 0]
+    last    = present[-1]
+    dmin    = int(first + offset)
+    dmax    = int(last  + offset)
+    nfinite = int(counts.sum())
+    nzeros  = int(counts[-offset])
+
+    counts[-offset] = 0
+    counts          = counts[first:last + 1]
+    points          = np.arange(dmin, dmax + 1, dtype=np.float64)
+
+    log.debug('Calculated base histogram (range: [{}, {}], {} values, '
+              '{} zeros)'.format(dmin, dmax, nfinite, nzeros))
+
+    return BaseHistogram(dtype, dmin, dmax, nfinite, nzeros, points, counts)
+
+
+def _calcValueCounts(data, slc, mask, offset, nvalues):
+    """Used by :func:`_calcSmallIntHistogram`. Counts every value in a
+    piece of the data.
+    """
+    piece = np.asarray(_readPiece(data, slc, mask), dtype=np.int64) - offset
+    return np.bincount(piece, minlength=nvalues)
+
+
+class BaseHistogram(object):
+    """A ``BaseHistogram`` contains a fine-grained histogram of some data,
+    from which coarser histograms can be derived via the :meth:`histogram`
+    method. ``BaseHistogram`` instances are created by the
+    :func:`calcBaseHistogram` function - see the module documentation for
+    details.
+    """
+
+
+    def __init__(self,
+                 dtype,
+                 dmin,
+                 dmax,
+                 nfinite,
+                 nzeros,
+                 points,
+                 counts,
+                 exact=True):
+        """Create a ``BaseHistogram``. You should not need to create a
+        ``BaseHistogram`` directly - use :func:`calcBaseHistogram`.
+
+        :arg dtype:   Data type of the original data.
+        :arg dmin:    Minimum finite value.
+        :arg dmax:    Maximum finite value.
+        :arg nfinite: Number of finite values.
+        :arg nzeros:  Number of zeros.
+        :arg points:  If ``exact``, the value corresponding to each count.
+                      Otherwise, the base histogram bin edges.
+        :arg counts:  Counts of the non-zero finite values.
+        :arg exact:   Whether ``counts`` contains the count for every
+                      individual value.
+        """
+
+        self.__dtype   = np.dtype(dtype)
+        self.__dmin    = dmin
+        self.__dmax    = dmax
+        self.__nfinite = nfinite
+        self.__nzeros  = nzeros
+        self.__points  = points
+        self.__exact   = exact
+        self.__cumsum  = np.concatenate(([0], np.cumsum(counts)))
+
+
+    @property
+    def dtype(self):
+        """Returns the data type of the original data. """
+        return self.__dtype
+
+
+    @property
+    def dmin(self):
+        """Returns the minimum finite value in the data. """
+        return self.__dmin
+
+
+    @property
+    def dmax(self):
+        """Returns the maximum finite value in the data. """
+        return self.__dmax
+
+
+    @property
+    def nfinite(self):
+        """Returns the number of finite values in the data. """
+        return self.__nfinite
+
+
+    @property
+    def nzeros(self):
+        """Returns the number of zeros in the data. """
+        return self.__nzeros
+
+
+    def histogram(self,
+                  nbins,
+                  histRange,
+                  dataRange,
+                  includeOutliers=False,
+                  ignoreZeros=True,
+                  count=True):
+        """Derives a histogram from this ``BaseHistogram``. The arguments
+        and return value are the same as for the
+        :func:`.histogramseries.histogram` function, with the addition of:
+
+        :arg ignoreZeros: If ``True`` (the default), zeros are excluded from
+                          the histogram.
+        """
+
+        hlo, hhi = histRange
+        dlo, dhi = dataRange
+
+        bins = np.linspace(hlo, hhi, nbins + 1)
+
+        if includeOutliers:
+            bins[ 0] = dlo
+            bins[-1] = dhi
+
+        # Calculate the cumulative count at
+        # each bin edge. Bins are half-open,
+        # except for the last bin, which
+        # includes its upper edge (the same
+        # as numpy.histogram).
+        cumsum = self.__cumulative(bins)
+        last   = self.__cumulative(bins[-1:], closed=True)
+        cumsum = np.concatenate((cumsum[:-1], last))
+
+        # Zeros are treated as a single
+        # point mass at 0 (which is
+        # included in the last bin if
+        # it lies on its upper edge)
+        if not ignoreZeros and self.__nzeros > 0:
+            zeros      = np.where(bins > 0, self.__nzeros, 0)
+            zeros[-1]  = self.__nzeros if bins[-1] >= 0 else 0
+            cumsum     = cumsum + zeros
+
+        histY = np.diff(cumsum)
+        nvals = histY.sum()
+
+        if not count:
+            histY = histY / nvals
+
+        return bins, histY, nvals
+
+
+    def __cumulative(self, edges, closed=False):
+        """Returns the number of non-zero finite values which are less than
+        (or, if ``closed``, less than or equal to) each of the given
+        ``edges``.
+        """
+
+        cumsum = self.__cumsum
+        points = self.__points
+
+        if len(points) == 0:
+            return np.zeros(len(edges))
+
+        if self.__exact:
+            if closed: side = 'right'
+            else:      side = 'left'
+            return cumsum[np.searchsorted(points, edges, side=side)]
+
+        # Linear interpolation within each base bin.
+        # Counts are rounded so that the derived
+        # histogram contains whole numbers.
+        return np.round(np.interp(edges, points, cumsum))
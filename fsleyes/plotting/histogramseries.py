@@ -21,10 +21,12 @@ import logging
 
 import numpy as np
 
+import fsl.utils.idle               as idle
 import fsl.utils.cache              as cache
 import fsleyes_widgets.utils.status as status
 import fsleyes_props                as props
 from . import                          dataseries
+from . import                          histogramengine
 
 
 log = logging.getLogger(__name__)
@@ -34,6 +36,13 @@ class HistogramSeries(dataseries.DataSeries):
     """A ``HistogramSeries`` generates histogram data from an overlay. It is
     the base class for the :class:`ImageHistogramSeriess` and
     :class:`MeshHistogramSeries` classes.
+
+    A copy of the overlay data is not retained. Instead, a
+    :class:`.BaseHistogram` is calculated (on a separate thread, via
+    :func:`.idle.run`) whenever new data is passed to the
+    :meth:`setHistogramData` method, and the histogram that is plotted is
+    derived from the base histogram whenever any of the histogram
+    settings change.
     """
 
 
@@ -82,16 +91,12 @@ class HistogramSeries(dataseries.DataSeries):
         dataseries.DataSeries.__init__(
             self, overlay, overlayList, displayCtx, plotPanel)
 
-        self.__nvals              = 0
-        self.__dataKey            = None
-        self.__xdata              = np.array([])
-        self.__ydata              = np.array([])
-        self.__finiteData         = np.array([])
-        self.__nonZeroData        = np.array([])
-        self.__clippedFiniteData  = np.array([])
-        self.__clippedNonZeroData = np.array([])
-        self.__dataCache          = cache.Cache(maxsize=10)
-        self.__histCache          = cache.Cache(maxsize=100)
+        self.__nvals      = 0
+        self.__pendingKey = None
+        self.__xdata      = np.array([])
+        self.__ydata      = np.array([])
+        self.__baseHist   = None
+        self.__dataCache  = cache.Cache(maxsize=10)
 
         self.addListener('dataRange',       self.name, self.__dataRangeChanged)
         self.addListener('nbins',           self.name, self.__histPropsChanged)
@@ -112,17 +117,12 @@ class HistogramSeries(dataseries.DataSeries):
         self.removeListener('nbins',           self.name)
 
         self.__dataCache.clear()
-        self.__histCache.clear()
-        self.__dataCache          = None
-        self.__histCache          = None
-        self.__nvals              = 0
-        self.__dataKey            = None
-        self.__xdata              = None
-        self.__ydata              = None
-        self.__finiteData         = None
-        self.__nonZeroData        = None
-        self.__clippedFiniteData  = None
-        self.__clippedNonZeroData = None
+        self.__dataCache  = None
+        self.__nvals      = 0
+        self.__pendingKey = None
+        self.__xdata      = None
+        self.__ydata      = None
+        self.__baseHist   = None
         dataseries.DataSeries.destroy(self)
 
 
@@ -131,56 +131,81 @@ class HistogramSeries(dataseries.DataSeries):
         changes.
 
         :arg data: A ``numpy`` array containing the data that the histogram is
-                   to be calculated on. Pass in ``None``  to indicate that
-                   there is currently no histogram data.
+                   to be calculated on (or any other object accepted by
+                   :func:`.histogramengine.calcBaseHistogram`, such as an
+                   :class:`.Image`), or a function which returns such an
+                   object (which allows the data to be read on a separate
+                   thread). Pass in ``None``  to indicate that there is
+                   currently no histogram data.
 
         :arg key:  Something which identifies the ``data``, and can be used as
                    a ``dict`` key.
         """
 
         if data is None:
-            self.__nvals              = 0
-            self.__dataKey            = None
-            self.__xdata              = np.array([])
-            self.__ydata              = np.array([])
-            self.__finiteData         = np.array([])
-            self.__nonZeroData        = np.array([])
-            self.__clippedFiniteData  = np.array([])
-            self.__clippedNonZeroData = np.array([])
+            self.__nvals      = 0
+            self.__pendingKey = None
+            self.__xdata      = np.array([])
+            self.__ydata      = np.array([])
+            self.__baseHist   = None
 
             # force the panel to refresh
             with props.skip(self, 'dataRange', self.name):
                 self.propNotify('dataRange')
             return
 
-        # We cache the following data, based
-        # on the provided key, so they don't
-        # need to be recalculated:
-        #  - finite data
-        #  - non-zero data
-        #  - finite minimum
-        #  - finite maximum
-        #
-        # The cache size is restricted (see its
-        # creation in __init__) so we don't blow
-        # out RAM
-        cached = self.__dataCache.get(key, None)
-
-        if cached is None:
-
-            log.debug('New histogram data {} - extracting '
-                      'finite/non-zero data'.format(key))
-
-            finData = data[np.isfinite(data)]
-            nzData  = finData[finData != 0]
-            dmin    = finData.min()
-            dmax    = finData.max()
-
-            self.__dataCache.put(key, (finData, nzData, dmin, dmax))
-        else:
+        # We cache the base histogram for each
+        # key, so it doesn't need to be
+        # recalculated. The cache size is
+        # restricted (see its creation in
+        # __init__), although base histograms
+        # are small compared to the data.
+        baseHist = self.__dataCache.get(key, None)
+
+        if baseHist is not None:
             log.debug('Got histogram data {} from cache'.format(key))
-            finData, nzData, dmin, dmax = cached
+            self.__pendingKey = None
+            self.__setBaseHistogram(baseHist)
+            return
+
+        log.debug('New histogram data {} - calculating '
+                  'base histogram'.format(key))
+
+        # The base histogram is calculated
+        # on a separate thread. If new data
+        # is passed in before it has been
+        # calculated, the result is discarded.
+        result            = []
+        self.__pendingKey = key
+
+        def calc():
+            if callable(data): result.append(data())
+            else:              result.append(data)
+            result[0] = histogramengine.calcBaseHistogram(
+                result[0], pool=histogramengine.sharedPool())
+
+        def finish():
+            if self.__dataCache is None or self.__pendingKey != key:
+                return
+            self.__pendingKey = None
+            self.__dataCache.put(key, result[0])
+            self.__setBaseHistogram(result[0])
+
+        status.update('Calculating histogram for '
+                      'overlay {}'.format(self.overlay.name))
 
+        idle.run(calc, onFinish=finish,
+                 name='{}_baseHistogram'.format(self.name))
+
+
+    def __setBaseHistogram(self, baseHist):
+        """Called by :meth:`setHistogramData`. Updates the :attr:`dataRange`
+        and :attr:`nbins` properties from the given :class:`.BaseHistogram`,
+        and re-calculates the histogram.
+        """
+
+        dmin = baseHist.dmin
+        dmax = baseHist.dmax
         dist = (dmax - dmin) / 10000.0
 
         with props.suppressAll(self):
@@ -189,11 +214,9 @@ class HistogramSeries(dataseries.DataSeries):
             self.dataRange.xmax = dmax + dist
             self.dataRange.xlo  = dmin
             self.dataRange.xhi  = dmax + dist
-            self.nbins          = autoBin(nzData, self.dataRange.x)
+            self.nbins          = autoBin(baseHist, self.dataRange.x)
 
-            self.__dataKey     = key
-            self.__finiteData  = finData
-            self.__nonZeroData = nzData
+            self.__baseHist = baseHist
 
             self.__dataRangeChanged()
 
@@ -244,14 +267,6 @@ class HistogramSeries(dataseries.DataSeries):
         :meth:`__initProperties` and :meth:`__volumeChanged` methods.
         """
 
-        finData = self.__finiteData
-        nzData  = self.__nonZeroData
-
-        self.__clippedFiniteData  = finData[(finData >= self.dataRange.xlo) &
-                                            (finData <  self.dataRange.xhi)]
-        self.__clippedNonZeroData = nzData[ (nzData  >= self.dataRange.xlo) &
-                                            (nzData  <  self.dataRange.xhi)]
-
         self.onDataRangeChange()
         self.__histPropsChanged()
 
@@ -264,24 +279,17 @@ class HistogramSeries(dataseries.DataSeries):
         log.debug('Calculating histogram for '
                   'overlay {}'.format(self.overlay.name))
 
-        status.update('Calculating histogram for '
-                      'overlay {}'.format(self.overlay.name))
+        baseHist = self.__baseHist
 
-        if np.isclose(self.dataRange.xhi, self.dataRange.xlo):
+        if baseHist is None or \
+           np.isclose(self.dataRange.xhi, self.dataRange.xlo):
             self.__xdata = np.array([])
             self.__ydata = np.array([])
             self.__nvals = 0
             return
 
-        if self.ignoreZeros:
-            if self.includeOutliers: data = self.__nonZeroData
-            else:                    data = self.__clippedNonZeroData
-        else:
-            if self.includeOutliers: data = self.__finiteData
-            else:                    data = self.__clippedFiniteData
-
         # Figure out the number of bins to use
-        if self.autoBin: nbins = autoBin(data, self.dataRange.x)
+        if self.autoBin: nbins = autoBin(baseHist, self.dataRange.x)
         else:            nbins = self.nbins
 
         # nbins is unclamped, but
@@ -293,29 +301,18 @@ class HistogramSeries(dataseries.DataSeries):
         with props.skip(self, 'nbins', self.name):
             self.nbins = nbins
 
-        # We cache calculated bins and counts
-        # for each combination of parameters,
-        # as histogram calculation can take
-        # time.
-        hrange  = (self.dataRange.xlo,  self.dataRange.xhi)
-        drange  = (self.dataRange.xmin, self.dataRange.xmax)
-        histkey = (self.__dataKey,
-                   self.includeOutliers,
-                   hrange,
-                   drange,
-                   self.nbins)
-        cached  = self.__histCache.get(histkey, None)
-
-        if cached is not None:
-            histX, histY, nvals = cached
-        else:
-            histX, histY, nvals = histogram(data,
-                                            self.nbins,
-                                            hrange,
-                                            drange,
-                                            self.includeOutliers,
-                                            True)
-            self.__histCache.put(histkey, (histX, histY, nvals))
+        # Deriving a histogram from the base
+        # histogram is cheap, so we don't
+        # bother caching the result.
+        hrange = (self.dataRange.xlo,  self.dataRange.xhi)
+        drange = (self.dataRange.xmin, self.dataRange.xmax)
+
+        histX, histY, nvals = baseHist.histogram(self.nbins,
+                                                 hrange,
+                                                 drange,
+                                                 self.includeOutliers,
+                                                 self.ignoreZeros,
+                                                 True)
 
         self.__xdata = histX
         self.__ydata = histY
@@ -351,6 +348,14 @@ class ImageHistogramSeries(HistogramSeries):
     """Data range to display with the :attr:`.showOverlay` mask. """
 
 
+    allVolumes = props.Boolean(default=False)
+    """If ``True``, and the image has more than three dimensions, the
+    histogram is calculated across all volumes of the image, rather than
+    for the current volume. The image data is streamed, volume by volume,
+    so the full image does not need to be loaded into memory.
+    """
+
+
     def __init__(self, *args, **kwargs):
         """Create an ``ImageHistogramSeries``. All arguments are passed
         through to :meth:`HistogramSeries.__init__`.
@@ -370,7 +375,11 @@ class ImageHistogramSeries(HistogramSeries):
         self.__opts   .addListener('volumeDim',
                                    self.name,
                                    self.__volumeChanged)
+        self          .addListener('allVolumes',
+                                   self.name,
+                                   self.__volumeChanged)
 
+        self.__volkey = None
         self.__volumeChanged()
 
 
@@ -385,6 +394,7 @@ class ImageHistogramSeries(HistogramSeries):
         self.__display.removeListener('overlayType', self.name)
         self.__opts   .removeListener('volume',      self.name)
         self.__opts   .removeListener('volumeDim',   self.name)
+        self          .removeListener('allVolumes',  self.name)
 
 
     def redrawProperties(self):
@@ -433,9 +443,27 @@ class ImageHistogramSeries(HistogramSeries):
 
         opts    = self.__opts
         overlay = self.overlay
-        volkey  = (opts.volumeDim, opts.volume)
 
-        self.setHistogramData(overlay[opts.index()], volkey)
+        # The data is read on the base histogram
+        # thread. When calculating a histogram
+        # across all volumes, the image itself
+        # is passed through, so that its data
+        # is streamed volume by volume.
+        if self.allVolumes and overlay.ndim > 3:
+            volkey = ('all',)
+            data   = lambda : overlay
+        else:
+            volkey = (opts.volumeDim, opts.volume)
+            index  = opts.index()
+            data   = lambda : overlay[index]
+
+        # Nothing to do if the volume changes
+        # when the histogram is for all volumes
+        if volkey == self.__volkey:
+            return
+
+        self.__volkey = volkey
+        self.setHistogramData(data, volkey)
 
 
     def __overlayTypeChanged(self, *a):
@@ -565,7 +593,9 @@ def autoBin(data, dataRange):
     of the given data. The calculation is identical to that implemented
     in the original FSLView.
 
-    :arg data:      The data that the histogram is to be calculated on.
+    :arg data:      The data that the histogram is to be calculated on (or
+                    any object with a ``dtype`` attribute, such as a
+                    :class:`.BaseHistogram`).
 
     :arg dataRange: A tuple containing the ``(min, max)`` histogram range.
     """
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+#
+# powerspectrumcache.py - The PowerSpectrumCache class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :func:`calcPowerSpectra` function, and the
+:class:`PowerSpectrumCache` class, which are used by the
+:class:`.PowerSpectrumSeries` classes to calculate power spectra.
+
+
+The :func:`calcPowerSpectra` function calculates the power spectra for many
+time series at once, with a single call to ``numpy.fft.rfft`` over a 2D (or
+higher) array.
+
+
+The ``PowerSpectrumCache`` calculates and caches power spectra for the voxels
+of a 4D :class:`.Image`. Time series are retrieved in blocks via a
+:class:`.TimeSeriesCache`, and the power spectra for all voxels in a block
+are calculated at once. For images of moderate size (see
+:data:`PRECOMPUTE_LIMIT`), the power spectra for the entire image are also
+calculated in the background, slice by slice, after the first request.
+
+
+A single ``PowerSpectrumCache`` is shared between all users of an ``Image``.
+Use the :func:`acquire` and :func:`release` functions to access the
+``PowerSpectrumCache`` for an image, rather than creating one directly. The
+cache is cleared whenever the image data changes.
+"""
+
+
+import logging
+import threading
+
+import numpy     as np
+import numpy.fft as fft
+
+import fsl.utils.cache    as cache
+import fsleyes.workerpool as workerpool
+from . import                timeseriescache
+
+
+log = logging.getLogger(__name__)
+
+
+PRECOMPUTE_LIMIT = 2 ** 25
+"""Power spectra for all voxels in a 4D image are calculated in the
+background if the image contains fewer than this many values. Set to ``0`` to
+disable background calculation.
+"""
+
+
+_caches = {}
+"""Dictionary of ``{id(overlay) : [PowerSpectrumCache, refcount]}`` mappings,
+used by the :func:`acquire` and :func:`release` functions.
+"""
+
+
+_cachesLock = threading.Lock()
+"""Lock protecting access to the :data:`_caches` dictionary. """
+
+
+def calcPowerSpectra(data, varNorm=True):
+    """Calculates power spectra for one or more time series.
+
+    :arg data:    ``numpy`` array containing time series along the last
+                  dimension.
+
+    :arg varNorm: If ``True``, each time series is de-meaned and normalised
+                  by its standard deviation before the fourier transformation.
+                  Time series with zero variance are set to zero.
+
+    :returns:     A ``numpy`` array of the same shape as ``data``, but with
+                  the last dimension replaced by the power spectrum of each
+                  time series (excluding the DC component).
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+
+    if varNorm:
+        mean = data.mean(axis=-1, keepdims=True)
+        std  = data.std( axis=-1, keepdims=True)
+        zero = np.isclose(std, 0)
+        std  = np.where(zero, 1, std)
+        data = np.where(zero, 0, (data - mean) / std)
+
+    data = fft.rfft(data, axis=-1)[..., 1:]
+
+    return np.power(data.real, 2) + np.power(data.imag, 2)
+
+
+def acquire(overlay):
+    """Returns the :class:`PowerSpectrumCache` for the given :class:`.Image`,
+    creating it if necessary. Every call to ``acquire`` must be followed
+    by a corresponding call to :func:`release`.
+    """
+
+    with _cachesLock:
+
+        entry = _caches.get(id(overlay), None)
+
+        if entry is None:
+            entry = [PowerSpectrumCache(overlay), 0]
+            _caches[id(overlay)] = entry
+
+        entry[1] += 1
+        return entry[0]
+
+
+def release(overlay):
+    """Releases a reference to the :class:`PowerSpectrumCache` for the given
+    :class:`.Image`. When all references have been released, the cache is
+    destroyed.
+    """
+
+    with _cachesLock:
+
+        entry = _caches.get(id(overlay), None)
+
+        if entry is None:
+            return
+
+        entry[1] -= 1
+
+        if entry[1] <= 0:
+            _caches.pop(id(overlay))
+            entry[0].destroy()
+
+
+class PowerSpectrumCache(object):
+    """The ``PowerSpectrumCache`` calculates and caches the power spectra
+    for voxels in a 4D :class:`.Image`. See the module documentation for
+    details.
+    """
+
+
+    def __init__(self, overlay, precomputeLimit=None):
+        """Create a ``PowerSpectrumCache``. You should use the :func:`acquire`
+        function instead of creating a ``PowerSpectrumCache`` directly.
+
+        :arg overlay:         The :class:`.Image` overlay.
+        :arg precomputeLimit: Defaults to :data:`PRECOMPUTE_LIMIT`.
+        """
+
+        if precomputeLimit is None:
+            precomputeLimit = PRECOMPUTE_LIMIT
+
+        self.__name       = '{}_{}'.format(type(self).__name__, id(self))
+        self.__overlay    = overlay
+        self.__tsCache    = timeseriescache.acquire(overlay)
+        self.__cache      = cache.Cache(maxsize=1000)
+        self.__lock       = threading.Lock()
+        self.__generation = 0
+
+        # Whole-image power spectra are only
+        # calculated for plain 4D images - the
+        # __full attribute contains a tuple of
+        # (varNorm, spectra, done), where done
+        # is a boolean array indicating which
+        # Z slices have been calculated.
+        self.__precompute = overlay.ndim == 4 and \
+                            np.prod(overlay.shape) <= precomputeLimit
+        self.__full       = None
+        self.__pool       = None
+
+        if self.__precompute:
+            self.__pool = workerpool.WorkerPool(
+                1, name='{}_precompute'.format(self.__name))
+
+        overlay.register(self.__name, self.__dataChanged, 'data')
+
+
+    def destroy(self):
+        """Must be called when this ``PowerSpectrumCache`` is no longer
+        needed. Clears the cache, and removes the listener on the image.
+        """
+
+        if self.__pool is not None:
+            self.__pool.stop()
+
+        self.__overlay.deregister(self.__name, 'data')
+        timeseriescache.release(self.__overlay)
+        self.__cache.clear()
+
+        self.__overlay = None
+        self.__tsCache = None
+        self.__full    = None
+        self.__pool    = None
+
+
+    def clear(self):
+        """Clears the cache, and cancels any background calculation. """
+        with self.__lock:
+            self.__generation += 1
+            self.__full        = None
+            self.__cache.clear()
+
+
+    def getPowerSpectrum(self, opts, voxel, varNorm=True):
+        """Returns the power spectrum of the time series at the given voxel.
+
+        :arg opts:    The :class:`.NiftiOpts` instance associated with the
+                      image.
+        :arg voxel:   Integer voxel coordinates.
+        :arg varNorm: Normalise time series before calculating the power
+                      spectrum - see :func:`calcPowerSpectra`.
+        """
+
+        voxel = [int(v) for v in voxel[:3]]
+        full  = self.__getFull(opts, varNorm)
+
+        if full is not None:
+            spectra, done = full
+            if done[voxel[2]]:
+                return np.array(spectra[tuple(voxel)])
+
+        # Otherwise calculate the power
+        # spectra for every voxel in the
+        # block containing the voxel
+        key, block = self.__tsCache.getBlock(opts, voxel)
+        key        = (key, varNorm)
+        offset     = tuple(v % self.__tsCache.blockSize for v in voxel)
+
+        with self.__lock:
+            spectra    = self.__cache.get(key, None)
+            generation = self.__generation
+
+        if spectra is None:
+            spectra = calcPowerSpectra(block, varNorm)
+            with self.__lock:
+                if generation == self.__generation:
+                    self.__cache.put(key, spectra)
+
+        return np.array(spectra[offset])
+
+
+    def __getFull(self, opts, varNorm):
+        """Returns a tuple containing the whole-image power spectra, and a
+        boolean array indicating which Z slices have been calculated, or
+        ``None`` if whole-image power spectra are not being calculated.
+        Starts the background calculation if necessary.
+        """
+
+        if not self.__precompute or opts.volumeDim != 0:
+            return None
+
+        with self.__lock:
+
+            full = self.__full
+
+            if full is not None and full[0] == varNorm:
+                return full[1:]
+
+            shape      = list(self.__overlay.shape[:3])
+            nfreqs     = self.__overlay.shape[3] // 2
+            spectra    = np.zeros(shape + [nfreqs], dtype=np.float32)
+            done       = np.zeros(shape[2], dtype=bool)
+            full       = (varNorm, spectra, done)
+            generation = self.__generation
+            self.__full = full
+
+        self.__pool.cancel()
+        self.__pool.submit(self.__precomputeSpectra,
+                           generation,
+                           varNorm,
+                           spectra,
+                           done)
+
+        return full[1:]
+
+
+    def __precomputeSpectra(self, generation, varNorm, spectra, done):
+        """Run on a background thread. Calculates the power spectra for every
+        voxel in the image, one Z slice at a time. Stops if the image data
+        changes, or if a different ``varNorm`` setting is requested.
+        """
+
+        overlay = self.__overlay
+
+        log.debug('Calculating power spectra for {} (varNorm: {})'.format(
+            overlay.name, varNorm))
+
+        for z in range(overlay.shape[2]):
+
+            full = self.__full
+            if generation != self.__generation or \
+               full is None or full[1] is not spectra:
+                log.debug('Power spectra calculation for {} '
+                          'cancelled'.format(overlay.name))
+                return
+
+            spectra[:, :, z, :] = calcPowerSpectra(overlay[:, :, z, :],
+                                                   varNorm)
+            done[z] = True
+
+
+    def __dataChanged(self, *a):
+        """Called when the image data changes. Clears the cache. """
+        log.debug('{} data changed - clearing power spectrum '
+                  'cache'.format(self.__overlay.name))
+        self.clear()
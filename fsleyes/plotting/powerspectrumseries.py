@@ -20,14 +20,14 @@ The following classes are provided:
 
 import logging
 
-import numpy     as np
-import numpy.fft as fft
+import numpy as np
 
 import fsl.utils.idle        as idle
 import fsl.utils.cache       as cache
 import fsl.data.melodicimage as fslmelimage
 import fsleyes_props         as props
 from . import                   dataseries
+from . import                   powerspectrumcache
 
 
 log = logging.getLogger(__name__)
@@ -77,25 +77,17 @@ class PowerSpectrumSeries(dataseries.DataSeries):
 
 
     def calcPowerSpectrum(self, data):
-        """Calculates a power spectrum for the given one-dimensional data
-        array. If the :attr:`varNorm` property is ``True``, the data is
-        de-meaned and normalised by its standard deviation before the fourier
+        """Calculates a power spectrum for the given data array. If the
+        :attr:`varNorm` property is ``True``, the data is de-meaned and
+        normalised by its standard deviation before the fourier
         transformation.
-        """
-        if self.varNorm:
-            mean = data.mean()
-            std  = data.std()
-
-            if not np.isclose(std, 0):
-                data = data - mean
-                data = data / std
-            else:
-                data = np.zeros(data.shape)
-
-        data = fft.rfft(data)[1:]
-        data = np.power(data.real, 2) + np.power(data.imag, 2)
 
-        return data
+        ``data`` may be a one-dimensional array, or may contain multiple time
+        series along its last dimension, in which case the power spectra for
+        all of them are calculated at once. See
+        :func:`.powerspectrumcache.calcPowerSpectra`.
+        """
+        return powerspectrumcache.calcPowerSpectra(data, self.varNorm)
 
 
 class VoxelPowerSpectrumSeries(PowerSpectrumSeries):
@@ -113,17 +105,25 @@ class VoxelPowerSpectrumSeries(PowerSpectrumSeries):
 
         PowerSpectrumSeries.__init__(self, *args, **kwargs)
 
-        # We use a cache just like in the
-        # VoxelTimeSeries class - see that
-        # class.
-        #
-        # TODO You need to invalidate the cache
-        #      when the image data changes.
-        self.__cache = cache.Cache(maxsize=1000)
-
         if self.overlay.ndim < 4:
             raise ValueError('Overlay is not a 4D image')
 
+        # Power spectra are calculated and
+        # cached by a PowerSpectrumCache,
+        # which is shared with all other
+        # series for the same image.
+        self.__cache = powerspectrumcache.acquire(self.overlay)
+
+
+    def destroy(self):
+        """Must be called when this ``VoxelPowerSpectrumSeries`` is no longer
+        needed. Releases the :class:`.PowerSpectrumCache`, and calls the
+        base-class implementation.
+        """
+        powerspectrumcache.release(self.overlay)
+        self.__cache = None
+        PowerSpectrumSeries.destroy(self)
+
 
     def makeLabel(self):
         """Creates and returns a label for use with this
@@ -152,21 +152,12 @@ class VoxelPowerSpectrumSeries(PowerSpectrumSeries):
         """
 
         opts  = self.displayCtx.getOpts(self.overlay)
-        vdim  = opts.volumeDim
         voxel = opts.getVoxel()
 
         if voxel is None:
             return [], []
 
-        x, y, z = voxel
-
-        ydata = self.__cache.get((x, y, z, vdim), None)
-
-        if ydata is None:
-            ydata = self.overlay[opts.index(voxel, atVolume=False)]
-            self.__cache.put((x, y, z, vdim), ydata)
-
-        ydata = self.calcPowerSpectrum(ydata)
+        ydata = self.__cache.getPowerSpectrum(opts, voxel, self.varNorm)
         xdata = np.arange(len(ydata), dtype=np.float32)
 
         return xdata, ydata
@@ -233,6 +224,22 @@ class MeshPowerSpectrumSeries(PowerSpectrumSeries):
         """
         PowerSpectrumSeries.__init__(self, *args, **kwargs)
 
+        # The power spectra for all vertices
+        # are calculated at once, and cached,
+        # for each vertex data set/varNorm
+        # setting (see getData).
+        self.__cache = cache.Cache(maxsize=4)
+
+
+    def destroy(self):
+        """Must be called when this ``MeshPowerSpectrumSeries`` is no
+        longer needed. Clears the cache, and calls the base-class
+        implementation.
+        """
+        self.__cache.clear()
+        self.__cache = None
+        PowerSpectrumSeries.destroy(self)
+
 
     def makeLabel(self):
         """Returns a label to use for this ``MeshPowerSpectrumSeries`` on the
@@ -272,7 +279,23 @@ class MeshPowerSpectrumSeries(PowerSpectrumSeries):
         opts  = self.displayCtx.getOpts(self.overlay)
         vidx  = opts.getVertex()
         vd    = opts.getVertexData()
-        ydata = self.calcPowerSpectrum(vd[vidx, :])
+
+        # Vertex data sets of moderate size
+        # are transformed in one go, so that
+        # subsequent lookups are instant.
+        if vd.size > powerspectrumcache.PRECOMPUTE_LIMIT:
+            ydata = self.calcPowerSpectrum(vd[vidx, :])
+
+        else:
+            key     = (opts.vertexData, id(vd), self.varNorm)
+            spectra = self.__cache.get(key, None)
+
+            if spectra is None:
+                spectra = self.calcPowerSpectrum(vd)
+                self.__cache.put(key, spectra)
+
+            ydata = spectra[vidx, :]
+
         xdata = np.arange(len(ydata))
 
         return xdata, ydata
@@ -25,12 +25,12 @@ are use by the :class:`.TimeSeriesPanel`. The following classes are provided:
 import numpy as np
 
 
-import fsl.utils.cache    as cache
 import fsl.utils.idle     as idle
 import fsleyes_props      as props
 import fsleyes.strings    as strings
 import fsleyes.colourmaps as fslcm
 from . import                dataseries
+from . import                timeseriescache
 
 
 class TimeSeries(dataseries.DataSeries):
@@ -99,6 +99,10 @@ class VoxelTimeSeries(TimeSeries):
     the voxel is defined by current value of the
     :attr:`.DisplayContext.location` property (transformed into the image
     voxel coordinate system).
+
+    Voxel data is retrieved via a :class:`.TimeSeriesCache`, which is shared
+    with all other ``VoxelTimeSeries`` and :class:`.VoxelPowerSpectrumSeries`
+    instances for the same image.
     """
 
     def __init__(self, overlay, overlayList, displayCtx, plotPanel):
@@ -114,15 +118,25 @@ class VoxelTimeSeries(TimeSeries):
         TimeSeries.__init__(
             self, overlay, overlayList, displayCtx, plotPanel)
 
-        # We use a cache to store data for the
-        # most recently accessed voxels. This is
-        # done to improve performance on big
-        # images (which may be compressed and
-        # on disk).
-        #
-        # TODO You need to invalidate the cache
-        #      when the image data changes.
-        self.__cache = cache.Cache(maxsize=1000)
+        # We use a shared cache to store data
+        # for blocks of voxels around the most
+        # recently accessed voxels. This is done
+        # to improve performance on big images
+        # (which may be compressed and on disk).
+        # The cache is acquired on first use,
+        # as some sub-classes never use it.
+        self.__cache = None
+
+
+    def destroy(self):
+        """Must be called when this ``VoxelTimeSeries`` is no longer needed.
+        Releases the :class:`.TimeSeriesCache`, and calls the base-class
+        implementation.
+        """
+        if self.__cache is not None:
+            timeseriescache.release(self.overlay)
+            self.__cache = None
+        TimeSeries.destroy(self)
 
 
     def makeLabel(self):
@@ -143,8 +157,8 @@ class VoxelTimeSeries(TimeSeries):
             return '{} [out of bounds]'.format(display.name)
 
 
-    # The PlotPanel uses a new thread to access
-    # data every time the displaycontext location
+    # The PlotPanel may access data from several
+    # threads when the displaycontext location
     # changes. So we mark this method as mutually
     # exclusive to prevent multiple
     # near-simultaneous accesses to the same voxel
@@ -162,19 +176,15 @@ class VoxelTimeSeries(TimeSeries):
 
         if ydata is None:
             opts = self.displayCtx.getOpts(self.overlay)
-            vdim = opts.volumeDim
             xyz  = opts.getVoxel(vround=True)
 
             if xyz is None:
                 return [], []
 
-            x, y, z = xyz
-
-            ydata = self.__cache.get((x, y, z, vdim), None)
+            if self.__cache is None:
+                self.__cache = timeseriescache.acquire(self.overlay)
 
-            if ydata is None:
-                ydata = self.overlay[opts.index(xyz, atVolume=False)]
-                self.__cache.put((x, y, z, vdim), ydata)
+            ydata = self.__cache.getTimeSeries(opts, xyz)
 
         if xdata is None:
             xdata = np.arange(len(ydata))
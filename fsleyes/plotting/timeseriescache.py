@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+#
+# timeseriescache.py - The TimeSeriesCache class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`TimeSeriesCache` class, which is used by
+the :class:`.VoxelTimeSeries` and :class:`.VoxelPowerSpectrumSeries` classes
+to retrieve voxel time series from :class:`.Image` overlays.
+
+
+Reading the time series for a single voxel from a large compressed or
+memory-mapped 4D image involves a strided read across every volume in the
+image, and is slow. The ``TimeSeriesCache`` instead reads small spatial
+*blocks* (e.g. 4x4x4 voxels) across all volumes at once, and caches them,
+so that the time series for neighbouring voxels are retrieved from memory.
+When the user moves the cursor around, the block adjacent to the current
+voxel, in the direction of movement, is loaded in the background.
+
+
+A single ``TimeSeriesCache`` is shared between all users of an ``Image``.
+Use the :func:`acquire` and :func:`release` functions to access the
+``TimeSeriesCache`` for an image, rather than creating one directly. The
+cache is cleared whenever the image data changes.
+"""
+
+
+import logging
+import threading
+
+import numpy as np
+
+import fsl.utils.cache    as cache
+import fsleyes.workerpool as workerpool
+
+
+log = logging.getLogger(__name__)
+
+
+BLOCK_SIZE = 4
+"""Default width, in voxels, of the blocks read by a
+:class:`TimeSeriesCache` along each spatial dimension.
+"""
+
+
+CACHE_BYTES = 256 * 1048576
+"""Default maximum amount of memory, in bytes, used by a single
+:class:`TimeSeriesCache`.
+"""
+
+
+_caches = {}
+"""Dictionary of ``{id(overlay) : [TimeSeriesCache, refcount]}`` mappings,
+used by the :func:`acquire` and :func:`release` functions.
+"""
+
+
+_cachesLock = threading.Lock()
+"""Lock protecting access to the :data:`_caches` dictionary. """
+
+
+def acquire(overlay):
+    """Returns the :class:`TimeSeriesCache` for the given :class:`.Image`,
+    creating it if necessary. Every call to ``acquire`` must be followed
+    by a corresponding call to :func:`release`.
+    """
+
+    with _cachesLock:
+
+        entry = _caches.get(id(overlay), None)
+
+        if entry is None:
+            entry = [TimeSeriesCache(overlay), 0]
+            _caches[id(overlay)] = entry
+
+        entry[1] += 1
+        return entry[0]
+
+
+def release(overlay):
+    """Releases a reference to the :class:`TimeSeriesCache` for the given
+    :class:`.Image`. When all references have been released, the cache is
+    destroyed.
+    """
+
+    with _cachesLock:
+
+        entry = _caches.get(id(overlay), None)
+
+        if entry is None:
+            return
+
+        entry[1] -= 1
+
+        if entry[1] <= 0:
+            _caches.pop(id(overlay))
+            entry[0].destroy()
+
+
+class TimeSeriesCache(object):
+    """The ``TimeSeriesCache`` reads and caches blocks of time series data
+    from an :class:`.Image`. See the module documentation for details.
+    """
+
+
+    def __init__(self, overlay, blockSize=None, maxBytes=None):
+        """Create a ``TimeSeriesCache``. You should use the :func:`acquire`
+        function instead of creating a ``TimeSeriesCache`` directly.
+
+        :arg overlay:   The :class:`.Image` overlay.
+        :arg blockSize: Block width, in voxels. Defaults to
+                        :data:`BLOCK_SIZE`.
+        :arg maxBytes:  Maximum cache size, in bytes. Defaults to
+                        :data:`CACHE_BYTES`.
+        """
+
+        if blockSize is None: blockSize = BLOCK_SIZE
+        if maxBytes  is None: maxBytes  = CACHE_BYTES
+
+        # Figure out how many blocks
+        # we can fit into the cache
+        nvols      = int(np.prod(overlay.shape[3:]))
+        blockBytes = blockSize ** 3 * nvols * overlay.dtype.itemsize
+        maxBlocks  = max(8, maxBytes // max(1, blockBytes))
+
+        self.__name       = '{}_{}'.format(type(self).__name__, id(self))
+        self.__overlay    = overlay
+        self.__blockSize  = blockSize
+        self.__cache      = cache.Cache(maxsize=maxBlocks)
+        self.__lock       = threading.Lock()
+        self.__loading    = {}
+        self.__generation = 0
+        self.__lastVoxel  = None
+        self.__prefetcher = workerpool.WorkerPool(
+            1, name='{}_prefetch'.format(self.__name))
+
+        overlay.register(self.__name, self.__dataChanged, 'data')
+
+
+    def destroy(self):
+        """Must be called when this ``TimeSeriesCache`` is no longer needed.
+        Clears the cache, and removes the listener on the image.
+        """
+        self.__prefetcher.stop()
+        self.__overlay.deregister(self.__name, 'data')
+        self.__cache.clear()
+        self.__overlay    = None
+        self.__prefetcher = None
+
+
+    @property
+    def blockSize(self):
+        """Returns the block width, in voxels. """
+        return self.__blockSize
+
+
+    def clear(self):
+        """Clears the cache. Any blocks which are currently being loaded will
+        not be added to the cache.
+        """
+        with self.__lock:
+            self.__generation += 1
+            self.__cache.clear()
+
+
+    def getTimeSeries(self, opts, voxel, prefetch=True):
+        """Returns the time series at the given voxel.
+
+        :arg opts:     The :class:`.NiftiOpts` instance associated with the
+                       image - its :attr:`.NiftiOpts.volumeDim` and the
+                       indices of any other volume dimensions are used to
+                       select the time series.
+
+        :arg voxel:    Integer voxel coordinates.
+
+        :arg prefetch: If ``True`` (the default), the block adjacent to
+                       ``voxel``, in the direction of movement from the
+                       previously requested voxel, is loaded in the
+                       background.
+        """
+
+        voxel      = [int(v) for v in voxel[:3]]
+        key, block = self.getBlock(opts, voxel, prefetch)
+        offset     = tuple(v % self.__blockSize for v in voxel)
+
+        return np.array(block[offset])
+
+
+    def getBlock(self, opts, voxel, prefetch=True):
+        """Returns the block which contains the given voxel. See
+        :meth:`getTimeSeries` for a description of the arguments.
+
+        :returns: A tuple containing:
+
+                   - A key which uniquely identifies the block (and which
+                     can be used by other caches).
+                   - The block data - a ``numpy`` array containing the time
+                     series for every voxel in the block.
+        """
+
+        voxel  = [int(v) for v in voxel[:3]]
+        volidx = self.__volumeIndex(opts)
+        key    = self.__blockKey(voxel, volidx)
+        block  = self.__getBlock(key)
+
+        if prefetch:
+            self.__prefetch(voxel, volidx)
+
+        return key, block
+
+
+    def __volumeIndex(self, opts):
+        """Returns a tuple which identifies the time series dimension of
+        the image, and the indices into any other volume dimensions. This
+        is the portion of :meth:`.NiftiOpts.index` beyond the first three
+        dimensions, with ``slice`` objects replaced by ``None`` so that it
+        can be used as part of a dictionary key.
+        """
+        idx = opts.index(atVolume=False)[3:]
+        return tuple(None if isinstance(i, slice) else i for i in idx)
+
+
+    def __blockKey(self, voxel, volidx):
+        """Returns a key identifying the block which contains the given
+        voxel.
+        """
+        bs = self.__blockSize
+        return tuple(v // bs for v in voxel) + (volidx,)
+
+
+    def __getBlock(self, key):
+        """Returns the block with the given key, loading it from the image
+        if it is not in the cache.
+        """
+
+        while True:
+
+            with self.__lock:
+
+                block = self.__cache.get(key, None)
+                if block is not None:
+                    return block
+
+                # Another thread is already
+                # loading this block - wait
+                # for it, then try again.
+                loading = self.__loading.get(key, None)
+                owner   = loading is None
+
+                if owner:
+                    loading            = threading.Event()
+                    generation         = self.__generation
+                    self.__loading[key] = loading
+
+            if not owner:
+                loading.wait()
+                continue
+
+            try:
+                block = self.__loadBlock(key)
+
+                # Don't cache the block if the
+                # data changed while we were
+                # loading it.
+                with self.__lock:
+                    if generation == self.__generation:
+                        self.__cache.put(key, block)
+            finally:
+                with self.__lock:
+                    self.__loading.pop(key, None)
+                loading.set()
+
+            return block
+
+
+    def __loadBlock(self, key):
+        """Reads the block with the given key from the image. """
+
+        overlay = self.__overlay
+        bs      = self.__blockSize
+        volidx  = key[3]
+        slc     = []
+
+        for ax, b in enumerate(key[:3]):
+            lo = b * bs
+            hi = min(lo + bs, overlay.shape[ax])
+            slc.append(slice(lo, hi))
+
+        slc += [slice(None) if i is None else i for i in volidx]
+
+        log.debug('Loading time series block {} from {}'.format(
+            key[:3], overlay.name))
+
+        return np.array(overlay[tuple(slc)])
+
+
+    def __prefetch(self, voxel, volidx):
+        """Schedules the block adjacent to the given voxel, in the direction
+        of movement from the previously requested voxel, to be loaded in
+        the background.
+        """
+
+        last             = self.__lastVoxel
+        self.__lastVoxel = voxel
+
+        if last is None:
+            return
+
+        shape     = self.__overlay.shape[:3]
+        direction = [int(np.sign(v - l)) for v, l in zip(voxel, last)]
+
+        if not any(direction):
+            return
+
+        neighbour = [v + d * self.__blockSize
+                     for v, d in zip(voxel, direction)]
+        neighbour = [min(max(n, 0), s - 1) for n, s in zip(neighbour, shape)]
+        key       = self.__blockKey(neighbour, volidx)
+
+        with self.__lock:
+            if key in self.__loading or \
+               self.__cache.get(key, None) is not None:
+                return
+
+        # Any prefetches which have not
+        # started yet are out of date
+        self.__prefetcher.cancel()
+        self.__prefetcher.submit(self.__getBlock, key)
+
+
+    def __dataChanged(self, *a):
+        """Called when the image data changes. Clears the cache. """
+        log.debug('{} data changed - clearing time series '
+                  'cache'.format(self.__overlay.name))
+        self.clear()
@@ -462,7 +462,7 @@ class OrthoEditProfile(orthoviewprofile.OrthoViewProfile):
         display = self.displayCtx.getDisplay(overlay)
         name    = '{}_mask'.format(display.name)
         data    = editor.getSelection().getSelection()
-        data    = np.array(data, dtype=overlay.dtype)
+        data    = np.array(data, dtype=np.uint8)
         mask    = copyoverlay.copyImage(self.overlayList,
                                         self.displayCtx,
                                         self.__currentOverlay,
@@ -301,8 +301,7 @@ class OrthoViewProfile(profiles.Profile):
             opts     = self.displayCtx.getOpts(overlay)
             vround   = opts.transform in ('id', 'pixdim', 'pixdim-flip')
             vloc     = opts.getVoxel(clip=False, vround=vround)
-            voxAxes  = overlay.axisMapping(opts.getTransform('voxel',
-                                                             'display'))
+            voxAxes  = opts.getDisplayAxisMapping()
 
             for i in range(3):
                 vdir       = np.sign(voxAxes[i])
@@ -18,6 +18,7 @@ import fsl.utils.transform as transform
 import fsl.utils.idle      as idle
 import fsleyes.profiles    as profiles
 import fsleyes.actions     as actions
+import fsleyes.meshindex   as meshindex
 
 
 log = logging.getLogger(__name__)
@@ -231,15 +232,13 @@ class Scene3DViewProfile(profiles.Profile):
             rayOrigin = opts.transformCoords(rayOrigin, 'display', 'mesh')
             rayDir    = opts.transformCoords(rayDir,    'display', 'mesh',
                                              vector=True)
-            loc, tri  = ovl.rayIntersection([rayOrigin],
-                                            [rayDir],
-                                            vertices=True)
+            index     = meshindex.getIndex(ovl)
+            loc, tri  = index.rayIntersection(rayOrigin, rayDir)
 
-            if len(loc) == 0:
+            if loc is None:
                 return
 
-            loc = loc[0]
-            tri = ovl.indices[int(tri[0]), :]
+            tri = ovl.indices[tri, :]
 
             # The rayIntersection method gives us a
             # point on one of the mesh triangles -
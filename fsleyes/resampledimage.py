@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+#
+# resampledimage.py - The ResampledImage class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`ResampledImage` class, a *virtual*
+:class:`.Image` which represents another image resampled onto a different
+voxel grid, without the resampled data ever being calculated in full.
+
+
+A ``ResampledImage`` only stores a reference to its source ``Image``, and the
+shape and voxel-to-world affine of the target grid. When it is displayed as a
+``volume`` overlay, it is rendered directly from the source image texture -
+the :meth:`.VolumeOpts.getTextureSource` method tells the :class:`.GLVolume`
+to use the source image data, and to map resampled voxel coordinates into
+source texture coordinates. Resampling is therefore performed on the GPU,
+as part of the normal texture lookup.
+
+
+Voxel values are only calculated when the resampled data is accessed, for
+example when a time series or histogram is plotted, or when the image is
+displayed as a type other than ``volume``. Data access is managed by a
+:class:`ResampledDataProxy` (the ``dataobj`` of the underlying ``nibabel``
+image), which resamples the source one 2D slice at a time, and keeps the
+most recently accessed slices in a cache (see :data:`CACHE_SIZE`).
+"""
+
+
+import logging
+import threading
+import itertools         as it
+
+import numpy             as np
+import scipy.ndimage     as ndimage
+import nibabel           as nib
+import nibabel.fileslice as fileslice
+
+import fsl.data.image      as fslimage
+import fsl.utils.cache     as cache
+import fsl.utils.transform as transform
+
+
+log = logging.getLogger(__name__)
+
+
+CACHE_SIZE = 512
+"""Maximum number of resampled 2D slices stored by each
+:class:`ResampledDataProxy`.
+"""
+
+
+class ResampledImage(fslimage.Image):
+    """A ``ResampledImage`` is a read-only :class:`.Image` which represents
+    another image resampled to a new voxel grid. See the module documentation
+    for details.
+
+    The non-spatial dimensions of the source image are preserved - only the
+    first three (spatial) dimensions are resampled. No smoothing is applied
+    when downsampling.
+    """
+
+
+    def __init__(self,
+                 source,
+                 shape,
+                 xform=None,
+                 order=1,
+                 name=None,
+                 cacheSize=None,
+                 **kwargs):
+        """Create a ``ResampledImage``.
+
+        :arg source:    The source :class:`.Image`.
+
+        :arg shape:     Shape of the resampled image along the spatial
+                        dimensions. May contain floating point values, which
+                        are interpreted in the same way as by
+                        :meth:`.Image.resample`. Any non-spatial values are
+                        ignored.
+
+        :arg xform:     Voxel-to-world affine of the resampled image. If not
+                        provided, the resampled grid covers the same extent
+                        as the source image grid, as with
+                        :meth:`.Image.resample`.
+
+        :arg order:     Spline interpolation order used when the resampled
+                        data is accessed (``0``, ``1`` or ``3``). This does
+                        not affect rendering, which uses the interpolation
+                        setting of the overlay display.
+
+        :arg name:      Image name - defaults to ``<source>_resampled``.
+
+        :arg cacheSize: Number of resampled slices to cache. Defaults to
+                        :data:`CACHE_SIZE`.
+
+        All other arguments are ignored - they are accepted so that a
+        ``ResampledImage`` can be created in the same way as other
+        :class:`.Image` types.
+        """
+
+        if not isinstance(source, fslimage.Image):
+            raise ValueError('Source must be an Image instance')
+
+        if name is None:
+            name = '{}_resampled'.format(source.name)
+
+        shape    = np.array(shape[:3], dtype=np.float64)
+        ratio    = np.array(source.shape[:3], dtype=np.float64) / shape
+        newShape = tuple(int(s) for s in np.round(shape))
+        newShape = newShape + tuple(source.shape[3:])
+
+        if xform is None:
+            xform = transform.concat(source.voxToWorldMat,
+                                     transform.scaleOffsetXform(ratio, 0))
+
+        voxToSrcMat = transform.concat(source.worldToVoxMat, xform)
+        proxy       = ResampledDataProxy(source,
+                                         newShape,
+                                         voxToSrcMat,
+                                         order=order,
+                                         cacheSize=cacheSize)
+
+        # Use the source header as a template,
+        # so the resampled image inherits its
+        # intent, units, etc.
+        header = source.header.copy()
+        header.set_data_dtype(source.dtype)
+        header.set_data_shape(newShape)
+
+        if isinstance(header, nib.nifti1.Nifti1Header):
+            header.set_sform(xform, code=int(header.get_sform(True)[1]))
+            header.set_qform(xform, code=int(header.get_qform(True)[1]))
+
+        nibImage = type(source.nibImage)(proxy, xform, header=header)
+
+        self.__source      = source
+        self.__proxy       = proxy
+        self.__voxToSrcMat = voxToSrcMat
+        self.__order       = order
+
+        fslimage.Image.__init__(self,
+                                nibImage,
+                                name=name,
+                                loadData=False,
+                                calcRange=False)
+
+        self.__lName = '{}_{}'.format(type(self).__name__, id(self))
+        source.register(self.__lName,
+                        self.__sourceDataChanged,
+                        topic='data')
+        source.register(self.__lName,
+                        self.__sourceDataRangeChanged,
+                        topic='dataRange')
+
+
+    def __del__(self):
+        """Deregisters from the source image. """
+        try:
+            self.__source.deregister(self.__lName, topic='data')
+            self.__source.deregister(self.__lName, topic='dataRange')
+        except Exception:
+            pass
+        fslimage.Image.__del__(self)
+
+
+    @property
+    def source(self):
+        """Returns the source :class:`.Image`. """
+        return self.__source
+
+
+    @property
+    def order(self):
+        """Returns the spline interpolation order used when the resampled
+        data is accessed.
+        """
+        return self.__order
+
+
+    @property
+    def voxToSourceVoxMat(self):
+        """Returns an affine transformation which transforms voxel
+        coordinates of this ``ResampledImage`` into voxel coordinates of the
+        source image.
+        """
+        return np.array(self.__voxToSrcMat)
+
+
+    @property
+    def dataRange(self):
+        """Returns the data range of the source image. The range of the
+        resampled data is not calculated, as it would require the entire
+        image to be resampled.
+        """
+        return self.__source.dataRange
+
+
+    def __setitem__(self, sliceobj, values):
+        """Raises a ``RuntimeError`` - ``ResampledImage`` data cannot be
+        modified.
+        """
+        raise RuntimeError('{} is a resampled view of {}, and cannot be '
+                           'modified'.format(self.name, self.__source.name))
+
+
+    def __sourceDataChanged(self, *a):
+        """Called when the source image data changes. Clears the slice
+        cache.
+        """
+        self.__proxy.clearCache()
+
+
+    def __sourceDataRangeChanged(self, *a):
+        """Called when the source image data range changes. Notifies
+        listeners registered on the ``dataRange`` topic of this image.
+        """
+        self.notify(topic='dataRange')
+
+
+class ResampledDataProxy(object):
+    """The ``ResampledDataProxy`` is an array-like object which is used as
+    the ``dataobj`` of the ``nibabel`` image that underlies a
+    :class:`ResampledImage`. When indexed, it resamples the required source
+    image data one 2D (X/Y) slice at a time, caching the result.
+    """
+
+
+    is_proxy = True
+    """Tells ``nibabel`` that the data is not in memory. """
+
+
+    def __init__(self, source, shape, voxToSrcMat, order=1, cacheSize=None):
+        """Create a ``ResampledDataProxy``.
+
+        :arg source:      The source :class:`.Image` (or any array-like).
+        :arg shape:       Shape of the resampled data.
+        :arg voxToSrcMat: Affine which transforms resampled voxel coordinates
+                          into source voxel coordinates.
+        :arg order:       Spline interpolation order.
+        :arg cacheSize:   Number of slices to cache. Defaults to
+                          :data:`CACHE_SIZE`.
+        """
+
+        if cacheSize is None:
+            cacheSize = CACHE_SIZE
+
+        self.__source      = source
+        self.__shape       = tuple(shape)
+        self.__dtype       = np.dtype(source.dtype)
+        self.__voxToSrcMat = np.array(voxToSrcMat, dtype=np.float64)
+        self.__order       = order
+        self.__cache       = cache.Cache(maxsize=cacheSize)
+        self.__lock        = threading.Lock()
+
+
+    @property
+    def shape(self):
+        """Returns the shape of the resampled data. """
+        return self.__shape
+
+
+    @property
+    def ndim(self):
+        """Returns the number of dimensions of the resampled data. """
+        return len(self.__shape)
+
+
+    @property
+    def dtype(self):
+        """Returns the resampled data type (the same as the source). """
+        return self.__dtype
+
+
+    def clearCache(self):
+        """Clears the slice cache. """
+        with self.__lock:
+            self.__cache.clear()
+
+
+    def __array__(self, dtype=None):
+        """Resamples and returns all of the data. """
+        data = self[(slice(None),) * self.ndim]
+        if dtype is not None:
+            data = np.asarray(data, dtype=dtype)
+        return data
+
+
+    def __getitem__(self, sliceobj):
+        """Resamples and returns the data at ``sliceobj``, which may contain
+        integers and slices.
+        """
+
+        shape    = self.__shape
+        sliceobj = fileslice.canonical_slicers(sliceobj, shape)
+
+        if len(sliceobj) != len(shape) or \
+           any(not isinstance(s, (slice, int, np.integer)) for s in sliceobj):
+            raise IndexError('Unsupported index: {}'.format(sliceobj))
+
+        ranges = []
+        for slc, n in zip(sliceobj, shape):
+            if isinstance(slc, slice): ranges.append(range(*slc.indices(n)))
+            else:                      ranges.append([int(slc)])
+
+        # Resample every selected X/Y slice
+        # into a block containing the full
+        # X/Y extent, and then apply the X/Y
+        # slices to the block.
+        zs     = ranges[2]
+        vols   = ranges[3:]
+        block  = np.zeros(shape[:2] + tuple(len(r) for r in ranges[2:]),
+                          dtype=self.__dtype)
+
+        for zi, z in enumerate(zs):
+            for voli in it.product(*[range(len(v)) for v in vols]):
+                vol = tuple(v[i] for v, i in zip(vols, voli))
+                block[(slice(None), slice(None), zi) + voli] = \
+                    self.__getSlice(z, vol)
+
+        index = list(sliceobj[:2])
+        for slc in sliceobj[2:]:
+            if isinstance(slc, slice): index.append(slice(None))
+            else:                      index.append(0)
+
+        return block[tuple(index)]
+
+
+    def __getSlice(self, z, vol):
+        """Returns the resampled 2D slice at ``z`` in volume ``vol``,
+        calculating it if it is not in the cache.
+        """
+
+        key = (z, vol)
+
+        with self.__lock:
+            data = self.__cache.get(key, None)
+
+        if data is None:
+            data = self.__calcSlice(z, vol)
+            with self.__lock:
+                self.__cache.put(key, data)
+
+        return data
+
+
+    def __calcSlice(self, z, vol):
+        """Resamples and returns the 2D slice at ``z`` in volume ``vol``.
+        Only the part of the source image which contributes to the slice is
+        read.
+        """
+
+        nx, ny   = self.__shape[:2]
+        srcShape = np.array(self.__source.shape[:3])
+        order    = self.__order
+        xform    = self.__voxToSrcMat
+        rot      = xform[:3, :3]
+        offset   = np.dot(rot, [0, 0, z]) + xform[:3, 3]
+
+        # The slice is a parallelogram in the
+        # source voxel grid - its bounding box
+        # is given by its corners, expanded by
+        # the support of the interpolating spline.
+        corners = np.array([[0,      0,      0],
+                            [nx - 1, 0,      0],
+                            [0,      ny - 1, 0],
+                            [nx - 1, ny - 1, 0]], dtype=np.float64)
+        corners = np.dot(corners, rot.T) + offset
+        halo    = order + 1
+
+        if order > 1:
+            halo += 16
+
+        lo = np.floor(corners.min(axis=0)).astype(np.intp) - halo
+        hi = np.ceil( corners.max(axis=0)).astype(np.intp) + 1 + halo
+        lo = np.maximum(lo, 0)
+        hi = np.minimum(hi, srcShape)
+
+        # The slice lies outside
+        # of the source image
+        if np.any(hi <= lo):
+            return np.zeros((nx, ny), dtype=self.__dtype)
+
+        idx  = tuple(slice(l, h) for l, h in zip(lo, hi)) + tuple(vol)
+        data = np.asarray(self.__source[idx])
+
+        if order > 0:
+            data = np.asarray(data, dtype=np.float64)
+
+        data = ndimage.affine_transform(data,
+                                        rot,
+                                        offset=offset - lo,
+                                        output_shape=(nx, ny, 1),
+                                        order=order,
+                                        mode='constant',
+                                        cval=0)[:, :, 0]
+
+        if order > 0 and np.issubdtype(self.__dtype, np.integer):
+            data = np.round(data)
+
+        return np.asarray(data, dtype=self.__dtype)
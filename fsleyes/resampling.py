@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+#
+# resampling.py - Chunked and parallel image resampling.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :func:`resample` function, which resamples an
+:class:`.Image` to a new shape in the same manner as the
+:meth:`.Image.resample` method, but without loading or copying the full image
+in one go, and without blocking the calling thread for the entire duration.
+
+
+The output is split into *blocks* - each volume of a 4D image is a separate
+block, and large 3D volumes are further split into slabs along the Z axis
+(see :data:`SLAB_SIZE`). Each block is read from the image (including a
+*halo* of neighbouring slices which are needed for smoothing and
+interpolation), smoothed, interpolated, and written into a pre-allocated
+output array. Blocks are processed in parallel on a :class:`.WorkerPool`.
+A progress function may be used to monitor progress and to cancel the
+resampling.
+"""
+
+
+import logging
+
+import numpy         as np
+import scipy.ndimage as ndimage
+
+import fsl.utils.transform as transform
+import fsleyes.workerpool  as workerpool
+
+
+log = logging.getLogger(__name__)
+
+
+SLAB_SIZE = 2 ** 22
+"""Approximate maximum number of output voxels in each block processed by
+the :func:`resample` function. 3D volumes which are larger than this are
+split into slabs along the Z axis.
+"""
+
+
+class ResampleCancelled(Exception):
+    """Raised by :func:`resample` when the resampling is cancelled via the
+    progress function.
+    """
+    pass
+
+
+def resample(image,
+             newShape,
+             sliceobj=None,
+             dtype=None,
+             order=1,
+             smooth=True,
+             pool=None,
+             progfunc=None,
+             slabSize=None):
+    """Resamples the given :class:`.Image` to a new shape. The arguments and
+    return value are the same as for the :meth:`.Image.resample` method,
+    with the following differences:
+
+    :arg sliceobj: Index into the image, e.g. as returned by
+                   :meth:`.NiftiOpts.index`. The spatial dimensions must be
+                   selected in their entirety - only non-spatial dimensions
+                   may be indexed.
+
+    :arg pool:     :class:`.WorkerPool` used to process blocks in parallel.
+                   If not provided, a pool is created for the duration of
+                   the call.
+
+    :arg progfunc: Function which is called, on the calling thread, after
+                   each block has been resampled, and which is passed the
+                   number of completed blocks, and the total number of
+                   blocks. If it returns ``False``, the resampling is
+                   cancelled, and a :exc:`ResampleCancelled` error raised.
+
+    :arg slabSize: Defaults to :data:`SLAB_SIZE`.
+    """
+
+    if dtype    is None: dtype    = image.dtype
+    if slabSize is None: slabSize = SLAB_SIZE
+
+    index    = _normaliseIndex(image.shape, sliceobj)
+    oldShape = _indexShape(image.shape, index)
+    newShape = np.array(newShape, dtype=np.float64)
+
+    if len(oldShape) != len(newShape):
+        raise ValueError('Shapes don\'t match')
+
+    # Nothing to do - return a copy
+    # of the (sliced) image data
+    if np.all(np.isclose(oldShape, newShape)):
+        data = np.array(image[index], dtype=dtype)
+        return data, image.voxToWorldMat
+
+    oldShape = np.array(oldShape, dtype=np.float64)
+    ratio    = oldShape / newShape
+    newShape = tuple(int(s) for s in np.round(newShape))
+    sigma    = np.zeros(3)
+
+    # Smoothing sigmas are calculated in the same
+    # way as by Image.resample (see the comments
+    # in that method). Smoothing is only performed
+    # along the spatial dimensions - resampling
+    # is always performed independently for each
+    # 3D volume.
+    if order > 0 and smooth:
+        sigma                     = np.array(ratio[:3])
+        sigma[ratio[:3] <  1.1]   = 0
+        sigma[ratio[:3] >= 1.1]  *= 0.425
+
+    if not np.all(np.isclose(ratio[3:], 1)):
+        raise ValueError('Only the spatial dimensions can be resampled')
+
+    output  = np.empty(newShape, dtype=dtype)
+    blocks  = _blocks(image.shape, index, newShape, slabSize)
+    ownPool = pool is None
+
+    if ownPool:
+        pool = workerpool.WorkerPool(name='resample')
+
+    log.debug('Resampling %s to %s (%u blocks)',
+              image.name, newShape, len(blocks))
+
+    try:
+        jobs = [pool.submit(resampleBlock,
+                            image,
+                            output,
+                            srcIdx,
+                            outIdx,
+                            (z0, z1),
+                            ratio[:3],
+                            sigma,
+                            order,
+                            jobGroup=id(output))
+                for srcIdx, outIdx, z0, z1 in blocks]
+
+        for i, job in enumerate(jobs):
+
+            job.wait()
+
+            if job.error is not None:
+                raise job.error
+
+            if progfunc is not None and \
+               progfunc(i + 1, len(jobs)) is False:
+                raise ResampleCancelled()
+
+    except Exception:
+        pool.cancel(id(output))
+        raise
+
+    finally:
+        if ownPool:
+            pool.stop()
+
+    scale = transform.scaleOffsetXform(ratio[:3], 0)
+    xform = transform.concat(image.voxToWorldMat, scale)
+
+    return output, xform
+
+
+def resampleBlock(image, output, srcIdx, outIdx, zrange, ratio, sigma, order):
+    """Resamples one block of an image. Used by :func:`resample`, and may be
+    run on a separate thread.
+
+    :arg image:  The :class:`.Image`, or any array-like.
+    :arg output: Output array.
+    :arg srcIdx: Index into ``image`` selecting the 3D volume to resample.
+                 The first three entries must be ``slice(None)``.
+    :arg outIdx: Index into ``output`` selecting the 3D output volume.
+    :arg zrange: ``(z0, z1)`` range of output slices to calculate.
+    :arg ratio:  Ratio of old to new voxel sizes, along each spatial
+                 dimension.
+    :arg sigma:  Smoothing sigmas along each spatial dimension.
+    :arg order:  Spline interpolation order.
+    """
+
+    z0, z1       = zrange
+    nz           = image.shape[2]
+    lo, hi       = blockSourceRange(nz, z0, z1, ratio[2], sigma[2], order)
+    srcIdx       = tuple(srcIdx[:2]) + (slice(lo, hi),) + tuple(srcIdx[3:])
+    outIdx       = tuple(outIdx[:2]) + (slice(z0, z1),) + tuple(outIdx[3:])
+    outShape     = output[outIdx].shape
+
+    data = np.array(image[srcIdx], dtype=output.dtype)
+
+    if np.any(sigma > 0):
+        data = ndimage.gaussian_filter(data, sigma)
+
+    # Output voxel o samples the source at ratio * o
+    # in the full image, which is ratio * o - lo
+    # within the source block.
+    offset = [0, 0, ratio[2] * z0 - lo]
+
+    output[outIdx] = ndimage.affine_transform(data,
+                                              ratio,
+                                              offset=offset,
+                                              output_shape=outShape,
+                                              order=order)
+
+
+def blockSourceRange(nz, z0, z1, ratio, sigma, order):
+    """Calculates the range of source slices which are required to calculate
+    output slices ``z0`` to ``z1``. The range is expanded to take into
+    account the width of the smoothing kernel, and the support of the
+    interpolating spline.
+
+    :returns: A tuple containing the ``(low, high)`` source slice range.
+    """
+
+    # ndimage.gaussian_filter truncates
+    # its kernel at 4 standard deviations
+    halo = int(4 * sigma + 0.5) + order + 2
+
+    # The spline pre-filter applied for higher
+    # order interpolation is not local, but
+    # its influence decays quickly
+    if order > 1:
+        halo += 16
+
+    lo = max(0,  int(np.floor(ratio * z0))            - halo)
+    hi = min(nz, int(np.ceil( ratio * (z1 - 1))) + 1 + halo)
+
+    return lo, hi
+
+
+def _normaliseIndex(shape, sliceobj):
+    """Used by :func:`resample`. Returns a tuple of length ``len(shape)``
+    equivalent to ``sliceobj``.
+    """
+
+    if sliceobj is None:
+        sliceobj = ()
+    if not isinstance(sliceobj, tuple):
+        sliceobj = (sliceobj,)
+
+    index = tuple(sliceobj) + (slice(None),) * (len(shape) - len(sliceobj))
+
+    if any(i != slice(None) for i in index[:3]):
+        raise ValueError('The spatial dimensions cannot be sliced')
+
+    return index
+
+
+def _indexShape(shape, index):
+    """Used by :func:`resample`. Returns the shape of the data that would be
+    returned by indexing an array of the given ``shape`` with ``index``,
+    without accessing any data.
+    """
+    return np.broadcast_to(0, shape)[index].shape
+
+
+def _blocks(shape, index, newShape, slabSize):
+    """Used by :func:`resample`. Splits the output into blocks - see the
+    module documentation.
+
+    :arg shape:    Shape of the source image.
+    :arg index:    Index into the source image, as returned by
+                   :func:`_normaliseIndex`.
+    :arg newShape: Shape of the output.
+    :arg slabSize: Maximum number of voxels in each block.
+
+    :returns: A list of ``(srcIdx, outIdx, z0, z1)`` tuples, one for each
+              block.
+    """
+
+    # Indices of the non-spatial
+    # dimensions which were not
+    # fixed by the input index
+    free    = [(i, range(*idx.indices(shape[i])))
+               for i, idx in enumerate(index)
+               if i >= 3 and isinstance(idx, slice)]
+    nslices = max(1, slabSize // max(1, newShape[0] * newShape[1]))
+    zranges = [(z, min(z + nslices, newShape[2]))
+               for z in range(0, newShape[2], nslices)]
+    blocks  = []
+
+    for vol in np.ndindex(*newShape[3:]):
+
+        srcIdx = list(index)
+        for (dim, vrange), vi in zip(free, vol):
+            srcIdx[dim] = vrange[vi]
+
+        outIdx = (slice(None),) * 3 + tuple(vol)
+
+        for z0, z1 in zranges:
+            blocks.append((tuple(srcIdx), outIdx, z0, z1))
+
+    return blocks
@@ -178,6 +178,10 @@ messages = TypeDict({
 
     'SaveOverlayAction.saveError' :
     'An error occurred while saving the file {}.',
+    'SaveOverlayAction.saving'    : 'Saving {}... {}%',
+    'SaveOverlayAction.saved'     : '{} saved.',
+    'SaveOverlayAction.inProgress' :
+    '{} is already being saved.',
 
     'removeoverlay.unsaved' :
     'This image has unsaved changes - are you sure you want to remove it?',
@@ -223,6 +227,9 @@ messages = TypeDict({
     'CorrelateAction.calculating' :
     'Calculating correlation values for seed voxel [{}, {}, {}] ...',
 
+    'ResampleAction.resampling' : 'Resampling {} ...',
+    'ResampleAction.error'      : 'An error occurred resampling {}.',
+
     'EditTransformPanel.saveFlirt.error' :
     'An error occurred saving the affine matrix.',
 
@@ -422,6 +429,9 @@ titles = TypeDict({
 
     'SaveFlirtXfmAction.error' : 'Error saving affine matrix',
 
+    'ResampleAction.resampling' : 'Resampling image',
+    'ResampleAction.error'      : 'Error resampling image',
+
     'ClearSettingsAction.confirm' : 'Clear all settings?',
 
 
@@ -843,6 +853,7 @@ labels = TypeDict({
     'ResampleDialog.interpolation' : 'Interpolation',
     'ResampleDialog.smoothing'     : 'Smoothing',
     'ResampleDialog.allVolumes'    : 'All volumes',
+    'ResampleDialog.virtual'       : 'Resample on the fly',
     'ResampleDialog.dtype'         : 'Data type',
     'ResampleDialog.nearest'       : 'Nearest neighbour',
     'ResampleDialog.linear'        : 'Linear',
@@ -872,6 +883,8 @@ labels = TypeDict({
 
     'BrowseDicomDialog.load'       : 'Load',
     'BrowseDicomDialog.cancel'     : 'Cancel',
+    'BrowseDicomDialog.scanning'   : 'Scanning for DICOM data series...',
+    'BrowseDicomDialog.found'      : '{} DICOM data series found',
 })
 
 
@@ -924,6 +937,9 @@ properties = TypeDict({
     'Scene3DOpts.light'      : 'Lighting',
     'Scene3DOpts.lightPos'   : 'Light position',
     'Scene3DOpts.occlusion'  : 'Volume occlusion',
+    'Scene3DOpts.progressive'      : 'Progressive rendering',
+    'Scene3DOpts.progressiveDelay' : 'Progressive rendering delay (ms)',
+    'Scene3DOpts.frameBudget'      : 'Interactive frame time (ms)',
 
     'PlotPanel.legend'     : 'Show legend',
     'PlotPanel.ticks'      : 'Show ticks',
@@ -964,6 +980,7 @@ properties = TypeDict({
     'HistogramSeries.volume'          : 'Volume',
     'HistogramSeries.dataRange'       : 'Data range',
     'HistogramSeries.showOverlay'     : 'Show 3D histogram overlay',
+    'HistogramSeries.allVolumes'      : 'Calculate across all volumes',
 
     'PowerSpectrumSeries.varNorm'     : 'Normalise to unit variance',
 
@@ -1037,6 +1054,7 @@ properties = TypeDict({
     'MaskOpts.threshold'     : 'Threshold',
     'MaskOpts.outline'       : 'Show outline only',
     'MaskOpts.outlineWidth'  : 'Outline width',
+    'MaskOpts.voxelOutline'  : 'Voxel outline',
     'MaskOpts.interpolation' : 'Interpolation',
 
     'VectorOpts.xColour'       : 'X Colour',
@@ -1082,6 +1100,7 @@ properties = TypeDict({
     'LabelOpts.lut'          : 'Look-up table',
     'LabelOpts.outline'      : 'Show outline only',
     'LabelOpts.outlineWidth' : 'Outline width',
+    'LabelOpts.voxelOutline' : 'Voxel outline',
     'LabelOpts.showNames'    : 'Show label names',
 
     'TensorOpts.lighting'          : 'Lighting effects',
@@ -183,6 +183,11 @@ properties = TypeDict({
     'MaskOpts.outlineWidth'  :
     'When the mask outline is shown, this setting controls the outline width '
     'in pixels.',
+    'MaskOpts.voxelOutline'  :
+    'When selected, the mask outline is calculated once, in terms of voxels, '
+    'rather than every time the display is drawn. The outline width is then '
+    'in voxels. This can make drawing faster, particularly in the lightbox '
+    'view.',
     'MaskOpts.interpolation' :
     'Interpolate the mask data on the display. You can choose no  '
     'interpolation (equivalent to nearest neighbour interpolation), linear '
@@ -199,6 +204,12 @@ properties = TypeDict({
                                'transparent border around each region. In '
                                'this situation, setting the width to 0 will '
                                'prevent the border from being shown.',
+    'LabelOpts.voxelOutline' : 'When selected, region outlines are calculated '
+                               'once, in terms of voxels, rather than every '
+                               'time the display is drawn. The outline width '
+                               'is then in voxels, and filled regions are '
+                               'drawn without a border. This can make drawing '
+                               'faster, particularly in the lightbox view.',
     'LabelOpts.showNames'    : 'Annotate the image display with the names of '
                                'each labelled region.',
 
@@ -477,6 +488,17 @@ properties = TypeDict({
     'Scene3DOpts.occlusion' :
     'When selected, volumes in the scene which are behind another volume will '
     'not be shown. ',
+    'Scene3DOpts.progressive' :
+    'When selected, volumes are drawn at a lower quality while the scene is '
+    'being rotated, zoomed, or panned, and are re-drawn at full quality '
+    'afterwards.',
+    'Scene3DOpts.progressiveDelay' :
+    'Time, in milliseconds, to wait after the scene has stopped moving before '
+    'drawing it at full quality.',
+    'Scene3DOpts.frameBudget' :
+    'Target time, in milliseconds, for drawing a single frame while the '
+    'scene is moving. The quality is adjusted automatically to stay within '
+    'this time.',
 
     'Scene3DOpts.zoom' :
     'Zoom level - distance from the camera to the model space.',
@@ -625,6 +647,9 @@ properties = TypeDict({
                                         'the first and last bins.',
     'HistogramSeries.volume'          : 'Current volume to calculate the '
                                         'histogram for (4D images only).',
+    'HistogramSeries.allVolumes'      : 'Calculate the histogram across all '
+                                        'volumes, rather than for the current '
+                                        'volume (4D images only).',
     'HistogramSeries.dataRange'       : 'Data range to include in the '
                                         'histogram.',
 
@@ -826,4 +851,9 @@ misc = TypeDict({
     'For images with more than three dimensions, this checkbox controls '
     'whether all volumes are resampled, or just the currently selected '
     'volume.',
+    'ResampleDialog.virtual' :
+    'If selected, the resampled image is not created in memory. Instead, it '
+    'is displayed directly from the original image, and voxel values are '
+    'only calculated when they are needed. The data type, smoothing, and '
+    'all volumes settings are ignored.',
 })
@@ -14,6 +14,7 @@ the currently selected overlay.
 
 import logging
 import collections
+import time
 
 import wx
 
@@ -31,6 +32,7 @@ import fsleyes_widgets.elistbox           as elistbox
 import fsleyes.strings                    as strings
 import fsleyes.actions                    as actions
 import fsleyes.overlay                    as fsloverlay
+import fsleyes.workerpool                 as workerpool
 import fsleyes.colourmaps                 as fslcm
 import fsleyes.plotting                   as plotting
 import fsleyes.controls.overlaylistpanel  as overlaylistpanel
@@ -106,6 +108,29 @@ class PlotPanel(viewpanel.ViewPanel):
     method, in case anything needs to be scheduled on it.
 
 
+    The data for each ``DataSeries`` is prepared on a small, fixed-size
+    :class:`.WorkerPool`. Every call to :meth:`drawDataSeries` starts a new
+    draw *generation* - any data preparation from a previous generation
+    which has not yet started is cancelled, and only the data from the most
+    recent generation is plotted. The time taken by the most recent redraw
+    can be retrieved via the :meth:`getDrawLatency` method.
+
+
+    **Incremental drawing**
+
+
+    Whenever possible, the plot is updated incrementally, rather than being
+    cleared and redrawn from scratch. If the only things that have changed
+    since the last full redraw are the data for the ``extraSeries`` passed to
+    :meth:`drawDataSeries` (e.g. the time series for the voxel at the
+    current cursor location), the ``Line2D`` data for those series is
+    updated, and they are drawn on top of a cached copy of the rest of the
+    plot (the axes, grid, and held :attr:`dataSeries`), which is then
+    blitted to the canvas. A full redraw is performed whenever a plot
+    setting, axis label, or axis limit changes, or when the data series being
+    plotted, or the data for any held series, changes.
+
+
     **Plot panel actions**
 
     A number of :mod:`actions` are also provided by the ``PlotPanel`` class:
@@ -239,20 +264,60 @@ class PlotPanel(viewpanel.ViewPanel):
         self.__drawQueue.daemon = True
         self.__drawQueue.start()
 
+        # The data for each data series is
+        # prepared on a bounded pool of worker
+        # threads, so that rapid draw requests
+        # (e.g. when the user is dragging the
+        # cursor around) do not result in a
+        # new thread for every data series on
+        # every request.
+        self.__preparePool = workerpool.WorkerPool(
+            name='{}_prepare'.format(self.__name))
+
         # Whenever a new request comes in to
-        # draw the plot, we can't cancel any
-        # pending requests, as they are running
-        # on separate threads and out of our
-        # control (and could be blocking on I/O).
-        #
-        # Instead, we keep track of the total
-        # number of pending requests. The
-        # __drawDataSeries method (which does the
-        # actual plotting) will only draw the
-        # plot if there are no pending requests
-        # (because otherwise it would be drawing
+        # draw the plot, we cancel all data
+        # preparation jobs which have not yet
+        # started. Jobs which have already
+        # started cannot be cancelled (they
+        # could be blocking on I/O), so each
+        # draw request is given a generation
+        # number - the __drawDataSeries method
+        # (which does the actual plotting) will
+        # only draw the plot if its generation
+        # is the most recent one (because
+        # otherwise it would be drawing
         # out-of-date data).
-        self.__drawRequests = 0
+        self.__drawGeneration = 0
+
+        # Time (seconds) taken by the most
+        # recent redraw, from the call to
+        # drawDataSeries until the data was
+        # plotted.
+        self.__drawLatency = None
+
+        # When only the data for the "extra"
+        # series passed to drawDataSeries
+        # has changed (e.g. the user has
+        # moved the cursor), the plot is
+        # updated incrementally by blitting
+        # the new lines on top of a cached
+        # copy of the rest of the plot. The
+        # __blitState is a dict containing
+        # information about the most recent
+        # full redraw, and the __blitBackground
+        # is the cached canvas region. The
+        # __fullRedraw flag is set whenever
+        # a plot setting changes, to force
+        # a full redraw. The __canvasStale
+        # flag is used by drawArtists so the
+        # canvas is only redrawn when needed.
+        self.__blitState           = None
+        self.__blitBackground      = None
+        self.__blitSize            = None
+        self.__fullRedraw          = True
+        self.__canvasStale         = True
+        self.__capturingBackground = False
+        canvas.mpl_connect('draw_event', self.__canvasDrawn)
 
         # The getDrawnDataSeries method returns
         # data as it is shown on the plot - some
@@ -279,7 +344,7 @@ class PlotPanel(viewpanel.ViewPanel):
                          'smooth',
                          'xlabel',
                          'ylabel']:
-            self.addListener(propName, self.__name, self.asyncDraw)
+            self.addListener(propName, self.__name, self.__plotPropChanged)
 
         # custom listeners for a couple of properties
         self.addListener('dataSeries',
@@ -315,6 +380,14 @@ class PlotPanel(viewpanel.ViewPanel):
         return self.__drawQueue
 
 
+    def getDrawLatency(self):
+        """Returns the time, in seconds, taken by the most recent redraw,
+        from the call to :meth:`drawDataSeries` until the data was plotted.
+        Returns ``None`` if nothing has been drawn yet.
+        """
+        return self.__drawLatency
+
+
     def draw(self, *a):
         """This method must be overridden by ``PlotPanel`` sub-classes.
 
@@ -371,7 +444,9 @@ class PlotPanel(viewpanel.ViewPanel):
             ds.destroy()
 
         self.__drawQueue.stop()
+        self.__preparePool.stop()
         self.__drawQueue       = None
+        self.__preparePool     = None
         self.__drawnDataSeries = None
         self.dataSeries        = []
         self.artists           = []
@@ -435,6 +510,7 @@ class PlotPanel(viewpanel.ViewPanel):
 
         if clear:
             self.__drawnDataSeries.clear()
+            self.__blitState = None
             axis.clear()
             axis.set_xlim((0.0, 1.0))
             axis.set_ylim((0.0, 1.0))
@@ -492,7 +568,15 @@ class PlotPanel(viewpanel.ViewPanel):
         """Draw all ``matplotlib.Artist`` instances in the :attr:`artists`
         list, then refresh the canvas.
 
-        :arg refresh: If ``True`` (default), the canvas is refreshed.
+        :arg refresh:   If ``True`` (default), the canvas is refreshed. If
+                        the most recent call to :meth:`drawDataSeries`
+                        resulted in an incremental (blitted) update, and no
+                        new artists have been added, the canvas is already
+                        up to date, and is not redrawn.
+
+        :arg immediate: If ``True``, the artists are drawn and the canvas
+                        is refreshed immediately. Otherwise (the default)
+                        these steps are scheduled on the draw queue.
         """
 
         axis   = self.getAxis()
@@ -508,6 +592,15 @@ class PlotPanel(viewpanel.ViewPanel):
             for artist in self.artists:
                 if artist not in axis.findobj(type(artist)):
                     axis.add_artist(artist)
+                    self.__canvasStale = True
+
+        def realRefresh():
+
+            if not fwidgets.isalive(self):
+                return
+
+            if self.__canvasStale:
+                canvas.draw()
 
         if immediate: realDraw()
         else:
@@ -515,7 +608,7 @@ class PlotPanel(viewpanel.ViewPanel):
 
         if refresh:
             if immediate: canvas.draw()
-            else:         self.__drawQueue.enqueue(idle.idle, canvas.draw)
+            else:         self.__drawQueue.enqueue(idle.idle, realRefresh)
 
 
     def drawDataSeries(self, extraSeries=None, refresh=False, **plotArgs):
@@ -525,15 +618,19 @@ class PlotPanel(viewpanel.ViewPanel):
         This method does not do the actual plotting - it is performed
         asynchronously, to avoid locking up the GUI:
 
-         1. The data for each ``DataSeries`` instance is prepared on
-            separate threads (using :func:`.idle.run`).
+         1. Any data preparation jobs from previous calls which have not
+            yet started are cancelled.
+
+         2. The data for each ``DataSeries`` instance is prepared on
+            the :class:`.WorkerPool`.
 
-         2. A call to :func:`.idle.wait` is enqueued on a
+         3. A call to :meth:`__waitAndDraw` is enqueued on a
             :class:`.TaskThread`.
 
-         3. This ``wait`` function waits until all of the data preparation
-            threads have completed, and then passes all of the data to
-            the :meth:`__drawDataSeries` method.
+         4. This function waits until all of the data preparation
+            jobs have completed, and then passes all of the data to
+            the :meth:`__drawDataSeries` method, unless a more recent
+            call to ``drawDataSeries`` has been made in the meantime.
 
         :arg extraSeries: A sequence of additional ``DataSeries`` to be
                           plotted. These series are passed through the
@@ -559,6 +656,15 @@ class PlotPanel(viewpanel.ViewPanel):
         if extraSeries is None:
             extraSeries = []
 
+        # Start a new draw generation - any
+        # preparation jobs from previous
+        # generations which have not yet
+        # started are now out of date.
+        self.__drawGeneration += 1
+        generation             = self.__drawGeneration
+        startTime              = time.time()
+        self.__preparePool.cancel()
+
         canvas      = self.getCanvas()
         axis        = self.getAxis()
         toPlot      = self.dataSeries[:]
@@ -566,11 +672,12 @@ class PlotPanel(viewpanel.ViewPanel):
         toPlot      = [ds for ds in toPlot      if ds.enabled]
         extraSeries = [ds for ds in extraSeries if ds.enabled]
 
-        toPlot      = extraSeries + toPlot
         preprocs    = [True] * len(extraSeries) + [False] * len(toPlot)
+        toPlot      = extraSeries + toPlot
 
         if len(toPlot) == 0:
             self.__drawnDataSeries.clear()
+            self.__blitState = None
             axis.clear()
             canvas.draw()
             self.Refresh()
@@ -588,16 +695,16 @@ class PlotPanel(viewpanel.ViewPanel):
         axylim = axis.get_ylim()
 
         # Here we are preparing the data for
-        # each data series on separate threads,
+        # each data series on the worker pool,
         # as data preparation can be time
         # consuming for large images. We
         # display a message on the canvas
         # during preparation.
-        tasks    = []
+        jobs     = []
         allXdata = [None] * len(toPlot)
         allYdata = [None] * len(toPlot)
 
-        # Create a separate function
+        # Create a separate job
         # for each data series
         for idx, (ds, preproc) in enumerate(zip(toPlot, preprocs)):
 
@@ -606,44 +713,81 @@ class PlotPanel(viewpanel.ViewPanel):
                 if not d.enabled:
                     return
 
+                # Don't bother if this request
+                # has already been superseded
+                if generation != self.__drawGeneration:
+                    return
+
                 if p: xdata, ydata = self.prepareDataSeries(d)
                 else: xdata, ydata = d.getData()
 
                 allXdata[i] = xdata
                 allYdata[i] = ydata
 
-            tasks.append(getData)
+            jobs.append(self.__preparePool.submit(getData))
 
-        # Run the data preparation tasks,
-        # a separate thread for each.
-        tasks = [idle.run(t) for t in tasks]
-
-        # Show a message while we're
-        # preparing the data.
-        self.message(strings.messages[self, 'preparingData'],
-                     clear=False,
-                     border=True)
+        # Show a message while we're preparing
+        # the data, unless the plot is likely
+        # to be updated incrementally (in which
+        # case the message would just flicker).
+        if self.__fullRedraw or self.__blitState is None:
+            self.message(strings.messages[self, 'preparingData'],
+                         clear=False,
+                         border=True)
 
         # Wait until data preparation is
         # done, then call __drawDataSeries.
-        self.__drawRequests += 1
-        self.__drawQueue.enqueue(idle.wait,
-                                 tasks,
-                                 self.__drawDataSeries,
+        self.__drawQueue.enqueue(self.__waitAndDraw,
+                                 generation,
+                                 startTime,
+                                 jobs,
                                  toPlot,
+                                 preprocs,
                                  allXdata,
                                  allYdata,
                                  axxlim,
                                  axylim,
                                  refresh,
                                  taskName='{}.wait'.format(id(self)),
-                                 wait_direct=True,
                                  **plotArgs)
 
 
+    def __waitAndDraw(self, generation, startTime, jobs, *args, **kwargs):
+        """Called on the draw queue by :meth:`drawDataSeries`. Waits until
+        all of the given data preparation ``jobs`` have completed, and then
+        schedules a call to :meth:`__drawDataSeries` on the main thread.
+
+        If a more recent call to :meth:`drawDataSeries` is made while
+        waiting, this method returns without drawing anything.
+
+        :arg generation: Draw generation of the request.
+        :arg startTime:  Time at which the request was made.
+        :arg jobs:       List of :class:`.Job` instances to wait on.
+
+        All other arguments are passed through to :meth:`__drawDataSeries`.
+        """
+
+        for job in jobs:
+            while not job.wait(0.05):
+                if generation != self.__drawGeneration:
+                    return
+
+        if generation != self.__drawGeneration:
+            return
+
+        idle.idle(self.__drawDataSeries,
+                  generation,
+                  startTime,
+                  *args,
+                  **kwargs)
+
+
     def __drawDataSeries(
             self,
+            generation,
+            startTime,
             dataSeries,
+            dynamic,
             allXdata,
             allYdata,
             oldxlim,
@@ -652,11 +796,26 @@ class PlotPanel(viewpanel.ViewPanel):
             xlabel=None,
             ylabel=None,
             **plotArgs):
-        """Called by :meth:`__drawDataSeries`. Plots all of the data
+        """Called by :meth:`__waitAndDraw`. Plots all of the data
         associated with the given ``dataSeries``.
 
+        If possible, the plot is updated incrementally via
+        :meth:`__blitDataSeries`. Otherwise the plot is cleared and fully
+        redrawn via :meth:`__fullDrawDataSeries`.
+
+        :arg generation: Draw generation of the request - the data is only
+                         plotted if this is the most recent generation.
+
+        :arg startTime:  Time at which the request was made - used to
+                         calculate the redraw latency.
+
         :arg dataSeries: The list of :class:`.DataSeries` instances to plot.
 
+        :arg dynamic:    A list of booleans, one for each ``DataSeries``,
+                         ``True`` for ``extraSeries`` which were passed to
+                         :meth:`drawDataSeries`, ``False`` for series in the
+                         :attr:`dataSeries` list.
+
         :arg allXdata:   A list of arrays containing X axis data, one for each
                          ``DataSeries``.
 
@@ -678,27 +837,29 @@ class PlotPanel(viewpanel.ViewPanel):
                          property.
 
         :arg plotArgs:   Remaining arguments passed to the
-                         :meth:`__drawOneDataSeries` method.
+                         ``Axis.plot`` function.
         """
 
         # Only draw the plot if there are no
-        # pending draw requests. Otherwise
+        # more recent draw requests. Otherwise
         # we would be drawing out-of-date data.
-        self.__drawRequests -= 1
-        if self.__drawRequests != 0:
+        if self.destroyed() or generation != self.__drawGeneration:
             return
 
-        axis          = self.getAxis()
         canvas        = self.getCanvas()
         width, height = canvas.get_width_height()
 
-        self.__drawnDataSeries.clear()
-        axis.clear()
+        # Apply smoothing/log scaling to the
+        # data for each series, and figure out
+        # the data limits.
+        drawData = []
+        xlims    = []
+        ylims    = []
 
-        xlims = []
-        ylims = []
-
-        for ds, xdata, ydata in zip(dataSeries, allXdata, allYdata):
+        for ds, dyn, xdata, ydata in zip(dataSeries,
+                                         dynamic,
+                                         allXdata,
+                                         allYdata):
 
             if any((ds is None, xdata is None, ydata is None)):
                 continue
@@ -706,10 +867,14 @@ class PlotPanel(viewpanel.ViewPanel):
             if not ds.enabled:
                 continue
 
-            xlim, ylim = self.__drawOneDataSeries(ds,
-                                                  xdata,
-                                                  ydata,
-                                                  **plotArgs)
+            processed = self.__processData(ds, xdata, ydata)
+
+            if processed is None:
+                continue
+
+            xdata, ydata, xlim, ylim = processed
+
+            drawData.append((ds, dyn, xdata, ydata))
 
             if np.any(np.isclose([xlim[0], ylim[0]], [xlim[1], ylim[1]])):
                 continue
@@ -732,6 +897,56 @@ class PlotPanel(viewpanel.ViewPanel):
 
         xlabel = xlabel.strip()
         ylabel = ylabel.strip()
+        limits = (xmin, xmax, ymin, ymax)
+
+        if self.__canBlit(drawData, xlabel, ylabel, limits):
+            self.__blitDataSeries(drawData)
+        else:
+            self.__fullDrawDataSeries(
+                drawData, xlabel, ylabel, limits, refresh, **plotArgs)
+
+        self.__drawLatency = time.time() - startTime
+        log.debug('{}: redraw latency: {:0.4f} seconds'.format(
+            self.__name, self.__drawLatency))
+
+
+    def __fullDrawDataSeries(self,
+                             drawData,
+                             xlabel,
+                             ylabel,
+                             limits,
+                             refresh,
+                             **plotArgs):
+        """Called by :meth:`__drawDataSeries`. Clears the axis, and plots
+        all of the given data. Information about the plot is saved so that
+        subsequent draws can be performed incrementally - see
+        :meth:`__canBlit`.
+
+        :arg drawData: List of ``(DataSeries, dynamic, xdata, ydata)``
+                       tuples.
+        :arg xlabel:   X axis label.
+        :arg ylabel:   Y axis label.
+        :arg limits:   ``(xmin, xmax, ymin, ymax)`` axis limits.
+        :arg refresh:  Refresh the canvas - see :meth:`drawDataSeries`.
+        :arg plotArgs: Passed to :meth:`__drawOneDataSeries`.
+        """
+
+        axis                   = self.getAxis()
+        canvas                 = self.getCanvas()
+        width, height          = canvas.get_width_height()
+        xmin, xmax, ymin, ymax = limits
+
+        self.__drawnDataSeries.clear()
+        self.__blitState      = None
+        self.__blitBackground = None
+        axis.clear()
+
+        for ds, dyn, xdata, ydata in drawData:
+            self.__drawOneDataSeries(ds, xdata, ydata, **plotArgs)
+
+        if len(drawData) > 0:
+            if self.xLogScale: axis.set_xscale('log')
+            if self.yLogScale: axis.set_yscale('log')
 
         if xlabel != '':
             axis.set_xlabel(xlabel, va='bottom')
@@ -769,7 +984,8 @@ class PlotPanel(viewpanel.ViewPanel):
             axis.set_ylim((ymin, ymax))
 
         # legend
-        labels = [ds.label for ds in dataSeries if ds.label is not None]
+        legend = None
+        labels = [d[0].label for d in drawData if d[0].label is not None]
         if len(labels) > 0 and self.legend:
             handles, labels = axis.get_legend_handles_labels()
             legend          = axis.legend(
@@ -797,36 +1013,185 @@ class PlotPanel(viewpanel.ViewPanel):
         axis.patch.set_facecolor(self.bgColour)
         self.getFigure().patch.set_alpha(0)
 
-        if refresh:
-            canvas.draw()
+        # Save everything we need to know in
+        # order to update the plot incrementally
+        # on subsequent draws. The legend text
+        # for each series is looked up via its
+        # line, as the legend only contains
+        # entries for series which have a label.
+        legendTexts = {}
+        if legend is not None:
+            lines = {l : ds for ds, l in self.__drawnDataSeries.items()}
+            for handle, text in zip(handles, legend.get_texts()):
+                ds = lines.get(handle, None)
+                if ds is not None:
+                    legendTexts[ds] = text
+
+        self.__fullRedraw = False
+        self.__blitState  = {
+            'series'      : [d[0] for d in drawData],
+            'dynamic'     : [d[1] for d in drawData],
+            'static'      : {d[0] : (d[2], d[3]) for d in drawData
+                             if not d[1]},
+            'styles'      : {d[0] : self.__seriesStyle(d[0])
+                             for d in drawData},
+            'labels'      : (xlabel, ylabel),
+            'limits'      : limits,
+            'axlimits'    : (axis.get_xlim(), axis.get_ylim()),
+            'legend'      : legend,
+            'legendTexts' : legendTexts,
+        }
+
+        if refresh: canvas.draw()
+        else:       self.__canvasStale = True
+
+
+    def __canBlit(self, drawData, xlabel, ylabel, limits):
+        """Called by :meth:`__drawDataSeries`. Returns ``True`` if the plot
+        can be updated incrementally, ``False`` if it needs to be fully
+        redrawn.
+
+        An incremental update is possible if nothing other than the data for
+        the *dynamic* data series (the ``extraSeries`` passed to
+        :meth:`drawDataSeries`) has changed since the last full redraw - the
+        same series are being plotted with the same styles, the data for
+        the held series (in the :attr:`dataSeries` list) has not changed,
+        and the axis labels and limits are the same.
+        """
 
+        state = self.__blitState
 
-    def __drawOneDataSeries(self, ds, xdata, ydata, **plotArgs):
-        """Plots a single :class:`.DataSeries` instance. This method is called
-        by the :meth:`drawDataSeries` method.
+        if self.__fullRedraw or state is None:
+            return False
 
-        :arg ds:       The ``DataSeries`` instance.
-        :arg xdata:    X axis data.
-        :arg ydata:    Y axis data.
-        :arg plotArgs: May be used to customise the plot - these
-                       arguments are all passed through to the
-                       ``Axis.plot`` function.
+        if len(drawData) != len(state['series']):
+            return False
+
+        if (xlabel, ylabel) != state['labels']:
+            return False
+
+        if not np.allclose(limits, state['limits']):
+            return False
+
+        # The axis limits may have been
+        # changed by the user (e.g.
+        # panning/zooming on the canvas)
+        axis = self.getAxis()
+        if (axis.get_xlim(), axis.get_ylim()) != state['axlimits']:
+            return False
+
+        for i, (ds, dyn, xdata, ydata) in enumerate(drawData):
+
+            if ds  is not state['series'][i]:  return False
+            if dyn !=     state['dynamic'][i]: return False
+
+            if self.__seriesStyle(ds) != state['styles'][ds]:
+                return False
+
+            if not dyn:
+                oldx, oldy = state['static'][ds]
+                if not (self.__dataEqual(xdata, oldx) and
+                        self.__dataEqual(ydata, oldy)):
+                    return False
+
+        return True
+
+
+    def __blitDataSeries(self, drawData):
+        """Called by :meth:`__drawDataSeries`. Updates the plot incrementally.
+        The ``Line2D`` data for each dynamic data series is replaced, and
+        the lines (and legend) are drawn on top of a cached copy of the
+        remaining plot, which is then blitted to the canvas.
+
+        :arg drawData: List of ``(DataSeries, dynamic, xdata, ydata)``
+                       tuples.
+        """
+
+        axis         = self.getAxis()
+        canvas       = self.getCanvas()
+        figure       = self.getFigure()
+        state        = self.__blitState
+        legend       = state['legend']
+        legendTexts  = state['legendTexts']
+        dynamicLines = [self.__drawnDataSeries[d[0]]
+                        for d in drawData if d[1]]
+
+        # The background (everything except for
+        # the dynamic lines and the legend) is
+        # captured on the first incremental draw
+        # after a full canvas draw, as the canvas
+        # may be redrawn by anyone at any time
+        # (see __canvasDrawn).
+        size = canvas.get_width_height()
+        if self.__blitBackground is None or self.__blitSize != size:
+
+            hidden = list(dynamicLines)
+            if legend is not None:
+                hidden.append(legend)
+
+            for artist in hidden:
+                artist.set_visible(False)
+
+            self.__capturingBackground = True
+            try:
+                canvas.draw()
+            finally:
+                self.__capturingBackground = False
+
+            self.__blitBackground = canvas.copy_from_bbox(figure.bbox)
+            self.__blitSize       = size
+
+            for artist in hidden:
+                artist.set_visible(True)
+
+        canvas.restore_region(self.__blitBackground)
+
+        for ds, dyn, xdata, ydata in drawData:
+
+            if not dyn:
+                continue
+
+            line = self.__drawnDataSeries[ds]
+            line.set_data(xdata, ydata)
+            line.set_label(ds.label)
+            axis.draw_artist(line)
+
+            text = legendTexts.get(ds, None)
+            if text is not None and ds.label is not None:
+                text.set_text(ds.label)
+
+        if legend is not None:
+            axis.draw_artist(legend)
+
+        canvas.blit(figure.bbox)
+
+
+    def __processData(self, ds, xdata, ydata):
+        """Called by :meth:`__drawDataSeries`. Applies smoothing and log
+        scaling (if enabled) to the data for a single :class:`.DataSeries`,
+        and calculates its limits.
+
+        :arg ds:    The ``DataSeries`` instance.
+        :arg xdata: X axis data.
+        :arg ydata: Y axis data.
+
+        :returns:   A tuple containing the processed ``(xdata, ydata)``,
+                    and the ``(xmin, xmax)`` and ``(ymin, ymax)`` data
+                    limits, or ``None`` if there is nothing to plot.
         """
 
         if ds.alpha == 0:
-            return (0, 0), (0, 0)
+            return None
 
         if len(xdata) != len(ydata) or len(xdata) == 0:
             log.debug('{}: data series length mismatch, or '
                       'no data points (x: {}, y: {})'.format(
                           ds.overlay.name, len(xdata), len(ydata)))
-            return (0, 0), (0, 0)
+            return None
 
         xdata = np.asarray(xdata, dtype=np.float)
         ydata = np.asarray(ydata, dtype=np.float)
 
-        log.debug('Drawing {} for {}'.format(type(ds).__name__, ds.overlay))
-
         # Note to self: If the smoothed data is
         # filled with NaNs, it is possibly due
         # to duplicate values in the x data, which
@@ -848,9 +1213,38 @@ class PlotPanel(viewpanel.ViewPanel):
         if self.yLogScale: ydata[ydata <= 0] = np.nan
 
         if np.all(np.isnan(xdata) | np.isnan(ydata)):
-            return (0, 0), (0, 0)
+            return None
+
+        if self.xLogScale:
+            posx    = xdata[xdata > 0]
+            xlimits = np.nanmin(posx), np.nanmax(posx)
+        else:
+            xlimits = np.nanmin(xdata), np.nanmax(xdata)
+
+        if self.yLogScale:
+            posy    = ydata[ydata > 0]
+            ylimits = np.nanmin(posy), np.nanmax(posy)
+        else:
+            ylimits = np.nanmin(ydata), np.nanmax(ydata)
+
+        return xdata, ydata, xlimits, ylimits
+
+
+    def __drawOneDataSeries(self, ds, xdata, ydata, **plotArgs):
+        """Plots a single :class:`.DataSeries` instance. This method is called
+        by the :meth:`__fullDrawDataSeries` method.
+
+        :arg ds:       The ``DataSeries`` instance.
+        :arg xdata:    X axis data, as returned by :meth:`__processData`.
+        :arg ydata:    Y axis data, as returned by :meth:`__processData`.
+        :arg plotArgs: May be used to customise the plot - these
+                       arguments are all passed through to the
+                       ``Axis.plot`` function.
+        """
 
-        kwargs = plotArgs
+        log.debug('Drawing {} for {}'.format(type(ds).__name__, ds.overlay))
+
+        kwargs = dict(plotArgs)
 
         kwargs['lw']    = kwargs.get('lw',    ds.lineWidth)
         kwargs['alpha'] = kwargs.get('alpha', ds.alpha)
@@ -863,22 +1257,25 @@ class PlotPanel(viewpanel.ViewPanel):
 
         self.__drawnDataSeries[ds] = line
 
-        if self.xLogScale:
-            axis.set_xscale('log')
-            posx    = xdata[xdata > 0]
-            xlimits = np.nanmin(posx), np.nanmax(posx)
 
-        else:
-            xlimits = np.nanmin(xdata), np.nanmax(xdata)
+    @staticmethod
+    def __seriesStyle(ds):
+        """Returns a tuple containing the values of all :class:`.DataSeries`
+        properties which affect the appearance of its line (excluding its
+        label). Used by :meth:`__canBlit`.
+        """
+        return (tuple(ds.colour), ds.alpha, ds.lineWidth, ds.lineStyle)
 
-        if self.yLogScale:
-            axis.set_yscale('log')
-            posy    = ydata[ydata > 0]
-            ylimits = np.nanmin(posy), np.nanmax(posy)
-        else:
-            ylimits = np.nanmin(ydata), np.nanmax(ydata)
 
-        return xlimits, ylimits
+    @staticmethod
+    def __dataEqual(a, b):
+        """Returns ``True`` if the two given arrays contain the same values
+        (treating ``nan`` values as equal), ``False`` otherwise. Used by
+        :meth:`__canBlit`.
+        """
+        if a.shape != b.shape:
+            return False
+        return np.all((a == b) | (np.isnan(a) & np.isnan(b)))
 
 
     def __dataSeriesChanged(self, *a):
@@ -891,18 +1288,38 @@ class PlotPanel(viewpanel.ViewPanel):
             for propName in ds.redrawProperties():
                 ds.addListener(propName,
                                self.__name,
-                               self.asyncDraw,
+                               self.__plotPropChanged,
                                overwrite=True)
-        self.asyncDraw()
+        self.__plotPropChanged()
 
 
     def __artistsChanged(self, *a):
         """Called when the :attr:`artists` list changes. Calls
         :meth:`asyncDraw`.
         """
+        self.__plotPropChanged()
+
+
+    def __plotPropChanged(self, *a):
+        """Called when any plot display property, or any property of a
+        :class:`.DataSeries` in the :attr:`dataSeries` list, changes. Makes
+        sure that the next draw is a full redraw (i.e. not blitted), then
+        calls :meth:`asyncDraw`.
+        """
+        self.__fullRedraw = True
         self.asyncDraw()
 
 
+    def __canvasDrawn(self, ev):
+        """Called whenever the ``matplotlib`` canvas is fully redrawn.
+        Invalidates the cached background used for incremental updates, as
+        anything might have been added to the plot.
+        """
+        self.__canvasStale = False
+        if not self.__capturingBackground:
+            self.__blitBackground = None
+
+
     def __limitsChanged(self, *a):
         """Called when the :attr:`limits` change. Updates the axis limits
         accordingly.
@@ -911,7 +1328,7 @@ class PlotPanel(viewpanel.ViewPanel):
         axis = self.getAxis()
         axis.set_xlim(self.limits.x)
         axis.set_ylim(self.limits.y)
-        self.asyncDraw()
+        self.__plotPropChanged()
 
 
     def __calcLimits(self,
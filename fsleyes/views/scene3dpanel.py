@@ -90,6 +90,9 @@ class Scene3DPanel(canvaspanel.CanvasPanel):
         opts.bindProps('offset',       sceneOpts)
         opts.bindProps('rotation',     sceneOpts)
         opts.bindProps('highDpi',      sceneOpts)
+        opts.bindProps('progressive',      sceneOpts)
+        opts.bindProps('progressiveDelay', sceneOpts)
+        opts.bindProps('frameBudget',      sceneOpts)
 
         sizer = wx.BoxSizer(wx.HORIZONTAL)
         sizer.Add(self.__canvas, flag=wx.EXPAND, proportion=1)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+#
+# workerpool.py - A bounded pool of worker threads.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`WorkerPool` class, a small, bounded pool
+of daemon threads which can be used to run short tasks off the main
+application thread, without creating a new thread for every task.
+
+
+Tasks are submitted to a ``WorkerPool`` via the :meth:`WorkerPool.submit`
+method, which returns a :class:`Job` instance that can be used to wait for,
+or cancel, the task. Jobs which have not yet started can be cancelled, either
+individually via :meth:`Job.cancel`, or en masse via
+:meth:`WorkerPool.cancel`.  Jobs which are already running cannot be
+interrupted - they are allowed to run to completion, but it is up to the
+caller to ignore their results.
+"""
+
+
+import multiprocessing
+import threading
+import logging
+
+import six.moves.queue as queue
+
+
+log = logging.getLogger(__name__)
+
+
+def defaultNumWorkers():
+    """Returns a sensible default number of worker threads for a
+    :class:`WorkerPool` - the number of CPUs on this machine, capped at 4.
+    """
+    try:
+        return max(1, min(4, multiprocessing.cpu_count()))
+    except NotImplementedError:
+        return 1
+
+
+class Job(object):
+    """A ``Job`` represents a single task which has been submitted to a
+    :class:`WorkerPool`.
+    """
+
+
+    def __init__(self, func, args, kwargs, group=None):
+        """Create a ``Job``. You should not need to create ``Job`` instances
+        directly - use :meth:`WorkerPool.submit`.
+
+        :arg func:   The function to run.
+        :arg args:   Positional arguments to pass to ``func``.
+        :arg kwargs: Keyword arguments to pass to ``func``.
+        :arg group:  Optional group identifier - see :meth:`WorkerPool.cancel`.
+        """
+
+        self.__func      = func
+        self.__args      = args
+        self.__kwargs    = kwargs
+        self.__group     = group
+        self.__lock      = threading.Lock()
+        self.__finished  = threading.Event()
+        self.__started   = False
+        self.__cancelled = False
+        self.__result    = None
+        self.__error     = None
+
+
+    @property
+    def group(self):
+        """Returns the group identifier that was specified when this ``Job``
+        was submitted.
+        """
+        return self.__group
+
+
+    @property
+    def result(self):
+        """Returns the value returned by the job function, or ``None`` if the
+        job has not finished, was cancelled, or raised an error.
+        """
+        return self.__result
+
+
+    @property
+    def error(self):
+        """Returns the error raised by the job function, or ``None`` if it
+        did not raise an error.
+        """
+        return self.__error
+
+
+    def cancel(self):
+        """Cancels this ``Job``, if it has not yet started.
+
+        :returns: ``True`` if the job was cancelled, ``False`` if it is
+                  already running or has finished.
+        """
+        with self.__lock:
+            if self.__started:
+                return False
+            self.__cancelled = True
+
+        self.__finished.set()
+        return True
+
+
+    def cancelled(self):
+        """Returns ``True`` if this ``Job`` was cancelled, ``False``
+        otherwise.
+        """
+        return self.__cancelled
+
+
+    def done(self):
+        """Returns ``True`` if this ``Job`` has finished or has been
+        cancelled, ``False`` otherwise.
+        """
+        return self.__finished.is_set()
+
+
+    def wait(self, timeout=None):
+        """Blocks until this ``Job`` has finished or been cancelled.
+
+        :arg timeout: Maximum time, in seconds, to wait.
+        :returns:     ``True`` if the job has finished, ``False`` if the
+                      timeout elapsed.
+        """
+        return self.__finished.wait(timeout)
+
+
+    def run(self):
+        """Runs this ``Job``. Called by :class:`WorkerPool` worker threads.
+        Does nothing if the job has been cancelled.
+        """
+
+        with self.__lock:
+            if self.__cancelled:
+                return
+            self.__started = True
+
+        try:
+            self.__result = self.__func(*self.__args, **self.__kwargs)
+
+        except Exception as e:
+            log.warning('Job {} failed: {}'.format(
+                getattr(self.__func, '__name__', '<unknown>'), e),
+                exc_info=True)
+            self.__error = e
+
+        finally:
+            self.__finished.set()
+
+
+class WorkerPool(object):
+    """The ``WorkerPool`` manages a fixed number of daemon threads which
+    run :class:`Job` instances from a shared queue, in the order in which
+    they were submitted.
+    """
+
+
+    def __init__(self, nworkers=None, name=None):
+        """Create a ``WorkerPool``. The worker threads are started
+        immediately.
+
+        :arg nworkers: Number of worker threads. Defaults to
+                       :func:`defaultNumWorkers`.
+        :arg name:     Name prefix to use for the worker threads.
+        """
+
+        if nworkers is None: nworkers = defaultNumWorkers()
+        if name     is None: name     = 'WorkerPool_{}'.format(id(self))
+
+        self.__name    = name
+        self.__queue   = queue.Queue()
+        self.__lock    = threading.Lock()
+        self.__pending = []
+        self.__threads = []
+        self.__stopped = False
+
+        for i in range(nworkers):
+            thread = threading.Thread(target=self.__worker,
+                                      name='{}_{}'.format(name, i))
+            thread.daemon = True
+            thread.start()
+            self.__threads.append(thread)
+
+
+    @property
+    def nworkers(self):
+        """Returns the number of worker threads in this ``WorkerPool``. """
+        return len(self.__threads)
+
+
+    def submit(self, func, *args, **kwargs):
+        """Submits a task to be run on one of the worker threads.
+
+        :arg func:     The function to run.
+
+        :arg jobGroup: Optional group identifier, which can be passed to
+                       :meth:`cancel`. Must be passed as a keyword argument.
+
+        All other arguments are passed through to ``func``.
+
+        :returns: A :class:`Job` instance.
+        """
+
+        group = kwargs.pop('jobGroup', None)
+        job   = Job(func, args, kwargs, group)
+
+        if self.__stopped:
+            job.cancel()
+            return job
+
+        with self.__lock:
+            self.__pending.append(job)
+
+        self.__queue.put(job)
+        return job
+
+
+    def cancel(self, group=None):
+        """Cancels all jobs which have not yet started.
+
+        :arg group: If provided, only jobs that were submitted with this
+                    ``jobGroup`` are cancelled.
+
+        :returns:   The number of jobs that were cancelled.
+        """
+
+        with self.__lock:
+            if group is None:
+                toCancel       = self.__pending
+                self.__pending = []
+            else:
+                toCancel       = [j for j in self.__pending
+                                  if j.group == group]
+                self.__pending = [j for j in self.__pending
+                                  if j.group != group]
+
+        return len([j for j in toCancel if j.cancel()])
+
+
+    def stop(self):
+        """Cancels all pending jobs, and stops the worker threads once they
+        have finished any jobs which are currently running.
+        """
+
+        self.__stopped = True
+        self.cancel()
+        for thread in self.__threads:
+            self.__queue.put(None)
+
+
+    def __worker(self):
+        """Run by each worker thread. Takes jobs from the queue and runs them,
+        until :meth:`stop` is called.
+        """
+
+        while True:
+
+            job = self.__queue.get()
+
+            if job is None:
+                break
+
+            with self.__lock:
+                try:               self.__pending.remove(job)
+                except ValueError: pass
+
+            job.run()
+
+        log.debug('{} worker thread finished'.format(self.__name))
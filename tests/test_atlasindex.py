@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#
+# test_atlasindex.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os
+import os.path as op
+
+import numpy as np
+
+import fsl.utils.tempdir  as tempdir
+import fsl.utils.settings as fslsettings
+import fsleyes.atlasindex as atlasindex
+
+
+def _randomAtlas(shape=(6, 7, 5, 12)):
+    data = np.random.randint(0, 100, shape).astype(np.uint8)
+    data[data < 70]     = 0
+    data[:2, :2, :2, :]   = 0
+    return data
+
+
+def _expected(data, vox, volumes, k):
+    props = data[vox][volumes]
+    exp   = [(p, i) for i, p in enumerate(props) if p > 0]
+    return sorted(exp, reverse=True)[:k]
+
+
+def test_calcAtlasIndex():
+
+    data    = _randomAtlas()
+    volumes = list(range(1, 12))
+
+    for k in (1, 4, 20):
+
+        lut, regions, probs = atlasindex.calcAtlasIndex(data, volumes, k)
+        index               = atlasindex.AtlasIndex(
+            lut, regions, probs, np.eye(4))
+
+        assert lut.shape     == data.shape[:3]
+        assert regions.shape == probs.shape
+        assert regions.shape[1] <= min(k, len(volumes))
+        assert np.all(lut[:2, :2, :2] == -1)
+
+        for vox in np.ndindex(*data.shape[:3]):
+            exp = _expected(data, vox, volumes, k)
+            got = index.lookup(vox, voxel=True)
+
+            # ties may be ordered differently
+            assert [p for p, _ in got] == [p for p, _ in exp]
+            for p, r in got:
+                assert data[vox][volumes[r]] == p
+
+    # out of bounds
+    assert index.lookup((-1, 0,  0), voxel=True) == []
+    assert index.lookup(( 0, 0, 10), voxel=True) == []
+
+
+def test_AtlasIndex_lookup_world():
+
+    data       = _randomAtlas()
+    voxToWorld = np.diag([2, 2, 2, 1])
+    voxToWorld[:3, 3] = [-10, 20, 5]
+    worldToVox = np.linalg.inv(voxToWorld)
+
+    index = atlasindex.AtlasIndex(*atlasindex.calcAtlasIndex(data),
+                                  worldToVox=worldToVox)
+
+    for vox in np.ndindex(*data.shape[:3]):
+        world = np.dot(voxToWorld[:3, :3], vox) + voxToWorld[:3, 3]
+        world = world + np.random.random(3) * 0.9 - 0.45
+        assert index.lookup(world) == index.lookup(vox, voxel=True)
+
+
+def test_AtlasIndex_save_load():
+
+    data  = _randomAtlas()
+    index = atlasindex.AtlasIndex(*atlasindex.calcAtlasIndex(data),
+                                  worldToVox=np.eye(4))
+
+    with tempdir.tempdir():
+        index.save('index')
+        loaded = atlasindex.AtlasIndex.load('index', np.eye(4))
+
+        for vox in np.ndindex(*data.shape[:3]):
+            assert loaded.lookup(vox, voxel=True) == \
+                index.lookup(vox, voxel=True)
+
+
+class MockLabel(object):
+    def __init__(self, index):
+        self.index = index
+        self.name  = 'label {}'.format(index)
+
+
+class MockDesc(object):
+    def __init__(self, nlabels):
+        self.atlasID = 'mockatlas'
+        self.labels  = [MockLabel(i) for i in range(nlabels)]
+
+
+class MockAtlas(object):
+    def __init__(self, data, dataSource):
+        self.data          = data
+        self.shape         = data.shape
+        self.dtype         = data.dtype
+        self.dataSource    = dataSource
+        self.desc          = MockDesc(data.shape[3])
+        self.worldToVoxMat = np.eye(4)
+        self.reads         = 0
+
+    def __getitem__(self, slc):
+        self.reads += 1
+        return self.data[slc]
+
+
+def test_loadIndex():
+
+    data = _randomAtlas()
+
+    with tempdir.tempdir() as td:
+
+        with open('atlas.nii.gz', 'wt') as f:
+            f.write('atlas')
+
+        atlas = MockAtlas(data, op.join(td, 'atlas.nii.gz'))
+        s     = fslsettings.Settings('test_atlasindex',
+                                     cfgdir=td,
+                                     writeOnExit=False)
+
+        with fslsettings.use(s):
+
+            loaded = []
+
+            # calculated and saved
+            atlasindex.loadIndex(atlas, onLoad=loaded.append)
+
+            key = atlasindex.indexKey(atlas)
+            assert len(loaded) == 1
+            assert atlas.reads == data.shape[2]
+            assert atlasindex.getIndex(atlas) is loaded[0]
+            assert op.exists(op.join(td, atlasindex.CACHE_DIR, key))
+
+            # cached in memory
+            atlasindex.loadIndex(atlas, onLoad=loaded.append)
+            assert len(loaded) == 2
+            assert loaded[1] is loaded[0]
+
+            # loaded from disk
+            atlasindex._indices.clear()
+            atlasindex.loadIndex(atlas, onLoad=loaded.append)
+            assert len(loaded) == 3
+            assert loaded[2] is not loaded[0]
+            assert atlas.reads == data.shape[2]
+
+            for vox in np.ndindex(*data.shape[:3]):
+                assert loaded[2].lookup(vox, voxel=True) == \
+                    loaded[0].lookup(vox, voxel=True)
+
+            # a modified atlas image
+            # invalidates the index
+            st = os.stat(atlas.dataSource)
+            os.utime(atlas.dataSource, (st.st_atime, st.st_mtime + 10))
+            assert atlasindex.indexKey(atlas) != key
+
+            atlasindex._indices.clear()
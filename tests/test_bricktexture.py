@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# test_bricktexture.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import itertools as it
+
+import numpy as np
+
+import fsleyes.gl.textures.bricktexture as bricktexture
+
+
+def test_calcBrickRanges():
+
+    data          = np.random.random((19, 17, 9)).astype(np.float32)
+    data[3, 4, 5] = np.nan
+    data[16:, 16:, 8:] = np.nan
+
+    for bs, overlap in it.product((1, 4, 8), (0, 1, 2)):
+
+        mins, maxs = bricktexture.calcBrickRanges(data, bs, overlap)
+        expshape   = tuple(int(np.ceil(s / float(bs))) for s in data.shape)
+
+        assert mins.shape == expshape
+        assert maxs.shape == expshape
+
+        for brick in np.ndindex(*expshape):
+            slc = tuple(slice(max(0, b * bs - overlap),
+                              min(s, (b + 1) * bs + overlap))
+                        for b, s in zip(brick, data.shape))
+
+            bdata = data[slc]
+
+            if np.all(np.isnan(bdata)):
+                assert np.isnan(mins[brick])
+                assert np.isnan(maxs[brick])
+            else:
+                assert np.isclose(mins[brick], np.nanmin(bdata))
+                assert np.isclose(maxs[brick], np.nanmax(bdata))
+
+
+def test_calcBrickOccupancy():
+
+    mins = np.array([0, -5, 2, np.nan, -1, 8])
+    maxs = np.array([0, -1, 3, np.nan,  1, 9])
+
+    def occ(*args, **kwargs):
+        return list(bricktexture.calcBrickOccupancy(mins, maxs,
+                                                    *args, **kwargs))
+
+    #             clipLow clipHigh displayLow
+    assert occ(    0,     10,      0) == [0, 0, 1, 0, 1, 1]
+    assert occ(    0,      5,      0) == [0, 0, 1, 0, 1, 0]
+    assert occ(    0,     10,      5) == [0, 0, 0, 0, 0, 1]
+    assert occ(    0,     10,      0, useNegCmap=True) == [0, 1, 1, 0, 1, 1]
+    assert occ(    1,    2.5,      0, invertClip=True) == [0, 0, 1, 0, 1, 1]
+
+    # Clipping is ignored when it is
+    # performed with respect to another image
+    assert occ(    0,      5,      0, imageIsClip=False) == \
+        [0, 0, 1, 0, 1, 1]
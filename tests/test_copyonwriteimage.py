@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#
+# test_copyonwriteimage.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import os.path as op
+
+import numpy as np
+import pytest
+
+import fsl.data.image           as fslimage
+import fsleyes.copyonwriteimage as copyonwriteimage
+
+from . import tempdir
+
+
+def _randomSlice(shape, rng):
+    slc = []
+    for n in shape:
+        r = rng.randint(3)
+        if   r == 0: slc.append(rng.randint(n))
+        elif r == 1: slc.append(slice(None))
+        else:
+            lo = rng.randint(n)
+            hi = rng.randint(lo, n) + 1
+            slc.append(slice(lo, hi))
+    return tuple(slc)
+
+
+@pytest.mark.parametrize('shape', [(10, 11, 12), (6, 7, 8, 9)])
+def test_CopyOnWriteImage_readWrite(shape):
+
+    data  = np.random.random(shape).astype(np.float32)
+    img   = fslimage.Image(data)
+    copy  = copyonwriteimage.CopyOnWriteImage(img, chunkSize=1000)
+    proxy = copy.nibImage.dataobj
+    exp   = np.array(data)
+    rng   = np.random.RandomState(1)
+
+    assert copy.source is img
+    assert copy.shape  == img.shape
+    assert copy.dtype  == np.float32
+    assert not copy.saveState
+    assert proxy.chunkAxis == len(shape) - 1
+    assert proxy.nchunks() == 0
+    assert np.all(copy[:] == data)
+
+    # Nothing is copied on read
+    assert proxy.nchunks() == 0
+
+    for i in range(100):
+        slc = _randomSlice(shape, rng)
+        if rng.randint(2):
+            vals     = np.random.random(exp[slc].shape).astype(np.float32)
+            exp[slc] = vals
+            copy[slc] = vals
+        assert np.all(copy[slc] == exp[slc])
+
+    # The source is not modified
+    assert np.all(img[:] == data)
+    assert np.all(copy[:] == exp)
+    assert copy.dataRange[0] <= exp.min()
+    assert copy.dataRange[1] >= exp.max()
+
+
+def test_CopyOnWriteImage_noRead():
+
+    data  = np.random.random((10, 10, 10, 4)).astype(np.float32)
+    img   = fslimage.Image(data)
+    reads = []
+    get   = fslimage.Image.__getitem__
+
+    def getitem(self, sliceobj):
+        result = get(self, sliceobj)
+        if self is img:
+            reads.append(np.asarray(result).size)
+        return result
+
+    # Creating a copy or mask should not read
+    # the source data, other than a single
+    # voxel to determine the data type
+    with mock.patch.object(fslimage.Image, '__getitem__', getitem):
+        copy = copyonwriteimage.CopyOnWriteImage(img)
+        mask = copyonwriteimage.CopyOnWriteImage(img, empty=True)
+
+    assert sum(reads) <= 2
+    assert copy.nibImage.dataobj.nchunks() == 0
+    assert np.all(np.isclose(copy.dataRange, img.dataRange))
+    assert mask.dataRange == (0, 0)
+
+
+def test_CopyOnWriteImage_chunks():
+
+    data  = np.random.random((10, 10, 10, 10)).astype(np.float32)
+    img   = fslimage.Image(data)
+    copy  = copyonwriteimage.CopyOnWriteImage(img, chunkSize=4000)
+    proxy = copy.nibImage.dataobj
+
+    # one chunk per volume
+    assert proxy.chunkAxis   == 3
+    assert proxy.chunkLength == 1
+
+    copy[:, :, :, 3] = np.zeros((10, 10, 10))
+    copy[2, 2, 2, 3] = 5
+    assert proxy.nchunks() == 1
+    assert np.all(copy[..., 3][copy[..., 3] != 0] == 5)
+    assert np.all(copy[..., :3] == data[..., :3])
+    assert np.all(copy[..., 4:] == data[..., 4:])
+
+    # Single volume of a 4D image
+    # is chunked along the Z axis
+    copy  = copyonwriteimage.CopyOnWriteImage(
+        img, roi=[(0, 10), (0, 10), (0, 10), (4, 5)], chunkSize=800)
+    proxy = copy.nibImage.dataobj
+    assert copy.shape        == (10, 10, 10)
+    assert proxy.chunkAxis   == 2
+    assert proxy.chunkLength == 2
+    assert np.all(copy[:] == data[..., 4])
+
+    copy[:, :, 5] = np.ones((10, 10))
+    assert proxy.nchunks() == 1
+    assert np.all(copy[:, :, 5] == 1)
+
+
+def test_CopyOnWriteImage_roi():
+
+    data = np.random.randint(0, 100, (10, 10, 10, 5)).astype(np.int16)
+    img  = fslimage.Image(data)
+    copy = copyonwriteimage.CopyOnWriteImage(img, roi=[(2, 5), (3, 9)])
+
+    assert copy.shape == (3, 6, 10, 5)
+    assert np.all(copy[:] == data[2:5, 3:9])
+
+
+def test_CopyOnWriteImage_empty():
+
+    img  = fslimage.Image(np.random.random((10, 10, 10)).astype(np.float32))
+    mask = copyonwriteimage.CopyOnWriteImage(img,
+                                             empty=True,
+                                             dtype=np.uint8)
+
+    assert mask.dtype == np.uint8
+    assert mask.nibImage.get_data_dtype() == np.uint8
+    assert np.all(mask[:] == 0)
+
+    mask[1:3, 1:3, 1:3] = np.ones((2, 2, 2))
+    assert mask[:].sum() == 8
+    assert mask.dataRange[1] == 1
+
+
+def test_prepareWrite():
+
+    data = np.random.random((10, 10, 10, 4)).astype(np.float32)
+    img  = fslimage.Image(np.array(data))
+    copy = copyonwriteimage.CopyOnWriteImage(img)
+    roi  = copyonwriteimage.CopyOnWriteImage(
+        img, roi=[(0, 10), (0, 10), (0, 10), (0, 2)])
+    cc   = copyonwriteimage.CopyOnWriteImage(copy)
+
+    # source modification
+    slc = (slice(None), slice(None), slice(None), 3)
+    copyonwriteimage.prepareWrite(img, slc)
+    img[slc] = np.zeros((10, 10, 10))
+
+    assert copy.nibImage.dataobj.nchunks() == 1
+    assert roi .nibImage.dataobj.nchunks() == 0
+    assert np.all(copy[:] == data)
+    assert np.all(roi[:]  == data[..., :2])
+
+    # copy modification - copies
+    # of the copy are preserved
+    copy[slc] = np.ones((10, 10, 10))
+    assert np.all(copy[..., 3] == 1)
+    assert np.all(cc[:]        == data)
+
+
+def test_prepareWrite_notCalled():
+
+    data  = np.random.random((10, 10, 10, 4)).astype(np.float32)
+    img   = fslimage.Image(np.array(data))
+    copy  = copyonwriteimage.CopyOnWriteImage(img, chunkSize=4000)
+    proxy = copy.nibImage.dataobj
+    zeros = np.zeros((10, 10, 10))
+
+    def slc(vol):
+        return (slice(None), slice(None), slice(None), vol)
+
+    with mock.patch.object(copyonwriteimage.log, 'warning') as warn:
+
+        # Changes to regions which the copy has
+        # already copied do not affect the copy
+        copy[slc(0)] = np.ones((10, 10, 10))
+        img[ slc(0)] = zeros
+        assert warn.call_count == 0
+        assert proxy.nchunks() == 1
+        assert np.all(copy[..., 0]  == 1)
+        assert np.all(copy[..., 1:] == data[..., 1:])
+
+        # Other changes are detected, and the
+        # copy is detached from the source
+        img[slc(1)] = zeros
+        assert warn.call_count == 1
+        assert proxy.nchunks() == 4
+        assert np.all(copy[..., 0]  == 1)
+        assert np.all(copy[..., 2:] == data[..., 2:])
+
+        # so is not affected by further changes
+        img[slc(2)] = zeros
+        img[slc(3)] = zeros
+        assert warn.call_count == 1
+        assert np.all(copy[..., 2:] == data[..., 2:])
+
+
+def test_CopyOnWriteImage_detach():
+
+    data = np.random.random((10, 10, 10)).astype(np.float32)
+    img  = fslimage.Image(data)
+
+    # Loading the data into
+    # memory detaches the copy
+    copy = copyonwriteimage.CopyOnWriteImage(img)
+    copy.data
+    assert copy.source is None
+    copy[0, 0, 0] = 5
+    assert copy[0, 0, 0] == 5
+    assert img[ 0, 0, 0] == data[0, 0, 0]
+
+    # as does saving it
+    with tempdir():
+        copy = copyonwriteimage.CopyOnWriteImage(img)
+        copy[0, 0, 0] = 5
+        assert not copy.saveState
+        copy.save('copy.nii.gz')
+        assert copy.saveState
+        assert copy.source is None
+        assert op.exists('copy.nii.gz')
+        assert np.all(fslimage.Image('copy.nii.gz')[:] == copy[:])
+
+        copy[0, 0, 1] = 5
+        assert not copy.saveState
@@ -16,6 +16,7 @@ import numpy as np
 
 import fsl.data.image              as fslimage
 import fsleyes.actions.copyoverlay as copyoverlay
+import fsleyes.copyonwriteimage    as copyonwriteimage
 
 from . import run_with_orthopanel
 
@@ -40,6 +41,8 @@ def _test_copyImage(panel, overlayList, displayCtx):
     # the copy should be inserted directly
     # after the original in the list
     copy = overlayList[1]
+    assert isinstance(copy, copyonwriteimage.CopyOnWriteImage)
+    assert copy.source is img3d
     assert np.all(img3d[:] == copy[:])
     assert displayCtx.getDisplay(copy).alpha == 75
     assert displayCtx.getDisplay(copy).name  == 'my cool copy'
@@ -67,6 +70,18 @@ def _test_copyImage(panel, overlayList, displayCtx):
     copy = overlayList[1]
     assert np.all(copy.shape == img3d.shape)
     assert np.all(copy[:]    == 0)
+    assert copy.dtype        == np.uint8
+    overlayList.remove(copy)
+
+    # mask with a specific data type
+    copyoverlay.copyImage(overlayList,
+                          displayCtx,
+                          img3d,
+                          createMask=True,
+                          dtype=np.float32)
+    copy = overlayList[1]
+    assert copy.dtype     == np.float32
+    assert np.all(copy[:] == 0)
     overlayList.remove(copy)
 
     # 4D
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# test_correlate.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+import numpy as np
+
+import fsl.data.image            as fslimage
+import fsleyes.actions.correlate as correlate
+
+
+def _pearson(data, seed):
+    x, y, z  = seed
+    npoints  = data.shape[3]
+    flat     = data.reshape(-1, npoints)
+    seedts   = data[x, y, z, :]
+    expected = np.zeros(flat.shape[0])
+
+    for i in range(flat.shape[0]):
+        if flat[i].std() > 0 and seedts.std() > 0:
+            expected[i] = np.corrcoef(seedts, flat[i])[0, 1]
+
+    return expected.reshape(data.shape[:3])
+
+
+def _test_NormalisedTimeSeries(memlimit, chunksize):
+
+    data             = np.random.random((8, 9, 10, 20)).astype(np.float32)
+    data[1, 1, 1, :] = 5
+    img              = fslimage.Image(data)
+    index            = (slice(None),) * 4
+
+    normts = correlate.NormalisedTimeSeries
+    oldml  = normts.MEMORY_LIMIT
+    oldcs  = normts.CHUNK_SIZE
+
+    try:
+        normts.MEMORY_LIMIT = memlimit
+        normts.CHUNK_SIZE   = chunksize
+
+        norm = correlate.NormalisedTimeSeries(img, index)
+
+        for seed in [(0, 0, 0), (3, 4, 5), (7, 8, 9), (1, 1, 1)]:
+            got = norm.correlate(seed)
+            exp = _pearson(data, seed)
+            assert got.shape == data.shape[:3]
+            assert np.all(np.isclose(got, exp, atol=1e-5))
+
+        norm.destroy()
+
+    finally:
+        normts.MEMORY_LIMIT = oldml
+        normts.CHUNK_SIZE   = oldcs
+
+
+def test_NormalisedTimeSeries():
+    _test_NormalisedTimeSeries(correlate.NormalisedTimeSeries.MEMORY_LIMIT,
+                               correlate.NormalisedTimeSeries.CHUNK_SIZE)
+
+
+def test_NormalisedTimeSeries_memmap():
+    _test_NormalisedTimeSeries(0, 100)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+#
+# test_dicomloader.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import os
+import os.path as op
+import json
+import time
+import textwrap
+
+import pytest
+
+import fsl.utils.tempdir   as tempdir
+import fsl.utils.settings  as fslsettings
+import fsleyes.dicomloader as dicomloader
+
+
+def _fakeDcm2niix(bindir, nseries, delay=0):
+    """Creates a fake dcm2niix script which writes a json metadata file for
+    each of nseries series, sleeping for delay seconds after each one.
+    """
+
+    script = textwrap.dedent("""
+    #!/usr/bin/env python
+    import sys, os.path as op, json, time
+    outdir = sys.argv[sys.argv.index('-o') + 1]
+    for i in range({nseries}, 0, -1):
+        meta = {{'SeriesNumber'      : i,
+                 'SeriesDescription' : 'series {{}}'.format(i),
+                 'ReconMatrixPE'     : 64}}
+        with open(op.join(outdir, '{{}}.json'.format(i)), 'wt') as f:
+            json.dump(meta, f)
+        time.sleep({delay})
+    """).strip().format(nseries=nseries, delay=delay)
+
+    fname = op.join(bindir, 'dcm2niix')
+    with open(fname, 'wt') as f:
+        f.write(script)
+    os.chmod(fname, 0o755)
+
+
+def _patches(bindir):
+    path = os.pathsep.join((bindir, os.environ.get('PATH', '')))
+    return (mock.patch.dict(os.environ, {'PATH' : path}),
+            mock.patch('fsl.data.dicom.enabled', return_value=True))
+
+
+def test_scanKey():
+
+    with tempdir.tempdir() as td:
+        os.mkdir('dicom')
+        key = dicomloader.scanKey('dicom')
+
+        assert dicomloader.scanKey(op.join(td, 'dicom')) == key
+
+        # new sub-directory
+        os.mkdir(op.join('dicom', 'sub'))
+        assert dicomloader.scanKey('dicom') != key
+        key = dicomloader.scanKey('dicom')
+
+        # modified sub-directory
+        st = os.stat(op.join('dicom', 'sub'))
+        os.utime(op.join('dicom', 'sub'), (st.st_atime, st.st_mtime + 10))
+        assert dicomloader.scanKey('dicom') != key
+
+
+def test_readSeries():
+
+    with tempdir.tempdir() as td:
+
+        seen = set()
+
+        with open('1.json', 'wt') as f: json.dump({'SeriesNumber' : 1}, f)
+        with open('2.json', 'wt') as f: f.write('{"SeriesNu')
+
+        # partially written files are skipped,
+        # and read on a subsequent call
+        series = dicomloader._readSeries(td, 'dcmdir', seen, False)
+        assert series == [{'SeriesNumber' : 1, 'DicomDir' : 'dcmdir'}]
+        assert dicomloader._readSeries(td, 'dcmdir', seen, False) == []
+
+        with open('2.json', 'wt') as f: json.dump({'SeriesNumber' : 2}, f)
+
+        series = dicomloader._readSeries(td, 'dcmdir', seen, True)
+        assert series == [{'SeriesNumber' : 2, 'DicomDir' : 'dcmdir'}]
+
+
+def test_scanDir():
+
+    with tempdir.tempdir() as td:
+
+        os.mkdir('bin')
+        os.mkdir('dicom')
+        _fakeDcm2niix(op.join(td, 'bin'), 4)
+
+        dcmdir   = op.join(td, 'dicom')
+        settings = fslsettings.Settings('test_dicomloader',
+                                        cfgdir=td,
+                                        writeOnExit=False)
+        penv, pen = _patches(op.join(td, 'bin'))
+
+        with penv, pen, fslsettings.use(settings):
+
+            found  = []
+            series = dicomloader.scanDir(dcmdir, found.extend)
+            key    = dicomloader.scanKey(dcmdir)
+
+            assert [s['SeriesNumber'] for s in series] == [1, 2, 3, 4]
+            assert sorted(s['SeriesNumber'] for s in found) == [1, 2, 3, 4]
+            assert all(s['DicomDir'] == dcmdir for s in series)
+            assert op.exists(op.join(td, dicomloader.CACHE_DIR,
+                                     '{}.json'.format(key)))
+
+            # cached in memory, and on disk - dcm2niix
+            # should not be called, so we remove it
+            os.remove(op.join('bin', 'dcm2niix'))
+            assert dicomloader.scanDir(dcmdir) == series
+            dicomloader._scans.clear()
+            assert dicomloader.scanDir(dcmdir) == series
+
+            # cache disabled
+            _fakeDcm2niix(op.join(td, 'bin'), 2)
+            series = dicomloader.scanDir(dcmdir, cache=False)
+            assert [s['SeriesNumber'] for s in series] == [1, 2]
+
+
+def test_scanDir_cancel():
+
+    with tempdir.tempdir() as td:
+
+        os.mkdir('bin')
+        os.mkdir('dicom')
+        _fakeDcm2niix(op.join(td, 'bin'), 4, delay=10)
+
+        dcmdir   = op.join(td, 'dicom')
+        settings = fslsettings.Settings('test_dicomloader',
+                                        cfgdir=td,
+                                        writeOnExit=False)
+        penv, pen = _patches(op.join(td, 'bin'))
+
+        found = []
+
+        def progfunc(series):
+            found.extend(series)
+            return len(found) == 0
+
+        with penv, pen, fslsettings.use(settings):
+
+            start = time.time()
+            with pytest.raises(dicomloader.DicomCancelled):
+                dicomloader.scanDir(dcmdir, progfunc)
+
+            assert time.time() - start < 5
+            assert [s['SeriesNumber'] for s in found] == [4]
+            assert not op.exists(op.join(td, dicomloader.CACHE_DIR))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# test_edgemaptexture.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import itertools as it
+
+import numpy as np
+
+import fsleyes.gl.textures.edgemaptexture as edgemaptexture
+
+
+def _naiveEdgeMap(data, width, background):
+
+    edges = np.zeros(data.shape, dtype=np.uint8)
+
+    for idx in np.ndindex(*data.shape):
+        for axis, off in it.product(range(3), range(1, width + 1)):
+            for sign in (-1, 1):
+                nbr        = list(idx)
+                nbr[axis] += sign * off
+
+                if 0 <= nbr[axis] < data.shape[axis]:
+                    nval = data[tuple(nbr)]
+                elif background is not None:
+                    nval = background
+                else:
+                    continue
+
+                if nval != data[idx]:
+                    edges[idx] |= 1 << axis
+    return edges
+
+
+def test_calcEdgeMap():
+
+    data = np.random.randint(0, 3, (9, 7, 5))
+
+    for width, bg in it.product((0, 1, 2, 3), (None, 0, -1)):
+        exp    = _naiveEdgeMap(data, width, bg)
+        result = edgemaptexture.calcEdgeMap(data, width, bg)
+        assert result.dtype == np.uint8
+        assert np.all(result == exp)
+
+
+def test_calcEdgeMap_singleton():
+
+    data           = np.zeros((5, 5), dtype=np.int32)
+    data[1:4, 1:4] = 1
+
+    edges = edgemaptexture.calcEdgeMap(data, 1)
+    exp   = _naiveEdgeMap(data.reshape((5, 5, 1)), 1, None)
+
+    assert edges.shape == (5, 5, 1)
+    assert np.all(edges == exp)
+    assert np.all(edges & 4 == 0)
+
+
+def test_labelClasses():
+
+    data = np.array([[[0, 1, 2.4, 2.6, 5, -1, np.nan, 20]]])
+    cls  = edgemaptexture.labelClasses(data, [1, 2, 5])
+
+    assert cls.dtype == np.int32
+    assert list(cls.ravel()) == [-1, 1, 2, -1, 5, -1, -1, -1]
+    assert np.all(edgemaptexture.labelClasses(data, []) == -1)
+
+
+def test_maskClasses():
+
+    data = np.arange(10).reshape((10, 1, 1))
+
+    cls = edgemaptexture.maskClasses(data, (2, 6))
+    assert list(cls.ravel()) == [0, 0, 0, 1, 1, 1, 0, 0, 0, 0]
+
+    cls = edgemaptexture.maskClasses(data, (2, 6), invert=True)
+    assert list(cls.ravel()) == [1, 1, 0, 0, 0, 0, 0, 1, 1, 1]
+
+
+def test_calcEdgeAxes():
+
+    assert list(edgemaptexture.calcEdgeAxes(np.eye(4), 0)) == [0, 1, 1]
+    assert list(edgemaptexture.calcEdgeAxes(np.eye(4), 2)) == [1, 1, 0]
+
+    # display z is voxel x
+    xform = np.array([[0, 0, 2, 0],
+                      [0, 1, 0, 0],
+                      [1, 0, 0, 0],
+                      [0, 0, 0, 1]])
+    assert list(edgemaptexture.calcEdgeAxes(xform, 2)) == [0, 1, 1]
+    assert list(edgemaptexture.calcEdgeAxes(xform, 0)) == [1, 1, 0]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+# test_glstate.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy     as np
+import OpenGL.GL as gl
+
+import fsleyes.gl.glstate as glstate
+
+
+def _patches():
+    funcs = ['glEnable', 'glDisable', 'glEnableClientState',
+             'glDisableClientState', 'glIsEnabled', 'glBlendFunc',
+             'glUseProgram', 'glActiveTexture', 'glBindTexture']
+    return {f : mock.patch.object(glstate.gl, f) for f in funcs}
+
+
+def test_capabilities():
+
+    patches = _patches()
+    mocks   = {f : p.start() for f, p in patches.items()}
+
+    try:
+        mocks['glIsEnabled'].return_value = False
+        glstate.newFrame()
+
+        assert not glstate.isEnabled(gl.GL_BLEND)
+        assert not glstate.isEnabled(gl.GL_BLEND)
+        assert mocks['glIsEnabled'].call_count == 1
+
+        glstate.enable(gl.GL_BLEND)
+        glstate.enable(gl.GL_BLEND)
+        assert glstate.isEnabled(gl.GL_BLEND)
+        assert mocks['glEnable'].call_count == 1
+
+        glstate.enable( gl.GL_VERTEX_ARRAY)
+        glstate.disable(gl.GL_VERTEX_ARRAY)
+        glstate.disable(gl.GL_VERTEX_ARRAY)
+        assert mocks['glEnableClientState'] .call_count == 1
+        assert mocks['glDisableClientState'].call_count == 1
+
+        # state is discarded on each frame
+        glstate.newFrame()
+        glstate.enable(gl.GL_BLEND)
+        assert mocks['glEnable'].call_count == 2
+
+    finally:
+        for p in patches.values():
+            p.stop()
+
+
+def test_textures():
+
+    patches = _patches()
+    mocks   = {f : p.start() for f, p in patches.items()}
+
+    try:
+        glstate.newFrame()
+
+        glstate.bindTexture(gl.GL_TEXTURE_2D, 1, gl.GL_TEXTURE0)
+        glstate.bindTexture(gl.GL_TEXTURE_2D, 1, gl.GL_TEXTURE0)
+        glstate.bindTexture(gl.GL_TEXTURE_2D, 2, gl.GL_TEXTURE1)
+        glstate.bindTexture(gl.GL_TEXTURE_2D, 2)
+        assert mocks['glActiveTexture'].call_count == 2
+        assert mocks['glBindTexture']  .call_count == 2
+
+        # texture enable state is per-unit
+        glstate.enable(gl.GL_TEXTURE_2D)
+        glstate.activeTexture(gl.GL_TEXTURE0)
+        glstate.enable(gl.GL_TEXTURE_2D)
+        assert mocks['glEnable'].call_count == 2
+
+        # deleted textures are no longer bound
+        glstate.forgetTexture(1)
+        glstate.bindTexture(gl.GL_TEXTURE_2D, 1, gl.GL_TEXTURE0)
+        assert mocks['glBindTexture'].call_count == 3
+
+    finally:
+        for p in patches.values():
+            p.stop()
+
+
+def test_blend_program():
+
+    patches = _patches()
+    mocks   = {f : p.start() for f, p in patches.items()}
+
+    try:
+        glstate.newFrame()
+
+        glstate.blendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        glstate.blendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        glstate.blendFunc(gl.GL_ONE,       gl.GL_ONE)
+        assert mocks['glBlendFunc'].call_count == 2
+
+        glstate.useProgram(1)
+        glstate.useProgram(1)
+        glstate.useProgram(0)
+        assert mocks['glUseProgram'].call_count == 2
+
+    finally:
+        for p in patches.values():
+            p.stop()
+
+
+def test_updateValue():
+
+    cache = {}
+    value = np.eye(4)
+
+    assert     glstate.updateValue(cache, 'a', 1)
+    assert not glstate.updateValue(cache, 'a', 1)
+    assert     glstate.updateValue(cache, 'a', 2)
+
+    assert     glstate.updateValue(cache, 'b', (value, 1))
+    assert not glstate.updateValue(cache, 'b', (value, 1))
+    assert     glstate.updateValue(cache, 'b', (value, 2))
+
+    # values are copied, so in-place
+    # changes are detected
+    value[0, 0] = 5
+    assert     glstate.updateValue(cache, 'b', (value, 2))
+    assert not glstate.updateValue(cache, 'b', (value, 2))
+
+
+def test_stats():
+
+    patches = _patches()
+    [p.start() for p in patches.values()]
+
+    try:
+        glstate.newFrame()
+
+        glstate.enable(gl.GL_BLEND)
+        glstate.enable(gl.GL_BLEND)
+        glstate.count(3)
+
+        stats = glstate.stats()
+        assert stats['calls']   == 4
+        assert stats['skipped'] == 1
+
+        glstate.newFrame()
+        stats = glstate.stats()
+        assert stats['calls']       == 0
+        assert stats['skipped']     == 0
+        assert stats['lastCalls']   == 4
+        assert stats['lastSkipped'] == 1
+
+    finally:
+        for p in patches.values():
+            p.stop()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+#
+# test_histogramengine.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import itertools as it
+
+import numpy  as np
+import pytest
+
+import fsleyes.workerpool               as workerpool
+import fsleyes.plotting.histogramengine as histogramengine
+
+
+def _reference(data, nbins, hrange, drange, includeOutliers, ignoreZeros):
+
+    data = data[np.isfinite(data)]
+    if ignoreZeros:
+        data = data[data != 0]
+
+    bins = np.linspace(hrange[0], hrange[1], nbins + 1)
+    if includeOutliers:
+        bins[ 0] = drange[0]
+        bins[-1] = drange[1]
+
+    return bins, np.histogram(data, bins=bins)[0]
+
+
+def test_calcBaseHistogram_integer():
+    for dtype in (np.uint8, np.int16, np.int32, np.int64):
+        _test_calcBaseHistogram_integer(dtype)
+
+
+def _test_calcBaseHistogram_integer(dtype):
+
+    data = np.random.randint(-50, 200, (20, 21, 22)).astype(dtype)
+    data[data >= 200] = 0
+    data[data <  0]   = 0
+
+    base = histogramengine.calcBaseHistogram(data, chunkSize=1000)
+
+    assert base.dmin    == data.min()
+    assert base.dmax    == data.max()
+    assert base.nfinite == data.size
+    assert base.nzeros  == (data == 0).sum()
+    assert base.dtype   == dtype
+
+    dmin, dmax = base.dmin, base.dmax + 1
+
+    for nbins, hrange, inc, ignz in it.product(
+            (10, 37, 100),
+            ((dmin, dmax), (10.5, 150), (5, 100)),
+            (False, True),
+            (False, True)):
+
+        expx, expy = _reference(data, nbins, hrange, (dmin, dmax), inc, ignz)
+        x, y, n    = base.histogram(nbins, hrange, (dmin, dmax), inc, ignz)
+
+        assert np.all(np.isclose(x, expx))
+        assert np.all(y == expy)
+        assert n == expy.sum()
+
+
+def test_calcBaseHistogram_float():
+
+    # The interpolation error in a derived
+    # histogram depends on where its bin
+    # edges fall within the base bins, so
+    # we use fixed data to keep this test
+    # deterministic
+    rng  = np.random.RandomState(0)
+    data = rng.random_sample((30, 31, 32)).astype(np.float32) * 100 - 20
+    data[data < 0]   = 0
+    data[1, 2, 3]    = np.nan
+    data[3, 2, 1]    = np.inf
+
+    # The data is streamed in many pieces -
+    # this should give exactly the same
+    # result as a single pass over the data
+    base   = histogramengine.calcBaseHistogram(data, chunkSize=1000)
+    single = histogramengine.calcBaseHistogram(data, chunkSize=data.nbytes)
+    fin  = data[np.isfinite(data)]
+
+    assert np.isclose(base.dmin, fin.min())
+    assert np.isclose(base.dmax, fin.max())
+    assert base.nfinite == fin.size
+    assert base.nzeros  == (fin == 0).sum()
+
+    dmin, dmax = base.dmin, base.dmax
+
+    for nbins, hrange, inc, ignz in it.product(
+            (10, 100),
+            ((dmin, dmax), (10, 50)),
+            (False, True),
+            (False, True)):
+
+        expx, expy = _reference(data, nbins, hrange, (dmin, dmax), inc, ignz)
+        x, y, n    = base.histogram(nbins, hrange, (dmin, dmax), inc, ignz)
+
+        sx, sy, sn = single.histogram(nbins, hrange, (dmin, dmax), inc, ignz)
+
+        assert np.all(x  == sx)
+        assert np.all(y  == sy)
+        assert n         == sn
+
+        # Counts are interpolated within
+        # each base bin, so may differ
+        # slightly from the real counts
+        assert np.all(np.isclose(x, expx))
+        assert np.all(np.abs(y - expy) <= 2)
+        assert abs(n - expy.sum()) <= 2
+
+
+def test_calcBaseHistogram_probability():
+
+    data       = np.random.randint(1, 10, 1000)
+    base       = histogramengine.calcBaseHistogram(data)
+    x, y, n    = base.histogram(9, (1, 10), (1, 10), count=False)
+    expx, expy = _reference(data, 9, (1, 10), (1, 10), False, True)
+
+    assert n == 1000
+    assert np.all(np.isclose(y, expy / 1000.0))
+
+
+def test_calcBaseHistogram_empty():
+
+    data = np.full((5, 5, 5), np.nan)
+    base = histogramengine.calcBaseHistogram(data)
+
+    assert base.nfinite == 0
+    x, y, n = base.histogram(10, (0, 1), (0, 1))
+    assert np.all(y == 0)
+    assert n == 0
+
+    data = np.full((5, 5, 5), 3.5)
+    base = histogramengine.calcBaseHistogram(data)
+    x, y, n = base.histogram(10, (3.5, 3.6), (3.5, 3.6))
+
+    assert base.dmin == 3.5
+    assert base.dmax == 3.5
+    assert y[0] == 125
+    assert n    == 125
+
+
+def test_calcBaseHistogram_mask():
+
+    data = np.random.random((10, 11, 12, 5)).astype(np.float32)
+    mask = np.random.random((10, 11, 12)) > 0.5
+
+    for m, expdata in [(mask,                          data[mask]),
+                       (np.zeros(data.shape, dtype=bool), data[:0]),
+                       (data > 0.5,                    data[data > 0.5])]:
+
+        base = histogramengine.calcBaseHistogram(data, mask=m, chunkSize=500)
+
+        assert base.nfinite == expdata.size
+
+        if expdata.size == 0:
+            continue
+
+        drange     = (base.dmin, base.dmax)
+        expx, expy = _reference(expdata, 20, drange, drange, False, True)
+        x, y, n    = base.histogram(20, drange, drange)
+
+        assert np.isclose(base.dmin, expdata.min())
+        assert np.isclose(base.dmax, expdata.max())
+        assert np.all(np.abs(y - expy) <= 2)
+
+    with pytest.raises(ValueError):
+        histogramengine.calcBaseHistogram(data, mask=mask[:5])
+
+
+def test_calcBaseHistogram_pool():
+
+    pool = workerpool.WorkerPool(3)
+
+    try:
+        for dtype in (np.int16, np.int32, np.float64):
+            data = np.random.randint(0, 1000, (10, 11, 12, 13)).astype(dtype)
+            mask = np.random.random((10, 11, 12)) > 0.5
+
+            exp  = histogramengine.calcBaseHistogram(data, mask=mask)
+            base = histogramengine.calcBaseHistogram(data,
+                                                     mask=mask,
+                                                     pool=pool,
+                                                     chunkSize=1000)
+
+            assert base.dmin    == exp.dmin
+            assert base.dmax    == exp.dmax
+            assert base.nfinite == exp.nfinite
+            assert base.nzeros  == exp.nzeros
+
+            drange = (base.dmin, base.dmax + 1)
+            assert np.all(base.histogram(50, drange, drange)[1] ==
+                          exp .histogram(50, drange, drange)[1])
+    finally:
+        pool.stop()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+#
+# test_imagewriter.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os
+import gzip
+import os.path as op
+
+import numpy   as np
+import nibabel as nib
+import pytest
+
+import fsl.data.image           as fslimage
+import fsl.utils.transform      as transform
+import fsleyes.imagewriter      as imagewriter
+import fsleyes.copyonwriteimage as copyonwriteimage
+
+from . import tempdir
+
+
+@pytest.mark.parametrize('shape,dtype', [((30, 31, 32),     np.float32),
+                                         ((20, 21, 22, 7),  np.int16),
+                                         ((10, 10, 10, 1),  np.uint8)])
+def test_writeImage(shape, dtype):
+
+    data  = (np.random.random(shape) * 100).astype(dtype)
+    xform = transform.scaleOffsetXform((2, 3, 4), (-10, 5, 20))
+    img   = fslimage.Image(data, xform=xform)
+
+    with tempdir():
+        for ext in ('.nii', '.nii.gz'):
+            for nworkers in (1, 3):
+
+                path     = 'image{}'.format(ext)
+                progress = []
+                snap, hdr = imagewriter.snapshot(img)
+
+                imagewriter.writeImage(
+                    snap,
+                    hdr,
+                    path,
+                    nworkers=nworkers,
+                    blockSize=4000,
+                    progfunc=lambda *a: progress.append(a))
+                snap.detach()
+
+                nimg = nib.load(path)
+                got  = np.asanyarray(nimg.dataobj)
+
+                assert got.dtype == dtype
+                assert np.all(got.reshape(shape) == data)
+                assert np.all(np.isclose(nimg.affine, xform))
+                assert progress[-1][0] == progress[-1][1]
+                assert len(progress) == progress[-1][1]
+
+                # Compressed blocks form a single gzip stream
+                if ext == '.nii.gz':
+                    with gzip.open(path, 'rb') as f:
+                        raw = f.read()
+                    assert len(raw) == nimg.dataobj.offset + data.nbytes
+
+        # no temporary files left behind
+        assert sorted(os.listdir('.')) == ['image.nii', 'image.nii.gz']
+
+
+def test_writeImage_snapshot():
+
+    data = np.random.random((20, 20, 20, 5)).astype(np.float32)
+    img  = fslimage.Image(np.array(data))
+
+    snap, hdr = imagewriter.snapshot(img)
+
+    # image modified after snapshot
+    # was taken (e.g. by the Editor)
+    slc = (slice(None), slice(None), slice(None), 2)
+    copyonwriteimage.prepareWrite(img, slc)
+    img[slc] = np.zeros((20, 20, 20))
+
+    with tempdir():
+        imagewriter.writeImage(snap, hdr, 'image.nii.gz')
+        got = np.asanyarray(nib.load('image.nii.gz').dataobj)
+        assert np.all(got == data)
+
+
+def test_writeImage_cancel():
+
+    img = fslimage.Image(np.random.random((20, 20, 20, 5)).astype(np.float32))
+
+    with tempdir():
+
+        fslimage.Image(np.zeros((2, 2, 2))).save('image.nii.gz')
+
+        snap, hdr = imagewriter.snapshot(img)
+
+        with pytest.raises(imagewriter.WriteCancelled):
+            imagewriter.writeImage(snap,
+                                   hdr,
+                                   'image.nii.gz',
+                                   progfunc=lambda done, total: done < 2,
+                                   blockSize=32000)
+
+        # existing file is left untouched
+        assert os.listdir('.') == ['image.nii.gz']
+        assert fslimage.Image('image.nii.gz').shape == (2, 2, 2)
+
+
+def test_canWrite():
+
+    img = fslimage.Image(np.random.random((5, 5, 5)))
+
+    assert     imagewriter.canWrite(img, 'image.nii')
+    assert     imagewriter.canWrite(img, 'image.nii.gz')
+    assert not imagewriter.canWrite(img, 'image.img')
+    assert not imagewriter.canWrite(img, 'image.hdr')
+
+
+def test_markSaved():
+
+    img = fslimage.Image(np.random.random((5, 5, 5)))
+    cow = copyonwriteimage.CopyOnWriteImage(img)
+
+    cow[0, 0, 0] = 5
+
+    with tempdir():
+        for image in (img, cow):
+
+            notified = []
+
+            def saveStateChanged(*a):
+                notified.append(True)
+
+            image.register('test', saveStateChanged, topic='saveState')
+
+            assert not image.saveState
+
+            snap, hdr = imagewriter.snapshot(image)
+            imagewriter.writeImage(snap, hdr, 'image.nii.gz')
+            snap.detach()
+
+            imagewriter.markSaved(image, 'image.nii.gz', modified=True)
+            assert image.dataSource == op.abspath('image.nii.gz')
+            assert not image.saveState
+            assert len(notified) == 0
+
+            imagewriter.markSaved(image, 'image.nii.gz')
+            assert image.saveState
+            assert len(notified) == 1
+
+            image.deregister('test', topic='saveState')
+
+
+def test_markSaved_detach():
+
+    data = np.random.random((10, 10, 10, 3)).astype(np.float32)
+    img  = fslimage.Image(np.array(data))
+    cow  = copyonwriteimage.CopyOnWriteImage(img, chunkSize=1000)
+
+    cow[..., 1] = 5
+    exp         = np.array(data)
+    exp[..., 1] = 5
+
+    with tempdir():
+        snap, hdr = imagewriter.snapshot(cow)
+        imagewriter.writeImage(snap, hdr, 'copy.nii.gz')
+        snap.detach()
+
+        # modified since the snapshot was
+        # taken - the copy remains attached
+        imagewriter.markSaved(cow, 'copy.nii.gz', modified=True)
+        assert cow.source is img
+
+        imagewriter.markSaved(cow, 'copy.nii.gz')
+        assert cow.source is None
+        assert cow.saveState
+        assert cow.nibImage.dataobj.nchunks() == 0
+        assert np.all(cow[:] == exp)
+
+        # changes to the source do not affect
+        # the saved copy, even without a call
+        # to prepareWrite
+        img[:] = np.zeros(data.shape, dtype=np.float32)
+        assert np.all(cow[:] == exp)
+
+        cow[0, 0, 0, 0] = 10
+        exp[0, 0, 0, 0] = 10
+        assert not cow.saveState
+        assert np.all(cow[:] == exp)
+        assert np.all(img[:] == 0)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+#
+# test_lightboxtexturestack.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import fsleyes.gl.textures.lightboxtexturestack as lbts
+
+
+def test_prioritiseSlices():
+
+    # visible slices first, then two
+    # ahead for every one behind
+    order = lbts.prioritiseSlices(20, 5, 10, 1, 20)
+    assert sorted(order) == list(range(20))
+    assert order[:5]     == [5, 6, 7, 8, 9]
+    assert order[5:11]   == [10, 11, 4, 12, 13, 3]
+
+    # scrolling the other way
+    order = lbts.prioritiseSlices(20, 5, 10, -1, 20)
+    assert order[:5]   == [5, 6, 7, 8, 9]
+    assert order[5:11] == [4, 3, 10, 2, 1, 11]
+
+    # limited by capacity
+    order = lbts.prioritiseSlices(500, 100, 150, 1, 60)
+    assert len(order) == 60
+    assert order[:50] == list(range(100, 150))
+    assert max(order) == 156
+    assert min(order) == 97
+
+    # visible range clipped to
+    # the number of slices
+    assert lbts.prioritiseSlices(10, 8, 20, 1, 100) == \
+        [8, 9, 7, 6, 5, 4, 3, 2, 1, 0]
+    assert lbts.prioritiseSlices(0, 0, 10, 1, 100) == []
+    assert lbts.prioritiseSlices(10, 0, 5, 1, 0)   == []
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+#
+# test_loadoverlay.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os
+import os.path as op
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy  as np
+import pytest
+
+import fsl.data.image              as fslimage
+import fsleyes.actions.loadoverlay as loadoverlay
+
+from . import run_with_fsleyes, realYield, tempdir
+
+
+def _makeImages(n, shape=(20, 20, 20), ext='.nii.gz'):
+    paths = []
+    for i in range(n):
+        path = op.abspath('image{:03d}{}'.format(i, ext))
+        data = np.random.randint(0, 1000, shape).astype(np.int16)
+        fslimage.Image(data).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_loadOverlays_blocking():
+
+    with tempdir():
+
+        paths = _makeImages(10)
+        paths.insert(3, 'notanimage.txt')
+
+        with open('notanimage.txt', 'wt') as f:
+            f.write('nope')
+
+        loaded = []
+        errors = []
+        result = []
+
+        def onLoad(idxs, ovls):
+            result.append((idxs, ovls))
+
+        ovls = loadoverlay.loadOverlays(
+            paths,
+            loadFunc=loaded.append,
+            errorFunc=lambda p, e: errors.append(p),
+            saveDir=False,
+            onLoad=onLoad,
+            blocking=True,
+            nworkers=4)
+
+        expect = [p for p in paths if p != 'notanimage.txt']
+
+        assert loaded              == paths
+        assert errors              == [op.abspath('notanimage.txt')]
+        assert len(result)         == 1
+        assert result[0][1]        == ovls
+        assert result[0][0]        == [0, 1, 2, 4, 5, 6, 7, 8, 9, 10]
+        assert [o.dataSource for o in ovls] == expect
+
+
+def _test_loadOverlays_progressive(frame, overlayList, displayCtx):
+
+    with tempdir():
+
+        paths  = _makeImages(12)
+        calls  = []
+
+        def onLoad(idxs, ovls):
+            calls.append((idxs, ovls))
+            overlayList.extend(ovls)
+
+        loadoverlay.loadOverlays(paths,
+                                 loadFunc=None,
+                                 saveDir=False,
+                                 onLoad=onLoad,
+                                 progressive=True,
+                                 nworkers=3)
+
+        start = time.time()
+        while len(overlayList) < len(paths) and time.time() - start < 30:
+            realYield()
+
+        idxs = [i for c in calls for i in c[0]]
+
+        assert idxs == list(range(len(paths)))
+        assert [o.dataSource for o in overlayList] == paths
+
+        overlayList.clear()
+
+
+def test_loadOverlays_progressive():
+    run_with_fsleyes(_test_loadOverlays_progressive)
+
+
+def _test_loadOverlays_window(frame, overlayList, displayCtx):
+
+    nworkers = 2
+    window   = nworkers * loadoverlay._ParallelLoader.WINDOW_FACTOR
+
+    with tempdir():
+
+        paths = _makeImages(12)
+        bad   = [op.abspath('bad{}.txt'.format(i)) for i in range(2)]
+
+        for b in bad:
+            with open(b, 'wt') as f:
+                f.write('nope')
+
+        paths.insert(2, bad[0])
+        paths.insert(7, bad[1])
+
+        lock       = threading.Lock()
+        active     = [0]
+        maxActive  = [0]
+        submitted  = []
+        processed  = []
+        outOfOrder = []
+        errors     = []
+        loaded     = []
+        realLoad   = loadoverlay._loadPath
+
+        # The first file takes a long time to
+        # load, so the other files pile up
+        # behind it, and the window fills up
+        def loadPath(path, inmem):
+            with lock:
+                active[0]    += 1
+                maxActive[0]  = max(maxActive[0], active[0])
+            try:
+                if path == paths[0]: time.sleep(1)
+                else:                time.sleep(0.05)
+                return realLoad(path, inmem)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        def loadFunc(path):
+            submitted.append(path)
+            outOfOrder.append(len(submitted) - len(processed))
+
+        # Each path is recorded in the recent
+        # paths list when it is processed
+        def recordPath(path):
+            processed.append(path)
+
+        def errorFunc(path, error):
+            errors.append(path)
+
+        def onLoad(idxs, ovls):
+            loaded.extend(zip(idxs, ovls))
+
+        rpm = loadoverlay.recentPathManager
+
+        with mock.patch.object(loadoverlay, '_loadPath', loadPath), \
+             mock.patch.object(rpm,         'recordPath', recordPath):
+            loadoverlay.loadOverlays(paths,
+                                     loadFunc=loadFunc,
+                                     errorFunc=errorFunc,
+                                     saveDir=False,
+                                     onLoad=onLoad,
+                                     progressive=True,
+                                     nworkers=nworkers)
+
+            start = time.time()
+            while len(processed) < len(paths) and time.time() - start < 30:
+                realYield()
+
+        goodIdxs  = [i for i, p in enumerate(paths) if p not in bad]
+        goodPaths = [paths[i] for i in goodIdxs]
+
+        # Results are passed back in
+        # the order that they were given
+        assert submitted                         == paths
+        assert processed                         == paths
+        assert [l[0]            for l in loaded] == goodIdxs
+        assert [l[1].dataSource for l in loaded] == goodPaths
+
+        # Errors are reported for each
+        # file which could not be loaded
+        assert errors == bad
+
+        # No more than nworkers files are loaded
+        # at once, and no more than window files
+        # are loaded ahead of the first file which
+        # has not yet been processed
+        assert maxActive[0]    <= nworkers
+        assert max(outOfOrder) <= window
+
+
+def test_loadOverlays_window():
+    run_with_fsleyes(_test_loadOverlays_window)
+
+
+@pytest.mark.skipif(not os.environ.get('FSLEYES_TEST_BENCHMARK', False),
+                    reason='Set FSLEYES_TEST_BENCHMARK=1 to run benchmarks')
+def test_loadOverlays_benchmark():
+
+    with tempdir():
+
+        for n in (1, 10, 50):
+
+            paths   = _makeImages(n, shape=(64, 64, 64))
+            timings = []
+
+            for nworkers in (1, None):
+                start = time.time()
+                loadoverlay.loadOverlays(paths,
+                                         loadFunc=None,
+                                         errorFunc=None,
+                                         saveDir=False,
+                                         blocking=True,
+                                         inmem=True,
+                                         nworkers=nworkers)
+                timings.append(time.time() - start)
+
+            print('{:3d} files: serial {:0.3f}s, parallel {:0.3f}s'.format(
+                n, *timings))
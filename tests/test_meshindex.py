@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# test_meshindex.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy         as np
+import scipy.spatial as spatial
+
+import fsleyes.meshindex as meshindex
+
+
+def _sphere(npoints=5000, radius=50):
+    verts  = np.random.randn(npoints, 3)
+    verts /= np.sqrt((verts ** 2).sum(axis=1))[:, None]
+    verts *= radius
+    tris   = spatial.ConvexHull(verts).simplices
+    return verts, tris
+
+
+def test_nearestVertex():
+
+    verts, tris = _sphere()
+    index       = meshindex.MeshIndex(verts, tris)
+    points      = np.random.randn(100, 3) * 60
+
+    idxs, dists = index.nearestVertex(points)
+    expdists    = np.sqrt(((verts[None, :, :] -
+                            points[:, None, :]) ** 2).sum(axis=2))
+
+    assert np.all(idxs == np.argmin(expdists, axis=1))
+    assert np.all(np.isclose(dists, expdists.min(axis=1)))
+
+    # single point, exact match
+    assert index.nearestVertex(verts[10], 0) == (10, 0)
+
+    # tolerance
+    point     = verts[10] * 1.01
+    idx, dist = index.nearestVertex(point, tolerance=0.0001)
+    assert idx == -1
+    assert np.isinf(dist)
+
+    idx, dist = index.nearestVertex(point, tolerance=1)
+    assert idx == 10
+
+
+def test_rayIntersection():
+
+    verts, tris = _sphere()
+    alltris     = verts[tris]
+
+    for leafSize in (1, 7, 32):
+
+        index = meshindex.MeshIndex(verts, tris, leafSize=leafSize)
+
+        for i in range(50):
+
+            origin    = np.random.randn(3) * 100
+            direction = -origin + np.random.randn(3) * 40
+            direction = direction / np.sqrt((direction ** 2).sum())
+
+            loc, tri = index.rayIntersection(origin, direction)
+            dists    = meshindex.rayTriangleIntersection(
+                origin, direction, alltris)
+            exp      = np.argmin(dists)
+
+            if np.isinf(dists[exp]):
+                assert loc is None and tri is None
+            else:
+                assert np.isclose(dists[tri], dists[exp])
+                assert np.all(np.isclose(loc,
+                                         origin + dists[exp] * direction))
+
+    # ray pointing away from the mesh
+    index = meshindex.MeshIndex(verts, tris)
+    assert index.rayIntersection([0, 0, 200], [0, 0, 1]) == (None, None)
+
+    # ray starting inside the mesh
+    loc, tri = index.rayIntersection([0, 0, 0], [0, 0, 1])
+    assert np.isclose(loc[2], 50, atol=1)
+
+
+def test_rayBoxIntersection():
+
+    mins = np.array([[0, 0, 0], [5, 5, 5], [0, 0, 0]], dtype=np.float64)
+    maxs = np.array([[1, 1, 1], [6, 6, 6], [0, 1, 1]], dtype=np.float64)
+
+    hits = meshindex.rayBoxIntersection(np.array([-1, 0.5, 0.5]),
+                                        np.array([1, 0, 0]),
+                                        mins, maxs)
+    assert list(hits) == [True, False, True]
+
+    hits = meshindex.rayBoxIntersection(np.array([2, 0.5, 0.5]),
+                                        np.array([1, 0, 0]),
+                                        mins, maxs)
+    assert list(hits) == [False, False, False]
+
+
+class MockMesh(object):
+    def __init__(self, vertices, indices):
+        self.vertices = vertices
+        self.indices  = indices
+
+
+def test_getIndex():
+
+    verts, tris = _sphere(500)
+    mesh        = MockMesh(verts, tris)
+
+    index = meshindex.getIndex(mesh)
+    assert meshindex.getIndex(mesh) is index
+
+    # new vertex set
+    mesh.vertices = verts * 2
+    index2        = meshindex.getIndex(mesh)
+    assert index2 is not index
+    assert index2.nearestVertex(verts[0] * 2)[0] == 0
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# test_niftiopts_transforms.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os.path   as op
+import itertools as it
+import time
+
+import numpy as np
+
+import fsl.data.image      as fslimage
+import fsl.utils.transform as transform
+
+from . import run_with_fsleyes, realYield
+
+
+datadir = op.join(op.dirname(__file__), 'testdata')
+
+
+SPACES = ['id', 'voxel', 'pixdim', 'pixdim-flip', 'pixflip', 'affine',
+          'world', 'reference', 'ref', 'display', 'texture']
+
+
+def _canonical(opts, space):
+    space = {'voxel'   : 'id',
+             'world'   : 'affine',
+             'pixflip' : 'pixdim-flip',
+             'ref'     : 'reference'}.get(space, space)
+    if space == 'display':
+        space = opts.transform
+    return space
+
+
+def _test_getTransform(frame, overlayList, displayCtx):
+
+    img1 = fslimage.Image(op.join(datadir, '3d'))
+    img2 = fslimage.Image(op.join(datadir, 'dti', 'dti_FA'))
+    overlayList.extend((img1, img2))
+    realYield()
+
+    opts = displayCtx.getOpts(img2)
+
+    for xform in ('affine', 'pixdim', 'pixdim-flip', 'id', 'reference'):
+
+        opts.transform = xform
+        realYield()
+
+        v2d = opts.getTransform('voxel', 'display')
+
+        for from_, to in it.product(SPACES, SPACES):
+
+            exp = opts.getTransform(_canonical(opts, from_),
+                                    _canonical(opts, to))
+            assert np.all(np.isclose(opts.getTransform(from_, to), exp))
+
+        # display -> voxel, for a different display xform
+        other = 'id' if xform != 'id' else 'affine'
+        assert np.all(np.isclose(
+            opts.getTransform('voxel', 'display', xform=other),
+            opts.getTransform('voxel', other)))
+
+        # The cached axis mapping must be
+        # updated when the transform changes
+        assert list(opts.getDisplayAxisMapping()) == \
+            list(img2.axisMapping(v2d))
+
+
+def test_getTransform():
+    run_with_fsleyes(_test_getTransform)
+
+
+def _test_transformCoords(frame, overlayList, displayCtx):
+
+    img = fslimage.Image(op.join(datadir, '3d'))
+    overlayList.append(img)
+    realYield()
+
+    opts   = displayCtx.getOpts(img)
+    coords = np.random.random((50, 3)) * 20 - 5
+
+    for from_, to in it.product(['voxel', 'world', 'display'], repeat=2):
+
+        xform = opts.getTransform(from_, to)
+        exp   = transform.transform(coords, xform)
+
+        assert np.all(np.isclose(opts.transformCoords(coords, from_, to), exp))
+
+        # single point
+        assert np.all(np.isclose(
+            opts.transformCoords(coords[0], from_, to), exp[0]))
+
+        # vectors
+        exp = transform.transform(coords, xform, vector=True)
+        assert np.all(np.isclose(
+            opts.transformCoords(coords, from_, to, vector=True), exp))
+
+    # Rounding to voxels
+    vox = opts.transformCoords(coords, 'display', 'voxel', vround=True)
+    for c, v in zip(coords, vox):
+        assert np.all(v == opts.getVoxel(c, clip=False))
+
+
+def test_transformCoords():
+    run_with_fsleyes(_test_transformCoords)
+
+
+def _test_transformCoords_benchmark(frame, overlayList, displayCtx):
+
+    img = fslimage.Image(op.join(datadir, '3d'))
+    overlayList.append(img)
+    realYield()
+
+    opts  = displayCtx.getOpts(img)
+    locs  = np.random.random((2000, 3)) * 50
+    nlocs = len(locs)
+
+    # The per-move cost of the previous
+    # implementation, which resolved the
+    # transform, applied it via the generic
+    # transform.transform, and re-calculated
+    # the voxel axis mapping for rounding
+    def legacy(loc):
+        xform = opts.getTransform('display', 'voxel')
+        vox   = transform.transform(np.array([loc]), xform)
+        img.axisMapping(opts.getTransform('voxel', 'display'))
+        return opts.roundVoxels(vox)[0]
+
+    start = time.time()
+    for loc in locs:
+        legacy(loc)
+    before = (time.time() - start) / nlocs
+
+    start = time.time()
+    for loc in locs:
+        opts.getVoxel(loc)
+    after = (time.time() - start) / nlocs
+
+    start = time.time()
+    opts.transformCoords(locs, 'display', 'voxel', vround=True)
+    batched = (time.time() - start) / nlocs
+
+    print('Per-move display -> voxel cost: before {:0.2f}us, '
+          'after {:0.2f}us, batched {:0.2f}us'.format(
+              before * 1e6, after * 1e6, batched * 1e6))
+
+
+def test_transformCoords_benchmark():
+    run_with_fsleyes(_test_transformCoords_benchmark)
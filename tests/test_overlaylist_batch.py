@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+#
+# test_overlaylist_batch.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy as np
+import pytest
+
+import fsl.data.image                        as fslimage
+import fsleyes.displaycontext                as fsldc
+import fsleyes.displaycontext.displaycontext as displaycontext
+
+from . import run_with_fsleyes, realYield
+
+
+def _images(n):
+    return [fslimage.Image(np.random.random((4, 4, 4)).astype(np.float32),
+                           name='image{}'.format(i))
+            for i in range(n)]
+
+
+def _test_batch(frame, overlayList, displayCtx):
+
+    child    = fsldc.DisplayContext(overlayList, parent=displayCtx)
+    notified = [0]
+
+    def changed(*a):
+        notified[0] += 1
+
+    overlayList.addListener('overlays', 'test', changed)
+
+    try:
+        imgs = _images(10)
+
+        # Nested batches - one notification
+        with overlayList.batch():
+            for img in imgs[:5]:
+                overlayList.append(img)
+            with overlayList.batch():
+                overlayList.extend(imgs[5:])
+                overlayList.move(9, 0)
+                overlayList.move(0, 9)
+
+        assert notified[0] == 1
+        assert list(overlayList) == imgs
+        assert child.overlayOrder[:] == list(range(10))
+
+        for img in imgs:
+            assert child.getDisplay(img).overlay is img
+            assert img in displayCtx.overlayGroups[0].overlays
+
+        # All images are in the same space, so
+        # should have been given the same transform
+        assert len(set([child.getOpts(i).transform for i in imgs])) == 1
+
+        # No changes - no notification
+        with overlayList.batch():
+            pass
+        assert notified[0] == 1
+
+        # Displays accessed within a batch
+        # block are handled properly
+        newImgs = _images(2)
+        with overlayList.batch():
+            overlayList.remove(imgs[3])
+            overlayList.remove(imgs[7])
+            overlayList.remove(imgs[1])
+            overlayList.extend(newImgs)
+            overlayList.remove(imgs[0])
+            child.getDisplay(newImgs[0])
+
+        expect = [imgs[2], imgs[4], imgs[5], imgs[6], imgs[8], imgs[9]] + \
+            newImgs
+
+        assert notified[0] == 2
+        assert list(overlayList) == expect
+        assert sorted(child.overlayOrder[:]) == list(range(8))
+
+        for img in newImgs:
+            assert img in displayCtx.overlayGroups[0].overlays
+
+        for img in (imgs[0], imgs[1], imgs[3], imgs[7]):
+            with pytest.raises(displaycontext.InvalidOverlayError):
+                child.getDisplay(img)
+
+        # Listeners are notified
+        # if an error occurs
+        with pytest.raises(RuntimeError):
+            with overlayList.batch():
+                overlayList.remove(imgs[2])
+                raise RuntimeError()
+
+        assert notified[0] == 3
+        with pytest.raises(displaycontext.InvalidOverlayError):
+            child.getDisplay(imgs[2])
+
+    finally:
+        overlayList.removeListener('overlays', 'test')
+        overlayList.clear()
+        child.destroy()
+
+
+def test_batch():
+    run_with_fsleyes(_test_batch)
+
+
+def _test_batch_scaling(frame, overlayList, displayCtx):
+
+    # Record the length of the overlay list
+    # every time a DisplayContext processes
+    # a change to it. The listener is bound
+    # when the DisplayContext is created, so
+    # we patch the class before creating it.
+    passes = []
+    orig   = displaycontext.DisplayContext._DisplayContext__overlayListChanged
+
+    def overlayListChanged(self, *a):
+        passes.append(len(self._DisplayContext__overlayList))
+        return orig(self, *a)
+
+    with mock.patch.object(displaycontext.DisplayContext,
+                           '_DisplayContext__overlayListChanged',
+                           overlayListChanged):
+        child = fsldc.DisplayContext(overlayList, parent=displayCtx)
+
+    try:
+        for n in (10, 50, 100):
+
+            imgs = _images(n)
+
+            # Batched - the DisplayContext should
+            # process the list once, so the total
+            # amount of work is linear in n
+            passes[:] = []
+            with overlayList.batch():
+                for img in imgs:
+                    overlayList.append(img)
+
+            assert passes == [n]
+            assert sorted(child.overlayOrder[:]) == list(range(n))
+            for img in imgs:
+                assert child.getDisplay(img).overlay is img
+
+            passes[:] = []
+            with overlayList.batch():
+                overlayList.clear()
+            assert passes == [0]
+            realYield()
+
+            # Un-batched - one pass per append,
+            # so the total work is quadratic
+            if n <= 10:
+                passes[:] = []
+                for img in imgs:
+                    overlayList.append(img)
+                assert passes == list(range(1, n + 1))
+                overlayList.clear()
+                realYield()
+    finally:
+        overlayList.clear()
+        child.destroy()
+
+
+def test_batch_scaling():
+    run_with_fsleyes(_test_batch_scaling)
+
+
+def _test_batch_benchmark(frame, overlayList, displayCtx):
+
+    children = [fsldc.DisplayContext(overlayList, parent=displayCtx)
+                for i in range(3)]
+
+    def load(imgs, batch):
+        start = time.time()
+        if batch:
+            with overlayList.batch():
+                for img in imgs:
+                    overlayList.append(img)
+        else:
+            for img in imgs:
+                overlayList.append(img)
+        elapsed = time.time() - start
+        overlayList.clear()
+        realYield()
+        return elapsed
+
+    try:
+        for n in (10, 100, 250, 500, 1000):
+
+            imgs    = _images(n)
+            batched = load(imgs, True)
+
+            # The un-batched case is
+            # quadratic - don't bother
+            # with the big lists
+            if n <= 250: single = load(imgs, False)
+            else:        single = np.nan
+
+            print('{:4d} overlays: one at a time {:8.3f}s, '
+                  'batched {:8.3f}s ({:0.2f}ms per overlay)'.format(
+                      n, single, batched, 1000 * batched / n))
+    finally:
+        for child in children:
+            child.destroy()
+
+
+@pytest.mark.skipif(not os.environ.get('FSLEYES_TEST_BENCHMARK', False),
+                    reason='Set FSLEYES_TEST_BENCHMARK=1 to run benchmarks')
+def test_batch_benchmark():
+    run_with_fsleyes(_test_batch_benchmark)
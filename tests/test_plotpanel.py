@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+#
+# test_plotpanel.py - Tests for incremental (blitted) plot updates.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy as np
+
+import fsleyes.plotting.dataseries as dataseries
+
+from . import run_with_timeseriespanel, realYield
+
+
+def _series(panel, overlayList, displayCtx, ydata):
+    ds = dataseries.DataSeries(None, overlayList, displayCtx, panel)
+    ds.setData(np.arange(len(ydata)), np.asarray(ydata, dtype=np.float32))
+    return ds
+
+
+class Spy(object):
+    """Counts calls to the full redraw and blit code paths of a PlotPanel.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.full  = mock.patch.object(
+            panel, '_PlotPanel__fullDrawDataSeries',
+            wraps=panel._PlotPanel__fullDrawDataSeries)
+        self.blit  = mock.patch.object(
+            panel, '_PlotPanel__blitDataSeries',
+            wraps=panel._PlotPanel__blitDataSeries)
+
+    def __enter__(self):
+        self.fullMock = self.full.__enter__()
+        self.blitMock = self.blit.__enter__()
+        return self
+
+    def __exit__(self, *a):
+        self.blit.__exit__(*a)
+        self.full.__exit__(*a)
+
+    def draw(self, extra, timeout=5):
+        """Calls drawDataSeries, waits for it to complete, and returns
+        either 'full' or 'blit'.
+        """
+
+        nfull = self.fullMock.call_count
+        nblit = self.blitMock.call_count
+
+        self.panel.drawDataSeries(extraSeries=extra, refresh=True)
+
+        start = time.time()
+        while time.time() - start < timeout:
+            realYield(5)
+            if self.fullMock.call_count > nfull: return 'full'
+            if self.blitMock.call_count > nblit: return 'blit'
+
+        raise AssertionError('Plot was not drawn')
+
+
+def test_blit():
+    run_with_timeseriespanel(_test_blit)
+def _test_blit(panel, overlayList, displayCtx):
+
+    # Prevent the panel from drawing by
+    # itself (e.g. on property changes), so
+    # we have control over every draw. Any
+    # draws which are already queued are
+    # allowed to complete first.
+    panel.asyncDraw = lambda *a: None
+    realYield(50)
+
+    held = _series(panel, overlayList, displayCtx, np.linspace(0, 10, 20))
+    dyn  = _series(panel, overlayList, displayCtx, np.linspace(2, 8, 20))
+    panel.dataSeries.append(held)
+
+    with Spy(panel) as spy:
+
+        assert spy.draw([dyn]) == 'full'
+
+        # Moving the dynamic series, within
+        # the data range of the held series
+        dyn.setData(np.arange(20), np.linspace(8, 2, 20))
+        assert spy.draw([dyn]) == 'blit'
+        dyn.setData(np.arange(20), np.random.uniform(1, 9, 20))
+        assert spy.draw([dyn]) == 'blit'
+
+        # changing the held series data
+        held.setData(np.arange(20), np.linspace(1, 10, 20))
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        # changing the style of a held
+        # or dynamic series
+        held.colour = (1, 0, 0)
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+        dyn.lineWidth = 3
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        # changing the axis labels
+        panel.xlabel = 'X label'
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        # different series
+        assert spy.draw([])    == 'full'
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+
+def test_blit_limits():
+    run_with_timeseriespanel(_test_blit_limits)
+def _test_blit_limits(panel, overlayList, displayCtx):
+
+    panel.asyncDraw = lambda *a: None
+    realYield(50)
+
+    held = _series(panel, overlayList, displayCtx, np.linspace(0, 10, 20))
+    dyn  = _series(panel, overlayList, displayCtx, np.linspace(2, 8, 20))
+    panel.dataSeries.append(held)
+
+    with Spy(panel) as spy:
+
+        assert panel.yAutoScale
+        assert spy.draw([dyn]) == 'full'
+
+        # When y limits are autoscaled, they are
+        # calculated from all series, including
+        # the dynamic one - moving the dynamic
+        # series outside of the range of the held
+        # data changes the limits, and so forces
+        # a full redraw
+        dyn.setData(np.arange(20), np.linspace(2, 20, 20))
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        # and moving it back again
+        dyn.setData(np.arange(20), np.linspace(2, 8, 20))
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        # Without autoscaling, the limits
+        # are fixed, so the dynamic series
+        # can be blitted anywhere
+        panel.xAutoScale = False
+        panel.yAutoScale = False
+        assert spy.draw([dyn]) == 'full'
+
+        dyn.setData(np.arange(20), np.linspace(2, 20, 20))
+        assert spy.draw([dyn]) == 'blit'
+        dyn.setData(np.arange(20), np.linspace(-5, 8, 20))
+        assert spy.draw([dyn]) == 'blit'
+
+
+def test_blit_panZoom():
+    run_with_timeseriespanel(_test_blit_panZoom)
+def _test_blit_panZoom(panel, overlayList, displayCtx):
+
+    panel.asyncDraw = lambda *a: None
+    realYield(50)
+
+    held = _series(panel, overlayList, displayCtx, np.linspace(0, 10, 20))
+    dyn  = _series(panel, overlayList, displayCtx, np.linspace(2, 8, 20))
+    panel.dataSeries.append(held)
+
+    panel.xAutoScale = False
+    panel.yAutoScale = False
+
+    with Spy(panel) as spy:
+
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        axis     = panel.getAxis()
+        xlo, xhi = axis.get_xlim()
+        ylo, yhi = axis.get_ylim()
+        xoff     = (xhi - xlo) / 4.0
+        yoff     = (yhi - ylo) / 4.0
+
+        # pan
+        axis.set_xlim((xlo + xoff, xhi + xoff))
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
+
+        # zoom
+        axis.set_xlim((xlo + xoff, xhi - xoff))
+        axis.set_ylim((ylo + yoff, yhi - yoff))
+        assert spy.draw([dyn]) == 'full'
+        assert spy.draw([dyn]) == 'blit'
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#
+# test_powerspectrumcache.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy     as np
+import numpy.fft as fft
+
+import fsl.data.image                      as fslimage
+import fsleyes.plotting.powerspectrumcache as pscache
+
+
+def _powerSpectrum(data, varNorm):
+    if varNorm:
+        std = data.std()
+        if np.isclose(std, 0): data = np.zeros(data.shape)
+        else:                  data = (data - data.mean()) / std
+    data = fft.rfft(data)[1:]
+    return np.power(data.real, 2) + np.power(data.imag, 2)
+
+
+def test_calcPowerSpectra():
+
+    data       = np.random.random((20, 50))
+    data[5, :] = 4
+
+    for varNorm in (True, False):
+        result = pscache.calcPowerSpectra(data, varNorm)
+        assert result.shape == (20, 25)
+
+        for i in range(data.shape[0]):
+            exp = _powerSpectrum(data[i], varNorm)
+            assert np.all(np.isclose(result[i], exp))
+            assert np.all(np.isclose(
+                pscache.calcPowerSpectra(data[i], varNorm), exp))
+
+
+def test_getPowerSpectrum():
+
+    data = np.random.random((10, 10, 10, 20))
+    img  = fslimage.Image(data)
+    opts = mock.MagicMock()
+
+    opts.volumeDim          = 0
+    opts.index.return_value = (slice(None),) * 4
+
+    for limit in (0, data.size):
+        cache = pscache.PowerSpectrumCache(img, precomputeLimit=limit)
+
+        for varNorm in (True, False):
+            for vox in [(0, 0, 0), (5, 6, 7), (9, 9, 9), (1, 8, 2)]:
+                exp = _powerSpectrum(data[vox], varNorm)
+                got = cache.getPowerSpectrum(opts, vox, varNorm)
+                assert np.all(np.isclose(got, exp))
+
+        cache.destroy()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+# test_programcache.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import fsleyes.gl.shaders.programcache as programcache
+
+
+class Compiler(object):
+    def __init__(self):
+        self.compiled  = []
+        self.destroyed = []
+
+    def compile(self, name):
+        def func():
+            self.compiled.append(name)
+            return name
+        return func
+
+    def destroy(self, prog):
+        self.destroyed.append(prog)
+
+
+def _reset():
+    programcache._programs.clear()
+    programcache._unused  .clear()
+    programcache._current[0] = None
+    programcache._stats['hits']   = 0
+    programcache._stats['misses'] = 0
+
+
+def test_programKey():
+
+    key = programcache.programKey('glsl', 'vert', 'frag')
+
+    assert programcache.programKey('glsl', 'vert', 'frag') == key
+    assert programcache.programKey('arbp', 'vert', 'frag') != key
+    assert programcache.programKey('glsl', 'ver',  'tfrag') != key
+    assert programcache.programKey('glsl', 'vert', 'frag2') != key
+
+
+def test_acquire_release():
+
+    _reset()
+    comp = Compiler()
+
+    p1 = programcache.acquire('a', comp.compile('a'), comp.destroy)
+    p2 = programcache.acquire('a', comp.compile('a'), comp.destroy)
+    p3 = programcache.acquire('b', comp.compile('b'), comp.destroy)
+
+    assert p1 is p2
+    assert p1.program  == 'a'
+    assert p1.refcount == 2
+    assert comp.compiled == ['a', 'b']
+    assert programcache.stats() == {'hits'   : 1, 'misses' : 2,
+                                    'total'  : 2, 'unused' : 0}
+
+    # unused programs are kept
+    programcache.release(p1)
+    programcache.release(p2)
+    assert comp.destroyed == []
+    assert programcache.stats()['unused'] == 1
+
+    # and can be re-used
+    p4 = programcache.acquire('a', comp.compile('a'), comp.destroy)
+    assert p4 is p1
+    assert comp.compiled == ['a', 'b']
+    assert programcache.stats()['unused'] == 0
+
+    programcache.release(p3)
+    programcache.release(p4)
+    programcache.clear()
+
+    assert sorted(comp.destroyed) == ['a', 'b']
+    assert programcache.stats()['total'] == 0
+
+
+def test_maxUnused():
+
+    _reset()
+    comp  = Compiler()
+    names = ['{}'.format(i) for i in range(programcache.MAX_UNUSED + 5)]
+
+    for n in names:
+        programcache.release(
+            programcache.acquire(n, comp.compile(n), comp.destroy))
+
+    # least recently used
+    # programs are deleted
+    assert comp.destroyed == names[:5]
+    assert programcache.stats()['unused'] == programcache.MAX_UNUSED
+
+
+def test_bind():
+
+    _reset()
+    comp   = Compiler()
+    owner1 = object()
+    owner2 = object()
+    prog   = programcache.acquire('a', comp.compile('a'), comp.destroy)
+    prog   = programcache.acquire('a', comp.compile('a'), comp.destroy)
+
+    # first bind always requires values to be uploaded
+    assert     programcache.bind(prog, owner1)
+    assert     programcache.isBound(owner1)
+    programcache.unbind(owner1)
+    assert not programcache.isBound(owner1)
+
+    # same owner - values are already in the program
+    assert not programcache.bind(prog, owner1)
+    programcache.unbind(owner1)
+
+    # different owner
+    assert     programcache.bind(prog, owner2)
+    assert not programcache.isBound(owner1)
+    programcache.unbind(owner1)
+    assert     programcache.isBound(owner2)
+    programcache.unbind(owner2)
+
+    # values changed while not bound
+    programcache.invalidate(prog, owner2)
+    assert     programcache.bind(prog, owner2)
+    programcache.unbind(owner2)
+
+    # releasing clears ownership
+    programcache.release(prog, owner2)
+    assert prog.owner is None
+    assert programcache.bind(prog, owner2)
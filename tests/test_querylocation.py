@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# test_querylocation.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+import os.path as op
+
+import numpy   as np
+import nibabel as nib
+
+import fsl.data.image as fslimage
+
+from . import run_with_fsleyes, realYield
+
+
+datadir = op.join(op.dirname(__file__), 'testdata')
+
+
+def _test_queryLocation(frame, overlayList, displayCtx):
+
+    img1 = fslimage.Image(op.join(datadir, '3d'))
+    img2 = fslimage.Image(op.join(datadir, '4d'))
+    img3 = fslimage.Image(np.random.random(img1.shape),
+                          xform=img1.voxToWorldMat)
+    img3.data
+
+    overlayList.extend((img1, img2, img3))
+    realYield()
+
+    displayCtx.getOpts(img2).volume = 3
+
+    locs = [displayCtx.location.xyz,
+            img1.voxToWorldMat[:3, 3],
+            [-1000, -1000, -1000]]
+
+    for loc in locs:
+
+        displayCtx.location.xyz = loc
+        realYield()
+
+        results = displayCtx.queryLocation()
+
+        assert set(results.keys()) == set(overlayList)
+
+        for ovl in overlayList:
+            opts       = displayCtx.getOpts(ovl)
+            expvox     = opts.getVoxel()
+            vox, value = results[ovl]
+
+            if expvox is None:
+                assert vox   is None
+                assert value is None
+            else:
+                assert tuple(vox) == tuple(expvox)
+                assert value == ovl[opts.index(expvox)]
+
+    # Query for specific overlays / location
+    results = displayCtx.queryLocation([img2], [0, 0, 0])
+    expvox  = displayCtx.getOpts(img2).getVoxel([0, 0, 0])
+    assert list(results.keys()) == [img2]
+    if expvox is None: assert results[img2][0] is None
+    else:              assert results[img2][0] == tuple(expvox)
+
+
+def test_queryLocation():
+    run_with_fsleyes(_test_queryLocation)
+
+
+def _test_queryLocation_fileBacked(frame, overlayList, displayCtx):
+
+    # Image data is not loaded into memory
+    path = op.join(datadir, '4d')
+    img  = fslimage.Image(path, loadData=False)
+    data = np.asanyarray(nib.load(img.dataSource).dataobj)
+
+    overlayList.append(img)
+    realYield()
+
+    opts        = displayCtx.getOpts(img)
+    opts.volume = 2
+
+    for vox in [(0, 0, 0), (1, 2, 3), tuple(np.array(img.shape[:3]) - 1)]:
+
+        loc     = opts.transformCoords([vox], 'voxel', 'display')[0]
+        results = displayCtx.queryLocation([img], loc)
+
+        assert tuple(results[img][0]) == vox
+        assert np.isclose(results[img][1], data[vox + (2,)])
@@ -17,6 +17,7 @@ import wx
 import fsl.data.image as fslimage
 
 import fsleyes.actions.resample as resample
+import fsleyes.resampledimage   as resampledimage
 
 from . import (run_with_fsleyes,
                run_with_orthopanel,
@@ -40,6 +41,7 @@ def _test_resample(panel, overlayList, displayCtx):
         GetDataType_return      = None
         GetSmoothing_return     = None
         GetAllVolumes_return    = None
+        GetVirtual_return       = False
         def __init__(self, *args, **kwargs):
             pass
         def ShowModal(self):
@@ -55,6 +57,8 @@ def _test_resample(panel, overlayList, displayCtx):
             return ResampleDialog.GetSmoothing_return
         def GetAllVolumes(self):
             return ResampleDialog.GetAllVolumes_return
+        def GetVirtual(self):
+            return ResampleDialog.GetVirtual_return
         def GetPixdims(self):
             return ResampleDialog.GetPixdims_return
 
@@ -104,6 +108,36 @@ def _test_resample(panel, overlayList, displayCtx):
         assert tuple(resampled.pixdim) == (2, 2, 2)
         assert resampled.dtype         == np.int32
 
+        # large images are resampled in the background
+        overlayList.clear()
+        overlayList.append(img)
+        ResampleDialog.GetAllVolumes_return = True
+        with mock.patch('fsleyes.actions.resample.BACKGROUND_LIMIT', 0):
+            act()
+            for i in range(50):
+                if len(overlayList) == 2:
+                    break
+                realYield(10)
+        assert len(overlayList) == 2
+        resampled = overlayList[1]
+        assert tuple(resampled.shape)  == (10, 10, 10, 15)
+        assert tuple(resampled.pixdim) == (2, 2, 2, 1)
+        assert resampled.dtype         == np.int32
+
+        # virtual images are added immediately,
+        # and keep the source data type
+        overlayList.clear()
+        overlayList.append(img)
+        ResampleDialog.GetVirtual_return = True
+        act()
+        assert len(overlayList) == 2
+        resampled = overlayList[1]
+        assert isinstance(resampled, resampledimage.ResampledImage)
+        assert resampled.source        is img
+        assert tuple(resampled.shape)  == (10, 10, 10, 15)
+        assert tuple(resampled.pixdim) == (2, 2, 2, 1)
+        assert resampled.dtype         == img.dtype
+
 
 def test_ResampleDialog():
     run_with_fsleyes(_test_ResampleDialog)
@@ -194,3 +228,16 @@ def _test_ResampleDialog(frame, overlayList, displayCtx):
     assert dlg.GetInterpolation() == 'nearest'
     assert dlg.GetDataType()      == np.uint8
     dlg.Destroy()
+
+    # virtual disables the data type control
+    dlg = resample.ResampleDialog(frame,
+                                  'title',
+                                  (10, 10, 10, 10),
+                                  (1, 1, 1))
+
+    wx.CallLater(500,  simclick, sim, dlg.virtualCtrl)
+    wx.CallLater(1000, simclick, sim, dlg.okButton)
+    dlg.ShowModal()
+    assert dlg.GetVirtual()
+    assert not dlg.dtypeCtrl.IsEnabled()
+    dlg.Destroy()
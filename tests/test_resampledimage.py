@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+# test_resampledimage.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy         as np
+import scipy.ndimage as ndimage
+import pytest
+
+import fsl.data.image         as fslimage
+import fsl.utils.transform    as transform
+import fsleyes.resampledimage as resampledimage
+
+
+def _checkResampled(got, exp, order):
+    """Compares resampled data against expected data. Nearest neighbour
+    interpolation must give identical results. Otherwise, the values are
+    calculated in a different order (one slice at a time, from a sub-region
+    of the source), so we allow for floating point error, and, for integer
+    images, for values which lie on a rounding boundary.
+    """
+
+    assert got.shape == exp.shape
+
+    if order == 0:
+        assert np.all(got == exp)
+    elif np.issubdtype(got.dtype, np.integer):
+        assert np.allclose(got, exp, rtol=0, atol=1)
+    else:
+        assert np.allclose(got, exp, rtol=1e-5, atol=1e-5)
+
+
+def test_ResampledImage():
+
+    data  = np.random.random((20, 22, 24, 3)).astype(np.float32)
+    xform = transform.scaleOffsetXform((2, 2, 2), (-20, -22, -24))
+    img   = fslimage.Image(data, xform=xform)
+    res   = resampledimage.ResampledImage(img, (10, 11, 12))
+
+    assert res.source is img
+    assert res.name   == '{}_resampled'.format(img.name)
+    assert res.shape  == (10, 11, 12, 3)
+    assert res.dtype  == img.dtype
+    assert np.all(np.isclose(res.pixdim[:3], (4, 4, 4)))
+    assert np.all(np.isclose(res.voxToSourceVoxMat,
+                             transform.scaleOffsetXform((2, 2, 2), 0)))
+    assert res.dataRange == img.dataRange
+
+    # voxel values are calculated on access
+    for vol in range(3):
+        exp, xform = img.resample((10, 11, 12),
+                                  sliceobj=(slice(None),) * 3 + (vol,),
+                                  order=1,
+                                  smooth=False)
+        assert np.all(np.isclose(xform, res.voxToWorldMat))
+        _checkResampled(res[..., vol], exp, 1)
+
+    exp = res[:]
+    assert np.all(np.isclose(res[3, 4, 5, :],     exp[3, 4, 5, :]))
+    assert np.all(np.isclose(res[2:8, -1, 3:9],   exp[2:8, -1, 3:9]))
+
+    with pytest.raises(RuntimeError):
+        res[0, 0, 0, 0] = 1
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.int16])
+@pytest.mark.parametrize('order', [0, 1, 3])
+@pytest.mark.parametrize('shape', [(10, 11, 12), (13, 17, 29), (30, 33, 36)])
+def test_ResampledImage_order(dtype, order, shape):
+
+    data = (np.random.random((20, 22, 24)) * 100).astype(dtype)
+    img  = fslimage.Image(data)
+    res  = resampledimage.ResampledImage(img, shape, order=order)
+
+    # Image.resample smooths by default
+    # when down-sampling - ResampledImage
+    # does not.
+    exp, xform = img.resample(shape, order=order, smooth=False)
+
+    assert res.dtype == img.dtype
+    assert np.all(np.isclose(xform, res.voxToWorldMat))
+    _checkResampled(res[:], exp, order)
+
+
+@pytest.mark.parametrize('order', [0, 1, 3])
+def test_ResampledImage_xform(order):
+
+    data  = np.random.randint(0, 100, (20, 20, 20)).astype(np.int16)
+    img   = fslimage.Image(data)
+
+    # Target grid rotated/shifted
+    # relative to the source
+    xform = transform.compose((1.5, 1.5, 1.5),
+                              (2, -1, 3),
+                              (0.1, 0, 0.2))
+    res   = resampledimage.ResampledImage(img, (15, 15, 15),
+                                          xform=xform,
+                                          order=order)
+    v2s   = transform.concat(img.worldToVoxMat, xform)
+
+    assert np.all(np.isclose(res.voxToWorldMat,     xform))
+    assert np.all(np.isclose(res.voxToSourceVoxMat, v2s))
+
+    # Image.resample cannot resample to an
+    # arbitrary grid, so we resample the
+    # source in the same way that it does
+    # (with points outside of the source
+    # set to 0).
+    if order == 0: src = data
+    else:          src = data.astype(np.float64)
+
+    got = res[:]
+    exp = ndimage.affine_transform(src,
+                                   v2s[:3, :3],
+                                   offset=v2s[:3, 3],
+                                   output_shape=(15, 15, 15),
+                                   order=order,
+                                   mode='constant',
+                                   cval=0)
+
+    if order > 0:
+        exp = np.round(exp).astype(np.int16)
+
+    assert got.dtype == np.int16
+    _checkResampled(got, exp, order)
+
+
+def test_ResampledImage_sourceChanged():
+
+    data = np.zeros((10, 10, 10), dtype=np.float32)
+    img  = fslimage.Image(data)
+    res  = resampledimage.ResampledImage(img, (5, 5, 5), order=0)
+
+    assert np.all(res[:] == 0)
+
+    img[:] = np.ones(img.shape, dtype=np.float32)
+    assert np.all(res[:] == 1)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+# test_resampling.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import itertools as it
+
+import numpy as np
+import pytest
+
+import fsl.data.image      as fslimage
+import fsleyes.workerpool  as workerpool
+import fsleyes.resampling  as resampling
+
+
+def test_resample_3d():
+
+    data = np.random.random((23, 19, 31)).astype(np.float32)
+    img  = fslimage.Image(data)
+
+    shapes = [(10, 10, 10), (40, 12.5, 61), (23, 19, 15)]
+
+    for order, smooth, slabSize, shape in it.product((0, 1, 3),
+                                                     (True, False),
+                                                     (50, None),
+                                                     shapes):
+
+        exp, expxform = img.resample(shape, order=order, smooth=smooth)
+        got, gotxform = resampling.resample(img,
+                                            shape,
+                                            order=order,
+                                            smooth=smooth,
+                                            slabSize=slabSize)
+
+        # The cubic spline pre-filter is not
+        # local, so slab boundaries will cause
+        # small differences
+        if order > 1: atol = 1e-3
+        else:         atol = 1e-5
+
+        assert got.shape == exp.shape
+        assert np.all(np.isclose(got, exp, atol=atol))
+        assert np.all(np.isclose(gotxform, expxform))
+
+
+def test_resample_4d():
+
+    data = np.random.random((13, 14, 15, 4)).astype(np.float32)
+    img  = fslimage.Image(data)
+    pool = workerpool.WorkerPool(2)
+
+    try:
+        exp, expxform = img.resample((7, 7, 30, 4), dtype=np.float64)
+        got, gotxform = resampling.resample(img,
+                                            (7, 7, 30, 4),
+                                            dtype=np.float64,
+                                            pool=pool,
+                                            slabSize=100)
+        assert got.dtype == np.float64
+        assert np.all(np.isclose(got, exp))
+        assert np.all(np.isclose(gotxform, expxform))
+
+        slc           = (slice(None), slice(None), slice(None), 2)
+        exp, expxform = img.resample((7, 7, 30), sliceobj=slc)
+        got, gotxform = resampling.resample(img,
+                                            (7, 7, 30),
+                                            sliceobj=slc,
+                                            pool=pool)
+        assert np.all(np.isclose(got, exp))
+    finally:
+        pool.stop()
+
+    # same shape
+    got, gotxform = resampling.resample(img, img.shape)
+    assert np.all(got == data)
+
+    # spatial slicing / non-spatial
+    # resampling not supported
+    with pytest.raises(ValueError):
+        resampling.resample(img, (5, 5, 5), sliceobj=(slice(1, 4),))
+    with pytest.raises(ValueError):
+        resampling.resample(img, (7, 7, 7, 2))
+
+
+def test_resample_progress_cancel():
+
+    data  = np.random.random((13, 14, 15, 10)).astype(np.float32)
+    img   = fslimage.Image(data)
+    calls = []
+
+    def progfunc(done, total):
+        calls.append((done, total))
+        return True
+
+    resampling.resample(img, (7, 7, 7, 10), progfunc=progfunc)
+    assert calls == [(i + 1, 10) for i in range(10)]
+
+    calls = []
+    def progfunc(done, total):
+        calls.append((done, total))
+        return done < 3
+
+    with pytest.raises(resampling.ResampleCancelled):
+        resampling.resample(img, (7, 7, 7, 10), progfunc=progfunc)
+    assert calls[-1] == (3, 10)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+# test_routines.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy as np
+
+import fsl.utils.transform as transform
+import fsleyes.gl.routines as glroutines
+
+
+def _random_affines(n):
+    xforms = []
+    for i in range(n):
+        xforms.append(transform.compose(np.random.random(3) + 0.5,
+                                        np.random.random(3) * 10,
+                                        np.random.random(3)))
+    return np.array(xforms)
+
+
+def test_stackTransform():
+
+    coords = np.random.random((10, 6, 3))
+    xforms = _random_affines(10)
+    got    = glroutines.stackTransform(coords, xforms)
+
+    assert got.shape == (10, 6, 3)
+
+    for c, x, g in zip(coords, xforms, got):
+        assert np.all(np.isclose(g, transform.transform(c, x)))
+
+
+def test_broadcast():
+
+    vertices = np.random.random((6, 3)).astype(np.float32)
+    indices  = np.arange(6, dtype=np.uint32)
+    zposes   = np.linspace(-10, 10, 15)
+    xforms   = _random_affines(15)
+
+    for zax in range(3):
+
+        verts, texs, idxs = glroutines.broadcast(
+            vertices, indices, zposes, xforms, zax)
+
+        assert verts.shape == (90, 3)
+        assert texs .shape == (90, 3)
+        assert idxs .shape == (90,)
+
+        for i, (zpos, xform) in enumerate(zip(zposes, xforms)):
+
+            expt         = np.array(vertices)
+            expt[:, zax] = zpos
+            expv         = transform.transform(expt, xform)
+
+            assert np.all(np.isclose(texs[ i * 6:i * 6 + 6], expt))
+            assert np.all(np.isclose(verts[i * 6:i * 6 + 6], expv,
+                                     atol=1e-4))
+            assert np.all(idxs[i * 6:i * 6 + 6] == indices + i * 6)
+
+    # list of matrices, and no slices
+    verts, texs, idxs = glroutines.broadcast(
+        vertices, indices, zposes[:2], list(xforms[:2]), 2)
+    assert verts.shape == (12, 3)
+
+    verts, texs, idxs = glroutines.broadcast(vertices, indices, [], [], 2)
+    assert verts.shape == (0, 3)
+    assert idxs .shape == (0,)
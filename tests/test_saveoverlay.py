@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+#
+# test_saveoverlay.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os.path as op
+
+import numpy as np
+
+import fsl.data.image              as fslimage
+import fsleyes.actions.saveoverlay as saveoverlay
+
+from . import tempdir
+
+
+def test_doSave():
+
+    data = np.random.random((20, 20, 20)).astype(np.float32)
+
+    with tempdir():
+
+        img      = fslimage.Image(data)
+        finished = []
+
+        assert not img.saveState
+
+        assert saveoverlay.doSave(img,
+                                  'image.nii.gz',
+                                  onFinish=lambda: finished.append(True),
+                                  blocking=True)
+
+        assert finished == [True]
+        assert img.saveState
+        assert not saveoverlay.isSaving(img)
+        assert img.dataSource == op.abspath('image.nii.gz')
+        assert np.all(fslimage.Image('image.nii.gz')[:] == data)
+
+        # Images which can't be saved in the
+        # background are saved via Image.save
+        img[0, 0, 0] = 5
+        assert not img.saveState
+        assert saveoverlay.doSave(img, 'image.img', blocking=True)
+        assert img.saveState
+        assert fslimage.Image('image.img')[0, 0, 0] == 5
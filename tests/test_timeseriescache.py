@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+#
+# test_timeseriescache.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy as np
+
+import fsl.data.image                   as fslimage
+import fsleyes.plotting.timeseriescache as tscache
+
+
+def _opts(image):
+    opts = mock.MagicMock()
+    opts.index.return_value = (slice(None),) * image.ndim
+    return opts
+
+
+def test_getTimeSeries():
+
+    data  = np.random.random((10, 11, 12, 15)).astype(np.float32)
+    img   = fslimage.Image(data)
+    opts  = _opts(img)
+    cache = tscache.TimeSeriesCache(img, blockSize=4)
+
+    for x, y, z in [(0, 0, 0), (3, 4, 5), (9, 10, 11), (4, 4, 4), (8, 1, 7)]:
+        assert np.all(cache.getTimeSeries(opts, (x, y, z)) == data[x, y, z])
+
+    cache.destroy()
+
+
+def test_dataChanged():
+
+    data  = np.random.random((10, 10, 10, 5)).astype(np.float32)
+    img   = fslimage.Image(data)
+    opts  = _opts(img)
+    cache = tscache.TimeSeriesCache(img)
+
+    assert np.all(cache.getTimeSeries(opts, (2, 2, 2)) == data[2, 2, 2])
+
+    img[2, 2, 2, :] = [1, 2, 3, 4, 5]
+
+    assert np.all(cache.getTimeSeries(opts, (2, 2, 2)) == [1, 2, 3, 4, 5])
+    cache.destroy()
+
+
+def test_acquire_release():
+
+    img = fslimage.Image(np.random.random((5, 5, 5, 5)))
+
+    c1 = tscache.acquire(img)
+    c2 = tscache.acquire(img)
+    assert c1 is c2
+
+    tscache.release(img)
+    tscache.release(img)
+
+    c3 = tscache.acquire(img)
+    assert c3 is not c1
+    tscache.release(img)
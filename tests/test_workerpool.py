@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+# test_workerpool.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+import time
+import threading
+
+import fsleyes.workerpool as workerpool
+
+
+def test_submit():
+    pool = workerpool.WorkerPool(2)
+    jobs = [pool.submit(lambda v=i: v * 2) for i in range(10)]
+
+    for job in jobs:
+        assert job.wait(5)
+
+    assert [j.result for j in jobs] == [i * 2 for i in range(10)]
+    assert not any(j.cancelled() for j in jobs)
+    pool.stop()
+
+
+def test_error():
+    def fail():
+        raise ValueError('bad')
+
+    pool = workerpool.WorkerPool(1)
+    job  = pool.submit(fail)
+    assert job.wait(5)
+    assert isinstance(job.error, ValueError)
+    assert job.result is None
+    pool.stop()
+
+
+def test_cancel():
+
+    pool    = workerpool.WorkerPool(1)
+    block   = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        block.wait()
+        return 'blocker'
+
+    first = pool.submit(blocker)
+    started.wait(5)
+
+    # the first job is running, so can't be cancelled
+    others = [pool.submit(lambda: 'a', jobGroup='a'),
+              pool.submit(lambda: 'b', jobGroup='b'),
+              pool.submit(lambda: 'a', jobGroup='a')]
+
+    assert pool.cancel('a') == 2
+    assert not first.cancel()
+    block.set()
+
+    assert first.wait(5)
+    assert others[1].wait(5)
+
+    assert first.result     == 'blocker'
+    assert others[0].cancelled()
+    assert others[2].cancelled()
+    assert others[1].result == 'b'
+    assert pool.cancel() == 0
+    pool.stop()
+
+
+def test_stop():
+    pool = workerpool.WorkerPool(2)
+    pool.stop()
+    time.sleep(0.1)
+    job = pool.submit(lambda: 1)
+    assert job.cancelled()
+    assert job.done()